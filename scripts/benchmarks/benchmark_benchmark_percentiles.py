@@ -0,0 +1,93 @@
+"""
+Benchmark Percentile Table Benchmark
+
+Compares the two ``AnalyticsEngine.compute_benchmark_metrics`` paths on the
+configured database: the live ROW_NUMBER() window over ``metric_snapshots``
+for the whole ticker universe, and the lookup against the
+``benchmark_percentiles`` table written by
+``AnalyticsEngine.materialize_benchmark_percentiles`` (also timed). Reports
+mean/p95 latency per call and checks both paths agree.
+
+Usage:
+    python scripts/benchmarks/benchmark_benchmark_percentiles.py
+    python scripts/benchmarks/benchmark_benchmark_percentiles.py --database data/sqlite/finanlyzeos_chatbot.sqlite3 --repeat 50
+"""
+
+import argparse
+import dataclasses
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.finanlyzeos_chatbot.analytics_engine import AnalyticsEngine
+from src.finanlyzeos_chatbot.config import load_settings
+
+DEFAULT_METRICS = (
+    "revenue", "net_income", "net_margin", "operating_margin", "return_on_equity",
+    "pe_ratio", "ev_ebitda", "free_cash_flow", "revenue_cagr", "dividend_yield",
+)
+
+
+def p95(values) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def time_calls(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark live vs materialized benchmark metrics")
+    parser.add_argument("--database", type=Path, default=None, help="SQLite database (defaults to settings)")
+    parser.add_argument("--universe", default="sp500")
+    parser.add_argument("--metrics", nargs="+", default=list(DEFAULT_METRICS))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = load_settings()
+    if args.database is not None:
+        settings = dataclasses.replace(settings, database_path=args.database)
+    if not Path(settings.database_path).exists():
+        sys.exit(f"Database not found: {settings.database_path}")
+    engine = AnalyticsEngine(settings)
+
+    start = time.perf_counter()
+    stored = engine.materialize_benchmark_percentiles(args.universe)
+    materialize_ms = (time.perf_counter() - start) * 1000
+
+    live = engine.compute_benchmark_metrics(args.metrics, universe=args.universe, use_materialized=False)
+    fast = engine.compute_benchmark_metrics(args.metrics, universe=args.universe)
+    mismatched = [
+        metric for metric in live
+        if metric not in fast or abs(live[metric].value - fast[metric].value) > 1e-9 * max(1.0, abs(live[metric].value))
+    ]
+
+    live_ms = time_calls(
+        lambda: engine.compute_benchmark_metrics(args.metrics, universe=args.universe, use_materialized=False),
+        args.repeat,
+    )
+    fast_ms = time_calls(lambda: engine.compute_benchmark_metrics(args.metrics, universe=args.universe), args.repeat)
+
+    print(f"Database: {settings.database_path}")
+    print(f"Universe: {args.universe}  metrics requested: {len(args.metrics)}  found: {len(live)}")
+    print(f"Materialization: {stored} distributions in {materialize_ms:.1f} ms")
+    print(f"{'path':<14} {'mean ms':>9} {'p95 ms':>9}")
+    print(f"{'window query':<14} {statistics.mean(live_ms):9.2f} {p95(live_ms):9.2f}")
+    print(f"{'materialized':<14} {statistics.mean(fast_ms):9.2f} {p95(fast_ms):9.2f}")
+    if statistics.mean(fast_ms) > 0:
+        print(f"Speed-up: {statistics.mean(live_ms) / statistics.mean(fast_ms):.1f}x")
+    print("Results match" if not mismatched else f"Mismatched metrics: {', '.join(mismatched)}")
+
+
+if __name__ == "__main__":
+    main()
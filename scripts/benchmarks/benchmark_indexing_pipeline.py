@@ -0,0 +1,114 @@
+"""
+Bulk Indexing Throughput Benchmark
+
+Measures docs/sec and chunks/sec for indexing a local fixture of synthetic
+10-K filings (ITEM 1, 1A and 7 built from the retrieval fixture paragraphs):
+
+- parse only: serial ``extract_sections_from_filing`` vs the process pool
+  used by ``IndexingPipeline``
+- end to end (needs chromadb + sentence-transformers): serial per-filing
+  ``VectorStore.sync_documents`` vs ``IndexingPipeline.run``, each into a
+  fresh temporary Chroma store
+
+Usage:
+    python scripts/benchmarks/benchmark_indexing_pipeline.py --filings 40 --workers 4
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.finanlyzeos_chatbot.rag_indexing_pipeline import FilingTask, IndexingPipeline, parse_filing
+from src.finanlyzeos_chatbot.rag_retriever import VectorStore
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "retrieval_fusion.json"
+ITEMS = [
+    ("ITEM 1. BUSINESS", 12),
+    ("ITEM 1A. RISK FACTORS", 30),
+    ("ITEM 7. MANAGEMENT'S DISCUSSION AND ANALYSIS OF FINANCIAL CONDITION AND RESULTS OF OPERATIONS", 40),
+]
+
+
+def build_filings(count: int, seed: int = 7) -> list:
+    paragraphs = [doc["text"] for doc in json.loads(FIXTURE.read_text(encoding="utf-8"))["documents"]]
+    rng = random.Random(seed)
+    filings = []
+    for n in range(count):
+        body = []
+        for heading, length in ITEMS:
+            body.append(heading)
+            body.extend(f"{rng.choice(paragraphs)} (Note {n}.{i})" for i in range(length))
+        body.append("SIGNATURES")
+        filings.append(FilingTask(
+            source_key=f"sec:bench-{n:04d}",
+            filing_text="\n\n".join(body),
+            ticker=["AAPL", "MSFT", "NVDA", "JPM", "XOM"][n % 5],
+            filing_type="10-K",
+            fiscal_year=2020 + n % 5,
+            source_url="https://www.sec.gov/",
+            metadata={"document_id": f"bench-{n:04d}"},
+        ))
+    return filings
+
+
+def report(label: str, filings: int, chunks: int, seconds: float) -> None:
+    print(f"  {label:<22} {seconds:8.2f}s {filings / seconds:9.2f} docs/s {chunks / seconds:10.1f} chunks/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the bulk indexing pipeline")
+    parser.add_argument("--filings", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count - 1)")
+    parser.add_argument("--embed-batch", type=int, default=512)
+    args = parser.parse_args()
+
+    filings = build_filings(args.filings)
+    print(f"Fixture: {len(filings)} filings, {sum(len(f.filing_text) for f in filings) / 1e6:.1f}M characters")
+
+    print("Parse + chunk:")
+    start = time.perf_counter()
+    serial_chunks = sum(len(parse_filing(task)[1]) for task in filings)
+    report("serial", len(filings), serial_chunks, time.perf_counter() - start)
+
+    workers = IndexingPipeline(None, parse_workers=args.workers).parse_workers
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pool_chunks = sum(len(sections) for _, sections in pool.map(parse_filing, filings))
+    report(f"process pool ({workers})", len(filings), pool_chunks, time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial_store = VectorStore(Path(tmp) / "serial" / "bench.sqlite3")
+        if not serial_store._available:
+            print("End to end: skipped (needs chromadb and sentence-transformers)")
+            return
+
+        print("Parse + embed + write:")
+        start = time.perf_counter()
+        for task in filings:
+            _, sections = parse_filing(task)
+            serial_store.sync_documents(task.source_key, sections, serial_store.sec_collection)
+        report("serial sync", len(filings), serial_chunks, time.perf_counter() - start)
+
+        pipeline_store = VectorStore(Path(tmp) / "pipeline" / "bench.sqlite3")
+        pipeline = IndexingPipeline(pipeline_store, parse_workers=args.workers, embed_batch_size=args.embed_batch)
+        stats = pipeline.run(filings, pipeline_store.sec_collection)
+        report("pipeline", stats.filings, stats.chunks, stats.elapsed_seconds)
+        print(
+            f"    embed {stats.embed_seconds:.2f}s  write {stats.write_seconds:.2f}s  "
+            f"waiting on parsers {stats.parse_wait_seconds:.2f}s"
+        )
+
+        stats = pipeline.run(filings, pipeline_store.sec_collection)
+        report("pipeline (unchanged)", stats.filings, stats.chunks, stats.elapsed_seconds)
+
+
+if __name__ == "__main__":
+    main()
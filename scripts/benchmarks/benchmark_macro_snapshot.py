@@ -0,0 +1,80 @@
+"""
+Macro Snapshot Benchmark
+
+Times ``MacroDataProvider.get_macro_snapshot`` offline against a local fixture
+source with simulated per-request latency: a sequential cold fetch (the legacy
+one-indicator-at-a-time behaviour), a parallel cold fetch, a cold start in a
+new provider seeded from the persisted snapshot table, and a warm in-memory read.
+
+Usage:
+    python scripts/benchmarks/benchmark_macro_snapshot.py --latency-ms 80
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.finanlyzeos_chatbot.macro_data import LocalMacroFixtureSource, MacroDataProvider
+
+FIXTURE = {
+    "fed_funds_rate": 4.33,
+    "treasury_10y": 4.21,
+    "vix": 16.4,
+    "sp500": 6120.0,
+    "unemployment": 4.2,
+    "inflation": 2.8,
+    "core_cpi": 3.0,
+    "core_pce": 2.7,
+    "pce": 2.5,
+    "eur_usd": 1.09,
+}
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cached macro snapshot reads")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Simulated latency per indicator fetch")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "macro.sqlite3"
+
+        sequential = MacroDataProvider(
+            source=LocalMacroFixtureSource(FIXTURE, latency_seconds=latency),
+            max_refresh_workers=1,
+        )
+        parallel = MacroDataProvider(
+            database_path=db_path,
+            source=LocalMacroFixtureSource(FIXTURE, latency_seconds=latency),
+            max_refresh_workers=args.workers,
+        )
+        timings = {
+            "cold sequential": timed(sequential.get_macro_snapshot),
+            "cold parallel": timed(parallel.get_macro_snapshot),
+        }
+        persisted = MacroDataProvider(
+            database_path=db_path,
+            source=LocalMacroFixtureSource(FIXTURE, latency_seconds=latency),
+        )
+        timings["cold from table"] = timed(persisted.get_macro_snapshot)
+        timings["warm in-memory"] = timed(persisted.get_macro_snapshot)
+
+    print(f"Indicators: {len(MacroDataProvider.INDICATORS)}  simulated latency: {args.latency_ms:.0f} ms/fetch")
+    for label, seconds in timings.items():
+        print(f"  {label:<16} {seconds * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
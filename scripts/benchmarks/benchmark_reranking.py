@@ -0,0 +1,94 @@
+"""
+Reranking Candidate-Cap Benchmark
+
+Measures the latency/recall trade-off of ``Reranker`` candidate caps. BM25
+over the labelled retrieval fixture supplies first-stage candidates (each
+document is also added with light edits so deduplication has work to do);
+each cap is then reranked with a cold score cache. Reports pruned candidate
+count, mean rerank latency, Recall@k against the labels and overlap with
+the uncapped top-k, plus a warm-cache pass.
+
+Requires sentence-transformers (cross-encoder) and rank-bm25.
+
+Usage:
+    python scripts/benchmarks/benchmark_reranking.py --caps 5 10 20 0 --top-k 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.finanlyzeos_chatbot.rag_reranker import Reranker
+from src.finanlyzeos_chatbot.rag_sparse_retriever import BM25_AVAILABLE, SparseRetriever
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "retrieval_fusion.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark reranker candidate caps")
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE)
+    parser.add_argument("--caps", type=int, nargs="+", default=[5, 10, 20, 0], help="Candidate caps (0 = uncapped)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--first-stage", type=int, default=40, help="BM25 candidates per query")
+    args = parser.parse_args()
+
+    if not BM25_AVAILABLE:
+        sys.exit("rank-bm25 is required: pip install rank-bm25")
+    reranker = Reranker(use_reranking=True)
+    if not reranker.use_reranking:
+        sys.exit("sentence-transformers CrossEncoder is required for reranking")
+
+    fixture = json.loads(args.fixture.read_text(encoding="utf-8"))
+    documents = []
+    for doc in fixture["documents"]:
+        metadata = {"document_id": doc["id"], "ticker": doc.get("ticker")}
+        documents.append({"text": doc["text"], "metadata": metadata})
+        documents.append({"text": doc["text"].replace(",", "").upper(), "metadata": dict(metadata)})
+    sparse = SparseRetriever(sec_documents=documents)
+    queries = [
+        (item["query"], set(item["relevant"]), sparse.search_sec(item["query"], n_results=args.first_stage))
+        for item in fixture["queries"]
+    ]
+
+    def top_ids(reranked):
+        return [doc.metadata["document_id"] for doc in reranked]
+
+    reference = {
+        query: top_ids(reranker.rerank(query, hits, top_k=args.top_k, max_candidates=10 ** 6))
+        for query, _, hits in queries
+    }
+
+    print(f"Queries: {len(queries)}  first-stage candidates <= {args.first_stage}  top_k={args.top_k}")
+    print(f"{'cap':>6} {'scored':>7} {'mean ms':>9} {'recall':>7} {'overlap':>8}")
+    for cap in args.caps:
+        reranker.clear_cache()
+        latencies, scored, recalls, overlaps = [], [], [], []
+        for query, relevant, hits in queries:
+            stats = {}
+            start = time.perf_counter()
+            reranked = reranker.rerank(query, hits, top_k=args.top_k, max_candidates=cap or 10 ** 6, stats=stats)
+            latencies.append((time.perf_counter() - start) * 1000)
+            scored.append(stats["pruned_candidates"])
+            ids = top_ids(reranked)
+            recalls.append(len(set(ids) & relevant) / len(relevant))
+            overlaps.append(len(set(ids) & set(reference[query])) / max(1, len(reference[query])))
+        print(
+            f"{cap or 'all':>6} {statistics.mean(scored):7.1f} {statistics.mean(latencies):9.2f} "
+            f"{statistics.mean(recalls):7.3f} {statistics.mean(overlaps):8.3f}"
+        )
+
+    start = time.perf_counter()
+    for query, _, hits in queries:
+        reranker.rerank(query, hits, top_k=args.top_k, max_candidates=args.caps[-1] or 10 ** 6)
+    warm_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"  warm score cache: {warm_ms:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
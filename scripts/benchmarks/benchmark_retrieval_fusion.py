@@ -0,0 +1,132 @@
+"""
+Retrieval Fusion Benchmark
+
+Compares dense-only, sparse-only, weighted score fusion
+(``SourceFusion.fuse_sparse_dense``) and reciprocal rank fusion
+(``SourceFusion.fuse_reciprocal_rank``) on a labelled query/relevant-document
+fixture. The corpus is indexed into a throwaway local Chroma store and a BM25
+index. Reports nDCG@5/@10, Recall@5/@10, MRR and mean/p95 per-query latency
+(retrieval + fusion) via ``RAGEvaluator``.
+
+Requires chromadb, sentence-transformers and rank-bm25.
+
+Usage:
+    python scripts/benchmarks/benchmark_retrieval_fusion.py
+    python scripts/benchmarks/benchmark_retrieval_fusion.py --fixture my_fixture.json --k 10
+"""
+
+import argparse
+import copy
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.finanlyzeos_chatbot.rag_evaluation import RAGEvaluator
+from src.finanlyzeos_chatbot.rag_fusion import SourceFusion
+from src.finanlyzeos_chatbot.rag_retriever import VectorStore
+from src.finanlyzeos_chatbot.rag_sparse_retriever import BM25_AVAILABLE, SparseRetriever
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "retrieval_fusion.json"
+METHODS = ("dense", "sparse", "weighted", "rrf")
+
+
+def doc_ids(docs) -> list:
+    return [doc.metadata.get("document_id", "") for doc in docs]
+
+
+def p95(values) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark sparse/dense fusion strategies")
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE, help="JSON with 'documents' and 'queries'")
+    parser.add_argument("--k", type=int, default=10, help="Candidates retrieved per retriever")
+    parser.add_argument("--dense-weight", type=float, default=0.6)
+    parser.add_argument("--sparse-weight", type=float, default=0.4)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    args = parser.parse_args()
+
+    fixture = json.loads(args.fixture.read_text(encoding="utf-8"))
+    documents = [
+        {"text": doc["text"], "metadata": {"document_id": doc["id"], "ticker": doc.get("ticker")}}
+        for doc in fixture["documents"]
+    ]
+    queries = fixture["queries"]
+
+    if not BM25_AVAILABLE:
+        sys.exit("rank-bm25 is required: pip install rank-bm25")
+
+    evaluator = RAGEvaluator()
+    fusion = SourceFusion()
+    evaluations = {method: [] for method in METHODS}
+    latencies = {method: [] for method in METHODS}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(Path(tmp) / "bench.sqlite3", collection_name="fusion_bench")
+        if not store._available:
+            sys.exit("chromadb and sentence-transformers are required for the dense retriever")
+        store.add_sec_documents(documents)
+        sparse = SparseRetriever(sec_documents=documents)
+
+        # Warm the embedding model so the first query does not pay model start-up
+        store.embed_query("warm-up")
+
+        for item in queries:
+            query, relevant = item["query"], set(item["relevant"])
+
+            start = time.perf_counter()
+            dense_hits = store.search_sec_narratives(query, n_results=args.k)
+            dense_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            sparse_hits = sparse.search_sec(query, n_results=args.k)
+            sparse_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            weighted = fusion.fuse_sparse_dense(
+                copy.deepcopy(dense_hits),
+                copy.deepcopy(sparse_hits),
+                dense_weight=args.dense_weight,
+                sparse_weight=args.sparse_weight,
+            )
+            weighted_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rrf = fusion.fuse_reciprocal_rank(
+                copy.deepcopy(dense_hits), copy.deepcopy(sparse_hits), k=args.rrf_k
+            )
+            rrf_seconds = time.perf_counter() - start
+
+            rankings = {
+                "dense": (dense_hits, dense_seconds),
+                "sparse": (sparse_hits, sparse_seconds),
+                "weighted": (weighted, dense_seconds + sparse_seconds + weighted_seconds),
+                "rrf": (rrf, dense_seconds + sparse_seconds + rrf_seconds),
+            }
+            for method, (ranked, seconds) in rankings.items():
+                evaluations[method].append(
+                    evaluator.evaluate_ranking(query, doc_ids(ranked)[:args.k], relevant)
+                )
+                latencies[method].append(seconds * 1000)
+
+    print(f"Corpus: {len(documents)} documents  queries: {len(queries)}  k={args.k}")
+    print(f"{'method':<10} {'nDCG@5':>8} {'nDCG@10':>8} {'R@5':>7} {'R@10':>7} {'MRR':>7} {'mean ms':>9} {'p95 ms':>9}")
+    for method in METHODS:
+        scores = evaluator.evaluate_batch(evaluations[method])
+        print(
+            f"{method:<10} {scores['ndcg_at_5']:8.3f} {scores['ndcg_at_10']:8.3f} "
+            f"{scores['recall_at_5']:7.3f} {scores['recall_at_10']:7.3f} {scores['mrr']:7.3f} "
+            f"{statistics.mean(latencies[method]):9.2f} {p95(latencies[method]):9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Token Counting Benchmark
+
+Times prompt assembly (context truncation plus history fitting) with the
+legacy per-call ``tiktoken.encoding_for_model`` lookup versus the shared
+``TokenCounter`` with cached encodings and approximate trimming.
+
+Usage:
+    python scripts/benchmarks/benchmark_token_counting.py --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.finanlyzeos_chatbot.token_counter import TokenCounter
+
+
+def legacy_count(text: str, model: str = "gpt-4o") -> int:
+    """Token counting as previously done in FinanlyzeOSChatbot._count_tokens."""
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+        return len(encoding.encode(text))
+    except Exception:
+        return len(text) // 4
+
+
+def legacy_truncate(text: str, max_tokens: int, count: Callable[[str], int]) -> str:
+    """Exact binary search used by the legacy _truncate_text_by_tokens."""
+    if count(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    best = text
+    while low < high:
+        mid = (low + high) // 2
+        if count(text[:mid]) <= max_tokens:
+            best = text[:mid]
+            low = mid + 1
+        else:
+            high = mid
+    return best
+
+
+def build_fixture(context_paragraphs: int, history_messages: int) -> tuple:
+    paragraph = (
+        "Apple reported FY2024 revenue of $391.0B (+2.0% YoY), operating margin of 31.5% "
+        "and free cash flow of $108.8B. Services gross margin expanded to 73.9%.\n\n"
+    )
+    context = paragraph * context_paragraphs
+    history = [
+        f"Turn {i}: compare Microsoft and Alphabet operating margins for FY2021-FY2024."
+        for i in range(history_messages)
+    ]
+    return context, history
+
+
+def assemble_legacy(context: str, history: List[str], budget: int) -> int:
+    trimmed = legacy_truncate(context, budget, legacy_count)
+    total = legacy_count("\n".join([trimmed] + history))
+    while total > budget and len(history) > 2:
+        history = history[1:]
+        total = legacy_count("\n".join([trimmed] + history))
+    return total
+
+
+def assemble_cached(counter: TokenCounter, context: str, history: List[str], budget: int) -> int:
+    trimmed = counter.truncate(context, budget)
+    history_tokens = counter.count_many(history)
+    total = counter.count(trimmed) + sum(history_tokens)
+    while total > budget and len(history_tokens) > 2:
+        total -= history_tokens.pop(0)
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark token counting during prompt assembly")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=20000)
+    args = parser.parse_args()
+
+    context, history = build_fixture(args.paragraphs, args.history)
+    counter = TokenCounter()
+    counter.count("warm-up")
+    mode = "tiktoken" if counter.is_exact() else "offline fallback"
+
+    timings = {}
+    for label, fn in (
+        ("legacy", lambda: assemble_legacy(context, list(history), args.budget)),
+        ("token_counter", lambda: assemble_cached(counter, context, list(history), args.budget)),
+    ):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        timings[label] = min(samples)
+
+    print(f"Token counting mode: {mode}")
+    print(f"Context chars: {len(context):,}  history messages: {len(history)}  budget: {args.budget:,}")
+    for label, seconds in timings.items():
+        print(f"  {label:<14} {seconds * 1000:9.2f} ms (best of {args.repeat})")
+    if timings["token_counter"] > 0:
+        print(f"  speedup        {timings['legacy'] / timings['token_counter']:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
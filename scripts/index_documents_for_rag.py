@@ -25,7 +25,9 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from finanlyzeos_chatbot.rag_retriever import VectorStore
-from finanlyzeos_chatbot.sec_filing_parser import extract_sections_from_filing
+from finanlyzeos_chatbot.rag_indexing_pipeline import FilingTask, IndexingPipeline
+from finanlyzeos_chatbot.rag_knowledge_graph import KnowledgeGraph
+from finanlyzeos_chatbot.rag_structure_aware import TableAwareRetriever
 from finanlyzeos_chatbot import database
 from finanlyzeos_chatbot.config import load_settings
 from finanlyzeos_chatbot.data_sources import EdgarClient
@@ -42,6 +44,30 @@ except ImportError:
     REQUESTS_AVAILABLE = False
 
 
+def _html_tables_to_pipe_rows(soup) -> None:
+    """Replace HTML tables with pipe-delimited rows so table extraction survives ``get_text``.
+
+    SEC tables pad numbers with spacer, ``$`` and ``)`` cells; those are dropped.
+    A header row with one fewer cell than the data rows gets an ``Item`` label column.
+    """
+    for table in soup.find_all("table"):
+        rows = []
+        for tr in table.find_all("tr"):
+            cells = [" ".join(cell.get_text(" ").split()) for cell in tr.find_all(["td", "th"])]
+            cells = [cell.replace("|", "/") for cell in cells if cell and cell not in ("$", ")", "%", "(")]
+            if cells:
+                rows.append(cells)
+        if len(rows) < 2:
+            continue
+        width = max(len(row) for row in rows[1:])
+        header = rows[0]
+        if len(header) == width - 1:
+            header = ["Item"] + header
+        lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+        lines.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+        table.replace_with("\n" + "\n".join(lines) + "\n")
+
+
 def download_filing_text(cik: str, accession_number: str, user_agent: str) -> Optional[str]:
     """
     Download SEC filing text from SEC website.
@@ -145,6 +171,7 @@ def download_filing_text(cik: str, accession_number: str, user_agent: str) -> Op
             # Remove script and style elements
             for script in soup(["script", "style"]):
                 script.decompose()
+            _html_tables_to_pipe_rows(soup)
             content = soup.get_text()
         
         return content
@@ -160,8 +187,15 @@ def index_sec_filings(
     filing_type_filter: Optional[str] = None,
     fetch_from_sec: bool = False,
     limit: Optional[int] = None,
+    reindex: bool = False,
 ):
-    """Index SEC filings into vector store."""
+    """
+    Index SEC filings into vector store.
+    
+    Filings already recorded in the index manifest are skipped without being
+    downloaded (accessions are immutable) unless ``reindex`` is set; re-indexed
+    filings only embed chunks whose content changed and drop orphaned chunks.
+    """
     print("📊 Initializing vector store for SEC filings...")
     try:
         vector_store = VectorStore(database_path)
@@ -174,6 +208,9 @@ def index_sec_filings(
         print("  pip install chromadb sentence-transformers")
         return 1
     
+    purged = vector_store.purge_positional_chunks(vector_store.sec_collection)
+    if purged:
+        print(f"🧹 Removed {purged} chunks with legacy positional IDs")
     stats_before = vector_store.sec_collection.count() if vector_store._available else 0
     print(f"📈 Current SEC narratives: {stats_before} documents")
     
@@ -308,95 +345,124 @@ def index_sec_filings(
     print(f"\n📄 Processing {len(filings)} filings...")
     
     settings = load_settings()
-    all_documents = []
-    processed = 0
+    knowledge_graph = KnowledgeGraph(database_path)
+    table_store = TableAwareRetriever(database_path=database_path)
+    tables_indexed = 0
+    skipped = 0
     failed = 0
     
-    for filing in filings:
-        try:
-            ticker = filing["ticker"]
-            form_type = filing["form_type"]
-            accession_number = filing["accession_number"]
-            cik = filing["cik"]
-            filed_at = filing.get("filed_at")
-            
-            # Extract fiscal year from period_of_report or filed_at
-            fiscal_year = None
-            if filing.get("period_of_report"):
-                try:
-                    # Parse YYYY-MM-DD format
-                    period_date = datetime.fromisoformat(filing["period_of_report"].replace('Z', '+00:00'))
-                    fiscal_year = period_date.year
-                except:
-                    pass
-            
-            if not fiscal_year and filed_at:
-                try:
-                    filed_date = datetime.fromisoformat(filed_at.replace('Z', '+00:00'))
-                    fiscal_year = filed_date.year
-                except:
-                    pass
-            
-            if not fiscal_year:
-                fiscal_year = datetime.now().year
-            
-            # Build SEC URL
-            clean_cik = cik.lstrip('0') or '0'
-            parts = accession_number.split('-')
-            if len(parts) == 3:
-                sec_url = f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={clean_cik}&accession_number={accession_number}&xbrl_type=v"
-            else:
-                sec_url = f"https://www.sec.gov/edgar/browse/?CIK={clean_cik}"
-            
-            # Download filing text
-            print(f"  📥 Downloading {ticker} {form_type} ({accession_number})...")
-            filing_text = download_filing_text(cik, accession_number, settings.sec_api_user_agent)
-            
-            if not filing_text:
-                print(f"    ⚠️  Could not download filing text, skipping...")
+    def filing_tasks():
+        """Download filings lazily; the pipeline parses them while the next one downloads."""
+        nonlocal skipped, failed, tables_indexed
+        for filing in filings:
+            try:
+                ticker = filing["ticker"]
+                form_type = filing["form_type"]
+                accession_number = filing["accession_number"]
+                cik = filing["cik"]
+                filed_at = filing.get("filed_at")
+                source_key = f"sec:{accession_number}"
+                
+                needs_chunks = reindex or not vector_store.is_source_indexed(source_key, vector_store.sec_collection)
+                needs_tables = reindex or not table_store.is_indexed(accession_number)
+                if not needs_chunks and not needs_tables:
+                    skipped += 1
+                    continue
+                
+                # Extract fiscal year from period_of_report or filed_at
+                fiscal_year = None
+                if filing.get("period_of_report"):
+                    try:
+                        # Parse YYYY-MM-DD format
+                        period_date = datetime.fromisoformat(filing["period_of_report"].replace('Z', '+00:00'))
+                        fiscal_year = period_date.year
+                    except:
+                        pass
+                
+                if not fiscal_year and filed_at:
+                    try:
+                        filed_date = datetime.fromisoformat(filed_at.replace('Z', '+00:00'))
+                        fiscal_year = filed_date.year
+                    except:
+                        pass
+                
+                if not fiscal_year:
+                    fiscal_year = datetime.now().year
+                
+                # Build SEC URL
+                clean_cik = cik.lstrip('0') or '0'
+                parts = accession_number.split('-')
+                if len(parts) == 3:
+                    sec_url = f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={clean_cik}&accession_number={accession_number}&xbrl_type=v"
+                else:
+                    sec_url = f"https://www.sec.gov/edgar/browse/?CIK={clean_cik}"
+                
+                # Download filing text
+                print(f"  📥 Downloading {ticker} {form_type} ({accession_number})...")
+                filing_text = download_filing_text(cik, accession_number, settings.sec_api_user_agent)
+                
+                if not filing_text:
+                    print(f"    ⚠️  Could not download filing text, skipping...")
+                    failed += 1
+                    continue
+                
+                print(f"    ✓ Downloaded {len(filing_text):,} characters")
+                
+                # Update the knowledge graph incrementally (replaces this filing's relations)
+                knowledge_graph.extract_from_document(
+                    filing_text,
+                    ticker,
+                    {"document_id": accession_number, "form_type": form_type, "fiscal_year": fiscal_year},
+                )
+                
+                # Persist extracted tables for table-aware retrieval (replaces this filing's tables)
+                if needs_tables:
+                    stored = table_store.index_tables(
+                        accession_number,
+                        filing_text,
+                        {"ticker": ticker, "fiscal_year": fiscal_year, "source": sec_url},
+                    )
+                    tables_indexed += stored
+                    print(f"    ✓ Stored {stored} tables")
+                
+                if not needs_chunks:
+                    skipped += 1
+                    continue
+                
+                yield FilingTask(
+                    source_key=source_key,
+                    filing_text=filing_text,
+                    ticker=ticker,
+                    filing_type=form_type,
+                    fiscal_year=fiscal_year,
+                    source_url=sec_url,
+                    filing_date=filed_at,
+                    metadata={"document_id": accession_number},
+                )
+            except Exception as e:
+                print(f"    ❌ Error processing filing: {e}")
+                import traceback
+                print(f"    Full error details:")
+                traceback.print_exc()
                 failed += 1
                 continue
-            
-            print(f"    ✓ Downloaded {len(filing_text):,} characters")
-            
-            # Extract sections
-            sections = extract_sections_from_filing(
-                filing_text=filing_text,
-                ticker=ticker,
-                filing_type=form_type,
-                fiscal_year=fiscal_year,
-                source_url=sec_url,
-                filing_date=filed_at,
-            )
-            
-            if sections:
-                all_documents.extend(sections)
-                processed += 1
-                print(f"    ✓ Extracted {len(sections)} sections")
-            else:
-                print(f"    ⚠️  No sections extracted (filing text length: {len(filing_text):,} chars)")
-                # Check if filing text has expected content
-                if "ITEM" in filing_text.upper() or "MANAGEMENT" in filing_text.upper():
-                    print(f"    ℹ️  Filing contains 'ITEM' or 'MANAGEMENT' keywords - parser may need adjustment")
-                failed += 1
-                
-        except Exception as e:
-            print(f"    ❌ Error processing filing: {e}")
-            import traceback
-            print(f"    Full error details:")
-            traceback.print_exc()
-            failed += 1
-            continue
     
-    # Add all documents to vector store
-    if all_documents:
-        print(f"\n📦 Indexing {len(all_documents)} document chunks into vector store...")
-        count = vector_store.add_sec_documents(all_documents)
-        print(f"✓ Successfully indexed {count} document chunks!")
-        
+    # Sections are parsed in worker processes, embedded in large batches and written asynchronously
+    stats = IndexingPipeline(vector_store).run(filing_tasks(), vector_store.sec_collection)
+    failed += stats.failed
+    table_store.close()
+    knowledge_graph.close()
+    
+    if stats.filings or skipped:
+        print(
+            f"\n✓ Embedded {stats.embedded} new chunks, kept {stats.unchanged} unchanged, "
+            f"removed {stats.deleted} orphaned "
+            f"({stats.docs_per_second:.2f} filings/s, {stats.chunks_per_second:.1f} chunks/s)"
+        )
         stats_after = vector_store.sec_collection.count() if vector_store._available else 0
         print(f"📊 Total SEC narratives in vector store: {stats_after}")
-        print(f"   Processed: {processed} filings, Failed: {failed} filings")
+        print(f"   Processed: {stats.filings} filings, Already indexed: {skipped}, Failed: {failed} filings")
+        print(f"   Tables stored: {tables_indexed}")
     else:
         print("\n⚠️  No documents to index")
     
@@ -437,8 +503,12 @@ def index_uploaded_documents(database_path: Path, conversation_id: Optional[str]
         print("ℹ️  No uploaded documents to index")
         return 0
     
-    # Convert to vector store format
-    all_documents = []
+    purged = vector_store.purge_positional_chunks(vector_store.uploaded_collection)
+    if purged:
+        print(f"🧹 Removed {purged} chunks with legacy positional IDs")
+    
+    # Convert to vector store format and sync each document's chunks
+    totals = {"added": 0, "unchanged": 0, "deleted": 0}
     for doc in documents:
         # Chunk the document
         text = doc.content or ""
@@ -452,32 +522,49 @@ def index_uploaded_documents(database_path: Path, conversation_id: Optional[str]
             end = min(start + chunk_size, len(text))
             chunk = text[start:end]
             chunks.append(chunk.strip())
-            start = end - chunk_overlap
-            if start >= len(text):
+            if end >= len(text):
                 break
+            start = end - chunk_overlap
         
         # Create document entries
+        chunk_documents = []
         for chunk_idx, chunk_text in enumerate(chunks):
-            all_documents.append({
+            chunk_documents.append({
                 "text": chunk_text,
                 "metadata": {
+                    "document_id": doc.document_id,
                     "filename": doc.filename,
                     "file_type": doc.file_type or "unknown",
                     "uploaded_at": doc.uploaded_at.isoformat() if doc.uploaded_at else None,
-                    "conversation_id": conversation_id,
+                    "conversation_id": doc.conversation_id,
+                    "source_type": "uploaded_doc",
                     "chunk_index": chunk_idx,
                     "total_chunks": len(chunks),
                 }
             })
-    
-    # Add to vector store
-    if all_documents:
-        print(f"📦 Indexing {len(all_documents)} document chunks...")
-        count = vector_store.add_uploaded_documents(all_documents)
-        print(f"✓ Successfully indexed {count} document chunks!")
         
-        stats_after = vector_store.uploaded_collection.count() if vector_store._available else 0
-        print(f"📊 Total uploaded documents in vector store: {stats_after}")
+        counts = vector_store.sync_documents(
+            f"uploaded:{doc.document_id}", chunk_documents, vector_store.uploaded_collection
+        )
+        for key, value in counts.items():
+            totals[key] += value
+    
+    # Documents deleted from the database leave orphaned chunks behind
+    if conversation_id is None:
+        removed = vector_store.prune_sources(
+            vector_store.uploaded_collection,
+            "uploaded:",
+            {f"uploaded:{doc.document_id}" for doc in documents},
+        )
+        if removed:
+            print(f"🧹 Removed chunks for {removed} deleted documents")
+    
+    print(
+        f"✓ Embedded {totals['added']} new chunks, kept {totals['unchanged']} unchanged, "
+        f"removed {totals['deleted']} orphaned"
+    )
+    stats_after = vector_store.uploaded_collection.count() if vector_store._available else 0
+    print(f"📊 Total uploaded documents in vector store: {stats_after}")
     
     return 0
 
@@ -496,6 +583,7 @@ def main():
     parser.add_argument("--max-tickers", type=int, help="Limit number of tickers to process (when using --universe)")
     parser.add_argument("--start-from", type=str, help="Start from this ticker (useful for resuming)")
     parser.add_argument("--sector", type=str, help="Industry sector (for industry research indexing)")
+    parser.add_argument("--reindex", action="store_true", help="Re-download and re-chunk filings already in the index manifest (only changed chunks are embedded)")
     
     args = parser.parse_args()
     
@@ -579,6 +667,7 @@ def main():
                         filing_type_filter=args.filing_type,
                         fetch_from_sec=args.fetch_from_sec,
                         limit=args.limit,
+                        reindex=args.reindex,
                     )
                     if result == 0:
                         total_processed += 1
@@ -613,6 +702,7 @@ def main():
             args.filing_type,
             fetch_from_sec=args.fetch_from_sec,
             limit=args.limit,
+            reindex=args.reindex,
         )
     
     if args.type in ["uploaded", "all"] and not args.universe:
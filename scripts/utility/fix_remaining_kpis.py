@@ -16,6 +16,7 @@ import yfinance as yf
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 
+from finanlyzeos_chatbot import database
 from finanlyzeos_chatbot.config import load_settings
 from finanlyzeos_chatbot.analytics_engine import AnalyticsEngine
 
@@ -82,6 +83,7 @@ def improve_ebitda_calculation(db_path: str) -> None:
     """).fetchall()
     
     print(f"Found {len(missing_ebitda)} tickers missing EBITDA")
+    updated = []
     
     for (ticker,) in missing_ebitda:
         # Try to calculate EBITDA from available data
@@ -117,8 +119,11 @@ def improve_ebitda_calculation(db_path: str) -> None:
             (ticker, metric, period, value, source, updated_at, start_year, end_year)
             VALUES (?, 'ebitda', 'FY2024', ?, 'derived_improved', datetime('now'), 2024, 2024)
             """, (ticker, ebitda))
+            updated.append(ticker)
             print(f"  {ticker}: Calculated EBITDA = {ebitda:,.0f}")
     
+    # Let running processes know their cached metrics for these tickers are stale
+    database.bump_metric_data_versions(con, updated)
     con.commit()
     con.close()
     print("EBITDA calculation improvement completed")
@@ -140,6 +145,7 @@ def improve_eps_calculation(db_path: str) -> None:
     """).fetchall()
     
     print(f"Found {len(missing_eps)} tickers missing P/E ratio")
+    updated = []
     
     for (ticker,) in missing_eps:
         # Get latest data
@@ -164,8 +170,10 @@ def improve_eps_calculation(db_path: str) -> None:
             (ticker, metric, period, value, source, updated_at, start_year, end_year)
             VALUES (?, 'eps_diluted', 'FY2024', ?, 'derived_improved', datetime('now'), 2024, 2024)
             """, (ticker, eps))
+            updated.append(ticker)
             print(f"  {ticker}: Calculated EPS = {eps:.2f}")
     
+    database.bump_metric_data_versions(con, updated)
     con.commit()
     con.close()
     print("EPS calculation improvement completed")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Run the universe-wide anomaly sweep and persist flags for /api/anomalies."""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Sequence
+
+from finanlyzeos_chatbot.anomaly_detection import AnomalyDetector
+from finanlyzeos_chatbot.config import Settings
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Flag unusual metric values across the whole universe.")
+    parser.add_argument("--year", type=int, default=None, help="Fiscal year to scan (defaults to the latest year)")
+    parser.add_argument("--ticker", type=str, action="append", dest="tickers", help="Restrict to specific ticker(s)")
+    parser.add_argument("--years", type=int, default=5, help="Trailing window for the rolling z-score")
+    parser.add_argument("--std-threshold", type=float, default=2.0, help="Flag when |rolling z| or |peer z| exceeds this")
+    parser.add_argument("--dry-run", action="store_true", default=False, help="Print flags without storing them")
+    parser.add_argument("--database", type=Path, default=None, help="Optional override for the SQLite database path")
+    args = parser.parse_args(argv)
+
+    database_path = args.database or Path(Settings().database_path)
+    detector = AnomalyDetector(str(database_path))
+    anomalies = detector.sweep_universe(
+        args.year,
+        years=args.years,
+        std_threshold=args.std_threshold,
+        tickers=[ticker.upper() for ticker in args.tickers] if args.tickers else None,
+        persist=not args.dry_run,
+    )
+    for anomaly in anomalies[:20]:
+        print(f"  [{anomaly.severity}] {anomaly.ticker} FY{anomaly.fiscal_year} {anomaly.metric}: {anomaly.description}")
+    action = "found" if args.dry_run else "stored"
+    print(f"[info] {len(anomalies)} anomalies {action}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,9 +13,11 @@ Calculates sophisticated financial ratios and KPIs including:
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 import sqlite3
 
 LOGGER = logging.getLogger(__name__)
@@ -107,23 +109,117 @@ class AdvancedKPIs:
         }
 
 
+KPI_FIELDS: Tuple[str, ...] = tuple(
+    f.name for f in fields(AdvancedKPIs) if f.name not in ("ticker", "fiscal_year")
+)
+
+# Raw metric_snapshots inputs used by the KPI formulas
+KPI_INPUT_METRICS: Tuple[str, ...] = (
+    "net_income", "shareholders_equity", "total_assets", "operating_income", "income_tax_expense",
+    "current_liabilities", "ebit", "current_assets", "inventory", "cash_and_cash_equivalents",
+    "total_liabilities", "interest_expense", "cash_from_operations", "long_term_debt", "revenue",
+    "shares_outstanding", "intangible_assets", "free_cash_flow",
+)
+
+
+def compute_kpi_arrays(inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Vectorised form of the AdvancedKPICalculator formulas.
+    
+    ``inputs`` maps each of KPI_INPUT_METRICS to an array with one entry per
+    (ticker, fiscal year); NaN marks a metric missing for that row. Missing
+    inputs take the same defaults as the scalar path. Results use NaN where
+    the scalar path returns None.
+    """
+    size = len(next(iter(inputs.values()))) if inputs else 0
+    
+    def get(metric: str, default: Optional[np.ndarray] = None) -> np.ndarray:
+        values = inputs.get(metric, np.full(size, np.nan))
+        fallback = np.zeros(size) if default is None else default
+        return np.where(np.isnan(values), fallback, values)
+    
+    def ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator > 0, numerator / denominator * scale, np.nan)
+    
+    net_income = get("net_income")
+    equity = get("shareholders_equity")
+    total_assets = get("total_assets")
+    operating_income = get("operating_income")
+    income_tax = get("income_tax_expense")
+    current_assets = get("current_assets")
+    current_liabilities = get("current_liabilities")
+    total_liabilities = get("total_liabilities")
+    interest_expense = get("interest_expense")
+    ocf = get("cash_from_operations")
+    revenue = get("revenue")
+    fcf = get("free_cash_flow")
+    ebit = get("ebit", operating_income)
+    inventory = get("inventory", current_assets * 0.3)
+    
+    pretax = net_income + income_tax
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tax_rate = np.where((net_income != 0) & (pretax != 0), income_tax / pretax, 0.21)
+    invested_capital = total_assets - current_liabilities
+    working_capital = current_assets - current_liabilities
+    debt_service = interest_expense + get("long_term_debt") * 0.1
+    
+    kpis = {name: np.full(size, np.nan) for name in KPI_FIELDS}
+    kpis.update({
+        "roe": ratio(net_income, equity, 100.0),
+        "roa": ratio(net_income, total_assets, 100.0),
+        "roic": ratio(operating_income * (1 - tax_rate), invested_capital, 100.0),
+        "roce": ratio(ebit, invested_capital, 100.0),
+        "current_ratio": ratio(current_assets, current_liabilities),
+        "quick_ratio": ratio(current_assets - inventory, current_liabilities),
+        "cash_ratio": ratio(get("cash_and_cash_equivalents"), current_liabilities),
+        "working_capital": working_capital,
+        "working_capital_ratio": ratio(working_capital, total_assets, 100.0),
+        "debt_to_equity": ratio(total_liabilities, equity),
+        "debt_to_assets": ratio(total_liabilities, total_assets),
+        "interest_coverage": ratio(ebit, interest_expense),
+        "debt_service_coverage": ratio(ocf, debt_service),
+        "asset_turnover": ratio(revenue, total_assets),
+        "book_value_per_share": ratio(equity, get("shares_outstanding")),
+        "tangible_book_value": equity - get("intangible_assets"),
+        "fcf_to_revenue": ratio(fcf, revenue, 100.0),
+        "fcf_to_net_income": ratio(fcf, net_income),
+        "cash_flow_margin": ratio(ocf, revenue, 100.0),
+    })
+    return kpis
+
+
+def _chunks(items: Sequence[str], size: int = 500) -> Iterable[Sequence[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 class AdvancedKPICalculator:
     """Calculate advanced financial KPIs from raw financial data."""
     
     def __init__(self, db_path: str):
         self.db_path = db_path
     
-    def calculate_all_kpis(self, ticker: str, fiscal_year: int = 2024) -> Optional[AdvancedKPIs]:
+    def calculate_all_kpis(
+        self, ticker: str, fiscal_year: int = 2024, *, use_materialized: bool = True
+    ) -> Optional[AdvancedKPIs]:
         """
         Calculate all advanced KPIs for a company.
         
         Args:
             ticker: Company ticker symbol
             fiscal_year: Year to calculate KPIs for
+            use_materialized: Return the row stored by ``materialize`` when present
+                and computed from the ticker's current metrics
             
         Returns:
             AdvancedKPIs object with all calculated metrics
         """
+        if use_materialized:
+            stored = self.get_materialized(ticker, fiscal_year)
+            if stored is not None:
+                return stored
+        
         # Get all metrics needed for calculations
         metrics = self._get_metrics(ticker, fiscal_year)
         if not metrics:
@@ -391,6 +487,234 @@ class AdvancedKPICalculator:
         return None
 
 
+    # === Materialized KPIs ===
+    
+    def _ensure_table(self) -> None:
+        """Create the materialized KPI tables if they do not exist."""
+        columns = ",\n".join(f"                    {name} REAL" for name in KPI_FIELDS)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS advanced_kpi_values (
+                    ticker TEXT NOT NULL,
+                    fiscal_year INTEGER NOT NULL,
+{columns},
+                    data_version TEXT NOT NULL,
+                    computed_at TEXT NOT NULL,
+                    PRIMARY KEY (ticker, fiscal_year)
+                );
+                CREATE INDEX IF NOT EXISTS idx_advanced_kpi_values_year
+                    ON advanced_kpi_values (fiscal_year);
+                CREATE TABLE IF NOT EXISTS advanced_kpi_versions (
+                    ticker TEXT PRIMARY KEY,
+                    data_version TEXT NOT NULL,
+                    computed_at TEXT NOT NULL
+                );
+                """
+            )
+    
+    @staticmethod
+    def _data_versions(conn: sqlite3.Connection) -> Dict[str, str]:
+        """
+        Per-ticker stamp of the inputs KPIs are computed from.
+        
+        The stamp is the ticker's ``metric_data_versions`` write counter, which
+        every metric writer bumps; only tickers with annual snapshots appear.
+        """
+        rows = conn.execute(
+            """
+            SELECT s.ticker, COALESCE(v.version, 0)
+            FROM (SELECT DISTINCT ticker FROM metric_snapshots WHERE end_year IS NOT NULL) AS s
+            LEFT JOIN metric_data_versions AS v ON v.ticker = s.ticker
+            """
+        ).fetchall()
+        return {ticker: str(version) for ticker, version in rows}
+    
+    def materialize(self, tickers: Optional[Iterable[str]] = None, *, force: bool = False) -> Dict[str, int]:
+        """
+        Compute and store KPIs for every (ticker, fiscal year) whose inputs changed.
+        
+        Tickers are compared against the data-version stamp stored at their
+        last materialization; only changed (or ``force``d) tickers are
+        recomputed, in vectorised batches.
+        
+        Args:
+            tickers: Limit the job to these tickers (defaults to the whole universe)
+            force: Recompute even when the data version is unchanged
+            
+        Returns:
+            Counts of recomputed tickers, stored rows and removed tickers
+        """
+        self._ensure_table()
+        wanted = {t.upper() for t in tickers} if tickers is not None else None
+        now = datetime.now(timezone.utc).isoformat()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            current = self._data_versions(conn)
+            stored = dict(conn.execute("SELECT ticker, data_version FROM advanced_kpi_versions"))
+            scope = wanted if wanted is not None else set(current) | set(stored)
+            changed = sorted(
+                t for t in scope if t in current and (force or stored.get(t) != current[t])
+            )
+            removed = sorted(t for t in scope if t in stored and t not in current)
+            
+            for batch in _chunks(removed):
+                placeholders = ",".join("?" * len(batch))
+                conn.execute(f"DELETE FROM advanced_kpi_values WHERE ticker IN ({placeholders})", batch)
+                conn.execute(f"DELETE FROM advanced_kpi_versions WHERE ticker IN ({placeholders})", batch)
+            
+            stored_rows = 0
+            insert = (
+                f"INSERT INTO advanced_kpi_values (ticker, fiscal_year, {', '.join(KPI_FIELDS)}, data_version, computed_at) "
+                f"VALUES ({', '.join('?' * (len(KPI_FIELDS) + 4))})"
+            )
+            for batch in _chunks(changed):
+                keys, kpis = self._compute_batch(conn, batch)
+                placeholders = ",".join("?" * len(batch))
+                conn.execute(f"DELETE FROM advanced_kpi_values WHERE ticker IN ({placeholders})", batch)
+                conn.executemany(insert, [
+                    (
+                        ticker, year,
+                        *(_optional(kpis[name][i]) for name in KPI_FIELDS),
+                        current[ticker], now,
+                    )
+                    for i, (ticker, year) in enumerate(keys)
+                ])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO advanced_kpi_versions (ticker, data_version, computed_at) VALUES (?, ?, ?)",
+                    [(ticker, current[ticker], now) for ticker in batch],
+                )
+                stored_rows += len(keys)
+        
+        LOGGER.info(
+            f"Materialized advanced KPIs: {len(changed)} tickers recomputed, "
+            f"{stored_rows} rows stored, {len(removed)} tickers removed"
+        )
+        return {"tickers": len(changed), "rows": stored_rows, "removed": len(removed)}
+    
+    @staticmethod
+    def _compute_batch(
+        conn: sqlite3.Connection, tickers: Sequence[str]
+    ) -> Tuple[List[Tuple[str, int]], Dict[str, np.ndarray]]:
+        """Load inputs for ``tickers`` with one query and compute their KPIs."""
+        ticker_placeholders = ",".join("?" * len(tickers))
+        # Every (ticker, year) with any snapshot gets a row, like calculate_all_kpis
+        keys = [
+            (ticker, year) for ticker, year in conn.execute(
+                f"""
+                SELECT DISTINCT ticker, end_year FROM metric_snapshots
+                WHERE ticker IN ({ticker_placeholders}) AND end_year IS NOT NULL
+                ORDER BY ticker, end_year
+                """,
+                list(tickers),
+            )
+        ]
+        row_index = {key: i for i, key in enumerate(keys)}
+        inputs = {metric: np.full(len(keys), np.nan) for metric in KPI_INPUT_METRICS}
+        rows = conn.execute(
+            f"""
+            SELECT ticker, end_year, metric, value FROM metric_snapshots
+            WHERE ticker IN ({ticker_placeholders}) AND end_year IS NOT NULL
+              AND metric IN ({",".join("?" * len(KPI_INPUT_METRICS))})
+            ORDER BY id
+            """,
+            [*tickers, *KPI_INPUT_METRICS],
+        )
+        for ticker, year, metric, value in rows:
+            inputs[metric][row_index[(ticker, year)]] = np.nan if value is None else value
+        return keys, compute_kpi_arrays(inputs)
+    
+    def get_materialized(self, ticker: str, fiscal_year: int) -> Optional[AdvancedKPIs]:
+        """
+        Stored KPIs for ``ticker`` in ``fiscal_year``.
+        
+        Returns None when the row is missing or was computed from an older
+        version of the ticker's metrics than the one currently stored.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute(
+                    f"""
+                    SELECT {', '.join(f'k.{name}' for name in KPI_FIELDS)}, k.data_version, COALESCE(v.version, 0)
+                    FROM advanced_kpi_values AS k
+                    LEFT JOIN metric_data_versions AS v ON v.ticker = k.ticker
+                    WHERE k.ticker = ? AND k.fiscal_year = ?
+                    """,
+                    (ticker.upper(), fiscal_year),
+                ).fetchone()
+        except sqlite3.OperationalError:
+            return None  # Not materialized yet
+        if row is None or row[-2] != str(row[-1]):
+            return None
+        return AdvancedKPIs(ticker=ticker, fiscal_year=fiscal_year, **dict(zip(KPI_FIELDS, row)))
+    
+    def rank_by_kpi(
+        self, kpi: str, fiscal_year: int = 2024, limit: int = 20, ascending: bool = False
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank the materialized universe by one KPI (e.g. ``roic``).
+        
+        Returns:
+            List of (ticker, value) tuples, best first
+        """
+        if kpi not in KPI_FIELDS:
+            raise ValueError(f"Unknown KPI: {kpi}")
+        self._ensure_table()
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(
+                f"""
+                SELECT ticker, {kpi} FROM advanced_kpi_values
+                WHERE fiscal_year = ? AND {kpi} IS NOT NULL
+                ORDER BY {kpi} {'ASC' if ascending else 'DESC'}, ticker
+                LIMIT ?
+                """,
+                (fiscal_year, limit),
+            ).fetchall()
+    
+    def screen(
+        self,
+        criteria: Dict[str, Tuple[Optional[float], Optional[float]]],
+        fiscal_year: int = 2024,
+        limit: int = 100,
+    ) -> List[AdvancedKPIs]:
+        """
+        Screen the materialized universe with (min, max) bounds per KPI.
+        
+        Example: ``screen({"roic": (15, None), "debt_to_equity": (None, 1.0)})``
+        """
+        conditions: List[str] = []
+        params: List = [fiscal_year]
+        for kpi, (low, high) in criteria.items():
+            if kpi not in KPI_FIELDS:
+                raise ValueError(f"Unknown KPI: {kpi}")
+            if low is not None:
+                conditions.append(f"{kpi} >= ?")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"{kpi} <= ?")
+                params.append(high)
+        where = "".join(f" AND {condition}" for condition in conditions)
+        params.append(limit)
+        self._ensure_table()
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                f"""
+                SELECT ticker, {', '.join(KPI_FIELDS)} FROM advanced_kpi_values
+                WHERE fiscal_year = ?{where}
+                ORDER BY ticker LIMIT ?
+                """,
+                params,
+            ).fetchall()
+        return [
+            AdvancedKPIs(ticker=row[0], fiscal_year=fiscal_year, **dict(zip(KPI_FIELDS, row[1:])))
+            for row in rows
+        ]
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
 def get_advanced_kpi_calculator(db_path: str) -> AdvancedKPICalculator:
     """Factory function to create AdvancedKPICalculator instance."""
     return AdvancedKPICalculator(db_path)
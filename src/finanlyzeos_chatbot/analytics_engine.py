@@ -14,11 +14,15 @@ from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
+import numpy as np
+
 from . import database
 from .config import Settings
-from .data_sources import YahooFinanceClient
+from .data_sources import QuoteProvider, YahooFinanceClient
+from .derived_metrics import DerivedMetricGraph, MetricFrame, default_derived_nodes
 from .kpi_backfill import fill_missing_kpis, reset_external_snapshot_cache
 from .secdb import SecPostgresStore
+from .smart_cache import metrics_cache
 from .ticker_universe import load_ticker_universe
 
 LOGGER = logging.getLogger(__name__)
@@ -141,6 +145,9 @@ AGGREGATE_METRICS = {
 
 DEFAULT_TAX_RATE = 0.21
 
+# Derived ratios as a dependency graph, evaluated for every ticker/year at once
+DERIVED_METRIC_GRAPH = DerivedMetricGraph(default_derived_nodes(tax_rate=DEFAULT_TAX_RATE))
+
 METRIC_DEFINITIONS: List[MetricDefinition] = [
     MetricDefinition("revenue", "Revenue"),
     MetricDefinition("net_income", "Net income"),
@@ -311,9 +318,14 @@ class AnalyticsEngine:
 
     BENCHMARK_LABEL = BENCHMARK_LABEL
 
-    def __init__(self, settings: Settings) -> None:
-        """Store runtime settings and bootstrap optional SEC store connections."""
+    def __init__(self, settings: Settings, *, quote_provider: Optional[QuoteProvider] = None) -> None:
+        """Store runtime settings and bootstrap optional SEC store connections.
+
+        ``quote_provider`` replaces the Yahoo Finance client used to refresh
+        missing or stale quotes (e.g. a local fixture provider in tests).
+        """
         self.settings = settings
+        self._quote_provider = quote_provider
         self._sec_store: Optional[SecPostgresStore] = None
         if settings.database_type == "postgresql":
             self._sec_store = SecPostgresStore(settings)
@@ -328,6 +340,7 @@ class AnalyticsEngine:
         *,
         period_filters: Optional[Sequence[Tuple[int, int]]] = None,
         universe: str = "sp500",
+        use_materialized: bool = True,
     ) -> Dict[str, database.MetricRecord]:
         """
         Aggregate the latest metric snapshots across a ticker universe.
@@ -341,26 +354,86 @@ class AnalyticsEngine:
             benchmark. When omitted the most recent observation per ticker is used.
         universe:
             Named ticker universe defined in :mod:`ticker_universe`.
+        use_materialized:
+            Serve unfiltered requests from the ``benchmark_percentiles`` table built by
+            :meth:`materialize_benchmark_percentiles`; metrics missing from it are
+            aggregated from the snapshots.
         """
 
         if not metrics:
             return {}
 
+        normalized_metrics = sorted({metric.lower() for metric in metrics})
+        benchmark_records: Dict[str, database.MetricRecord] = {}
+        if use_materialized and not period_filters:
+            materialized = database.fetch_benchmark_percentiles(
+                self.settings.database_path, universe, normalized_metrics
+            )
+            benchmark_records.update(
+                {
+                    metric_name: database.MetricRecord(
+                        ticker=self.BENCHMARK_LABEL,
+                        metric=metric_name,
+                        period=record.period or self.BENCHMARK_LABEL,
+                        value=record.mean,
+                        source="benchmark",
+                        updated_at=record.computed_at,
+                        start_year=record.start_year,
+                        end_year=record.end_year,
+                    )
+                    for metric_name, record in materialized.items()
+                }
+            )
+            normalized_metrics = [metric for metric in normalized_metrics if metric not in benchmark_records]
+            if not normalized_metrics:
+                return benchmark_records
+
         tickers = load_ticker_universe(universe)
         if not tickers:
-            return {}
+            return benchmark_records
 
-        normalized_metrics = sorted({metric.lower() for metric in metrics})
-        metric_placeholders = ",".join("?" for _ in normalized_metrics)
-        ticker_placeholders = ",".join("?" for _ in tickers)
+        grouped = self._latest_snapshots_by_metric(tickers, normalized_metrics, period_filters)
+        if not grouped:
+            return benchmark_records
 
+        timestamp = _now()
+        for metric_name, rows in grouped.items():
+            values = [_to_float(row["value"]) for row in rows]
+            numeric_values = [value for value in values if value is not None]
+            if not numeric_values:
+                continue
+
+            average_value = sum(numeric_values) / len(numeric_values)
+            period_label, start_year, end_year = self._benchmark_period(rows)
+
+            benchmark_records[metric_name] = database.MetricRecord(
+                ticker=self.BENCHMARK_LABEL,
+                metric=metric_name,
+                period=str(period_label) if period_label else self.BENCHMARK_LABEL,
+                value=average_value,
+                source="benchmark",
+                updated_at=timestamp,
+                start_year=start_year,
+                end_year=end_year,
+            )
+
+        return benchmark_records
+
+    def _latest_snapshots_by_metric(
+        self,
+        tickers: Sequence[str],
+        metrics: Optional[Sequence[str]] = None,
+        period_filters: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> Dict[str, List[sqlite3.Row]]:
+        """Latest numeric snapshot per (ticker, metric), grouped by metric (all metrics when None)."""
         where_clauses = [
-            f"metric IN ({metric_placeholders})",
-            f"ticker IN ({ticker_placeholders})",
+            f"ticker IN ({','.join('?' for _ in tickers)})",
             "value IS NOT NULL",
         ]
-
-        params: List[Any] = list(normalized_metrics) + tickers
+        params: List[Any] = list(tickers)
+        if metrics is not None:
+            where_clauses.insert(0, f"metric IN ({','.join('?' for _ in metrics)})")
+            params = list(metrics) + params
         if period_filters:
             range_clauses: List[str] = []
             for start, end in period_filters:
@@ -396,7 +469,7 @@ class AnalyticsEngine:
                 FROM metric_snapshots
                 WHERE {where_sql}
             )
-            SELECT metric, period, value, start_year, end_year
+            SELECT ticker, metric, period, value, start_year, end_year
             FROM ranked
             WHERE rn = 1
         """
@@ -411,35 +484,82 @@ class AnalyticsEngine:
                 if value is None:
                     continue
                 grouped[metric_name].append(row)
+        return grouped
 
-        if not grouped:
-            return {}
-
-        benchmark_records: Dict[str, database.MetricRecord] = {}
-        timestamp = _now()
-        for metric_name, rows in grouped.items():
-            values = [_to_float(row["value"]) for row in rows]
-            numeric_values = [value for value in values if value is not None]
-            if not numeric_values:
-                continue
+    @staticmethod
+    def _benchmark_period(rows: Sequence[sqlite3.Row]) -> Tuple[Any, Optional[int], Optional[int]]:
+        """Most common period label and fiscal years among benchmark contributors."""
+        period_label = _most_common([row["period"] for row in rows])
+        start_year = _most_common([row["start_year"] for row in rows])
+        end_year = _most_common([row["end_year"] for row in rows])
+        return (
+            period_label,
+            int(start_year) if isinstance(start_year, int) else None,
+            int(end_year) if isinstance(end_year, int) else None,
+        )
 
-            average_value = sum(numeric_values) / len(numeric_values)
-            period_label = _most_common([row["period"] for row in rows])
-            start_year = _most_common([row["start_year"] for row in rows])
-            end_year = _most_common([row["end_year"] for row in rows])
+    def materialize_benchmark_percentiles(self, universe: str = "sp500") -> int:
+        """
+        Precompute latest-per-ticker benchmark distributions for ``universe``.
 
-            benchmark_records[metric_name] = database.MetricRecord(
-                ticker=self.BENCHMARK_LABEL,
-                metric=metric_name,
-                period=str(period_label) if period_label else self.BENCHMARK_LABEL,
-                value=average_value,
-                source="benchmark",
-                updated_at=timestamp,
-                start_year=int(start_year) if isinstance(start_year, int) else None,
-                end_year=int(end_year) if isinstance(end_year, int) else None,
-            )
+        One window query selects each ticker's latest snapshot for every metric;
+        the mean and 10/25/50/75/90th percentile breakpoints are then stored per
+        metric for the whole universe and for each GICS sector, so benchmark
+        lookups read a handful of rows instead of re-ranking ``metric_snapshots``.
+        Returns the number of stored distributions.
+        """
+        tickers = load_ticker_universe(universe)
+        if not tickers:
+            return 0
+        from .sector_analytics import SECTOR_MAP
 
-        return benchmark_records
+        grouped = self._latest_snapshots_by_metric(tickers)
+        computed_at = _now()
+        records: List[database.BenchmarkPercentileRecord] = []
+        for metric_name, rows in grouped.items():
+            scopes: Dict[str, List[sqlite3.Row]] = {"universe": list(rows)}
+            for row in rows:
+                sector = SECTOR_MAP.get((row["ticker"] or "").upper())
+                if sector:
+                    scopes.setdefault(sector, []).append(row)
+            for scope, scope_rows in scopes.items():
+                values = np.array([_to_float(row["value"]) for row in scope_rows], dtype=float)
+                p10, p25, p50, p75, p90 = np.percentile(values, [10, 25, 50, 75, 90])
+                period_label, start_year, end_year = self._benchmark_period(scope_rows)
+                records.append(database.BenchmarkPercentileRecord(
+                    universe=universe,
+                    scope=scope,
+                    metric=metric_name,
+                    period=str(period_label) if period_label else None,
+                    start_year=start_year,
+                    end_year=end_year,
+                    ticker_count=len(scope_rows),
+                    mean=float(values.mean()),
+                    p10=float(p10),
+                    p25=float(p25),
+                    p50=float(p50),
+                    p75=float(p75),
+                    p90=float(p90),
+                    computed_at=computed_at,
+                ))
+        stored = database.replace_benchmark_percentiles(self.settings.database_path, universe, records)
+        LOGGER.info("Materialized %d benchmark distributions for %s", stored, universe)
+        return stored
+
+    def get_benchmark_percentiles(
+        self,
+        metrics: Sequence[str],
+        *,
+        sector: Optional[str] = None,
+        universe: str = "sp500",
+    ) -> Dict[str, database.BenchmarkPercentileRecord]:
+        """Return precomputed percentile breakpoints for the universe or one sector."""
+        return database.fetch_benchmark_percentiles(
+            self.settings.database_path,
+            universe,
+            sorted({metric.lower() for metric in metrics}),
+            scope=sector or "universe",
+        )
 
     def refresh_metrics(self, *, force: bool = False) -> None:
         """Compute or refresh metric snapshots using the latest financial facts."""
@@ -488,6 +608,11 @@ class AnalyticsEngine:
 
         tickers = sorted({ticker for ticker, _ in per_year})
         self._ensure_quotes(tickers)
+        latest_quotes = database.fetch_latest_quotes(self.settings.database_path, tickers)
+        one_year_ago = _now() - timedelta(days=365)
+        previous_quotes = database.fetch_quotes_on_or_before(
+            self.settings.database_path, {ticker: one_year_ago for ticker in tickers}
+        )
 
         metric_records: List[database.MetricRecord] = []
         derived_records: List[database.MetricRecord] = []
@@ -495,8 +620,6 @@ class AnalyticsEngine:
 
         for (ticker, fiscal_year), metrics in per_year.items():
             ticker_year_map[ticker][fiscal_year] = metrics
-            updated_at = _latest_timestamp(metrics)
-
             for metric_name, (value, recorded_at) in metrics.items():
                 numeric_value = _to_float(value)
                 if numeric_value is None:
@@ -514,11 +637,10 @@ class AnalyticsEngine:
                     )
                 )
 
-            derived_values = _compute_derived_metrics(metrics)
-            for metric_name, value in derived_values.items():
-                numeric_value = _to_float(value)
-                if numeric_value is None:
-                    continue
+        for (ticker, fiscal_year), derived_values in _compute_derived_metric_rows(per_year).items():
+            metrics = per_year[(ticker, fiscal_year)]
+            updated_at = _latest_timestamp(metrics)
+            for metric_name, numeric_value in derived_values.items():
                 derived_records.append(
                     database.MetricRecord(
                         ticker=ticker,
@@ -630,7 +752,7 @@ class AnalyticsEngine:
                 )
                 _add_metric("working_capital_change", working_cap_change, start=prev_year, end=last_year)
 
-            quote = database.fetch_latest_quote(self.settings.database_path, ticker)
+            quote = latest_quotes.get(ticker.upper())
             price = _to_float(quote.get("price") if quote else None)
             if price is None:
                 price = _to_float(_first_non_none(last_values, "price"))
@@ -767,10 +889,7 @@ class AnalyticsEngine:
                 _add_metric("dividend_yield", dividend_yield)
 
             if quote and price is not None:
-                one_year_ago = _now() - timedelta(days=365)
-                previous_quote = database.fetch_quote_on_or_before(
-                    self.settings.database_path, ticker, before=one_year_ago
-                )
+                previous_quote = previous_quotes.get(ticker.upper())
                 prev_price = _to_float(previous_quote.get("price") if previous_quote else None)
                 if prev_price not in (None, 0):
                     dividends = dividends_per_share or 0.0
@@ -815,6 +934,33 @@ class AnalyticsEngine:
                     LOGGER.debug("Backfilled %d KPI values for %s FY%s", added, ticker, fiscal_year)
             except Exception:  # pragma: no cover - defensive safeguard
                 LOGGER.exception("KPI backfill pipeline failed for %s FY%s", ticker, fiscal_year)
+        try:
+            from .finance_consolidation import refresh_consolidation_cube
+
+            refresh_consolidation_cube(
+                self.settings.database_path, {record.ticker for record in all_records}
+            )
+        except Exception:  # pragma: no cover - defensive safeguard
+            LOGGER.exception("Consolidation cube refresh failed")
+        try:
+            from .advanced_kpis import AdvancedKPICalculator
+
+            AdvancedKPICalculator(str(self.settings.database_path)).materialize()
+        except Exception:  # pragma: no cover - defensive safeguard
+            LOGGER.exception("Advanced KPI materialization failed")
+        try:
+            self.materialize_benchmark_percentiles()
+        except Exception:  # pragma: no cover - defensive safeguard
+            LOGGER.exception("Benchmark percentile materialization failed")
+        try:
+            from .anomaly_detection import AnomalyDetector
+
+            AnomalyDetector(str(self.settings.database_path)).sweep_universe(persist=True)
+        except Exception:  # pragma: no cover - defensive safeguard
+            LOGGER.exception("Anomaly sweep failed")
+        from .sector_analytics import invalidate_sector_distributions
+
+        invalidate_sector_distributions(str(self.settings.database_path))
         LOGGER.info(
             "Updated %d metric snapshots (%d base, %d derived)",
             len(all_records),
@@ -829,11 +975,22 @@ class AnalyticsEngine:
         phase: Optional[str] = None,
         period_filters: Optional[Sequence[Tuple[int, int]]] = None,
     ) -> List[database.MetricRecord]:
-        """Return cached metric snapshots for ``ticker`` with optional filters."""
-        records = database.fetch_metric_snapshots(
+        """Return cached metric snapshots for ``ticker`` with optional filters.
+
+        Snapshots come from the process-wide ``metrics_cache``, so dashboards,
+        comparisons, exports and fact verification reuse one fetch per ticker
+        until a snapshot or KPI write for that ticker invalidates it.
+        """
+        ticker = ticker.upper()
+        records = metrics_cache.get_or_load(
             self.settings.database_path,
-            ticker.upper(),
-            period_filters=period_filters,
+            ticker,
+            period_filters,
+            lambda: database.fetch_metric_snapshots(
+                self.settings.database_path,
+                ticker,
+                period_filters=period_filters,
+            ),
         )
         latest_map = self._select_latest_records(records, span_fn=self._period_span)
         if not phase:
@@ -874,7 +1031,7 @@ class AnalyticsEngine:
         """
         try:
             # Fetch ALL records for this ticker to calculate historical growth
-            all_records = database.fetch_metric_snapshots(self.settings.database_path, ticker.upper())
+            all_records = self.get_metrics(ticker)
             if not all_records:
                 return None
             
@@ -1006,7 +1163,7 @@ class AnalyticsEngine:
     def generate_summary(self, ticker: str) -> str:
         """Return a narrative summary of key metrics for ``ticker``."""
         ticker_upper = ticker.upper()
-        records = database.fetch_metric_snapshots(self.settings.database_path, ticker_upper)
+        records = self.get_metrics(ticker_upper)
         if not records:
             return (
                 f"No cached metrics for {ticker_upper}. "
@@ -1089,9 +1246,7 @@ class AnalyticsEngine:
     ) -> ScenarioSummary:
         """Generate an illustrative scenario by tweaking a few core inputs."""
         ticker_upper = ticker.upper()
-        records = database.fetch_metric_snapshots(
-            self.settings.database_path, ticker_upper
-        )
+        records = self.get_metrics(ticker_upper)
         latest = self._select_latest_records(
             records, span_fn=self._period_span
         )
@@ -1247,27 +1402,30 @@ class AnalyticsEngine:
         return [dict(row) for row in rows]
 
     def _ensure_quotes(self, tickers: Sequence[str]) -> None:
-        """Ensure supplemental market quotes exist for each ticker before deriving ratios."""
+        """Ensure supplemental market quotes exist for each ticker before deriving ratios.
+
+        One grouped query finds tickers whose latest cached quote is missing or
+        older than ``settings.quote_max_age_hours``; only those are requested
+        from the quote provider, in a single batch call.
+        """
         if not tickers:
             return
         if getattr(self.settings, "disable_quote_refresh", False):
-            LOGGER.debug("Quote refresh disabled via settings; skipping Yahoo fetch for %d tickers", len(tickers))
+            LOGGER.debug("Quote refresh disabled via settings; skipping quote fetch for %d tickers", len(tickers))
             return
-        missing: List[str] = []
-        for ticker in tickers:
-            quote = database.fetch_latest_quote(self.settings.database_path, ticker)
-            if not quote:
-                missing.append(ticker)
+        latest = database.fetch_latest_quote_times(self.settings.database_path, tickers)
+        max_age_hours = getattr(self.settings, "quote_max_age_hours", 0.0) or 0.0
+        stale_before = _now() - timedelta(hours=max_age_hours) if max_age_hours > 0 else None
+        missing: List[str] = [
+            ticker
+            for ticker in dict.fromkeys(ticker.upper() for ticker in tickers)
+            if ticker not in latest or (stale_before is not None and latest[ticker] < stale_before)
+        ]
         if not missing:
             return
 
-        client = YahooFinanceClient(
-            base_url=self.settings.yahoo_quote_url,
-            timeout=self.settings.http_request_timeout,
-            batch_size=self.settings.yahoo_quote_batch_size,
-        )
         try:
-            quotes = client.fetch_quotes(missing)
+            quotes = self.quote_provider().fetch_quotes(missing)
         except Exception as exc:  # pragma: no cover - network dependent
             LOGGER.warning("Failed to refresh quotes for %s: %s", ", ".join(missing), exc)
             return
@@ -1275,6 +1433,16 @@ class AnalyticsEngine:
             return
         database.bulk_insert_market_quotes(self.settings.database_path, quotes)
 
+    def quote_provider(self) -> QuoteProvider:
+        """Return the configured quote provider, defaulting to Yahoo Finance."""
+        if self._quote_provider is None:
+            self._quote_provider = YahooFinanceClient(
+                base_url=self.settings.yahoo_quote_url,
+                timeout=self.settings.http_request_timeout,
+                batch_size=self.settings.yahoo_quote_batch_size,
+            )
+        return self._quote_provider
+
     def _select_latest_records(
         self,
         records: Sequence[database.MetricRecord],
@@ -1451,104 +1619,22 @@ def _format_metric_value(metric: str, record: Optional[database.MetricRecord]) -
     return f"{value:,.1f}"
 
 
-def _compute_derived_metrics(
-    metrics: Dict[str, Tuple[Optional[float], datetime]]
-) -> Dict[str, Optional[float]]:
-    """Derive additional ratios and margins from base metric values."""
-    value_map = {name: _to_float(pair[0]) for name, pair in metrics.items()}
-    derived: Dict[str, Optional[float]] = {}
-
-    revenue = _first_non_none(value_map, "revenue")
-    net_income_raw = _first_non_none(value_map, "net_income")
-    net_income_adjusted = _first_non_none(value_map, "adjusted_net_income")
-    net_income = net_income_adjusted if net_income_adjusted is not None else net_income_raw
-    operating_income = _first_non_none(value_map, "operating_income", "clean_operating_income")
-    total_assets = _first_non_none(value_map, "total_assets")
-    shareholders_equity = _first_non_none(value_map, "shareholders_equity", "total_equity")
-    total_liabilities = _first_non_none(value_map, "total_liabilities", "total_debt")
-    cash_from_operations = _first_non_none(value_map, "cash_from_operations", "operating_cash_flow")
-    capital_expenditures = _first_non_none(value_map, "capital_expenditures", "capital_expenditure")
-    cash = _first_non_none(value_map, "cash_and_cash_equivalents", "cash")
-    current_assets = _first_non_none(value_map, "current_assets")
-    current_liabilities = _first_non_none(value_map, "current_liabilities")
-    ebit = _first_non_none(value_map, "ebit", "operating_income", "clean_operating_income")
-    depreciation = _first_non_none(value_map, "depreciation_and_amortization")
-
-    adjusted_ebitda = _first_non_none(value_map, "adjusted_ebitda")
-    ebitda = _first_non_none(value_map, "ebitda", "adjusted_ebitda")
-    if ebitda is None and operating_income is not None:
-        ebitda = operating_income + (depreciation or 0.0)
-
-    free_cash_flow = _first_non_none(value_map, "free_cash_flow", "normalised_free_cash_flow")
-    if free_cash_flow is None and cash_from_operations is not None and capital_expenditures is not None:
-        free_cash_flow = cash_from_operations + capital_expenditures
-
-    working_capital = _first_non_none(value_map, "working_capital")
-    if working_capital is None and current_assets is not None and current_liabilities is not None:
-        working_capital = current_assets - current_liabilities
-
-    derived["profit_margin"] = _safe_div(net_income, revenue)
-    derived["net_margin"] = derived["profit_margin"]
-    derived["operating_margin"] = _safe_div(operating_income, revenue)
-    derived["return_on_assets"] = _safe_div(net_income, total_assets)
-    derived["roa"] = derived["return_on_assets"]
-    derived["return_on_equity"] = _safe_div(net_income, shareholders_equity)
-    derived["roe"] = derived["return_on_equity"]
-    derived["debt_to_equity"] = _safe_div(total_liabilities, shareholders_equity)
-    derived["free_cash_flow_margin"] = _safe_div(free_cash_flow, revenue)
-    cash_conversion_denominator = net_income if net_income is not None else net_income_raw
-    derived["cash_conversion"] = _safe_div(cash_from_operations, cash_conversion_denominator)
-    derived["working_capital"] = working_capital
-    derived["ebitda"] = ebitda
-    derived["ebitda_margin"] = _safe_div(ebitda, revenue)
-    if adjusted_ebitda is not None:
-        derived["adjusted_ebitda_margin"] = _safe_div(adjusted_ebitda, revenue)
-    
-    # Liquidity ratios
-    derived["current_ratio"] = _safe_div(current_assets, current_liabilities)
-    
-    # Quick ratio = (Current Assets - Inventory) / Current Liabilities
-    # Using cash + current_assets as a proxy if we don't have inventory separately
-    quick_assets = current_assets  # Simplified - could be improved with inventory data
-    derived["quick_ratio"] = _safe_div(quick_assets, current_liabilities)
-    
-    # Profitability
-    gross_profit = _first_non_none(value_map, "gross_profit")
-    # Calculate gross_profit from revenue - cost_of_revenue if not directly available
-    if gross_profit is None and revenue is not None:
-        cost_of_revenue = _first_non_none(value_map, "cost_of_revenue", "cost_of_goods_sold")
-        if cost_of_revenue is not None:
-            gross_profit = revenue - cost_of_revenue
-    derived["gross_margin"] = _safe_div(gross_profit, revenue)
-    
-    # Interest coverage = EBIT / Interest Expense
-    interest_expense = _first_non_none(value_map, "interest_expense")
-    derived["interest_coverage"] = _safe_div(ebit, interest_expense)
-    
-    # Asset turnover = Revenue / Total Assets
-    derived["asset_turnover"] = _safe_div(revenue, total_assets)
-    
-    # P/S ratio
-    market_cap = _first_non_none(value_map, "market_cap")
-    derived["ps_ratio"] = _safe_div(market_cap, revenue)
-
-    invested_capital = None
-    if total_assets is not None:
-        invested_capital = total_assets
-        if cash is not None:
-            invested_capital -= cash
-        if current_liabilities is not None:
-            invested_capital -= current_liabilities
-    nopat = None
-    if ebit is not None:
-        nopat = ebit * (1 - DEFAULT_TAX_RATE)
-    derived["return_on_invested_capital"] = _safe_div(nopat, invested_capital)
-    derived["roic"] = derived["return_on_invested_capital"]
-
-    if free_cash_flow is not None and "free_cash_flow" not in metrics:
-        derived["free_cash_flow"] = free_cash_flow
-
-    return {name: value for name, value in derived.items() if name in DERIVED_METRICS}
+def _compute_derived_metric_rows(
+    per_period: Mapping[Tuple[str, int], Mapping[str, Tuple[Optional[float], datetime]]]
+) -> Dict[Tuple[str, int], Dict[str, float]]:
+    """Evaluate the derived metric graph for many (ticker, fiscal year) periods at once."""
+    keys = list(per_period)
+    frame = MetricFrame.from_mappings(
+        keys,
+        ({name: pair[0] for name, pair in per_period[key].items()} for key in keys),
+    )
+    rows: Dict[Tuple[str, int], Dict[str, float]] = {key: {} for key in keys}
+    for name, values in DERIVED_METRIC_GRAPH.evaluate(frame).items():
+        if name not in DERIVED_METRICS:
+            continue
+        for index in np.flatnonzero(np.isfinite(values)):
+            rows[keys[index]][name] = float(values[index])
+    return rows
 
     @staticmethod
     def _extract_year(record: database.MetricRecord) -> Optional[int]:
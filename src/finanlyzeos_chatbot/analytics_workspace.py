@@ -13,9 +13,11 @@ All entities are persisted in SQLite with JSON metadata for traceability.
 
 from __future__ import annotations
 
+import atexit
 import json
 import re
 import sqlite3
+import threading
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -221,16 +223,70 @@ class SavedSession:
         }
 
 
+_BINDING_COLUMNS = (
+    "alias, raw_alias, canonical_metric, source_system, primary_tag, fallback_tags, "
+    "description, metadata, created_at, updated_at, created_by, updated_by"
+)
+
+
+class _DictionaryState:
+    """Process-wide in-memory copy of one database's metric dictionary."""
+
+    def __init__(self, database_path: Path):
+        self.conn = sqlite3.connect(str(database_path), check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.bindings: Dict[str, MetricBinding] = {}
+        self.version = -1  # metric_dictionary_version last loaded into ``bindings``
+        self.data_version = -1  # PRAGMA data_version at the last check
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+_DICTIONARY_STATES: Dict[str, _DictionaryState] = {}
+_DICTIONARY_STATES_LOCK = threading.Lock()
+
+
+def close_data_dictionaries() -> None:
+    """Close the shared dictionary connections; later ``DataDictionary`` instances reopen them."""
+    with _DICTIONARY_STATES_LOCK:
+        states = list(_DICTIONARY_STATES.values())
+        _DICTIONARY_STATES.clear()
+    for state in states:
+        state.close()
+
+
+atexit.register(close_data_dictionaries)
+
+
 class DataDictionary:
-    """Manage alias → canonical metric bindings with source metadata."""
+    """
+    Manage alias → canonical metric bindings with source metadata.
+
+    Bindings are held in memory (shared by every instance for the same
+    database) and served without touching SQLite. New bindings are written
+    through in a single transaction. Triggers keep a version counter in
+    ``metric_dictionary_version`` so changes made by other processes or
+    connections are picked up with a ``PRAGMA data_version`` check and, only
+    when that moved, a one-row version read.
+    """
 
     def __init__(self, database_path: Path):
         self.database_path = Path(database_path)
+        key = str(self.database_path.resolve())
+        with _DICTIONARY_STATES_LOCK:
+            state = _DICTIONARY_STATES.get(key)
+            if state is None:
+                state = _DictionaryState(self.database_path)
+                _DICTIONARY_STATES[key] = state
+        self._state = state
         self._ensure_table()
 
     def _ensure_table(self) -> None:
-        with sqlite3.connect(self.database_path) as conn:
-            conn.execute(
+        with self._state.lock:
+            self._state.conn.executescript(
                 """
                 CREATE TABLE IF NOT EXISTS metric_dictionary (
                     alias TEXT PRIMARY KEY,
@@ -245,16 +301,47 @@ class DataDictionary:
                     updated_at TEXT NOT NULL,
                     created_by TEXT NOT NULL DEFAULT 'system',
                     updated_by TEXT NOT NULL DEFAULT 'system'
-                )
-                """
-            )
-            conn.execute(
-                """
+                );
                 CREATE INDEX IF NOT EXISTS idx_metric_dictionary_canonical
-                ON metric_dictionary (canonical_metric)
+                ON metric_dictionary (canonical_metric);
+                CREATE TABLE IF NOT EXISTS metric_dictionary_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO metric_dictionary_version (id, version) VALUES (1, 0);
+                CREATE TRIGGER IF NOT EXISTS trg_metric_dictionary_insert AFTER INSERT ON metric_dictionary
+                BEGIN UPDATE metric_dictionary_version SET version = version + 1 WHERE id = 1; END;
+                CREATE TRIGGER IF NOT EXISTS trg_metric_dictionary_update AFTER UPDATE ON metric_dictionary
+                BEGIN UPDATE metric_dictionary_version SET version = version + 1 WHERE id = 1; END;
+                CREATE TRIGGER IF NOT EXISTS trg_metric_dictionary_delete AFTER DELETE ON metric_dictionary
+                BEGIN UPDATE metric_dictionary_version SET version = version + 1 WHERE id = 1; END;
                 """
             )
-            conn.commit()
+
+    @property
+    def version(self) -> int:
+        """Version of the dictionary currently held in memory."""
+        with self._state.lock:
+            self._sync_locked()
+            return self._state.version
+
+    def _sync_locked(self) -> None:
+        """Reload the in-memory map if the stored dictionary changed (caller holds the lock)."""
+        state = self._state
+        data_version = state.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == state.data_version and state.version >= 0:
+            return
+        state.data_version = data_version
+        version = state.conn.execute(
+            "SELECT version FROM metric_dictionary_version WHERE id = 1"
+        ).fetchone()[0]
+        if version != state.version:
+            self._load_locked(version)
+
+    def _load_locked(self, version: int) -> None:
+        rows = self._state.conn.execute(f"SELECT {_BINDING_COLUMNS} FROM metric_dictionary").fetchall()
+        self._state.bindings = {row["alias"]: self._row_to_binding(row) for row in rows}
+        self._state.version = version
 
     def _row_to_binding(self, row: sqlite3.Row) -> MetricBinding:
         return MetricBinding(
@@ -274,96 +361,93 @@ class DataDictionary:
 
     def resolve(self, aliases: Iterable[str], create_missing: bool = True) -> Dict[str, MetricBinding]:
         """Resolve a batch of aliases to MetricBinding objects."""
-        alias_list = list(aliases)
-        if not alias_list:
+        normalised = {_normalise_alias(alias): alias for alias in aliases}
+        if not normalised:
             return {}
 
-        normalised = {_normalise_alias(alias): alias for alias in alias_list}
-        bindings: Dict[str, MetricBinding] = {}
-
-        with sqlite3.connect(self.database_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(
-                f"""
-                SELECT alias, raw_alias, canonical_metric, source_system,
-                       primary_tag, fallback_tags, description, metadata,
-                       created_at, updated_at, created_by, updated_by
-                FROM metric_dictionary
-                WHERE alias IN ({",".join(["?"] * len(normalised))})
-                """,
-                list(normalised.keys()),
-            ).fetchall()
-            for row in rows:
-                binding = self._row_to_binding(row)
-                bindings[normalised[binding.alias]] = binding
-
-            missing_keys = [alias for alias in normalised if alias not in bindings]
-            if not create_missing or not missing_keys:
+        state = self._state
+        with state.lock:
+            self._sync_locked()
+            bindings = {
+                raw_alias: state.bindings[alias]
+                for alias, raw_alias in normalised.items()
+                if alias in state.bindings
+            }
+            if not create_missing or len(bindings) == len(normalised):
                 return bindings
 
-            for alias in missing_keys:
-                raw_alias = normalised[alias]
-                binding = self._auto_create_binding(conn, alias, raw_alias)
-                bindings[raw_alias] = binding
-
-            conn.commit()
+            state.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another writer may have added some of these since the last sync
+                version = state.conn.execute(
+                    "SELECT version FROM metric_dictionary_version WHERE id = 1"
+                ).fetchone()[0]
+                if version != state.version:
+                    self._load_locked(version)
+                created = [
+                    self._auto_create_binding(alias, raw_alias)
+                    for alias, raw_alias in normalised.items()
+                    if alias not in state.bindings
+                ]
+                state.conn.executemany(
+                    f"INSERT INTO metric_dictionary ({_BINDING_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            binding.alias,
+                            binding.raw_alias,
+                            binding.canonical_metric,
+                            binding.source_system,
+                            binding.primary_tag,
+                            _json_dumps(binding.fallback_tags),
+                            binding.description,
+                            _json_dumps(binding.metadata),
+                            binding.created_at.isoformat(),
+                            binding.updated_at.isoformat(),
+                            binding.created_by,
+                            binding.updated_by,
+                        )
+                        for binding in created
+                    ],
+                )
+                new_version = state.conn.execute(
+                    "SELECT version FROM metric_dictionary_version WHERE id = 1"
+                ).fetchone()[0]
+                state.conn.execute("COMMIT")
+            except BaseException:
+                state.conn.execute("ROLLBACK")
+                raise
+
+            for binding in created:
+                state.bindings[binding.alias] = binding
+            state.version = new_version
+            state.data_version = state.conn.execute("PRAGMA data_version").fetchone()[0]
+            for alias, raw_alias in normalised.items():
+                bindings[raw_alias] = state.bindings[alias]
 
         return bindings
 
-    def _auto_create_binding(self, conn: sqlite3.Connection, alias: str, raw_alias: str) -> MetricBinding:
+    def _auto_create_binding(self, alias: str, raw_alias: str) -> MetricBinding:
         canonical_metric = self._canonical_from_alias(raw_alias or alias)
         tags = _CANONICAL_TAGS.get(canonical_metric, [])
         primary_tag = tags[0] if tags else None
-        fallback_tags = tags[1:] if len(tags) > 1 else []
-        created_at = _now().isoformat()
-        metadata = {
-            "autogenerated": True,
-            "source": "ontology",
-        }
-        conn.execute(
-            """
-            INSERT INTO metric_dictionary (
-                alias,
-                raw_alias,
-                canonical_metric,
-                source_system,
-                primary_tag,
-                fallback_tags,
-                description,
-                metadata,
-                created_at,
-                updated_at,
-                created_by,
-                updated_by
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                alias,
-                raw_alias,
-                canonical_metric,
-                "sec_xbrl" if primary_tag else "unknown",
-                primary_tag,
-                _json_dumps(fallback_tags),
-                None,
-                _json_dumps(metadata),
-                created_at,
-                created_at,
-                "system",
-                "system",
-            ),
+        created_at = _now()
+        return MetricBinding(
+            alias=alias,
+            raw_alias=raw_alias,
+            canonical_metric=canonical_metric,
+            source_system="sec_xbrl" if primary_tag else "unknown",
+            primary_tag=primary_tag,
+            fallback_tags=tags[1:] if len(tags) > 1 else [],
+            description=None,
+            metadata={
+                "autogenerated": True,
+                "source": "ontology",
+            },
+            created_at=created_at,
+            updated_at=created_at,
+            created_by="system",
+            updated_by="system",
         )
-        row = conn.execute(
-            """
-            SELECT alias, raw_alias, canonical_metric, source_system, primary_tag,
-                   fallback_tags, description, metadata, created_at, updated_at, created_by, updated_by
-            FROM metric_dictionary
-            WHERE alias = ?
-            """,
-            (alias,),
-        ).fetchone()
-        assert row is not None  # safety guard
-        return self._row_to_binding(row)
 
     def _canonical_from_alias(self, alias: str) -> str:
         token = _normalize_metric_token(alias)
@@ -9,12 +9,17 @@ from __future__ import annotations
 
 import logging
 import statistics
+import warnings
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import sqlite3
 
+from .sector_analytics import SECTOR_MAP
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -30,6 +35,7 @@ class Anomaly:
     severity: str  # "low", "medium", "high", "critical"
     description: str
     confidence: float  # 0-1
+    method: str = "time_series"  # "time_series", "rolling", "peer" or "robust"
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization."""
@@ -43,9 +49,84 @@ class Anomaly:
             "severity": self.severity,
             "description": self.description,
             "confidence": self.confidence,
+            "method": self.method,
         }
 
 
+@contextmanager
+def _quiet_nan_warnings():
+    """Silence numpy's all-NaN slice warnings inside vectorised statistics."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        yield
+
+
+# Base metrics loaded for the universe-wide sweep
+SWEEP_BASE_METRICS = (
+    "revenue", "net_income", "cash_from_operations", "free_cash_flow",
+    "current_assets", "current_liabilities", "total_liabilities", "shareholders_equity",
+)
+
+SEVERITY_ORDER = ("low", "medium", "high", "critical")
+
+
+@dataclass
+class MetricPanel:
+    """Dense (ticker x year) matrices per series, built from one metric_snapshots read."""
+    tickers: List[str]
+    years: List[int]
+    series: Dict[str, np.ndarray]
+    
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[str, str, int, Optional[float]]]) -> "MetricPanel":
+        tickers = sorted({ticker for ticker, _, _, _ in rows})
+        years = sorted({year for _, _, year, _ in rows})
+        ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+        year_index = {year: i for i, year in enumerate(years)}
+        metric_index = {metric: i for i, metric in enumerate(SWEEP_BASE_METRICS)}
+        cube = np.full((len(SWEEP_BASE_METRICS), len(tickers), len(years)), np.nan)
+        for ticker, metric, year, value in rows:
+            if value is not None:
+                cube[metric_index[metric], ticker_index[ticker], year_index[year]] = value
+        base = {metric: cube[i] for metric, i in metric_index.items()}
+        
+        def ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(denominator > 0, numerator / denominator * scale, np.nan)
+        
+        revenue = base["revenue"]
+        growth = np.full_like(revenue, np.nan)
+        if len(years) > 1:
+            # Growth only between consecutive fiscal years
+            consecutive = np.diff(np.asarray(years)) == 1
+            step = ratio(revenue[:, 1:] - revenue[:, :-1], revenue[:, :-1], 100.0)
+            growth[:, 1:] = np.where(consecutive, step, np.nan)
+        
+        series = {
+            "revenue_growth": growth,
+            "net_margin": ratio(base["net_income"], revenue, 100.0),
+            "operating_cash_flow": base["cash_from_operations"],
+            "free_cash_flow": base["free_cash_flow"],
+            "current_ratio": ratio(base["current_assets"], base["current_liabilities"]),
+            "debt_to_equity": ratio(base["total_liabilities"], base["shareholders_equity"]),
+        }
+        return cls(tickers=tickers, years=years, series=series)
+    
+    def rolling_stats(self, name: str, window: int, min_periods: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean and sample std of the ``window`` years before each year (NaN when too sparse)."""
+        values = self.series[name]
+        padded = np.concatenate([np.full((values.shape[0], window), np.nan), values], axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=1)[:, :values.shape[1], :]
+        counts = np.sum(~np.isnan(windows), axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"), _quiet_nan_warnings():
+            mean = np.nanmean(windows, axis=2)
+            std = np.nanstd(windows, axis=2, ddof=1)
+        sparse = counts < min_periods
+        mean[sparse] = np.nan
+        std[sparse] = np.nan
+        return mean, std
+
+
 class AnomalyDetector:
     """Statistical anomaly detection for financial metrics."""
     
@@ -405,6 +486,288 @@ class AnomalyDetector:
         
         return anomalies
     
+    def _ensure_table(self) -> None:
+        """Create the persisted anomaly table if it does not exist."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS anomaly_flags (
+                    ticker TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    fiscal_year INTEGER NOT NULL,
+                    method TEXT NOT NULL,
+                    sector TEXT,
+                    value REAL NOT NULL,
+                    expected_value REAL NOT NULL,
+                    deviation_pct REAL NOT NULL,
+                    severity TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    rolling_z REAL,
+                    peer_z REAL,
+                    robust_score REAL,
+                    detected_at TEXT NOT NULL,
+                    PRIMARY KEY (ticker, metric, fiscal_year)
+                );
+                CREATE INDEX IF NOT EXISTS idx_anomaly_flags_year
+                    ON anomaly_flags (fiscal_year, confidence DESC);
+                """
+            )
+    
+    def load_panel(self, tickers: Optional[Sequence[str]] = None) -> MetricPanel:
+        """Load the (ticker x metric x year) panel for the sweep with a single query."""
+        query = """
+            SELECT ticker, metric, end_year, value
+            FROM metric_snapshots
+            WHERE metric IN ({}) AND end_year IS NOT NULL
+        """.format(",".join("?" * len(SWEEP_BASE_METRICS)))
+        params: List = list(SWEEP_BASE_METRICS)
+        if tickers:
+            query += " AND ticker IN ({})".format(",".join("?" * len(tickers)))
+            params.extend(t.upper() for t in tickers)
+        query += " ORDER BY id"  # later snapshots win, as with per-ticker reads
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return MetricPanel.from_rows(rows)
+    
+    def sweep_universe(
+        self,
+        fiscal_year: Optional[int] = None,
+        *,
+        years: int = 5,
+        std_threshold: float = 2.0,
+        robust_threshold: float = 3.5,
+        min_peers: int = 3,
+        tickers: Optional[Sequence[str]] = None,
+        persist: bool = True,
+    ) -> List[Anomaly]:
+        """
+        Flag unusual values across the whole universe for one fiscal year.
+        
+        Every series (revenue growth, net margin, cash flows, current ratio,
+        debt-to-equity) is scored with vectorised operations:
+        - rolling z: vs the company's own previous ``years`` values
+        - peer z: vs the same year's sector mean/std (GICS sector from SECTOR_MAP)
+        - robust score: modified z (0.6745 * deviation / MAD) vs the sector median
+        
+        Ratios need both inputs present (missing values are not treated as 0).
+        
+        Args:
+            fiscal_year: Year to scan (defaults to the latest year in the panel)
+            years: Trailing window for the rolling z-score
+            std_threshold: Flag when |rolling z| or |peer z| exceeds this
+            robust_threshold: Flag when |robust score| exceeds this
+            min_peers: Minimum companies per sector for peer scores
+            tickers: Restrict the sweep (and its peer groups) to these tickers
+            persist: Replace the stored flags for the scanned year (and tickers)
+            
+        Returns:
+            Flagged anomalies sorted by confidence (highest first)
+        """
+        panel = self.load_panel(tickers)
+        if not panel.years:
+            return []
+        target_year = fiscal_year if fiscal_year is not None else panel.years[-1]
+        anomalies: List[Anomaly] = []
+        scores: List[Tuple[Optional[float], Optional[float], Optional[float], str]] = []
+        
+        if target_year in panel.years:
+            col = panel.years.index(target_year)
+            sectors = np.array([SECTOR_MAP.get(t, "Unknown") for t in panel.tickers])
+            
+            for name, matrix in panel.series.items():
+                values = matrix[:, col]
+                roll_mean, roll_std = panel.rolling_stats(name, years)
+                roll_mean, roll_std = roll_mean[:, col], roll_std[:, col]
+                peer_mean = np.full_like(values, np.nan)
+                peer_std = np.full_like(values, np.nan)
+                peer_median = np.full_like(values, np.nan)
+                peer_mad = np.full_like(values, np.nan)
+                with _quiet_nan_warnings():
+                    for sector in np.unique(sectors):
+                        members = sectors == sector
+                        peers = values[members]
+                        if np.count_nonzero(~np.isnan(peers)) < min_peers:
+                            continue
+                        median = np.nanmedian(peers)
+                        peer_mean[members] = np.nanmean(peers)
+                        peer_std[members] = np.nanstd(peers, ddof=1)
+                        peer_median[members] = median
+                        peer_mad[members] = np.nanmedian(np.abs(peers - median))
+                
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rolling_z = np.where(roll_std > 0, (values - roll_mean) / roll_std, np.nan)
+                    peer_z = np.where(peer_std > 0, (values - peer_mean) / peer_std, np.nan)
+                    robust = np.where(peer_mad > 0, 0.6745 * (values - peer_median) / peer_mad, np.nan)
+                # Strength of each signal relative to its own threshold
+                strengths = np.stack([
+                    np.abs(rolling_z) / std_threshold,
+                    np.abs(peer_z) / std_threshold,
+                    np.abs(robust) / robust_threshold,
+                ])
+                strengths = np.nan_to_num(strengths, nan=0.0)
+                best = strengths.max(axis=0)
+                
+                for i in np.flatnonzero((best > 1.0) & ~np.isnan(values)):
+                    method = ("rolling", "peer", "robust")[int(strengths[:, i].argmax())]
+                    anomaly = self._sweep_anomaly(
+                        panel.tickers[i], name, target_year, float(values[i]), method, sectors[i], years,
+                        rolling=(roll_mean[i], roll_std[i], rolling_z[i]),
+                        peer=(peer_mean[i], peer_std[i], peer_z[i]),
+                        robust=(peer_median[i], robust[i]),
+                        strength=float(best[i]),
+                    )
+                    anomalies.append(anomaly)
+                    scores.append((
+                        _finite_or_none(rolling_z[i]), _finite_or_none(peer_z[i]),
+                        _finite_or_none(robust[i]), str(sectors[i]),
+                    ))
+        
+        order = sorted(range(len(anomalies)), key=lambda k: anomalies[k].confidence, reverse=True)
+        anomalies = [anomalies[k] for k in order]
+        scores = [scores[k] for k in order]
+        if persist:
+            self._store_flags(target_year, anomalies, scores, [t.upper() for t in tickers] if tickers else None)
+        LOGGER.info(f"Anomaly sweep FY{target_year}: {len(anomalies)} flags across {len(panel.tickers)} tickers")
+        return anomalies
+    
+    def _sweep_anomaly(
+        self,
+        ticker: str,
+        metric: str,
+        fiscal_year: int,
+        value: float,
+        method: str,
+        sector: str,
+        window: int,
+        *,
+        rolling: Tuple[float, float, float],
+        peer: Tuple[float, float, float],
+        robust: Tuple[float, float],
+        strength: float,
+    ) -> Anomaly:
+        label = metric.replace('_', ' ').title()
+        if method == "rolling":
+            expected, spread, score = rolling
+            direction = "high" if value > expected else "low"
+            description = (
+                f"{label} unusually {direction}: {value:.2f} vs trailing {window}-year avg "
+                f"{expected:.2f} (±{spread:.2f}). Deviation: {abs(score):.1f} std devs."
+            )
+        elif method == "peer":
+            expected, spread, score = peer
+            direction = "high" if value > expected else "low"
+            description = (
+                f"{label} unusually {direction} for {sector}: {value:.2f} vs peer avg "
+                f"{expected:.2f} (±{spread:.2f}). Deviation: {abs(score):.1f} std devs."
+            )
+        else:
+            expected, score = robust
+            direction = "high" if value > expected else "low"
+            description = (
+                f"{label} unusually {direction} for {sector}: {value:.2f} vs peer median "
+                f"{expected:.2f}. Robust score: {abs(score):.1f}."
+            )
+        return Anomaly(
+            ticker=ticker,
+            metric=metric,
+            fiscal_year=fiscal_year,
+            value=value,
+            expected_value=float(expected),
+            deviation_pct=abs(value - float(expected)),
+            severity=self._calculate_severity(strength, 1.0),
+            description=description,
+            confidence=min(strength / 2, 1.0),
+            method=method,
+        )
+    
+    def _store_flags(
+        self,
+        fiscal_year: int,
+        anomalies: Sequence[Anomaly],
+        scores: Sequence[Tuple[Optional[float], Optional[float], Optional[float], str]],
+        tickers: Optional[Sequence[str]],
+    ) -> None:
+        """Replace persisted flags for ``fiscal_year`` (limited to ``tickers`` when given)."""
+        self._ensure_table()
+        detected_at = datetime.now(timezone.utc).isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            if tickers is None:
+                conn.execute("DELETE FROM anomaly_flags WHERE fiscal_year = ?", (fiscal_year,))
+            else:
+                conn.execute(
+                    "DELETE FROM anomaly_flags WHERE fiscal_year = ? AND ticker IN ({})".format(
+                        ",".join("?" * len(tickers))
+                    ),
+                    [fiscal_year, *tickers],
+                )
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO anomaly_flags (
+                    ticker, metric, fiscal_year, method, sector, value, expected_value,
+                    deviation_pct, severity, description, confidence,
+                    rolling_z, peer_z, robust_score, detected_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        a.ticker, a.metric, a.fiscal_year, a.method, sector, a.value, a.expected_value,
+                        a.deviation_pct, a.severity, a.description, a.confidence,
+                        rolling_z, peer_z, robust_score, detected_at,
+                    )
+                    for a, (rolling_z, peer_z, robust_score, sector) in zip(anomalies, scores)
+                ],
+            )
+    
+    def get_flagged_anomalies(
+        self,
+        ticker: Optional[str] = None,
+        fiscal_year: Optional[int] = None,
+        min_severity: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Anomaly]:
+        """
+        Read anomalies persisted by ``sweep_universe``.
+        
+        Args:
+            ticker: Only this company
+            fiscal_year: Only this year (defaults to all stored years)
+            min_severity: Lowest severity to include ("low", "medium", "high", "critical")
+            limit: Maximum number of anomalies (highest confidence first)
+        """
+        self._ensure_table()
+        query = """
+            SELECT ticker, metric, fiscal_year, value, expected_value, deviation_pct,
+                   severity, description, confidence, method
+            FROM anomaly_flags WHERE 1 = 1
+        """
+        params: List = []
+        if ticker:
+            query += " AND ticker = ?"
+            params.append(ticker.upper())
+        if fiscal_year is not None:
+            query += " AND fiscal_year = ?"
+            params.append(fiscal_year)
+        if min_severity in SEVERITY_ORDER:
+            allowed = SEVERITY_ORDER[SEVERITY_ORDER.index(min_severity):]
+            query += " AND severity IN ({})".format(",".join("?" * len(allowed)))
+            params.extend(allowed)
+        query += " ORDER BY fiscal_year DESC, confidence DESC LIMIT ?"
+        params.append(limit)
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            Anomaly(
+                ticker=row[0], metric=row[1], fiscal_year=row[2], value=row[3],
+                expected_value=row[4], deviation_pct=row[5], severity=row[6],
+                description=row[7], confidence=row[8], method=row[9],
+            )
+            for row in rows
+        ]
+    
     def _calculate_severity(self, z_score: float, threshold: float) -> str:
         """Calculate severity level based on z-score."""
         if z_score > threshold * 3:
@@ -417,6 +780,10 @@ class AnomalyDetector:
             return "low"
 
 
+def _finite_or_none(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
 def get_anomaly_detector(db_path: str) -> AnomalyDetector:
     """Factory function to create AnomalyDetector instance."""
     return AnomalyDetector(db_path)
@@ -32,6 +32,7 @@ from .help_content import HELP_TEXT
 from .llm_client import LLMClient, build_llm_client
 from .parsing.parse import parse_to_structured
 from .table_renderer import METRIC_DEFINITIONS, render_table_command
+from .token_counter import get_token_counter
 from .dashboard_utils import (
     build_cfi_dashboard_payload,
     build_cfi_compare_payload,
@@ -2671,15 +2672,9 @@ class FinanlyzeOSChatbot:
             return valid_tickers[-1]
         
         return None
-    def _count_tokens(self, text: str, model: str = "gpt-4o") -> int:
-        """Count tokens in text using tiktoken (approximate if not available)."""
-        try:
-            import tiktoken
-            encoding = tiktoken.encoding_for_model(model)
-            return len(encoding.encode(text))
-        except (ImportError, KeyError):
-            # Fallback: approximate 1 token = 4 characters (conservative estimate)
-            return len(text) // 4
+    def _count_tokens(self, text: str, model: str = "gpt-4o", *, exact: bool = True) -> int:
+        """Count tokens using the shared token counter (cached encodings, offline fallback)."""
+        return get_token_counter().count(text, model, exact=exact)
     
     def _truncate_context(self, context: str, max_tokens: int = 100000) -> str:
         """Truncate context to fit within token limit, preserving important sections."""
@@ -2733,20 +2728,8 @@ class FinanlyzeOSChatbot:
         if current_tokens <= max_tokens:
             return current
         
-        # Binary search for the right length
-        low, high = 0, len(text)
-        best = text[:high]
-        
-        while low < high:
-            mid = (low + high) // 2
-            candidate = text[:mid]
-            tokens = self._count_tokens(candidate)
-            
-            if tokens <= max_tokens:
-                best = candidate
-                low = mid + 1
-            else:
-                high = mid
+        # Approximate binary search confirmed by a single exact count
+        best = get_token_counter().truncate(text, max_tokens)
         
         # Try to break at a paragraph boundary
         truncated = best
@@ -2806,9 +2789,17 @@ class FinanlyzeOSChatbot:
                 "═══════════════════════════════════════════════════════════════════════════════\n"
             )
             
-            # Check total token count before adding
-            all_messages_content = "\n".join([msg.get("content", "") for msg in messages] + [context_with_marker] + [msg.get("content", "") for msg in chat_history])
-            total_tokens = self._count_tokens(all_messages_content)
+            # Check total token count before adding (each message counted once;
+            # dropping history subtracts its count instead of re-encoding everything)
+            fixed_tokens = sum(
+                get_token_counter().count_many(
+                    [msg.get("content", "") for msg in messages] + [context_with_marker]
+                )
+            )
+            history_tokens = get_token_counter().count_many(
+                [msg.get("content", "") for msg in chat_history]
+            )
+            total_tokens = fixed_tokens + sum(history_tokens)
             LOGGER.info(f"📊 Total message tokens: {total_tokens} (limit: 128000)")
             
             if total_tokens > 120000:  # Safety margin
@@ -2816,8 +2807,7 @@ class FinanlyzeOSChatbot:
                 # Truncate conversation history if needed
                 while total_tokens > 120000 and len(chat_history) > 2:
                     chat_history = chat_history[1:]  # Remove oldest messages
-                    all_messages_content = "\n".join([msg.get("content", "") for msg in messages] + [context_with_marker] + [msg.get("content", "") for msg in chat_history])
-                    total_tokens = self._count_tokens(all_messages_content)
+                    total_tokens -= history_tokens.pop(0)
                 LOGGER.info(f"📊 After truncation: {total_tokens} tokens, {len(chat_history)} history messages")
             
             # Add context as a system message (NOT user message)
@@ -4724,6 +4714,8 @@ class FinanlyzeOSChatbot:
                 conv_id,
                 database_path,
                 file_ids=file_ids if file_ids else None,  # None triggers auto-fetch from conversation
+                top_k=getattr(self.settings, "document_context_top_k", 8),
+                token_budget=getattr(self.settings, "document_context_token_budget", 6000),
             )
             
             # CRITICAL: If doc_context is None but we have a conversation_id, something is wrong
@@ -73,6 +73,9 @@ class Settings:
         Directory used to persist intermediate ingestion artefacts.
     enable_bloomberg:
         Whether Bloomberg real-time quote integration should be attempted.
+    document_context_top_k / document_context_token_budget:
+        How many uploaded-document chunks, and how many tokens of them, are
+        retrieved into the prompt per chat turn.
     bloomberg_host / bloomberg_port / bloomberg_timeout:
         Connection details for a Bloomberg Session (if enabled).
     """
@@ -99,6 +102,7 @@ class Settings:
     bloomberg_port: Optional[int] = None
     bloomberg_timeout: float = 30.0
     disable_quote_refresh: bool = False
+    quote_max_age_hours: float = 0.0  # Refresh cached quotes older than this (0 = only missing quotes)
     enable_external_backfill: bool = False
     use_companyfacts_bulk: bool = False
     companyfacts_bulk_url: str = "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
@@ -117,6 +121,8 @@ class Settings:
     cross_validation_enabled: bool = True
     auto_correct_enabled: bool = True
     include_macro_context: bool = True
+    document_context_top_k: int = 8
+    document_context_token_budget: int = 6000
     # Private Company API Settings
     enable_private_companies: bool = False
     private_api_url: Optional[str] = None
@@ -180,6 +186,17 @@ def _parse_float_env(name: str, *, default: float) -> float:
         raise ValueError(f"{name} must be a float (received {value!r}).") from exc
 
 
+def _parse_int_env(name: str, *, default: int, minimum: int = 1) -> int:
+    """Parse an integer (clamped to ``minimum``) from an environment variable."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return max(minimum, int(value))
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer (received {value!r}).") from exc
+
+
 def load_settings() -> Settings:
     """Load configuration from environment variables.
 
@@ -341,6 +358,7 @@ def load_settings() -> Settings:
         bloomberg_port=bloomberg_port,
         bloomberg_timeout=bloomberg_timeout,
         disable_quote_refresh=_env_flag("DISABLE_QUOTE_REFRESH", default=False),
+        quote_max_age_hours=_parse_float_env("QUOTE_MAX_AGE_HOURS", default=0.0),
         enable_external_backfill=_env_flag("ENABLE_EXTERNAL_BACKFILL", default=False),
         use_companyfacts_bulk=use_companyfacts_bulk,
         companyfacts_bulk_url=companyfacts_bulk_url,
@@ -359,6 +377,8 @@ def load_settings() -> Settings:
         cross_validation_enabled=_env_flag("CROSS_VALIDATION_ENABLED", default=True),
         auto_correct_enabled=_env_flag("AUTO_CORRECT_ENABLED", default=True),
         include_macro_context=_env_flag("ENABLE_MACRO_CONTEXT", default=True),
+        document_context_top_k=_parse_int_env("DOCUMENT_CONTEXT_TOP_K", default=8),
+        document_context_token_budget=_parse_int_env("DOCUMENT_CONTEXT_TOKEN_BUDGET", default=6000),
         enable_private_companies=_env_flag("ENABLE_PRIVATE_COMPANIES", default=False),
         private_api_url=os.getenv("PRIVATE_API_URL"),
         private_api_key=os.getenv("PRIVATE_API_KEY"),
@@ -3650,7 +3650,7 @@ def build_financial_context(
                 # Get FRED API key from environment if available
                 import os
                 fred_api_key = os.getenv('FRED_API_KEY')
-                macro_provider = get_macro_provider(fred_api_key=fred_api_key)
+                macro_provider = get_macro_provider(fred_api_key=fred_api_key, database_path=db_path)
                 
                 # Attempt to determine company sector (first ticker)
                 company_sector = None
@@ -9,7 +9,7 @@ import time
 from dataclasses import dataclass
 from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Protocol, Sequence, Tuple, TYPE_CHECKING
 
 import requests
 import random
@@ -684,6 +684,13 @@ class StooqQuoteClient:
         return results
 
 
+class QuoteProvider(Protocol):
+    """Anything that can fetch current quotes for a batch of tickers."""
+
+    def fetch_quotes(self, tickers: Sequence[str]) -> List[MarketQuote]:
+        """Return the quotes available for ``tickers`` (missing tickers are omitted)."""
+
+
 class YahooFinanceClient:
     """Client for Yahoo Finance real-time quote API."""
 
@@ -18,7 +18,7 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING, Union
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING, Union
 
 # Import connection pooling for performance
 try:
@@ -56,6 +56,63 @@ class MetricRecord:
     end_year: Optional[int]
 
 
+_BENCHMARK_PERCENTILES_DDL = """
+    CREATE TABLE IF NOT EXISTS benchmark_percentiles (
+        universe TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        period TEXT,
+        start_year INTEGER,
+        end_year INTEGER,
+        ticker_count INTEGER NOT NULL,
+        mean REAL NOT NULL,
+        p10 REAL NOT NULL,
+        p25 REAL NOT NULL,
+        p50 REAL NOT NULL,
+        p75 REAL NOT NULL,
+        p90 REAL NOT NULL,
+        computed_at TEXT NOT NULL,
+        PRIMARY KEY (universe, scope, metric)
+    )
+"""
+
+
+# Per-ticker write counters, bumped once per ticker by every metric writer
+# (see bump_metric_data_versions); caches in any process compare them to detect
+# stale entries. Older databases carried per-row triggers for this; they are dropped.
+_METRIC_DATA_VERSIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS metric_data_versions (
+        ticker TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    DROP TRIGGER IF EXISTS trg_metric_snapshots_insert_version;
+    DROP TRIGGER IF EXISTS trg_metric_snapshots_update_version;
+    DROP TRIGGER IF EXISTS trg_metric_snapshots_delete_version;
+    DROP TRIGGER IF EXISTS trg_kpi_values_insert_version;
+    DROP TRIGGER IF EXISTS trg_kpi_values_update_version;
+    DROP TRIGGER IF EXISTS trg_kpi_values_delete_version;
+"""
+
+
+@dataclass(frozen=True)
+class BenchmarkPercentileRecord:
+    """Precomputed cross-sectional distribution of one metric's latest values."""
+    universe: str
+    scope: str  # "universe" or a sector name
+    metric: str
+    period: Optional[str]
+    start_year: Optional[int]
+    end_year: Optional[int]
+    ticker_count: int
+    mean: float
+    p10: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+    computed_at: datetime
+
+
 @dataclass(frozen=True)
 class KpiValueRecord:
     """Value persisted by the KPI backfill pipeline with provenance metadata."""
@@ -716,6 +773,7 @@ def initialise(database_path: Path) -> None:
             )
             """
         )
+        connection.execute(_BENCHMARK_PERCENTILES_DDL)
         connection.execute(
             """
             CREATE TABLE IF NOT EXISTS kpi_values (
@@ -1121,6 +1179,7 @@ def initialise(database_path: Path) -> None:
             ON kpi_values (ticker, metric_id, fiscal_year, fiscal_quarter)
             """
         )
+        connection.executescript(_METRIC_DATA_VERSIONS_DDL)
         connection.execute(
             """
             CREATE INDEX IF NOT EXISTS idx_scenario_results_ticker
@@ -1286,6 +1345,23 @@ def log_message(
         connection.commit()
 
 
+def fetch_recent_user_messages(database_path: Path, *, limit: int = 200) -> List[str]:
+    """Return the most recent distinct user messages across all conversations."""
+    with _connect(database_path) as connection:
+        rows = connection.execute(
+            """
+            SELECT content, MAX(id) AS last_id
+            FROM conversations
+            WHERE role = 'user' AND content IS NOT NULL AND TRIM(content) <> ''
+            GROUP BY content
+            ORDER BY last_id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
 def fetch_conversation(
     database_path: Path, conversation_id: str
 ) -> Iterable[Message]:
@@ -1908,6 +1984,17 @@ def bulk_insert_market_quotes(
             connection.close()
 
 
+def _quote_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "price": row["price"],
+        "currency": row["currency"],
+        "volume": row["volume"],
+        "timestamp": _parse_dt(row["quote_time"]),
+        "source": row["source"],
+        "raw": json.loads(row["data"]) if row["data"] else {},
+    }
+
+
 def fetch_latest_quote(database_path: Path, ticker: str) -> Optional[Dict[str, Any]]:
     """Return the most recent cached quote for a ticker."""
     with _connect(database_path) as connection:
@@ -1926,14 +2013,7 @@ def fetch_latest_quote(database_path: Path, ticker: str) -> Optional[Dict[str, A
     if row is None:
         return None
 
-    return {
-        "price": row["price"],
-        "currency": row["currency"],
-        "volume": row["volume"],
-        "timestamp": _parse_dt(row["quote_time"]),
-        "source": row["source"],
-        "raw": json.loads(row["data"]) if row["data"] else {},
-    }
+    return _quote_from_row(row)
 
 
 def fetch_quote_on_or_before(
@@ -1956,14 +2036,87 @@ def fetch_quote_on_or_before(
     if row is None:
         return None
 
-    return {
-        "price": row["price"],
-        "currency": row["currency"],
-        "volume": row["volume"],
-        "timestamp": _parse_dt(row["quote_time"]),
-        "source": row["source"],
-        "raw": json.loads(row["data"]) if row["data"] else {},
+    return _quote_from_row(row)
+
+
+_QUOTE_BATCH_SIZE = 400
+_LATEST_QUOTE_CUTOFF = "9999-12-31T23:59:59+00:00"
+
+
+def fetch_latest_quote_times(
+    database_path: Path, tickers: Iterable[str]
+) -> Dict[str, datetime]:
+    """Return the latest cached quote timestamp per ticker (tickers without quotes are omitted)."""
+    normalized = sorted({_normalize_ticker(ticker) for ticker in tickers if ticker})
+    results: Dict[str, datetime] = {}
+    with _connect(database_path) as connection:
+        for start in range(0, len(normalized), _QUOTE_BATCH_SIZE):
+            batch = normalized[start:start + _QUOTE_BATCH_SIZE]
+            placeholders = ", ".join("?" for _ in batch)
+            rows = connection.execute(
+                f"""
+                SELECT ticker, MAX(quote_time)
+                FROM market_quotes
+                WHERE ticker IN ({placeholders})
+                GROUP BY ticker
+                """,
+                batch,
+            ).fetchall()
+            for ticker, quote_time in rows:
+                parsed = _parse_dt(quote_time)
+                if parsed is not None:
+                    results[ticker] = _ensure_utc(parsed)
+    return results
+
+
+def fetch_latest_quotes(
+    database_path: Path, tickers: Iterable[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Return the most recent cached quote for each ticker in one pass."""
+    return fetch_quotes_on_or_before(database_path, {ticker: None for ticker in tickers})
+
+
+def fetch_quotes_on_or_before(
+    database_path: Path,
+    cutoffs: Mapping[str, Optional[datetime]],
+) -> Dict[str, Dict[str, Any]]:
+    """Return, per ticker, the closest quote at or before that ticker's cutoff.
+
+    ``cutoffs`` maps tickers to their own cutoff (e.g. each fiscal year end);
+    a ``None`` cutoff selects the latest quote.
+    """
+    pairs = {
+        _normalize_ticker(ticker): _iso_utc(before) if before is not None else _LATEST_QUOTE_CUTOFF
+        for ticker, before in cutoffs.items()
+        if ticker
     }
+    items = sorted(pairs.items())
+    results: Dict[str, Dict[str, Any]] = {}
+    with _connect(database_path) as connection:
+        connection.row_factory = sqlite3.Row
+        for start in range(0, len(items), _QUOTE_BATCH_SIZE):
+            batch = items[start:start + _QUOTE_BATCH_SIZE]
+            values = ", ".join("(?, ?)" for _ in batch)
+            params = [value for pair in batch for value in pair]
+            rows = connection.execute(
+                f"""
+                WITH cutoffs(ticker, before) AS (VALUES {values})
+                SELECT ticker, price, currency, volume, quote_time, data, source
+                FROM (
+                    SELECT q.ticker, q.price, q.currency, q.volume, q.quote_time, q.data, q.source,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY q.ticker ORDER BY q.quote_time DESC, q.id DESC
+                           ) AS rn
+                    FROM cutoffs c
+                    JOIN market_quotes q ON q.ticker = c.ticker AND q.quote_time <= c.before
+                )
+                WHERE rn = 1
+                """,
+                params,
+            ).fetchall()
+            for row in rows:
+                results[row["ticker"]] = _quote_from_row(row)
+    return results
 
 
 # -----------------------------
@@ -2299,11 +2452,31 @@ def lookup_ticker(
         if row:
             return row["ticker"]
 
+def bump_metric_data_versions(connection: sqlite3.Connection, tickers: Iterable[str]) -> None:
+    """Bump the stored write counter of each ticker once, in ``connection``'s transaction.
+
+    Every writer of ``metric_snapshots``/``kpi_values`` calls this, including
+    scripts that write with raw SQL, so caches in other processes notice.
+    """
+    affected = sorted({_normalize_ticker(ticker) for ticker in tickers if ticker})
+    if not affected:
+        return
+    connection.executemany(
+        """
+        INSERT INTO metric_data_versions (ticker, version) VALUES (?, 1)
+        ON CONFLICT(ticker) DO UPDATE SET version = version + 1
+        """,
+        [(ticker,) for ticker in affected],
+    )
+
+
 def replace_metric_snapshots(
     database_path: Path,
     records: Sequence[MetricRecord],
 ) -> int:
     """Replace metric snapshots with the supplied values."""
+    from .smart_cache import metrics_cache
+
     if not records:
         return 0
 
@@ -2335,8 +2508,82 @@ def replace_metric_snapshots(
             """,
             payload,
         )
+        bump_metric_data_versions(connection, {row[0] for row in payload})
         connection.commit()
-        return cursor.rowcount
+    metrics_cache.invalidate(database_path, {row[0] for row in payload})
+    return cursor.rowcount
+
+
+def replace_benchmark_percentiles(
+    database_path: Path,
+    universe: str,
+    records: Sequence[BenchmarkPercentileRecord],
+) -> int:
+    """Replace every precomputed benchmark distribution for ``universe``."""
+    payload = [
+        (
+            record.universe,
+            record.scope,
+            record.metric,
+            record.period,
+            record.start_year,
+            record.end_year,
+            record.ticker_count,
+            record.mean,
+            record.p10,
+            record.p25,
+            record.p50,
+            record.p75,
+            record.p90,
+            _iso_utc(record.computed_at),
+        )
+        for record in records
+    ]
+    with _connect(database_path) as connection:
+        # Databases created before this table existed get it on first materialization
+        connection.execute(_BENCHMARK_PERCENTILES_DDL)
+        connection.execute("DELETE FROM benchmark_percentiles WHERE universe = ?", (universe,))
+        connection.executemany(
+            """
+            INSERT INTO benchmark_percentiles (
+                universe, scope, metric, period, start_year, end_year, ticker_count,
+                mean, p10, p25, p50, p75, p90, computed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            payload,
+        )
+        connection.commit()
+    return len(payload)
+
+
+def fetch_benchmark_percentiles(
+    database_path: Path,
+    universe: str,
+    metrics: Sequence[str],
+    *,
+    scope: str = "universe",
+) -> Dict[str, BenchmarkPercentileRecord]:
+    """Return precomputed benchmark distributions keyed by metric (empty if not materialized)."""
+    if not metrics:
+        return {}
+    placeholders = ",".join("?" for _ in metrics)
+    try:
+        with _connect(database_path) as connection:
+            rows = connection.execute(
+                f"""
+                SELECT universe, scope, metric, period, start_year, end_year, ticker_count,
+                       mean, p10, p25, p50, p75, p90, computed_at
+                FROM benchmark_percentiles
+                WHERE universe = ? AND scope = ? AND metric IN ({placeholders})
+                """,
+                [universe, scope, *metrics],
+            ).fetchall()
+    except sqlite3.OperationalError:
+        return {}  # Table not created yet (database predates the benchmark table)
+    return {
+        row[2]: BenchmarkPercentileRecord(*row[:13], computed_at=_parse_dt(row[13]) or datetime.now(timezone.utc))
+        for row in rows
+    }
 
 
 def fetch_metric_snapshots(
@@ -2407,6 +2654,8 @@ def upsert_kpi_value(
     warning: Optional[str] = None,
 ) -> None:
     """Insert or update a KPI backfill value with provenance metadata."""
+    from .smart_cache import metrics_cache
+
     timestamp = _iso_utc(datetime.now(timezone.utc))
     with _connect(database_path) as connection:
         connection.execute(
@@ -2438,7 +2687,9 @@ def upsert_kpi_value(
                 timestamp,
             ),
         )
+        bump_metric_data_versions(connection, [ticker])
         connection.commit()
+    metrics_cache.invalidate(database_path, [ticker])
 
 
 def fetch_kpi_values(
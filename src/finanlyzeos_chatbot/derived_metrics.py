@@ -0,0 +1,294 @@
+"""
+Derived Metric Graph
+
+Declares derived metrics (margins, returns, leverage, liquidity) as a graph of
+nodes, each a vectorized function of named inputs: base metric columns or
+other nodes. ``DerivedMetricGraph.evaluate`` computes every node for many
+(ticker, fiscal year) rows at once with numpy, treating NaN as a missing
+value, and memoizes each node by the versions of its inputs so re-evaluating
+after one input column changes recomputes only the nodes downstream of it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from graphlib import TopologicalSorter
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+# Input prefix resolving to a 1.0/0.0 column marking rows where a base metric key is present
+PRESENCE_PREFIX = "has:"
+
+
+@dataclass(frozen=True)
+class DerivedNode:
+    """One derived value computed from named inputs.
+
+    Inputs name other nodes when a node with that name exists, otherwise base
+    metric columns. ``metrics`` lists the metric names the node is published
+    under (empty for intermediates).
+    """
+    name: str
+    inputs: Tuple[str, ...]
+    compute: Callable[..., np.ndarray]
+    metrics: Tuple[str, ...] = ()
+
+
+def _finite(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(numeric) or math.isinf(numeric):
+        return None
+    return numeric
+
+
+class MetricFrame:
+    """Column-oriented base metrics for many rows; NaN marks a missing value."""
+
+    def __init__(
+        self,
+        keys: Sequence[Hashable],
+        columns: Dict[str, np.ndarray],
+        present: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        self.keys = list(keys)
+        self.columns = columns
+        self.present = present or {}
+        self.row_version = hash(tuple(self.keys))
+        self._missing = np.full(len(self.keys), np.nan)
+        self._versions: Dict[str, Hashable] = {}
+
+    @classmethod
+    def from_mappings(
+        cls,
+        keys: Sequence[Hashable],
+        mappings: Iterable[Mapping[str, Any]],
+    ) -> "MetricFrame":
+        """Build a frame from one ``{metric: value}`` mapping per row key."""
+        keys = list(keys)
+        size = len(keys)
+        columns: Dict[str, np.ndarray] = {}
+        present: Dict[str, np.ndarray] = {}
+        for index, mapping in enumerate(mappings):
+            for name, value in mapping.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = np.full(size, np.nan)
+                    present[name] = np.zeros(size, dtype=bool)
+                present[name][index] = True
+                numeric = _finite(value)
+                if numeric is not None:
+                    column[index] = numeric
+        return cls(keys, columns, present)
+
+    def column(self, name: str) -> np.ndarray:
+        """Values for ``name`` (all NaN when absent); ``has:<metric>`` yields presence flags."""
+        if name.startswith(PRESENCE_PREFIX):
+            mask = self.present.get(name[len(PRESENCE_PREFIX):])
+            return mask.astype(float) if mask is not None else np.zeros(len(self.keys))
+        column = self.columns.get(name)
+        return column if column is not None else self._missing
+
+    def version(self, name: str) -> Hashable:
+        """Content hash of an input column, used to key node memoization."""
+        version = self._versions.get(name)
+        if version is None:
+            data = self.column(name)
+            version = hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+            self._versions[name] = version
+        return version
+
+
+class DerivedMetricGraph:
+    """Topologically ordered derived nodes with per-node memoization."""
+
+    def __init__(self, nodes: Sequence[DerivedNode]):
+        self.nodes: Dict[str, DerivedNode] = {node.name: node for node in nodes}
+        if len(self.nodes) != len(nodes):
+            raise ValueError("Derived node names must be unique")
+        sorter = TopologicalSorter(
+            {node.name: [name for name in node.inputs if name in self.nodes] for node in nodes}
+        )
+        self.order: Tuple[str, ...] = tuple(sorter.static_order())  # raises CycleError on cycles
+        self._memo: Dict[str, Tuple[Hashable, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"computed": 0, "reused": 0}
+
+    @property
+    def metrics(self) -> List[str]:
+        """Published metric names in evaluation order."""
+        return [metric for name in self.order for metric in self.nodes[name].metrics]
+
+    def base_inputs(self) -> Set[str]:
+        """Base metric columns the graph reads."""
+        return {
+            name
+            for node in self.nodes.values()
+            for name in node.inputs
+            if name not in self.nodes
+        }
+
+    def downstream(self, changed: Iterable[str]) -> Set[str]:
+        """Nodes whose value depends, directly or transitively, on ``changed`` inputs."""
+        affected = set(changed)
+        result: Set[str] = set()
+        for name in self.order:
+            if affected.intersection(self.nodes[name].inputs):
+                affected.add(name)
+                result.add(name)
+        return result
+
+    def evaluate(self, frame: MetricFrame, *, memoize: bool = True) -> Dict[str, np.ndarray]:
+        """Compute every node for all rows of ``frame``; returns ``{metric: values}``.
+
+        Returned arrays are read-only and may be shared with later calls.
+        """
+        results: Dict[str, np.ndarray] = {}
+        versions: Dict[str, Hashable] = {}
+        with self._lock:
+            for name in self.order:
+                node = self.nodes[name]
+                key = (frame.row_version,) + tuple(
+                    versions[item] if item in self.nodes else frame.version(item)
+                    for item in node.inputs
+                )
+                cached = self._memo.get(name) if memoize else None
+                if cached is not None and cached[0] == key:
+                    result = cached[1]
+                    self._stats["reused"] += 1
+                else:
+                    arguments = [
+                        results[item] if item in self.nodes else frame.column(item)
+                        for item in node.inputs
+                    ]
+                    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                        result = np.asarray(node.compute(*arguments), dtype=float)
+                    result.flags.writeable = False
+                    self._stats["computed"] += 1
+                    if memoize:
+                        self._memo[name] = (key, result)
+                results[name] = result
+                versions[name] = key
+        return {metric: results[name] for name in self.order for metric in self.nodes[name].metrics}
+
+    def clear(self) -> None:
+        """Drop memoized node results."""
+        with self._lock:
+            self._memo.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of node computations versus memo reuses."""
+        with self._lock:
+            return dict(self._stats)
+
+
+# ----------------------------------------------------------------------
+# Vectorized building blocks (NaN = missing)
+# ----------------------------------------------------------------------
+
+
+def coalesce(*columns: np.ndarray) -> np.ndarray:
+    """First non-missing value per row."""
+    result = columns[0]
+    for column in columns[1:]:
+        result = np.where(np.isnan(result), column, result)
+    return result
+
+
+def safe_div(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Divide, leaving rows with a missing input or zero denominator missing."""
+    invalid = np.isnan(numerator) | np.isnan(denominator) | (denominator == 0)
+    return np.where(invalid, np.nan, numerator / np.where(invalid, 1.0, denominator))
+
+
+def _or_zero(column: np.ndarray) -> np.ndarray:
+    return np.where(np.isnan(column), 0.0, column)
+
+
+def _ebitda(reported: np.ndarray, operating_income: np.ndarray, depreciation: np.ndarray) -> np.ndarray:
+    return coalesce(reported, operating_income + _or_zero(depreciation))
+
+
+def _invested_capital(total_assets: np.ndarray, cash: np.ndarray, current_liabilities: np.ndarray) -> np.ndarray:
+    return total_assets - _or_zero(cash) - _or_zero(current_liabilities)
+
+
+def default_derived_nodes(*, tax_rate: float) -> List[DerivedNode]:
+    """Nodes reproducing the engine's per-period derived ratios and margins."""
+    node = DerivedNode
+    return [
+        # Input resolution (reported value first, then fallbacks)
+        node("net_income_basis", ("adjusted_net_income", "net_income"), coalesce),
+        node("operating_income_basis", ("operating_income", "clean_operating_income"), coalesce),
+        node("equity_basis", ("shareholders_equity", "total_equity"), coalesce),
+        node("liabilities_basis", ("total_liabilities", "total_debt"), coalesce),
+        node("cfo_basis", ("cash_from_operations", "operating_cash_flow"), coalesce),
+        node("capex_basis", ("capital_expenditures", "capital_expenditure"), coalesce),
+        node("cash_basis", ("cash_and_cash_equivalents", "cash"), coalesce),
+        node("ebit_basis", ("ebit", "operating_income", "clean_operating_income"), coalesce),
+        node(
+            "ebitda_basis",
+            ("ebitda", "adjusted_ebitda", "operating_income_basis", "depreciation_and_amortization"),
+            lambda ebitda, adjusted, operating, depreciation: _ebitda(coalesce(ebitda, adjusted), operating, depreciation),
+            ("ebitda",),
+        ),
+        node(
+            "fcf_basis",
+            ("free_cash_flow", "normalised_free_cash_flow", "cfo_basis", "capex_basis"),
+            lambda fcf, normalised, cfo, capex: coalesce(fcf, normalised, cfo + capex),
+        ),
+        node(
+            "working_capital_basis",
+            ("working_capital", "current_assets", "current_liabilities"),
+            lambda working_capital, assets, liabilities: coalesce(working_capital, assets - liabilities),
+            ("working_capital",),
+        ),
+        node(
+            "gross_profit_basis",
+            ("gross_profit", "revenue", "cost_of_revenue", "cost_of_goods_sold"),
+            lambda gross, revenue, cost, cogs: coalesce(gross, revenue - coalesce(cost, cogs)),
+        ),
+        node("invested_capital", ("total_assets", "cash_basis", "current_liabilities"), _invested_capital),
+        node("nopat", ("ebit_basis",), lambda ebit: ebit * (1 - tax_rate)),
+        # Published ratios
+        node("profit_margin", ("net_income_basis", "revenue"), safe_div, ("profit_margin", "net_margin")),
+        node("operating_margin", ("operating_income_basis", "revenue"), safe_div, ("operating_margin",)),
+        node("return_on_assets", ("net_income_basis", "total_assets"), safe_div, ("return_on_assets", "roa")),
+        node("return_on_equity", ("net_income_basis", "equity_basis"), safe_div, ("return_on_equity", "roe")),
+        node("debt_to_equity", ("liabilities_basis", "equity_basis"), safe_div, ("debt_to_equity",)),
+        node("free_cash_flow_margin", ("fcf_basis", "revenue"), safe_div, ("free_cash_flow_margin",)),
+        node("cash_conversion", ("cfo_basis", "net_income_basis"), safe_div, ("cash_conversion",)),
+        node("ebitda_margin", ("ebitda_basis", "revenue"), safe_div, ("ebitda_margin",)),
+        node("adjusted_ebitda_margin", ("adjusted_ebitda", "revenue"), safe_div, ("adjusted_ebitda_margin",)),
+        node("current_ratio", ("current_assets", "current_liabilities"), safe_div, ("current_ratio",)),
+        # Without inventory data the quick ratio uses current assets as a proxy
+        node("quick_ratio", ("current_assets", "current_liabilities"), safe_div, ("quick_ratio",)),
+        node("gross_margin", ("gross_profit_basis", "revenue"), safe_div, ("gross_margin",)),
+        node("interest_coverage", ("ebit_basis", "interest_expense"), safe_div, ("interest_coverage",)),
+        node("asset_turnover", ("revenue", "total_assets"), safe_div, ("asset_turnover",)),
+        node("ps_ratio", ("market_cap", "revenue"), safe_div, ("ps_ratio",)),
+        node(
+            "return_on_invested_capital",
+            ("nopat", "invested_capital"),
+            safe_div,
+            ("return_on_invested_capital", "roic"),
+        ),
+        # Free cash flow is only published when the period did not report it
+        node(
+            "derived_free_cash_flow",
+            ("fcf_basis", PRESENCE_PREFIX + "free_cash_flow"),
+            lambda fcf, reported: np.where(reported > 0, np.nan, fcf),
+            ("free_cash_flow",),
+        ),
+    ]
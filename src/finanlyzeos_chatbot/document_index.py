@@ -0,0 +1,573 @@
+"""Chunk-level retrieval index for user-uploaded documents.
+
+Uploads are split into token-bounded chunks once, when they are ingested. The
+chunks (with page provenance) live in the ``uploaded_document_chunks`` SQLite
+table, which doubles as the source for an in-process BM25 sidecar per
+conversation. When ChromaDB and sentence-transformers are installed the same
+chunks are embedded once into the vector store's uploaded-document collection,
+scoped by ``conversation_id`` metadata. Each chat turn then retrieves only the
+top-k chunks that fit a token budget instead of pasting whole documents into
+the prompt.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .token_counter import get_token_counter
+
+LOGGER = logging.getLogger(__name__)
+
+# Optional import for BM25 (same dependency as rag_sparse_retriever)
+try:
+    from rank_bm25 import BM25Okapi
+    BM25_AVAILABLE = True
+except ImportError:
+    BM25_AVAILABLE = False
+    BM25Okapi = None
+
+# PDF extraction separates pages with a form feed so chunks can cite pages.
+PAGE_BREAK = "\f"
+
+DEFAULT_CHUNK_TOKENS = 350
+DEFAULT_CHUNK_OVERLAP_TOKENS = 40
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Reciprocal rank fusion constant (Cormack et al.)
+_RRF_K = 60
+_MAX_SPARSE_INDEXES = 64
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "me", "of", "on", "or", "please", "tell", "that", "the", "this", "to", "was",
+    "what", "with", "about", "can", "you", "uploaded", "document", "file",
+}
+
+
+def _tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", (text or "").lower()) if token not in _STOPWORDS]
+
+
+@dataclass(frozen=True)
+class DocumentChunk:
+    """A retrievable slice of an uploaded document."""
+
+    chunk_id: str
+    document_id: str
+    conversation_id: Optional[str]
+    filename: str
+    chunk_index: int
+    page_number: Optional[int]
+    text: str
+    token_count: int
+
+    @property
+    def citation(self) -> str:
+        """Human-readable provenance label, e.g. ``report.pdf, p. 4``."""
+        if self.page_number is not None:
+            return f"{self.filename}, p. {self.page_number}"
+        return f"{self.filename}, section {self.chunk_index + 1}"
+
+
+@dataclass(frozen=True)
+class ScoredChunk:
+    """A chunk selected for a prompt together with its fused relevance score."""
+
+    chunk: DocumentChunk
+    score: float
+    sparse_rank: Optional[int] = None
+    dense_rank: Optional[int] = None
+
+
+def _split_oversized(paragraph: str, chunk_tokens: int) -> List[str]:
+    """Break a paragraph that alone exceeds the chunk size on sentence boundaries."""
+    counter = get_token_counter()
+    sentences = re.split(r"(?<=[.!?])\s+", paragraph)
+    pieces: List[str] = []
+    current = ""
+    for sentence in sentences:
+        candidate = f"{current} {sentence}".strip() if current else sentence
+        if current and counter.count(candidate) > chunk_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+        while counter.count(current) > chunk_tokens:
+            head = counter.truncate(current, chunk_tokens)
+            if not head:
+                break
+            pieces.append(head)
+            current = current[len(head):].lstrip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_document_text(
+    text: str,
+    *,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_CHUNK_OVERLAP_TOKENS,
+) -> List[Tuple[Optional[int], str]]:
+    """Split extracted document text into ``(page_number, chunk_text)`` pairs.
+
+    Chunks never span pages, prefer paragraph boundaries and carry a short
+    token overlap from the preceding chunk on the same page. ``page_number``
+    is ``None`` for formats without page breaks.
+    """
+    counter = get_token_counter()
+    text = (text or "").strip()
+    if not text:
+        return []
+
+    pages = text.split(PAGE_BREAK)
+    paginated = len(pages) > 1
+    chunks: List[Tuple[Optional[int], str]] = []
+
+    for page_index, page_text in enumerate(pages, start=1):
+        page_number = page_index if paginated else None
+        paragraphs: List[str] = []
+        for paragraph in re.split(r"\n\s*\n", page_text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if counter.count(paragraph) > chunk_tokens:
+                paragraphs.extend(_split_oversized(paragraph, chunk_tokens))
+            else:
+                paragraphs.append(paragraph)
+
+        current: List[str] = []
+        current_tokens = 0
+        for paragraph in paragraphs:
+            tokens = counter.count(paragraph)
+            if current and current_tokens + tokens > chunk_tokens:
+                chunk_text = "\n\n".join(current)
+                chunks.append((page_number, chunk_text))
+                tail = ""
+                if overlap_tokens > 0:
+                    tail_tokens = counter.count(chunk_text)
+                    skip = max(tail_tokens - overlap_tokens, 0)
+                    if skip:
+                        # keep roughly the last ``overlap_tokens`` worth of characters
+                        ratio = skip / tail_tokens
+                        tail = chunk_text[int(len(chunk_text) * ratio):].lstrip()
+                current = [tail] if tail else []
+                current_tokens = counter.count(tail) if tail else 0
+            current.append(paragraph)
+            current_tokens += tokens
+        if current:
+            chunks.append((page_number, "\n\n".join(current)))
+
+    return chunks
+
+
+def best_matching_window(text: str, query: str) -> str:
+    """Trim a chunk to the contiguous paragraphs spanning its query-term matches.
+
+    Paragraphs stay in source order and everything between the first and last
+    matching paragraph is kept, so tables and surrounding sentences are not
+    split apart. Chunks without lexical matches are returned unchanged.
+    """
+    paragraphs = [paragraph for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+    query_terms = set(_tokenize(query))
+    if len(paragraphs) < 2 or not query_terms:
+        return text
+    matching = [idx for idx, paragraph in enumerate(paragraphs) if query_terms.intersection(_tokenize(paragraph))]
+    if not matching:
+        return text
+    return "\n\n".join(paragraph.strip() for paragraph in paragraphs[matching[0]:matching[-1] + 1])
+
+
+class _SparseSidecar:
+    """BM25 index over one conversation's (or document set's) chunks."""
+
+    def __init__(self, chunks: Sequence[DocumentChunk]):
+        self.chunks = list(chunks)
+        self._tokenized = [_tokenize(chunk.text) for chunk in self.chunks]
+        self._bm25 = None
+        if BM25_AVAILABLE and any(self._tokenized):
+            try:
+                self._bm25 = BM25Okapi([tokens or [""] for tokens in self._tokenized])
+            except Exception as exc:  # pragma: no cover - defensive
+                LOGGER.warning(f"Failed to build BM25 sidecar: {exc}")
+
+    def rank(self, query: str) -> List[int]:
+        """Return chunk positions ordered by lexical relevance (matches only)."""
+        query_tokens = _tokenize(query)
+        if not query_tokens or not self.chunks:
+            return []
+        if self._bm25 is not None:
+            scores = list(self._bm25.get_scores(query_tokens))
+        else:
+            query_set = set(query_tokens)
+            scores = [float(len(query_set.intersection(tokens))) for tokens in self._tokenized]
+        query_set = set(query_tokens)
+        matched = [
+            idx for idx, tokens in enumerate(self._tokenized) if query_set.intersection(tokens)
+        ]
+        matched.sort(key=lambda idx: (-scores[idx], idx))
+        return matched
+
+
+class UploadedDocumentIndex:
+    """Persist, embed and retrieve chunks of uploaded documents."""
+
+    def __init__(self, database_path: Path, vector_store: Optional[Any] = None):
+        self.database_path = Path(database_path)
+        self.vector_store = vector_store
+        self._ensure_table()
+
+    def _ensure_table(self) -> None:
+        with sqlite3.connect(self.database_path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploaded_document_chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    document_id TEXT NOT NULL,
+                    conversation_id TEXT,
+                    filename TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    page_number INTEGER,
+                    text TEXT NOT NULL,
+                    token_count INTEGER NOT NULL,
+                    embedded INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_uploaded_document_chunks_conversation
+                ON uploaded_document_chunks (conversation_id, document_id, chunk_index)
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_uploaded_document_chunks_document
+                ON uploaded_document_chunks (document_id, chunk_index)
+                """
+            )
+            conn.commit()
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+    def index_document(
+        self,
+        *,
+        document_id: str,
+        conversation_id: Optional[str],
+        filename: str,
+        text: str,
+        file_type: Optional[str] = None,
+        uploaded_at: Optional[str] = None,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        overlap_tokens: int = DEFAULT_CHUNK_OVERLAP_TOKENS,
+    ) -> List[DocumentChunk]:
+        """Chunk ``text`` once, persist the chunks and embed them when possible.
+
+        Re-indexing a document replaces its previous chunks.
+        """
+        pieces = chunk_document_text(text, chunk_tokens=chunk_tokens, overlap_tokens=overlap_tokens)
+        token_counts = get_token_counter().count_many(piece for _, piece in pieces)
+        chunks = [
+            DocumentChunk(
+                chunk_id=f"{document_id}_chunk_{index}",
+                document_id=document_id,
+                conversation_id=conversation_id,
+                filename=filename,
+                chunk_index=index,
+                page_number=page_number,
+                text=piece,
+                token_count=tokens,
+            )
+            for index, ((page_number, piece), tokens) in enumerate(zip(pieces, token_counts))
+        ]
+
+        embedded = self._embed_chunks(chunks, file_type=file_type, uploaded_at=uploaded_at)
+        created_at = datetime.now(timezone.utc).isoformat()
+        with sqlite3.connect(self.database_path) as conn:
+            conn.execute("DELETE FROM uploaded_document_chunks WHERE document_id = ?", (document_id,))
+            conn.executemany(
+                """
+                INSERT INTO uploaded_document_chunks (
+                    chunk_id, document_id, conversation_id, filename, chunk_index,
+                    page_number, text, token_count, embedded, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        chunk.chunk_id,
+                        chunk.document_id,
+                        chunk.conversation_id,
+                        chunk.filename,
+                        chunk.chunk_index,
+                        chunk.page_number,
+                        chunk.text,
+                        chunk.token_count,
+                        1 if embedded else 0,
+                        created_at,
+                    )
+                    for chunk in chunks
+                ],
+            )
+            conn.commit()
+        LOGGER.info(f"Indexed {len(chunks)} chunks for uploaded document {document_id} (embedded={embedded})")
+        return chunks
+
+    def _embed_chunks(
+        self,
+        chunks: Sequence[DocumentChunk],
+        *,
+        file_type: Optional[str],
+        uploaded_at: Optional[str],
+    ) -> bool:
+        store = self.vector_store
+        if not chunks or store is None or not getattr(store, "_available", False):
+            return False
+        try:
+            store.delete_uploaded_document(chunks[0].document_id)
+            store.add_uploaded_documents(
+                [
+                    {
+                        "text": chunk.text,
+                        "metadata": {
+                            "chunk_id": chunk.chunk_id,
+                            "document_id": chunk.document_id,
+                            "conversation_id": chunk.conversation_id,
+                            "filename": chunk.filename,
+                            "file_type": file_type,
+                            "uploaded_at": uploaded_at,
+                            "chunk_index": chunk.chunk_index,
+                            "page_number": chunk.page_number,
+                            "source_type": "uploaded_doc",
+                        },
+                    }
+                    for chunk in chunks
+                ],
+                ids=[chunk.chunk_id for chunk in chunks],
+            )
+            return True
+        except Exception as exc:
+            LOGGER.debug(f"Embedding uploaded chunks failed (sparse retrieval only): {exc}")
+            return False
+
+    def ensure_indexed(self, documents: Iterable[Any]) -> None:
+        """Index any :class:`~finanlyzeos_chatbot.database.UploadedDocumentRecord` not yet chunked.
+
+        Covers uploads stored before chunk indexing existed; each document is
+        chunked at most once.
+        """
+        records = [record for record in documents if (record.content or "").strip()]
+        if not records:
+            return
+        ids = [record.document_id for record in records]
+        with sqlite3.connect(self.database_path) as conn:
+            indexed = {
+                row[0]
+                for row in conn.execute(
+                    f"""
+                    SELECT DISTINCT document_id FROM uploaded_document_chunks
+                    WHERE document_id IN ({",".join(["?"] * len(ids))})
+                    """,
+                    ids,
+                )
+            }
+        for record in records:
+            if record.document_id in indexed:
+                continue
+            uploaded_at = record.uploaded_at.isoformat() if getattr(record, "uploaded_at", None) else None
+            self.index_document(
+                document_id=record.document_id,
+                conversation_id=record.conversation_id,
+                filename=record.filename,
+                text=record.content,
+                file_type=record.file_type,
+                uploaded_at=uploaded_at,
+            )
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def load_chunks(
+        self,
+        *,
+        conversation_id: Optional[str] = None,
+        document_ids: Optional[Sequence[str]] = None,
+    ) -> List[DocumentChunk]:
+        """Return the chunks of a conversation or of explicit documents, in document order."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        if document_ids:
+            clauses.append(f"document_id IN ({','.join(['?'] * len(document_ids))})")
+            params.extend(document_ids)
+        elif conversation_id:
+            clauses.append("conversation_id = ?")
+            params.append(conversation_id)
+        else:
+            return []
+        with sqlite3.connect(self.database_path) as conn:
+            rows = conn.execute(
+                f"""
+                SELECT chunk_id, document_id, conversation_id, filename, chunk_index,
+                       page_number, text, token_count
+                FROM uploaded_document_chunks
+                WHERE {" AND ".join(clauses)}
+                ORDER BY document_id, chunk_index
+                """,
+                params,
+            ).fetchall()
+        return [DocumentChunk(*row) for row in rows]
+
+    def _sparse_sidecar(self, scope: Tuple[Any, ...], chunks: Sequence[DocumentChunk]) -> _SparseSidecar:
+        signature = (str(self.database_path), scope, tuple(chunk.chunk_id for chunk in chunks))
+        with _SIDECAR_LOCK:
+            sidecar = _SIDECARS.get(signature)
+            if sidecar is not None:
+                _SIDECARS.move_to_end(signature)
+                return sidecar
+        sidecar = _SparseSidecar(chunks)
+        with _SIDECAR_LOCK:
+            _SIDECARS[signature] = sidecar
+            while len(_SIDECARS) > _MAX_SPARSE_INDEXES:
+                _SIDECARS.popitem(last=False)
+        return sidecar
+
+    def _dense_ranking(
+        self,
+        query: str,
+        *,
+        conversation_id: Optional[str],
+        document_ids: Optional[Sequence[str]],
+        limit: int,
+    ) -> List[str]:
+        store = self.vector_store
+        if store is None or not getattr(store, "_available", False):
+            return []
+        if document_ids:
+            where: Dict[str, Any] = {"document_id": {"$in": list(document_ids)}}
+        elif conversation_id:
+            where = {"conversation_id": conversation_id}
+        else:
+            return []
+        try:
+            results = store.search_uploaded_docs(query=query, n_results=limit, filter_metadata=where)
+        except Exception as exc:
+            LOGGER.debug(f"Dense retrieval over uploads failed: {exc}")
+            return []
+        return [
+            result.metadata.get("chunk_id")
+            for result in results
+            if result.metadata and result.metadata.get("chunk_id")
+        ]
+
+    def search(
+        self,
+        query: str,
+        *,
+        conversation_id: Optional[str] = None,
+        document_ids: Optional[Sequence[str]] = None,
+        top_k: int = DEFAULT_TOP_K,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+    ) -> List[ScoredChunk]:
+        """Return up to ``top_k`` relevant chunks whose combined size fits ``token_budget``.
+
+        Lexical (BM25) and dense rankings are combined with reciprocal rank
+        fusion. When the query matches nothing, the opening chunks of each
+        document are used so generic requests ("summarize this file") still
+        see content.
+        """
+        chunks = self.load_chunks(conversation_id=conversation_id, document_ids=document_ids)
+        if not chunks or top_k <= 0 or token_budget <= 0:
+            return []
+
+        scope = (conversation_id, tuple(document_ids or ()))
+        sparse = self._sparse_sidecar(scope, chunks).rank(query)
+        dense_ids = self._dense_ranking(
+            query,
+            conversation_id=conversation_id,
+            document_ids=document_ids,
+            limit=max(top_k * 2, 10),
+        )
+        by_id = {chunk.chunk_id: pos for pos, chunk in enumerate(chunks)}
+        dense = [by_id[chunk_id] for chunk_id in dense_ids if chunk_id in by_id]
+
+        fused: Dict[int, float] = {}
+        sparse_rank = {pos: rank for rank, pos in enumerate(sparse)}
+        dense_rank = {pos: rank for rank, pos in enumerate(dense)}
+        for ranking in (sparse, dense):
+            for rank, pos in enumerate(ranking):
+                fused[pos] = fused.get(pos, 0.0) + 1.0 / (_RRF_K + rank + 1)
+
+        if fused:
+            ordered = sorted(fused, key=lambda pos: (-fused[pos], pos))
+        else:
+            # No lexical or semantic signal: lead with each document's opening chunks.
+            ordered = sorted(range(len(chunks)), key=lambda pos: (chunks[pos].chunk_index, pos))
+
+        selected: List[ScoredChunk] = []
+        remaining = token_budget
+        for pos in ordered:
+            chunk = chunks[pos]
+            if chunk.token_count > remaining:
+                continue
+            selected.append(
+                ScoredChunk(
+                    chunk=chunk,
+                    score=fused.get(pos, 0.0),
+                    sparse_rank=sparse_rank.get(pos),
+                    dense_rank=dense_rank.get(pos),
+                )
+            )
+            remaining -= chunk.token_count
+            if len(selected) >= top_k:
+                break
+        return selected
+
+
+_SIDECARS: "OrderedDict[Tuple[Any, ...], _SparseSidecar]" = OrderedDict()
+_SIDECAR_LOCK = threading.Lock()
+_VECTOR_STORES: Dict[str, Any] = {}
+_VECTOR_STORE_LOCK = threading.Lock()
+
+
+def get_shared_vector_store(database_path: Path) -> Optional[Any]:
+    """Return a process-wide VectorStore for ``database_path`` (None if unavailable).
+
+    Loading the embedding model is expensive, so one store is reused across
+    uploads and chat turns instead of being constructed per request.
+    """
+    key = str(Path(database_path).resolve())
+    with _VECTOR_STORE_LOCK:
+        if key not in _VECTOR_STORES:
+            try:
+                from .rag_retriever import VectorStore
+
+                store = VectorStore(Path(database_path))
+                _VECTOR_STORES[key] = store if store._available else None
+            except Exception as exc:
+                LOGGER.debug(f"Vector store unavailable for uploads: {exc}")
+                _VECTOR_STORES[key] = None
+        return _VECTOR_STORES[key]
+
+
+__all__ = [
+    "DEFAULT_TOKEN_BUDGET",
+    "DEFAULT_TOP_K",
+    "DocumentChunk",
+    "PAGE_BREAK",
+    "ScoredChunk",
+    "UploadedDocumentIndex",
+    "best_matching_window",
+    "chunk_document_text",
+    "get_shared_vector_store",
+]
@@ -6,6 +6,8 @@ import logging
 from pathlib import Path
 from typing import Optional, Tuple
 
+from .document_index import PAGE_BREAK
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -74,7 +76,7 @@ def extract_text_from_pdf(file_path: Path) -> Optional[str]:
                 pdf_reader = PyPDF2.PdfReader(f)
                 text = ""
                 for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+                    text += (page.extract_text() or "") + "\n" + PAGE_BREAK
                 return text.strip() if text.strip() else None
         except ImportError:
             # Try pypdf instead
@@ -84,7 +86,7 @@ def extract_text_from_pdf(file_path: Path) -> Optional[str]:
                     pdf_reader = pypdf.PdfReader(f)
                     text = ""
                     for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
+                        text += (page.extract_text() or "") + "\n" + PAGE_BREAK
                     return text.strip() if text.strip() else None
             except ImportError:
                 # Try pdfplumber
@@ -94,8 +96,8 @@ def extract_text_from_pdf(file_path: Path) -> Optional[str]:
                         text = ""
                         for page in pdf.pages:
                             page_text = page.extract_text()
-                            if page_text:
-                                text += page_text + "\n"
+                            # Keep empty pages so page numbers stay aligned
+                            text += (page_text or "") + "\n" + PAGE_BREAK
                         return text.strip() if text.strip() else None
                 except ImportError:
                     LOGGER.warning("PDF extraction libraries not available. Install PyPDF2, pypdf, or pdfplumber.")
@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime
+import re
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Literal, Optional
+from typing import Dict, Iterable, List, Literal, Optional, Sequence, Tuple
 from pydantic import BaseModel
 
 from . import database, load_settings
@@ -82,6 +84,256 @@ def consolidate_data(
     return consolidate_sample_data(sources, filters, view)
 
 
+# Map line items to database metrics (first alias present in the database wins)
+LINE_ITEM_ALIASES: Dict[str, List[str]] = {
+    "Revenue": ["revenue", "total_revenue", "net_sales", "sales"],
+    "COGS": ["cost_of_revenue", "cogs", "cost_of_goods_sold"],
+    "Gross Profit": ["gross_profit", "gross_income"],
+    "R&D": ["research_and_development", "r_and_d", "rd_expense"],
+    "S&M": ["selling_general_and_administrative", "sga", "sales_and_marketing"],
+    "G&A": ["general_and_administrative", "ga_expense"],
+    "Total OpEx": ["operating_expenses", "total_opex", "operating_expense"],
+    "EBITDA": ["ebitda", "earnings_before_interest_taxes_depreciation_amortization"],
+}
+
+PARENT_LINE_ITEMS = {"Revenue", "Gross Profit", "Total OpEx", "EBITDA"}
+
+_YEAR_PATTERN = re.compile(r"(19|20)\d{2}")
+_QUARTER_PATTERN = re.compile(r"Q([1-4])", re.IGNORECASE)
+
+
+def _parse_period(period: str) -> Tuple[Optional[int], int]:
+    """Split '2025-Q1', 'FY2024' or '2024' into (fiscal_year, fiscal_quarter); quarter 0 = annual."""
+    year = _YEAR_PATTERN.search(period or "")
+    quarter = _QUARTER_PATTERN.search(period or "")
+    return (int(year.group(0)) if year else None), (int(quarter.group(1)) if quarter else 0)
+
+
+class ConsolidationCube:
+    """
+    Pre-aggregated (line item x fiscal year x quarter x entity) totals.
+    
+    Source metric names from ``kpi_values`` and ``metric_snapshots`` are
+    resolved to canonical line items once per refresh and stored in
+    ``consolidation_metric_map``; ``consolidation_cube`` then holds one summed
+    value per (line item, year, quarter, ticker, source table). Consolidation
+    views read it with indexed lookups instead of LIKE scans over the raw tables.
+    """
+    
+    SOURCES = ("kpi_values", "metric_snapshots")
+    
+    def __init__(self, database_path: Path):
+        self.database_path = Path(database_path)
+        self._lock = threading.Lock()
+        self._built = False  # True once a refresh ran (or the cube was found populated)
+        self._ensure_table()
+    
+    def _ensure_table(self) -> None:
+        with database.temporary_connection(self.database_path) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS consolidation_metric_map (
+                    source TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    line_item TEXT NOT NULL,
+                    PRIMARY KEY (source, metric)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS consolidation_cube (
+                    line_item TEXT NOT NULL,
+                    fiscal_year INTEGER NOT NULL,
+                    fiscal_quarter INTEGER NOT NULL,
+                    entity TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    refreshed_at TEXT NOT NULL,
+                    PRIMARY KEY (fiscal_year, fiscal_quarter, line_item, entity, source)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_consolidation_cube_entity
+                    ON consolidation_cube(entity);
+                """
+            )
+    
+    @staticmethod
+    def _resolve_metric_map(conn, tickers: Optional[Sequence[str]] = None) -> Dict[Tuple[str, str], str]:
+        """Map source metric names (of ``tickers``, or all) to at most one canonical line item."""
+        ticker_clause, params = "", []
+        if tickers is not None:
+            ticker_clause = f" WHERE UPPER(ticker) IN ({', '.join('?' for _ in tickers)})"
+            params = list(tickers)
+        kpi_metrics = [row[0] for row in conn.execute(f"SELECT DISTINCT metric_id FROM kpi_values{ticker_clause}", params)]
+        snapshot_metrics = [row[0] for row in conn.execute(f"SELECT DISTINCT metric FROM metric_snapshots{ticker_clause}", params)]
+        
+        # Each line item uses its first alias found in kpi_values, else in metric_snapshots
+        patterns: Dict[str, str] = {}
+        for line_item, aliases in LINE_ITEM_ALIASES.items():
+            for candidates in (kpi_metrics, snapshot_metrics):
+                found = next((alias for alias in aliases if any(alias in metric for metric in candidates)), None)
+                if found:
+                    patterns[line_item] = found
+                    break
+        
+        # A metric matching several patterns (cost_of_revenue vs revenue) goes to the longest one
+        mapping: Dict[Tuple[str, str], str] = {}
+        for source, metrics in zip(ConsolidationCube.SOURCES, (kpi_metrics, snapshot_metrics)):
+            for metric in metrics:
+                matches = [(len(pattern), line_item) for line_item, pattern in patterns.items() if pattern in (metric or "")]
+                if matches:
+                    mapping[(source, metric)] = max(matches)[1]
+        return mapping
+    
+    def refresh(self, tickers: Optional[Iterable[str]] = None) -> int:
+        """
+        Rebuild cube rows for ``tickers`` (all tickers when None).
+        
+        A full refresh rebuilds ``consolidation_metric_map``; a ticker refresh
+        keeps the stored mappings and only adds those for the tickers' new
+        metric names. Returns the number of cube rows written.
+        """
+        ticker_list = sorted({t.upper() for t in tickers if t}) if tickers is not None else None
+        if ticker_list == []:
+            return 0
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, database.temporary_connection(self.database_path) as conn:
+            mapping = self._resolve_metric_map(conn, ticker_list)
+            if ticker_list is None:
+                conn.execute("DELETE FROM consolidation_metric_map")
+            conn.executemany(
+                "INSERT OR IGNORE INTO consolidation_metric_map (source, metric, line_item) VALUES (?, ?, ?)",
+                [(source, metric, line_item) for (source, metric), line_item in mapping.items()],
+            )
+            
+            ticker_clause, params = "", []
+            if ticker_list is not None:
+                ticker_clause = f" AND UPPER(s.ticker) IN ({', '.join('?' for _ in ticker_list)})"
+                params = ticker_list
+                conn.execute(
+                    f"DELETE FROM consolidation_cube WHERE entity IN ({', '.join('?' for _ in ticker_list)})",
+                    ticker_list,
+                )
+            else:
+                conn.execute("DELETE FROM consolidation_cube")
+            
+            totals: Dict[Tuple[str, int, int, str, str], List[float]] = {}
+            kpi_rows = conn.execute(
+                f"""
+                SELECT m.line_item, s.fiscal_year, COALESCE(s.fiscal_quarter, 0), UPPER(s.ticker),
+                       SUM(s.value), COUNT(*)
+                FROM kpi_values s
+                JOIN consolidation_metric_map m ON m.source = 'kpi_values' AND m.metric = s.metric_id
+                WHERE s.value IS NOT NULL AND s.fiscal_year IS NOT NULL{ticker_clause}
+                GROUP BY 1, 2, 3, 4
+                """,
+                params,
+            )
+            for line_item, year, quarter, entity, value, count in kpi_rows:
+                totals[(line_item, year, quarter, entity, "kpi_values")] = [value, count]
+            
+            snapshot_rows = conn.execute(
+                f"""
+                SELECT m.line_item, s.period, UPPER(s.ticker), SUM(s.value), COUNT(*)
+                FROM metric_snapshots s
+                JOIN consolidation_metric_map m ON m.source = 'metric_snapshots' AND m.metric = s.metric
+                WHERE s.value IS NOT NULL{ticker_clause}
+                GROUP BY 1, 2, 3
+                """,
+                params,
+            )
+            for line_item, period, entity, value, count in snapshot_rows:
+                year, quarter = _parse_period(period)
+                if year is None:
+                    continue
+                entry = totals.setdefault((line_item, year, quarter, entity, "metric_snapshots"), [0.0, 0])
+                entry[0] += value
+                entry[1] += count
+            
+            conn.executemany(
+                """
+                INSERT INTO consolidation_cube (
+                    line_item, fiscal_year, fiscal_quarter, entity, source, value, row_count, refreshed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(*key[:4], key[4], value, count, now) for key, (value, count) in totals.items()],
+            )
+            self._built = True
+        LOGGER.info(f"Refreshed consolidation cube: {len(totals)} rows for {len(ticker_list) if ticker_list else 'all'} tickers")
+        return len(totals)
+    
+    def is_empty(self) -> bool:
+        with database.temporary_connection(self.database_path) as conn:
+            return conn.execute("SELECT 1 FROM consolidation_cube LIMIT 1").fetchone() is None
+    
+    def ensure_built(self) -> None:
+        """Build the cube on first use; later calls return without touching the database."""
+        if self._built:
+            return
+        if self.is_empty():
+            self.refresh()
+        self._built = True
+    
+    def entities(self) -> List[str]:
+        """Tickers present in the cube."""
+        with database.temporary_connection(self.database_path) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT entity FROM consolidation_cube ORDER BY entity")]
+    
+    def lookup(
+        self,
+        fiscal_year: int,
+        fiscal_quarter: Optional[int] = None,
+        tickers: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Summed values per line item and source table for one period.
+        
+        An annual lookup (``fiscal_quarter`` None or 0) uses each entity's
+        annual rows, falling back to the sum of its quarters only where the
+        year has no annual row.
+        """
+        query = (
+            "SELECT line_item, source, SUM(value) FROM consolidation_cube c WHERE fiscal_year = ?"
+        )
+        params: List = [fiscal_year]
+        if fiscal_quarter is not None and fiscal_quarter != 0:
+            query += " AND fiscal_quarter = ?"
+            params.append(fiscal_quarter)
+        else:
+            query += """
+                AND (fiscal_quarter = 0 OR NOT EXISTS (
+                    SELECT 1 FROM consolidation_cube a
+                    WHERE a.fiscal_year = c.fiscal_year AND a.fiscal_quarter = 0
+                      AND a.line_item = c.line_item AND a.entity = c.entity AND a.source = c.source
+                ))"""
+        if tickers:
+            query += f" AND entity IN ({', '.join('?' for _ in tickers)})"
+            params.extend(t.upper() for t in tickers)
+        query += " GROUP BY line_item, source"
+        result: Dict[str, Dict[str, float]] = {}
+        with database.temporary_connection(self.database_path) as conn:
+            for line_item, source, value in conn.execute(query, params):
+                result.setdefault(line_item, {})[source] = value or 0.0
+        return result
+
+
+_CUBES: Dict[str, ConsolidationCube] = {}
+_CUBES_LOCK = threading.Lock()
+
+
+def get_consolidation_cube(database_path: Path) -> ConsolidationCube:
+    """Return the process-wide consolidation cube for ``database_path``."""
+    key = str(Path(database_path).resolve())
+    with _CUBES_LOCK:
+        cube = _CUBES.get(key)
+        if cube is None:
+            cube = ConsolidationCube(Path(database_path))
+            _CUBES[key] = cube
+        return cube
+
+
+def refresh_consolidation_cube(database_path: Path, tickers: Optional[Iterable[str]] = None) -> int:
+    """Incrementally refresh the cube after ingestion or KPI refresh."""
+    return get_consolidation_cube(database_path).refresh(tickers)
+
+
 def consolidate_from_database(
     sources: List[SourceConfig],
     filters: ConsolidationFilters,
@@ -92,183 +344,74 @@ def consolidate_from_database(
         settings = load_settings()
         db_path = Path(settings.database_path)
         
-        # Map line items to database metrics
-        metric_mapping = {
-            "Revenue": ["revenue", "total_revenue", "net_sales", "sales"],
-            "COGS": ["cost_of_revenue", "cogs", "cost_of_goods_sold"],
-            "Gross Profit": ["gross_profit", "gross_income"],
-            "R&D": ["research_and_development", "r_and_d", "rd_expense"],
-            "S&M": ["selling_general_and_administrative", "sga", "sales_and_marketing"],
-            "G&A": ["general_and_administrative", "ga_expense"],
-            "Total OpEx": ["operating_expenses", "total_opex", "operating_expense"],
-            "EBITDA": ["ebitda", "earnings_before_interest_taxes_depreciation_amortization"],
-        }
+        cube = get_consolidation_cube(db_path)
+        cube.ensure_built()
         
-        # Get S&P 1500 tickers
-        # Use the database connection helper
-        from .database import temporary_connection
+        all_tickers = set(cube.entities())
+        if not all_tickers:
+            LOGGER.warning("No tickers found in database, falling back to sample data")
+            return consolidate_sample_data(sources, filters, view)
         
-        with temporary_connection(db_path) as conn:
-            # Get all unique tickers from kpi_values or metric_snapshots
-            tickers_query = """
-                SELECT DISTINCT ticker 
-                FROM kpi_values 
-                WHERE ticker IS NOT NULL AND ticker != ''
-                UNION
-                SELECT DISTINCT ticker 
-                FROM metric_snapshots 
-                WHERE ticker IS NOT NULL AND ticker != ''
-                LIMIT 1500
-            """
-            ticker_rows = conn.execute(tickers_query).fetchall()
-            all_tickers = [row[0].upper() for row in ticker_rows if row[0]]
-            
-            if not all_tickers:
-                LOGGER.warning("No tickers found in database, falling back to sample data")
-                return consolidate_sample_data(sources, filters, view)
-            
-            LOGGER.info(f"Found {len(all_tickers)} tickers in database")
-            
-            # Parse periods
-            periods = filters.periods or ["2025-Q1", "2025-Q2", "2025-Q3"]
-            entities = filters.entities or ["Global"]
-            
-            rows: List[ConsolidatedRow] = []
+        LOGGER.info(f"Found {len(all_tickers)} tickers in consolidation cube")
+        
+        # Parse periods
+        periods = filters.periods or ["2025-Q1", "2025-Q2", "2025-Q3"]
+        entities = filters.entities or ["Global"]
+        
+        rows: List[ConsolidatedRow] = []
+        for period in periods:
+            # Parse period (e.g., "2025-Q1" -> year=2025, quarter=1)
+            year, quarter = _parse_period(period)
+            if year is None:
+                continue
             
-            # For each line item, aggregate across tickers
-            for line_item, metric_aliases in metric_mapping.items():
-                # Try to find the metric in the database
-                metric_found = None
-                for alias in metric_aliases:
-                    # Check if this metric exists
-                    check_query = """
-                        SELECT COUNT(*) FROM kpi_values 
-                        WHERE metric_id LIKE ? OR metric_id = ?
-                        LIMIT 1
-                    """
-                    count = conn.execute(check_query, (f"%{alias}%", alias)).fetchone()[0]
-                    if count > 0:
-                        metric_found = alias
-                        break
-                
-                if not metric_found:
-                    # Try metric_snapshots
-                    for alias in metric_aliases:
-                        check_query = """
-                            SELECT COUNT(*) FROM metric_snapshots 
-                            WHERE metric LIKE ? OR metric = ?
-                            LIMIT 1
-                        """
-                        count = conn.execute(check_query, (f"%{alias}%", alias)).fetchone()[0]
-                        if count > 0:
-                            metric_found = alias
-                            break
+            for entity in entities:
+                # Entities that are tickers are consolidated alone; others aggregate every ticker
+                tickers = [entity.upper()] if entity and entity.upper() in all_tickers else None
+                totals = cube.lookup(year, quarter or None, tickers)
                 
-                # If metric found, aggregate data
-                if metric_found:
-                    for period in periods:
-                        # Parse period (e.g., "2025-Q1" -> year=2025, quarter=1)
-                        year = int(period.split('-')[0]) if '-' in period else int(period)
-                        quarter = None
-                        if 'Q' in period:
-                            try:
-                                quarter = int(period.split('Q')[1])
-                            except:
-                                pass
+                for line_item in LINE_ITEM_ALIASES:
+                    by_source = totals.get(line_item, {})
+                    total_value = by_source.get("kpi_values", 0.0)
+                    total_value2 = by_source.get("metric_snapshots", 0.0)
+                    
+                    # Use the larger of the two sources
+                    actual = max(total_value, total_value2) if (total_value > 0 or total_value2 > 0) else None
+                    
+                    if actual and actual > 0:
+                        # Calculate budget and forecast (for now, use simple multipliers)
+                        budget = actual * 1.05
+                        forecast = actual * 1.02
+                        variance_abs = actual - budget
+                        variance_pct = (variance_abs / budget * 100) if budget != 0 else 0.0
                         
-                        # Aggregate across all tickers (or filtered entities if they map to tickers)
-                        for entity in entities:
-                            # Query kpi_values
-                            query = """
-                                SELECT SUM(value) as total_value, COUNT(*) as count
-                                FROM kpi_values
-                                WHERE metric_id LIKE ? 
-                                AND fiscal_year = ?
-                            """
-                            params = [f"%{metric_found}%", year]
-                            
-                            if quarter:
-                                query += " AND fiscal_quarter = ?"
-                                params.append(quarter)
-                            
-                            result = conn.execute(query, params).fetchone()
-                            total_value = result[0] if result and result[0] else 0
-                            
-                            # Also try metric_snapshots
-                            query2 = """
-                                SELECT SUM(value) as total_value, COUNT(*) as count
-                                FROM metric_snapshots
-                                WHERE metric LIKE ?
-                                AND period LIKE ?
-                            """
-                            period_pattern = f"{year}%"
-                            if quarter:
-                                period_pattern = f"{year}-Q{quarter}%"
-                            
-                            result2 = conn.execute(query2, (f"%{metric_found}%", period_pattern)).fetchone()
-                            total_value2 = result2[0] if result2 and result2[0] else 0
-                            
-                            # Use the larger value or sum
-                            actual = max(total_value, total_value2) if (total_value > 0 or total_value2 > 0) else None
-                            
-                            # If we have aggregated data, use it; otherwise try per-ticker aggregation
-                            if (actual is None or actual == 0) and all_tickers:
-                                # Aggregate per ticker and sum
-                                per_ticker_query = """
-                                    SELECT ticker, SUM(value) as ticker_value
-                                    FROM kpi_values
-                                    WHERE metric_id LIKE ?
-                                    AND fiscal_year = ?
-                                    AND ticker IN ({})
-                                    GROUP BY ticker
-                                """.format(','.join(['?' for _ in all_tickers[:100]]))  # Limit to 100 tickers for performance
-                                
-                                params_pt = [f"%{metric_found}%", year] + all_tickers[:100]
-                                if quarter:
-                                    per_ticker_query = per_ticker_query.replace('AND fiscal_year = ?', 'AND fiscal_year = ? AND fiscal_quarter = ?')
-                                    params_pt.insert(2, quarter)
-                                
-                                try:
-                                    ticker_results = conn.execute(per_ticker_query, params_pt).fetchall()
-                                    actual = sum(row[1] for row in ticker_results if row[1]) if ticker_results else 0
-                                except Exception as e:
-                                    LOGGER.warning(f"Error in per-ticker aggregation: {e}")
-                            
-                            if actual and actual > 0:
-                                # Calculate budget and forecast (for now, use simple multipliers)
-                                budget = actual * 1.05
-                                forecast = actual * 1.02
-                                variance_abs = actual - budget
-                                variance_pct = (variance_abs / budget * 100) if budget != 0 else 0.0
-                                
-                                # Determine level
-                                level = "parent" if line_item in ["Revenue", "Gross Profit", "Total OpEx", "EBITDA"] else "child"
-                                
-                                rows.append(ConsolidatedRow(
-                                    line_item=line_item,
-                                    entity=entity,
-                                    period=period,
-                                    scenario="Actual",
-                                    actual=round(actual, 2),
-                                    budget=round(budget, 2),
-                                    forecast=round(forecast, 2),
-                                    variance_abs=round(variance_abs, 2),
-                                    variance_pct=round(variance_pct, 2),
-                                    level=level,
-                                ))
-            
-            # If we got data, return it
-            if rows:
-                # Calculate derived metrics
-                rows = calculate_derived_metrics(rows)
-                return ConsolidatedTable(
-                    view=view,
-                    period_label=f"{periods[0]} to {periods[-1]}" if len(periods) > 1 else periods[0],
-                    rows=rows,
-                )
-            else:
-                LOGGER.warning("No data found in database, falling back to sample data")
-                return consolidate_sample_data(sources, filters, view)
+                        rows.append(ConsolidatedRow(
+                            line_item=line_item,
+                            entity=entity,
+                            period=period,
+                            scenario="Actual",
+                            actual=round(actual, 2),
+                            budget=round(budget, 2),
+                            forecast=round(forecast, 2),
+                            variance_abs=round(variance_abs, 2),
+                            variance_pct=round(variance_pct, 2),
+                            level="parent" if line_item in PARENT_LINE_ITEMS else "child",
+                        ))
+        
+        # If we got data, return it
+        if rows:
+            # Keep the P&L ordering (line item, then period and entity)
+            order = {line_item: index for index, line_item in enumerate(LINE_ITEM_ALIASES)}
+            rows.sort(key=lambda row: order[row.line_item])
+            # Calculate derived metrics
+            rows = calculate_derived_metrics(rows)
+            return ConsolidatedTable(
+                view=view,
+                period_label=f"{periods[0]} to {periods[-1]}" if len(periods) > 1 else periods[0],
+                rows=rows,
+            )
+        LOGGER.warning("No data found in database, falling back to sample data")
+        return consolidate_sample_data(sources, filters, view)
                 
     except Exception as e:
         LOGGER.error(f"Error consolidating from database: {e}", exc_info=True)
@@ -21,10 +21,14 @@ from __future__ import annotations
 
 import json
 import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
 from urllib.parse import urljoin
 # Removed unused imports - no longer using CSV fallback
 # from urllib.request import urlopen, Request
@@ -44,6 +48,48 @@ class MacroIndicator:
     description: str
 
 
+class LocalMacroFixtureSource:
+    """
+    Offline observation source backed by a local JSON fixture.
+    
+    The fixture maps indicator keys (``"vix"``) or FRED series ids (``"VIXCLS"``)
+    to either a bare value or ``{"value": ..., "date": "YYYY-MM-DD"}``. Missing
+    dates default to today so fixtures pass the freshness checks. Use it to run
+    the macro path in tests and benchmarks without network access.
+    """
+    
+    label = "Fixture"
+    
+    def __init__(self, fixture: Union[str, Path, Dict[str, Any]], *, latency_seconds: float = 0.0):
+        if isinstance(fixture, (str, Path)):
+            with open(fixture, 'r', encoding='utf-8') as f:
+                fixture = json.load(f)
+        series_by_key = {key: cfg.get("fred_series") for key, cfg in MacroDataProvider.INDICATORS.items()}
+        self._observations: Dict[str, Dict[str, Any]] = {}
+        for name, observation in fixture.items():
+            if not isinstance(observation, dict):
+                observation = {"value": observation}
+            self._observations[series_by_key.get(name) or name] = observation
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+    
+    def fetch(self, series_id: str, months_back: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return an observation shaped like ``MacroDataProvider._fetch_fred_data`` output."""
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        observation = self._observations.get(series_id)
+        if observation is None or observation.get("value") is None:
+            return None
+        return {
+            'value': float(observation["value"]),
+            'date': observation.get("date") or datetime.now().strftime('%Y-%m-%d'),
+            'title': observation.get("title", series_id),
+            'units': observation.get("units", ''),
+            'frequency': observation.get("frequency", ''),
+        }
+
+
 class MacroDataProvider:
     """Provides macro economic data from multiple sources."""
     
@@ -156,7 +202,17 @@ class MacroDataProvider:
         }
     }
     
-    def __init__(self, imf_data_path: Optional[Path] = None, cache_ttl_hours: int = 24, fred_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        imf_data_path: Optional[Path] = None,
+        cache_ttl_hours: int = 24,
+        fred_api_key: Optional[str] = None,
+        *,
+        database_path: Optional[Union[str, Path]] = None,
+        source: Optional["LocalMacroFixtureSource"] = None,
+        max_refresh_workers: int = 8,
+        default_retry_minutes: int = 30,
+    ):
         """
         Initialize macro data provider.
         
@@ -164,6 +220,10 @@ class MacroDataProvider:
             imf_data_path: Path to IMF sector KPIs JSON file
             cache_ttl_hours: Default hours to cache FRED API data (can be overridden per indicator)
             fred_api_key: Optional FRED API key for real-time data (free from https://fred.stlouisfed.org/docs/api/api_key.html)
+            database_path: Optional SQLite database used to persist the snapshot across processes
+            source: Optional observation source used instead of FRED (e.g. LocalMacroFixtureSource)
+            max_refresh_workers: Maximum number of indicators fetched concurrently
+            default_retry_minutes: How long a built-in default is served before retrying the fetch
         """
         self.imf_data_path = imf_data_path or Path("data/external/imf_sector_kpis.json")
         self.default_cache_ttl = timedelta(hours=cache_ttl_hours)
@@ -193,7 +253,23 @@ class MacroDataProvider:
             "jpy_usd": timedelta(hours=6),        # Daily - update 4x per day (FX rates)
         }
         
-        self._cache: Dict[str, tuple[Any, datetime]] = {}
+        self.default_retry_ttl = timedelta(minutes=default_retry_minutes)
+        self.max_refresh_workers = max_refresh_workers
+        self.source = source
+        self.source_label = source.label if source is not None else "FRED"
+        
+        # Snapshot: indicator key -> (indicator, expires_at); expired entries are
+        # still served while a background refresh replaces them.
+        self._snapshot: Dict[str, Tuple[MacroIndicator, datetime]] = {}
+        self._snapshot_loaded = False
+        self._snapshot_lock = threading.Lock()
+        self._refreshing: set = set()
+        self._refresh_thread: Optional[threading.Thread] = None
+        
+        self.database_path = Path(database_path) if database_path else None
+        if self.database_path is not None:
+            self._ensure_table()
+        
         self.fred_api_key = fred_api_key
         self._fred_client = None
         
@@ -354,248 +430,332 @@ class MacroDataProvider:
         logger.debug(f"No FRED API key available for {series_id}, will use default values")
         return None
     
+    # Fallback values used when no live observation is available. They should
+    # be updated regularly to reflect current market conditions (latest 2025 data).
+    DEFAULT_VALUES: Dict[str, Tuple[float, str]] = {
+        "gdp_growth": (2.0, "2025-Q1"),          # Real GDP growth, quarterly (~2-3 months lag)
+        "fed_funds_rate": (4.3, "2025-07"),      # Trend is downward from 5.25-5.50%
+        "inflation": (2.7, "2025-09"),           # CPI YoY
+        "unemployment": (4.3, "2025-08"),
+        "sp500": (6363.0, "2025-07"),
+        "treasury_10y": (4.4, "2025-07"),
+        "vix": (15.5, "2025-07"),
+        "consumer_confidence": (62.0, "2025-07"),  # Typical range: 60-65
+        "manufacturing_pmi": (51.0, "2025-07"),    # Typical range: 48-52
+        "core_cpi": (2.5, "2025-09"),            # YoY, excludes food & energy
+        "nonfarm_payrolls": (159700.0, "2025-08"),  # Thousands of jobs
+        "core_pce": (2.4, "2025-09"),            # YoY, Fed's preferred measure
+        "pce": (2.5, "2025-09"),                 # YoY
+        "dxy": (120.0, "2025-07"),               # Broad trade-weighted index, typically 110-130
+        "eur_usd": (1.08, "2025-07"),            # USD per EUR
+        "cny_usd": (7.25, "2025-07"),            # CNY per USD
+        "jpy_usd": (155.0, "2025-07"),           # JPY per USD
+    }
+
     def get_macro_snapshot(self) -> Dict[str, MacroIndicator]:
         """
         Get current snapshot of key macro indicators.
         
-        Attempts to fetch from FRED API if available, otherwise uses default values.
+        Reads are served from the in-memory snapshot, seeded from the persisted
+        snapshot table on cold start. Indicators past their TTL are returned
+        as-is while a background refresh runs (stale-while-revalidate); only
+        indicators with no value at all are fetched inline, in parallel.
         
         Returns:
             Dict mapping indicator name to MacroIndicator
         """
-        indicators = {}
+        with self._snapshot_lock:
+            if not self._snapshot_loaded:
+                self._load_persisted_snapshot()
+                self._snapshot_loaded = True
+            entries = dict(self._snapshot)
+        
+        now = datetime.now()
+        missing = [key for key in self.INDICATORS if key not in entries]
+        stale = [key for key, (_, expires_at) in entries.items() if expires_at <= now]
+        if missing:
+            # Nothing to serve for these keys yet: block, and refresh stale keys on the same trip
+            self.refresh_snapshot(missing + stale)
+            with self._snapshot_lock:
+                entries = dict(self._snapshot)
+        elif stale:
+            self._schedule_refresh(stale)
+        
+        return {key: entries[key][0] for key in self.INDICATORS if key in entries}
+    
+    def refresh_snapshot(self, keys: Optional[List[str]] = None) -> Dict[str, MacroIndicator]:
+        """
+        Fetch the given indicators (default: all) in parallel and store them.
         
-        # Try to fetch from FRED API first, with fallback to defaults
-        for key, config in self.INDICATORS.items():
-            fred_series = config.get("fred_series")
-            default_value = None
-            default_date = None
-            
-            # Set defaults based on indicator type
-            # IMPORTANT: These defaults are fallbacks only when FRED API is unavailable
-            # They should be updated regularly to reflect current market conditions
-            # As of January 2025 (updated with latest 2025 data), approximate current values:
-            if key == "gdp_growth":
-                # Real GDP growth rate (Q1 2025 data, ~2-3 months lag)
-                default_value = 2.0  # Updated: ~2.0% YoY (Q1 2025, from 2.8% Q3 2024)
-                default_date = "2025-Q1"  # Quarterly data (Q1 2025 latest available)
-            elif key == "fed_funds_rate":
-                # Fed Funds Rate (July 2025: 4.3%, projected 4.2% for 2025)
-                # Note: Actual rate may vary, but trend is downward from 5.25-5.50%
-                default_value = 4.3  # Updated: ~4.3% (July 2025, from 5.25%)
-                default_date = "2025-07"  # Monthly (July 2025 latest available)
-            elif key == "inflation":
-                # CPI YoY inflation (September 2025: 2.73%, latest available)
-                default_value = 2.7  # Updated: ~2.7% YoY (September 2025, from 2.7% Dec 2024)
-                default_date = "2025-09"  # YoY September 2025 (specify YoY for clarity)
-            elif key == "unemployment":
-                # Unemployment rate (August 2025: 4.3%, latest available)
-                default_value = 4.3  # Updated: ~4.3% (August 2025, from 4.0% Dec 2024)
-                default_date = "2025-08"  # Monthly data (August 2025 latest available)
-            elif key == "sp500":
-                # S&P 500 Index (July 2025: ~6,363 points, latest available)
-                default_value = 6363.0  # Updated: ~6,363 points (July 2025, from 4,500 Jan 2025)
-                default_date = "2025-07"  # Daily (July 2025 latest available)
-            elif key == "treasury_10y":
-                # 10-Year Treasury Yield (July 2025: 4.4%, latest available)
-                default_value = 4.4  # Updated: ~4.4% (July 2025, from 4.2% Jan 2025)
-                default_date = "2025-07"  # Daily (July 2025 latest available)
-            elif key == "vix":
-                # VIX Volatility Index (July 2025: ~15.5, latest available)
-                default_value = 15.5  # Updated: ~15.5 (July 2025, from 15.0)
-                default_date = "2025-07"  # Daily (July 2025 latest available)
-            elif key == "consumer_confidence":
-                # University of Michigan Consumer Sentiment (latest: varies, typically 60-65 range)
-                default_value = 62.0  # Typical range: 60-65 (unchanged from Dec 2024)
-                default_date = "2025-07"  # Monthly (July 2025, approximate)
-            elif key == "manufacturing_pmi":
-                # ISM Manufacturing PMI (latest: typically 48-52 range)
-                default_value = 51.0  # Typical range: 48-52 (unchanged from Dec 2024, slight expansion >50)
-                default_date = "2025-07"  # Monthly (July 2025, approximate)
-            elif key == "core_cpi":
-                # Core CPI YoY inflation (excludes food & energy, typically lower than headline CPI)
-                default_value = 2.5  # Updated: ~2.5% YoY (September 2025, slightly lower than headline CPI)
-                default_date = "2025-09"  # YoY September 2025
-            elif key == "nonfarm_payrolls":
-                # Nonfarm Payrolls (Total employment in thousands)
-                default_value = 159700.0  # Updated: ~159.7 million jobs (August 2025, from ~158 million)
-                default_date = "2025-08"  # Monthly (August 2025 latest available)
-            elif key == "core_pce":
-                # Core PCE YoY inflation (Fed's preferred measure, excludes food & energy)
-                default_value = 2.4  # Updated: ~2.4% YoY (September 2025, Fed's target is 2.0%)
-                default_date = "2025-09"  # YoY September 2025
-            elif key == "pce":
-                # PCE YoY inflation (Fed's preferred measure, broader than CPI)
-                default_value = 2.5  # Updated: ~2.5% YoY (September 2025, Fed's preferred measure)
-                default_date = "2025-09"  # YoY September 2025
-            elif key == "dxy":
-                # Trade-Weighted USD Index (broad, goods and services) - Base year 2006=100
-                default_value = 120.0  # Approximate current level (varies, typically 110-130 range)
-                default_date = "2025-07"  # Daily (July 2025, approximate)
-            elif key == "eur_usd":
-                # EUR/USD exchange rate (USD per EUR)
-                default_value = 1.08  # Approximate current level (varies, typically 1.05-1.12 range)
-                default_date = "2025-07"  # Daily (July 2025, approximate)
-            elif key == "cny_usd":
-                # CNY/USD exchange rate (CNY per USD)
-                default_value = 7.25  # Approximate current level (varies, typically 7.0-7.5 range)
-                default_date = "2025-07"  # Daily (July 2025, approximate)
-            elif key == "jpy_usd":
-                # JPY/USD exchange rate (JPY per USD)
-                default_value = 155.0  # Approximate current level (varies, typically 140-160 range)
-                default_date = "2025-07"  # Daily (July 2025, approximate)
-            
-            # Try to fetch from FRED
-            value = default_value
-            date = default_date
-            source = "FRED (default)"
-            
-            if fred_series:
-                # Get cache TTL for this specific indicator (smart caching)
-                indicator_cache_ttl = self.cache_ttl_map.get(key, self.default_cache_ttl)
-                
-                # Check cache first
-                cache_key = f"{key}_{fred_series}"
-                if cache_key in self._cache:
-                    cached_data, cached_time = self._cache[cache_key]
-                    cache_age = datetime.now() - cached_time
-                    if cache_age < indicator_cache_ttl:
-                        logger.debug(f"Using cached FRED data for {key} (age: {cache_age}, TTL: {indicator_cache_ttl})")
-                        value = cached_data.get('value', default_value)
-                        date = str(cached_data.get('date', default_date))
-                        source = "FRED (cached)"
-                    else:
-                        # Cache expired, remove it
-                        logger.debug(f"Cache expired for {key} (age: {cache_age}, TTL: {indicator_cache_ttl})")
-                        del self._cache[cache_key]
+        Results replace the in-memory snapshot and are written through to the
+        snapshot table when a database path was configured.
+        """
+        keys = [key for key in (keys or list(self.INDICATORS)) if key in self.INDICATORS]
+        if not keys:
+            return {}
+        
+        workers = max(1, min(self.max_refresh_workers, len(keys)))
+        if workers == 1:
+            resolved = [self._resolve_indicator(key) for key in keys]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="macro-refresh") as pool:
+                resolved = list(pool.map(self._resolve_indicator, keys))
+        
+        now = datetime.now()
+        fresh: Dict[str, Tuple[MacroIndicator, datetime]] = {}
+        for key, (indicator, live) in zip(keys, resolved):
+            ttl = self.cache_ttl_map.get(key, self.default_cache_ttl) if live else self.default_retry_ttl
+            fresh[key] = (indicator, now + ttl)
+        
+        with self._snapshot_lock:
+            self._snapshot.update(fresh)
+        self._persist_snapshot(fresh, fetched_at=now)
+        return {key: entry[0] for key, entry in fresh.items()}
+    
+    def _schedule_refresh(self, keys: List[str]) -> None:
+        """Refresh ``keys`` on a background thread unless already in flight."""
+        with self._snapshot_lock:
+            pending = [key for key in keys if key not in self._refreshing]
+            if not pending:
+                return
+            self._refreshing.update(pending)
+        
+        def _run() -> None:
+            try:
+                self.refresh_snapshot(pending)
+            except Exception as e:  # pragma: no cover - defensive, stale values keep serving
+                logger.warning(f"Background macro refresh failed: {e}")
+            finally:
+                with self._snapshot_lock:
+                    self._refreshing.difference_update(pending)
+        
+        thread = threading.Thread(target=_run, name="macro-snapshot-refresh", daemon=True)
+        self._refresh_thread = thread
+        thread.start()
+    
+    def _fetch_indicator(self, series_id: str, months_back: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if self.source is not None:
+            return self.source.fetch(series_id, months_back=months_back)
+        return self._fetch_fred_data(series_id, months_back=months_back)
+    
+    def _resolve_indicator(self, key: str) -> Tuple[MacroIndicator, bool]:
+        """
+        Fetch, freshness-check and validate a single indicator.
+        
+        Returns the indicator and whether it carries a live observation (as
+        opposed to the built-in default), which decides how long it is cached.
+        """
+        config = self.INDICATORS[key]
+        fred_series = config.get("fred_series")
+        default_value, default_date = self.DEFAULT_VALUES.get(key, (None, None))
+        label = self.source_label
+        
+        value = default_value
+        date = default_date
+        source = f"{label} (default)"
+        live = False
+        
+        if fred_series:
+            # For inflation indicators (CPI, Core CPI, Core PCE, PCE), need 12 months of data to calculate YoY
+            needs_yoy_calc = key in ["inflation", "core_cpi", "core_pce", "pce"]
+            months_back = 12 if needs_yoy_calc else None
+            try:
+                fred_data = self._fetch_indicator(fred_series, months_back=months_back)
+            except Exception as e:
+                logger.warning(f"Failed to fetch {key} ({fred_series}): {e}")
+                fred_data = None
+            if fred_data and fred_data.get('value') is not None:
+                value = fred_data['value']
+                date_obj = fred_data.get('date', default_date)
                 
-                # If not cached or expired, try to fetch
-                if cache_key not in self._cache or datetime.now() - self._cache[cache_key][1] >= indicator_cache_ttl:
-                    # For inflation indicators (CPI, Core CPI, Core PCE, PCE), need 12 months of data to calculate YoY
-                    needs_yoy_calc = key in ["inflation", "core_cpi", "core_pce", "pce"]
-                    months_back = 12 if needs_yoy_calc else None
-                    fred_data = self._fetch_fred_data(fred_series, months_back=months_back)
-                    if fred_data and fred_data.get('value') is not None:
-                        value = fred_data['value']
-                        date_obj = fred_data.get('date', default_date)
-                        
-                        # CRITICAL: Convert date to string with proper formatting
-                        if isinstance(date_obj, (datetime,)):
-                            date = date_obj.strftime('%Y-%m-%d')
-                            date_for_age_check = date_obj
-                        elif hasattr(date_obj, 'strftime'):
-                            date = date_obj.strftime('%Y-%m-%d')
-                            date_for_age_check = date_obj
-                        else:
-                            date = str(date_obj) if date_obj else default_date
-                            # Try to parse date string to check age
-                            try:
-                                if len(date) == 7:  # YYYY-MM format
-                                    date_for_age_check = datetime.strptime(date, '%Y-%m')
-                                elif len(date) == 10:  # YYYY-MM-DD format
-                                    date_for_age_check = datetime.strptime(date, '%Y-%m-%d')
-                                else:
-                                    date_for_age_check = None
-                            except (ValueError, TypeError):
-                                date_for_age_check = None
-                        
-                        # CRITICAL: Check data freshness and REJECT if too old
-                        data_age_days = None
-                        if date_for_age_check:
-                            if isinstance(date_for_age_check, datetime):
-                                data_age = datetime.now() - date_for_age_check
-                                data_age_days = data_age.days
-                        
-                        # CRITICAL: Define maximum acceptable age for each indicator type
-                        max_age_days = None
-                        if key in ["fed_funds_rate", "treasury_10y", "sp500", "vix"]:
-                            max_age_days = 7  # Daily indicators - max 7 days old
-                        elif key in ["inflation", "unemployment", "consumer_confidence", "manufacturing_pmi", "core_cpi", "nonfarm_payrolls", "core_pce", "pce"]:
-                            max_age_days = 90  # Monthly indicators - max 90 days old
-                        elif key in ["dxy", "eur_usd", "cny_usd", "jpy_usd"]:
-                            max_age_days = 7  # FX rates - max 7 days old (daily data)
-                        elif key == "gdp_growth":
-                            max_age_days = 180  # Quarterly indicators - max 180 days old
-                        
-                        # REJECT data if too old
-                        if data_age_days is not None and max_age_days is not None:
-                            if data_age_days > max_age_days:
-                                logger.warning(f"🔴 REJECTED {key} data: {data_age_days} days old (max: {max_age_days} days)")
-                                logger.warning(f"   Date: {date} - Using default value instead")
-                                value = default_value
-                                date = default_date
-                                source = f"FRED (default - data too old: {data_age_days} days, max: {max_age_days} days)"
-                            else:
-                                # Data is fresh enough, proceed with validation
-                                period_note = ""
-                                if key in ["inflation", "core_cpi", "core_pce", "pce"]:
-                                    period_note = " (YoY)"  # Year-over-Year inflation rate
-                                
-                                # Validate value is reasonable (prevent obviously wrong data)
-                                is_valid, validation_msg = self._validate_indicator_value(key, value)
-                                if not is_valid:
-                                    logger.warning(f"🔴 VALIDATION FAILED for {key}: {validation_msg}")
-                                    logger.warning(f"   Value {value} rejected, using default {default_value}")
-                                    value = default_value
-                                    date = default_date
-                                    source = f"FRED (default - validation failed: {validation_msg})"
-                                else:
-                                    source = "FRED (live)"
-                                    # Add freshness warning to source if data is getting old
-                                    if data_age_days > max_age_days * 0.7:  # Warn if >70% of max age
-                                        source = f"FRED (live - data {data_age_days} days old)"
-                                    
-                                    # Cache the result
-                                    self._cache[cache_key] = (fred_data, datetime.now())
-                                    logger.info(f"Fetched live FRED data for {key}: {value:.2f}{config.get('unit', '')}{period_note} (date: {date}, age: {data_age_days} days)")
+                # CRITICAL: Convert date to string with proper formatting
+                if isinstance(date_obj, (datetime,)):
+                    date = date_obj.strftime('%Y-%m-%d')
+                    date_for_age_check = date_obj
+                elif hasattr(date_obj, 'strftime'):
+                    date = date_obj.strftime('%Y-%m-%d')
+                    date_for_age_check = date_obj
+                else:
+                    date = str(date_obj) if date_obj else default_date
+                    # Try to parse date string to check age
+                    try:
+                        if len(date) == 7:  # YYYY-MM format
+                            date_for_age_check = datetime.strptime(date, '%Y-%m')
+                        elif len(date) == 10:  # YYYY-MM-DD format
+                            date_for_age_check = datetime.strptime(date, '%Y-%m-%d')
                         else:
-                            # Could not determine age, validate value but proceed
-                            period_note = ""
-                            if key in ["inflation", "core_cpi", "core_pce", "pce"]:
-                                period_note = " (YoY)"
-                            
-                            is_valid, validation_msg = self._validate_indicator_value(key, value)
-                            if not is_valid:
-                                logger.warning(f"🔴 VALIDATION FAILED for {key}: {validation_msg}")
-                                logger.warning(f"   Value {value} rejected, using default {default_value}")
-                                value = default_value
-                                date = default_date
-                                source = f"FRED (default - validation failed: {validation_msg})"
-                            else:
-                                source = "FRED (live - age unknown)"
-                                self._cache[cache_key] = (fred_data, datetime.now())
-                                logger.info(f"Fetched live FRED data for {key}: {value:.2f}{config.get('unit', '')}{period_note} (date: {date})")
+                            date_for_age_check = None
+                    except (ValueError, TypeError):
+                        date_for_age_check = None
+                
+                # CRITICAL: Check data freshness and REJECT if too old
+                data_age_days = None
+                if date_for_age_check:
+                    if isinstance(date_for_age_check, datetime):
+                        data_age = datetime.now() - date_for_age_check
+                        data_age_days = data_age.days
+                
+                # CRITICAL: Define maximum acceptable age for each indicator type
+                max_age_days = None
+                if key in ["fed_funds_rate", "treasury_10y", "sp500", "vix"]:
+                    max_age_days = 7  # Daily indicators - max 7 days old
+                elif key in ["inflation", "unemployment", "consumer_confidence", "manufacturing_pmi", "core_cpi", "nonfarm_payrolls", "core_pce", "pce"]:
+                    max_age_days = 90  # Monthly indicators - max 90 days old
+                elif key in ["dxy", "eur_usd", "cny_usd", "jpy_usd"]:
+                    max_age_days = 7  # FX rates - max 7 days old (daily data)
+                elif key == "gdp_growth":
+                    max_age_days = 180  # Quarterly indicators - max 180 days old
+                
+                period_note = ""
+                if key in ["inflation", "core_cpi", "core_pce", "pce"]:
+                    period_note = " (YoY)"  # Year-over-Year inflation rate
+                
+                # REJECT data if too old
+                if data_age_days is not None and max_age_days is not None and data_age_days > max_age_days:
+                    logger.warning(f"🔴 REJECTED {key} data: {data_age_days} days old (max: {max_age_days} days)")
+                    logger.warning(f"   Date: {date} - Using default value instead")
+                    value = default_value
+                    date = default_date
+                    source = f"{label} (default - data too old: {data_age_days} days, max: {max_age_days} days)"
+                else:
+                    # Validate value is reasonable (prevent obviously wrong data)
+                    is_valid, validation_msg = self._validate_indicator_value(key, value)
+                    if not is_valid:
+                        logger.warning(f"🔴 VALIDATION FAILED for {key}: {validation_msg}")
+                        logger.warning(f"   Value {value} rejected, using default {default_value}")
+                        value = default_value
+                        date = default_date
+                        source = f"{label} (default - validation failed: {validation_msg})"
+                    elif data_age_days is None or max_age_days is None:
+                        source = f"{label} (live - age unknown)"
+                        live = True
+                        logger.info(f"Fetched live {label} data for {key}: {value:.2f}{config.get('unit', '')}{period_note} (date: {date})")
                     else:
-                        logger.debug(f"Using default value for {key} (FRED data not available)")
-            
-            # For inflation, if value still looks like CPI index (> 100), it wasn't converted
-            # This shouldn't happen if _fetch_fred_data worked correctly, but keep as safety check
-            if key == "inflation" and value and value > 100:
-                # If CPI index (e.g., ~300), not percentage - skip and use default
-                logger.warning(f"🔴 Inflation value {value} looks like CPI index, not percentage - using default 3.2%")
-                value = 3.2
-            
-            # Final validation check before creating indicator
-            is_valid, validation_msg = self._validate_indicator_value(key, value)
-            if not is_valid:
-                logger.warning(f"🔴 FINAL VALIDATION FAILED for {key}: {validation_msg}")
-                logger.warning(f"   Value {value} rejected, using default {default_value}")
-                value = default_value
-                source = f"{source} (validation failed, using default)"
-            
-            # Format date with period clarity
-            formatted_date = self._format_indicator_date(key, date or default_date)
-            
-            indicators[key] = MacroIndicator(
-                name=config["name"],
-                value=value,
-                date=formatted_date,
-                unit=config["unit"],
-                source=source,
-                description=config["description"]
+                        source = f"{label} (live)"
+                        live = True
+                        # Add freshness warning to source if data is getting old
+                        if data_age_days > max_age_days * 0.7:  # Warn if >70% of max age
+                            source = f"{label} (live - data {data_age_days} days old)"
+                        logger.info(f"Fetched live {label} data for {key}: {value:.2f}{config.get('unit', '')}{period_note} (date: {date}, age: {data_age_days} days)")
+            else:
+                logger.debug(f"Using default value for {key} ({label} data not available)")
+        
+        # For inflation, if value still looks like CPI index (> 100), it wasn't converted
+        # This shouldn't happen if _fetch_fred_data worked correctly, but keep as safety check
+        if key == "inflation" and value and value > 100:
+            # If CPI index (e.g., ~300), not percentage - skip and use default
+            logger.warning(f"🔴 Inflation value {value} looks like CPI index, not percentage - using default 3.2%")
+            value = 3.2
+            live = False
+        
+        # Final validation check before creating indicator
+        is_valid, validation_msg = self._validate_indicator_value(key, value)
+        if not is_valid:
+            logger.warning(f"🔴 FINAL VALIDATION FAILED for {key}: {validation_msg}")
+            logger.warning(f"   Value {value} rejected, using default {default_value}")
+            value = default_value
+            source = f"{source} (validation failed, using default)"
+            live = False
+        
+        # Format date with period clarity
+        formatted_date = self._format_indicator_date(key, date or default_date)
+        
+        indicator = MacroIndicator(
+            name=config["name"],
+            value=value,
+            date=formatted_date,
+            unit=config["unit"],
+            source=source,
+            description=config["description"]
         )
-        
-        return indicators
+        return indicator, live
+    
+    # ------------------------------------------------------------------
+    # Persisted snapshot
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.database_path, timeout=30)
+    
+    def _ensure_table(self) -> None:
+        """Create the macro snapshot table if it does not exist."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS macro_indicator_snapshots (
+                    provider TEXT NOT NULL,
+                    indicator_key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    value REAL,
+                    observation_date TEXT,
+                    unit TEXT,
+                    source TEXT,
+                    description TEXT,
+                    fetched_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    PRIMARY KEY (provider, indicator_key)
+                )
+                """
+            )
+    
+    def _load_persisted_snapshot(self) -> None:
+        """Seed the in-memory snapshot from the table (caller holds the lock)."""
+        if self.database_path is None:
+            return
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT indicator_key, name, value, observation_date, unit, source, description, expires_at
+                    FROM macro_indicator_snapshots
+                    WHERE provider = ?
+                    """,
+                    (self.source_label,),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not load persisted macro snapshot: {e}")
+            return
+        for key, name, value, date, unit, source, description, expires_at in rows:
+            if key not in self.INDICATORS:
+                continue
+            try:
+                expires = datetime.fromisoformat(expires_at)
+            except (TypeError, ValueError):
+                continue
+            self._snapshot[key] = (MacroIndicator(name, value, date, unit, source, description), expires)
+        if rows:
+            logger.debug(f"Loaded {len(self._snapshot)} persisted macro indicators")
+    
+    def _persist_snapshot(self, entries: Dict[str, Tuple[MacroIndicator, datetime]], *, fetched_at: datetime) -> None:
+        if self.database_path is None or not entries:
+            return
+        rows = [
+            (
+                self.source_label,
+                key,
+                indicator.name,
+                indicator.value,
+                indicator.date,
+                indicator.unit,
+                indicator.source,
+                indicator.description,
+                fetched_at.isoformat(),
+                expires_at.isoformat(),
+            )
+            for key, (indicator, expires_at) in entries.items()
+        ]
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO macro_indicator_snapshots (
+                        provider, indicator_key, name, value, observation_date, unit,
+                        source, description, fetched_at, expires_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist macro snapshot: {e}")
     
     def get_sector_benchmarks(self, sector: Optional[str] = None) -> Dict[str, float]:
         """
@@ -1506,7 +1666,13 @@ class MacroDataProvider:
 _macro_provider: Optional[MacroDataProvider] = None
 
 
-def get_macro_provider(fred_api_key: Optional[str] = None) -> MacroDataProvider:
+_macro_provider_lock = threading.Lock()
+
+
+def get_macro_provider(
+    fred_api_key: Optional[str] = None,
+    database_path: Optional[Union[str, Path]] = None,
+) -> MacroDataProvider:
     """
     Get or create the global macro data provider instance.
     
@@ -1514,20 +1680,36 @@ def get_macro_provider(fred_api_key: Optional[str] = None) -> MacroDataProvider:
         fred_api_key: Optional FRED API key for real-time data.
                      If None, will try to get from environment variable FRED_API_KEY.
                      Get free API key: https://fred.stlouisfed.org/docs/api/api_key.html
+        database_path: Optional SQLite database for the persisted macro snapshot,
+                     so new worker processes start warm.
+    
+    Setting ``MACRO_DATA_FIXTURE`` to a JSON file path serves observations from
+    a :class:`LocalMacroFixtureSource` instead of FRED.
     
     Returns:
         MacroDataProvider instance
     """
     global _macro_provider
+    import os
     
     # Always recreate if FRED API key is provided (to use live data)
     if fred_api_key is None:
-        import os
         fred_api_key = os.getenv('FRED_API_KEY')
+    fixture_path = os.getenv('MACRO_DATA_FIXTURE')
     
-    # If FRED API key changed or provider doesn't exist, create new one
-    if _macro_provider is None or (fred_api_key and _macro_provider.fred_api_key != fred_api_key):
-        _macro_provider = MacroDataProvider(fred_api_key=fred_api_key)
-    
-    return _macro_provider
+    with _macro_provider_lock:
+        # If FRED API key changed or provider doesn't exist, create new one
+        needs_new = (
+            _macro_provider is None
+            or (fred_api_key and _macro_provider.fred_api_key != fred_api_key)
+            or (database_path is not None and _macro_provider.database_path is None)
+        )
+        if needs_new:
+            source = LocalMacroFixtureSource(fixture_path) if fixture_path else None
+            _macro_provider = MacroDataProvider(
+                fred_api_key=fred_api_key,
+                database_path=database_path,
+                source=source,
+            )
+        return _macro_provider
 
@@ -7,18 +7,27 @@ sandboxed subprocess, and persist lightweight state for future forecasts.
 
 from __future__ import annotations
 
+import atexit
+import hashlib
 import importlib.util
 import json
 import logging
 import multiprocessing as mp
 import sqlite3
 import sys
+import threading
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+from types import ModuleType
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+try:  # ``resource`` is POSIX-only; memory-based recycling is skipped elsewhere.
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
 import pandas as pd
 
 from .. import database
@@ -27,6 +36,10 @@ LOGGER = logging.getLogger(__name__)
 
 # Timeout (seconds) for sandboxed plugin execution.
 DEFAULT_PLUGIN_TIMEOUT = 30
+# Warm worker pool sizing and recycling policy.
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_CALLS_PER_WORKER = 50
+DEFAULT_MAX_WORKER_MEMORY_GROWTH_MB = 512
 
 
 class PluginExecutionError(RuntimeError):
@@ -91,6 +104,83 @@ def _call_optional(obj: Any, attr: str, *args: Any, **kwargs: Any) -> Optional[A
     return None
 
 
+def _load_plugin_module(module_path: str, module_hash: Optional[str] = None) -> ModuleType:
+    """Import a plugin module from disk under a name unique to its contents."""
+    suffix = (module_hash or uuid.uuid4().hex)[:16]
+    module_name = f"user_forecast_plugin_{suffix}"
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    if not spec or not spec.loader:
+        raise ImportError(f"Unable to load plugin module from {module_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run_plugin_command(
+    module: ModuleType,
+    class_name: str,
+    command: str,
+    payload: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Run ``train``/``predict`` against a loaded plugin module and build the response."""
+    plugin_cls = getattr(module, class_name, None)
+    if plugin_cls is None:
+        raise AttributeError(f"Plugin class '{class_name}' not found in module.")
+
+    data_records = payload.get("data") or []
+    df = pd.DataFrame(data_records)
+    parameters = payload.get("parameters") or {}
+    periods = int(payload.get("periods", 0)) if payload.get("periods") else 0
+
+    if command == "train":
+        model = plugin_cls()
+        fit_sig = getattr(model, "fit", None)
+        if callable(fit_sig):
+            model.fit(df, **parameters)
+        state = _call_optional(model, "serialize_state")
+        description = _call_optional(model, "describe") or {}
+        return {"success": True, "state": state, "description": description}
+
+    if command == "predict":
+        state = payload.get("state")
+        model: Any
+        loader = getattr(plugin_cls, "load_state", None)
+        if callable(loader):
+            model = loader(state)
+        else:
+            model = plugin_cls()
+            load_method = getattr(model, "load_state", None)
+            if callable(load_method) and state is not None:
+                load_method(state)
+
+        # Some plugins may require fit before predict even when state provided.
+        if getattr(model, "requires_fit_before_predict", False):
+            fit_sig = getattr(model, "fit", None)
+            if callable(fit_sig):
+                model.fit(df, **parameters)
+
+        predict_sig = getattr(model, "predict", None)
+        if not callable(predict_sig):
+            raise AttributeError("Plugin must implement predict(periods: int).")
+        if periods <= 0:
+            raise ValueError("Prediction periods must be greater than zero.")
+        forecast_values = predict_sig(periods)
+        if not isinstance(forecast_values, Iterable):
+            raise ValueError("Plugin predict() must return an iterable of values.")
+        forecast = list(forecast_values)
+        description = _call_optional(model, "describe") or {}
+        confidence = _call_optional(model, "confidence_intervals")
+        return {
+            "success": True,
+            "forecast": forecast,
+            "description": description,
+            "confidence": confidence,
+        }
+
+    raise ValueError(f"Unknown command '{command}' for plugin.")
+
+
 def _plugin_worker(
     module_path: str,
     class_name: str,
@@ -98,78 +188,271 @@ def _plugin_worker(
     payload: Dict[str, Any],
     conn: mp.connection.Connection,
 ) -> None:
-    """Execute user plugin command inside isolated process."""
+    """Execute a single user plugin command inside an isolated, one-shot process."""
     try:
-        spec = importlib.util.spec_from_file_location("user_forecast_plugin", module_path)
-        if not spec or not spec.loader:
-            raise ImportError(f"Unable to load plugin module from {module_path}")
-        module = importlib.util.module_from_spec(spec)
-        sys.modules["user_forecast_plugin"] = module
-        spec.loader.exec_module(module)
-
-        plugin_cls = getattr(module, class_name, None)
-        if plugin_cls is None:
-            raise AttributeError(f"Plugin class '{class_name}' not found in module.")
-
-        data_records = payload.get("data") or []
-        df = pd.DataFrame(data_records)
-        parameters = payload.get("parameters") or {}
-        periods = int(payload.get("periods", 0)) if payload.get("periods") else 0
-
-        if command == "train":
-            model = plugin_cls()
-            fit_sig = getattr(model, "fit", None)
-            if callable(fit_sig):
-                model.fit(df, **parameters)
-            state = _call_optional(model, "serialize_state")
-            description = _call_optional(model, "describe") or {}
-            conn.send({"success": True, "state": state, "description": description})
-
-        elif command == "predict":
-            state = payload.get("state")
-            model: Any
-            loader = getattr(plugin_cls, "load_state", None)
-            if callable(loader):
-                model = loader(state)
-            else:
-                model = plugin_cls()
-                load_method = getattr(model, "load_state", None)
-                if callable(load_method) and state is not None:
-                    load_method(state)
-
-            # Some plugins may require fit before predict even when state provided.
-            if getattr(model, "requires_fit_before_predict", False):
-                fit_sig = getattr(model, "fit", None)
-                if callable(fit_sig):
-                    model.fit(df, **parameters)
-
-            predict_sig = getattr(model, "predict", None)
-            if not callable(predict_sig):
-                raise AttributeError("Plugin must implement predict(periods: int).")
-            if periods <= 0:
-                raise ValueError("Prediction periods must be greater than zero.")
-            forecast_values = predict_sig(periods)
-            if not isinstance(forecast_values, Iterable):
-                raise ValueError("Plugin predict() must return an iterable of values.")
-            forecast = list(forecast_values)
-            description = _call_optional(model, "describe") or {}
-            confidence = _call_optional(model, "confidence_intervals")
-            conn.send(
-                {
-                    "success": True,
-                    "forecast": forecast,
-                    "description": description,
-                    "confidence": confidence,
-                }
-            )
-        else:
-            raise ValueError(f"Unknown command '{command}' for plugin.")
+        module = _load_plugin_module(module_path)
+        conn.send(_run_plugin_command(module, class_name, command, payload))
     except Exception as exc:  # pragma: no cover - defensive, logging happens in parent
         conn.send({"success": False, "error": repr(exc)})
     finally:
         conn.close()
 
 
+def _max_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _pool_worker_main(
+    conn: mp.connection.Connection,
+    max_calls: int,
+    max_memory_growth_mb: Optional[float],
+) -> None:
+    """Long-lived sandbox worker: serve plugin commands until asked to recycle.
+
+    pandas is imported once at start-up and plugin modules are cached by the
+    hash of their source, so repeat calls skip interpreter, pandas and plugin
+    import costs. Each response carries ``recycle=True`` when the worker has
+    reached its call budget or grown past its memory allowance, after which it
+    exits and the parent replaces it.
+    """
+    modules: Dict[Tuple[str, str], ModuleType] = {}
+    baseline_rss = _max_rss_mb()
+    calls = 0
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+            if request is None:
+                break
+            calls += 1
+            try:
+                key = (request["module_path"], request["module_hash"])
+                module = modules.get(key)
+                if module is None:
+                    module = _load_plugin_module(*key)
+                    modules[key] = module
+                response = _run_plugin_command(
+                    module, request["class_name"], request["command"], request["payload"]
+                )
+            except Exception as exc:
+                response = {"success": False, "error": repr(exc)}
+
+            recycle = calls >= max_calls
+            if not recycle and max_memory_growth_mb and baseline_rss is not None:
+                current_rss = _max_rss_mb()
+                recycle = current_rss is not None and current_rss - baseline_rss > max_memory_growth_mb
+            response["recycle"] = recycle
+            conn.send(response)
+            if recycle:
+                break
+    finally:
+        conn.close()
+
+
+class _PoolWorker:
+    """Parent-side handle for one warm sandbox process.
+
+    ``key`` is the (user, plugin) the worker has been bound to, or ``None``
+    while it is still fresh; a bound worker only ever runs that plugin.
+    """
+
+    def __init__(self, ctx: Any, max_calls: int, max_memory_growth_mb: Optional[float]) -> None:
+        self.key: Optional[Tuple[str, str]] = None
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_pool_worker_main,
+            args=(child_conn, max_calls, max_memory_growth_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, *, force: bool = False) -> None:
+        try:
+            if not force and self.process.is_alive():
+                self.conn.send(None)
+                self.process.join(timeout=1)
+        except (OSError, BrokenPipeError):
+            pass
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class PluginWorkerPool:
+    """Pool of pre-warmed sandbox processes for forecasting plugins.
+
+    Keeps the guarantees of the one-shot sandbox: plugins run in separate
+    ``spawn`` processes, every call is bounded by a timeout, and a worker
+    that times out or dies is terminated and replaced rather than reused.
+    Workers are bound to the first (user, plugin) they serve and never run
+    another plugin, so module-level state cannot leak between users; when
+    every slot is held by other plugins an idle worker is retired for a
+    fresh one. Processes are started and stopped outside the pool lock.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int = DEFAULT_POOL_SIZE,
+        max_calls_per_worker: int = DEFAULT_MAX_CALLS_PER_WORKER,
+        max_memory_growth_mb: Optional[float] = DEFAULT_MAX_WORKER_MEMORY_GROWTH_MB,
+        prewarm: bool = True,
+    ) -> None:
+        self.size = max(1, size)
+        self.max_calls_per_worker = max(1, max_calls_per_worker)
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self._ctx = mp.get_context("spawn")
+        self._idle: List[_PoolWorker] = []
+        # Slots held by checked-out workers and by processes being started.
+        self._busy = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        if prewarm:
+            self._idle = [self._spawn() for _ in range(self.size)]
+
+    def _spawn(self) -> _PoolWorker:
+        return _PoolWorker(self._ctx, self.max_calls_per_worker, self.max_memory_growth_mb)
+
+    def _acquire(self, key: Tuple[str, str]) -> _PoolWorker:
+        """Check out a worker bound to ``key``, starting one if none is idle."""
+        retired: List[_PoolWorker] = []
+        try:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PluginExecutionError("Plugin worker pool has been shut down.")
+                    retired.extend(worker for worker in self._idle if not worker.process.is_alive())
+                    self._idle = [worker for worker in self._idle if worker.process.is_alive()]
+                    match = next((w for w in self._idle if w.key == key), None)
+                    if match is None:
+                        match = next((w for w in self._idle if w.key is None), None)
+                    if match is not None:
+                        self._idle.remove(match)
+                        self._busy += 1
+                        match.key = key
+                        return match
+                    if self._idle and self._busy + len(self._idle) >= self.size:
+                        # All idle workers belong to other plugins: retire the oldest one.
+                        retired.append(self._idle.pop(0))
+                    if self._busy + len(self._idle) < self.size:
+                        self._busy += 1  # reserve the slot, start the process below
+                        break
+                    self._condition.wait()
+        finally:
+            for worker in retired:
+                worker.stop()
+
+        try:
+            worker = self._spawn()
+        except BaseException:
+            with self._condition:
+                self._busy -= 1
+                self._condition.notify()
+            raise
+        worker.key = key
+        return worker
+
+    def _release(self, worker: _PoolWorker, *, reusable: bool) -> None:
+        with self._condition:
+            if reusable and not self._closed and worker.process.is_alive():
+                self._busy -= 1
+                self._idle.append(worker)
+                self._condition.notify()
+                return
+            replace = not self._closed  # keep the slot reserved while the replacement starts
+
+        worker.stop(force=not reusable)
+        replacement = None
+        if replace:
+            try:
+                # Replace recycled workers eagerly so the next call stays warm.
+                replacement = self._spawn()
+            except Exception as exc:  # pragma: no cover - defensive
+                LOGGER.warning(f"Could not start replacement plugin worker: {exc}")
+
+        with self._condition:
+            self._busy -= 1
+            if replacement is not None and not self._closed:
+                self._idle.append(replacement)
+                replacement = None
+            self._condition.notify()
+        if replacement is not None:
+            replacement.stop()
+
+    def execute(
+        self,
+        module_path: Path,
+        class_name: str,
+        command: str,
+        payload: Dict[str, Any],
+        *,
+        timeout: float,
+        owner: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Run a plugin command on a warm worker, enforcing ``timeout`` seconds.
+
+        ``owner`` identifies the user the plugin belongs to; together with the
+        module path it decides which worker may run the call.
+        """
+        module_path = Path(module_path)
+        module_hash = hashlib.sha256(module_path.read_bytes()).hexdigest()
+        worker = self._acquire((owner or "", str(module_path.resolve())))
+        reusable = False
+        try:
+            worker.conn.send(
+                {
+                    "module_path": str(module_path),
+                    "module_hash": module_hash,
+                    "class_name": class_name,
+                    "command": command,
+                    "payload": payload,
+                }
+            )
+            if not worker.conn.poll(timeout):
+                raise PluginExecutionError(
+                    f"Plugin execution timed out after {timeout} seconds."
+                )
+            try:
+                response = worker.conn.recv()
+            except (EOFError, OSError):
+                return {"success": False, "error": "No response from plugin process."}
+            reusable = not response.pop("recycle", False)
+            return response
+        finally:
+            self._release(worker, reusable=reusable)
+
+    def shutdown(self) -> None:
+        """Stop every worker; further calls raise :class:`PluginExecutionError`."""
+        with self._condition:
+            self._closed = True
+            workers, self._idle = self._idle, []
+            self._condition.notify_all()
+        for worker in workers:
+            worker.stop()
+
+
+_SHARED_POOL: Optional[PluginWorkerPool] = None
+_SHARED_POOL_LOCK = threading.Lock()
+
+
+def get_plugin_worker_pool() -> PluginWorkerPool:
+    """Return the process-wide warm plugin pool, starting it on first use."""
+    global _SHARED_POOL
+    with _SHARED_POOL_LOCK:
+        if _SHARED_POOL is None:
+            _SHARED_POOL = PluginWorkerPool()
+            atexit.register(_SHARED_POOL.shutdown)
+        return _SHARED_POOL
+
+
 class ForecastingPluginManager:
     """Manages registration and execution of user-defined forecasting plugins."""
 
@@ -179,11 +462,15 @@ class ForecastingPluginManager:
         *,
         plugins_dir: Optional[Path] = None,
         timeout_seconds: int = DEFAULT_PLUGIN_TIMEOUT,
+        worker_pool: Optional[PluginWorkerPool] = None,
+        use_worker_pool: bool = True,
     ) -> None:
         self.database_path = Path(database_path)
         self.plugins_dir = plugins_dir or self.database_path.parent / "forecasting_plugins"
         self.plugins_dir.mkdir(parents=True, exist_ok=True)
         self.timeout_seconds = timeout_seconds
+        self._worker_pool = worker_pool
+        self.use_worker_pool = use_worker_pool or worker_pool is not None
 
     # ------------------------------------------------------------------
     # Registration and lookup
@@ -463,7 +750,18 @@ class ForecastingPluginManager:
         command: str,
         payload: Dict[str, Any],
     ) -> Dict[str, Any]:
-        """Execute plugin command in sandboxed process."""
+        """Execute plugin command in a sandboxed process (warm pool when enabled)."""
+        if self.use_worker_pool:
+            pool = self._worker_pool or get_plugin_worker_pool()
+            return pool.execute(
+                plugin.module_path,
+                plugin.class_name,
+                command,
+                payload,
+                timeout=self.timeout_seconds,
+                owner=plugin.user_id,
+            )
+
         parent_conn, child_conn = mp.Pipe()
         ctx = mp.get_context("spawn")
         process = ctx.Process(
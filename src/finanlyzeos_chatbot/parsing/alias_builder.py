@@ -190,6 +190,9 @@ _TICKER_PATTERN = re.compile(r"\b([A-Za-z]{1,5})(?:\.[A-Za-z]{1,2})?\b")
 _ALIAS_CACHE: Optional[Dict[str, Set[str]]] = None
 _ALIAS_LOOKUP: Optional[Dict[str, List[str]]] = None
 _TICKER_SET: Optional[Set[str]] = None
+# Bumped whenever the runtime alias map is (re)loaded so downstream caches keyed
+# on alias resolution (e.g. the parse cache) can tell stale entries apart.
+_ALIAS_MAP_VERSION = 0
 
 
 def _base_tokens(text: str) -> List[str]:
@@ -409,7 +412,7 @@ def _build_lookup(alias_map: Dict[str, Set[str]]) -> Dict[str, List[str]]:
 
 def load_aliases() -> Dict[str, Set[str]]:
     """Load (or build) the alias map for runtime resolution."""
-    global _ALIAS_CACHE, _ALIAS_LOOKUP, _TICKER_SET
+    global _ALIAS_CACHE, _ALIAS_LOOKUP, _TICKER_SET, _ALIAS_MAP_VERSION
     if _ALIAS_CACHE is not None:
         return _ALIAS_CACHE
 
@@ -430,9 +433,24 @@ def load_aliases() -> Dict[str, Set[str]]:
     _ALIAS_CACHE = alias_cache
     _ALIAS_LOOKUP = _build_lookup(alias_cache)
     _TICKER_SET = set(alias_cache.keys())
+    _ALIAS_MAP_VERSION += 1
     return alias_cache
 
 
+def alias_map_version() -> int:
+    """Return a counter that changes every time the alias map is reloaded."""
+    return _ALIAS_MAP_VERSION
+
+
+def reset_alias_cache() -> None:
+    """Drop the in-memory alias map so the next lookup reloads ``aliases.json``."""
+    global _ALIAS_CACHE, _ALIAS_LOOKUP, _TICKER_SET, _ALIAS_MAP_VERSION
+    _ALIAS_CACHE = None
+    _ALIAS_LOOKUP = None
+    _TICKER_SET = None
+    _ALIAS_MAP_VERSION += 1
+
+
 def _ensure_lookup_loaded() -> Tuple[Dict[str, Set[str]], Dict[str, List[str]], Set[str]]:
     alias_map = load_aliases()
     assert _ALIAS_LOOKUP is not None
@@ -1129,8 +1147,10 @@ def resolve_tickers_freeform(text: str) -> Tuple[List[Dict[str, str]], List[str]
 
 
 __all__ = [
+    "alias_map_version",
     "build_alias_map",
     "load_aliases",
     "normalize_alias",
+    "reset_alias_cache",
     "resolve_tickers_freeform",
 ]
@@ -2,16 +2,29 @@
 
 from __future__ import annotations
 
+import copy
 import re
+import threading
 import unicodedata
-from typing import Any, Dict, List
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
-from .alias_builder import resolve_tickers_freeform
+from .alias_builder import alias_map_version, load_aliases, resolve_tickers_freeform
 from .ontology import METRIC_SYNONYMS
 from .time_grammar import parse_periods
 
 _METRIC_ITEMS = sorted(METRIC_SYNONYMS.items(), key=lambda item: -len(item[0]))
 
+# Process-wide memo of parse results. A single ``ask()`` parses the same prompt
+# from the chatbot, the context builder and the RAG orchestrator, so identical
+# text is parsed once and every caller receives its own copy of the result.
+_PARSE_CACHE_MAX_ENTRIES = 1024
+_PARSE_CACHE: "OrderedDict[Tuple[str, int, int], Dict[str, Any]]" = OrderedDict()
+_PARSE_INFLIGHT: Dict[Tuple[str, int, int], threading.Event] = {}
+_PARSE_CACHE_LOCK = threading.Lock()
+_METRIC_SYNONYMS_VERSION = 0
+_PARSE_CACHE_STATS = {"hits": 0, "misses": 0}
+
 INTENT_COMPARE_PATTERN = re.compile(
     r"\b(compare|vs|versus|v\.?s\.?|compared\s+to|compared\s+with|"
     r"comparison|contrast|difference\s+between|similarity\s+between|"
@@ -397,7 +410,84 @@ def normalize(text: str) -> str:
     return normalized
 
 
+def _parse_cache_key(text: str) -> Tuple[str, int, int]:
+    # Ticker resolution is case-sensitive, so the raw text is part of the key;
+    # the normalised form is derived from it. Loading the alias map first keeps
+    # the version stable across the first lookup.
+    load_aliases()
+    return (unicodedata.normalize("NFKC", text), alias_map_version(), _METRIC_SYNONYMS_VERSION)
+
+
+def invalidate_parse_cache(*, metrics_changed: bool = False) -> None:
+    """Drop memoised parse results.
+
+    Call with ``metrics_changed=True`` after mutating ``METRIC_SYNONYMS`` so the
+    longest-alias-first metric table is rebuilt as well. Alias map reloads are
+    picked up automatically through :func:`alias_map_version`.
+    """
+    global _METRIC_ITEMS, _METRIC_SYNONYMS_VERSION
+    with _PARSE_CACHE_LOCK:
+        if metrics_changed:
+            _METRIC_ITEMS = sorted(METRIC_SYNONYMS.items(), key=lambda item: -len(item[0]))
+            _METRIC_SYNONYMS_VERSION += 1
+        _PARSE_CACHE.clear()
+
+
+def parse_cache_info() -> Dict[str, int]:
+    """Return hit/miss counters and the current size of the parse cache."""
+    with _PARSE_CACHE_LOCK:
+        return {
+            "hits": _PARSE_CACHE_STATS["hits"],
+            "misses": _PARSE_CACHE_STATS["misses"],
+            "size": len(_PARSE_CACHE),
+            "max_size": _PARSE_CACHE_MAX_ENTRIES,
+        }
+
+
 def parse_to_structured(text: str) -> Dict[str, Any]:
+    """Parse ``text`` into the structured intent payload, memoised per process.
+
+    Concurrent callers asking for the same text wait for the in-flight parse
+    instead of repeating it. The cached payload is never handed out directly;
+    callers receive a deep copy they are free to mutate.
+    """
+    if not isinstance(text, str):
+        return _parse_uncached(text)
+
+    key = _parse_cache_key(text)
+    while True:
+        with _PARSE_CACHE_LOCK:
+            cached = _PARSE_CACHE.get(key)
+            if cached is not None:
+                _PARSE_CACHE.move_to_end(key)
+                _PARSE_CACHE_STATS["hits"] += 1
+                return copy.deepcopy(cached)
+            pending: Optional[threading.Event] = _PARSE_INFLIGHT.get(key)
+            if pending is None:
+                pending = threading.Event()
+                _PARSE_INFLIGHT[key] = pending
+                _PARSE_CACHE_STATS["misses"] += 1
+                break
+        # Another thread is parsing the same text; wait and re-check the cache.
+        pending.wait()
+
+    try:
+        structured = _parse_uncached(text)
+        frozen = copy.deepcopy(structured)
+        with _PARSE_CACHE_LOCK:
+            if key[1:] == (alias_map_version(), _METRIC_SYNONYMS_VERSION):
+                _PARSE_CACHE[key] = frozen
+                _PARSE_CACHE.move_to_end(key)
+                while len(_PARSE_CACHE) > _PARSE_CACHE_MAX_ENTRIES:
+                    _PARSE_CACHE.popitem(last=False)
+        return structured
+    finally:
+        with _PARSE_CACHE_LOCK:
+            _PARSE_INFLIGHT.pop(key, None)
+        pending.set()
+
+
+def _parse_uncached(text: str) -> Dict[str, Any]:
     norm = normalize(text)
     lowered_full = unicodedata.normalize("NFKC", text).lower()
 
@@ -997,4 +1087,10 @@ def infer_computed(metrics: List[Dict[str, Any]]) -> List[str]:
     return []
 
 
-__all__ = ["parse_to_structured", "normalize", "resolve_metrics"]
+__all__ = [
+    "parse_to_structured",
+    "normalize",
+    "resolve_metrics",
+    "invalidate_parse_cache",
+    "parse_cache_info",
+]
@@ -1,20 +1,31 @@
 """
 Multi-Hop RAG Controller - Decomposed Retrieval for Complex Questions
 
-Implements agentic RAG with query decomposition and sequential retrieval.
+Implements agentic RAG with query decomposition and dependency-aware retrieval:
+steps form a small DAG and independent steps run concurrently on a small
+per-request thread pool, so latency follows the critical path.
 """
 
 from __future__ import annotations
 
 import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 from .rag_retriever import RAGRetriever, RetrievalResult
 
 LOGGER = logging.getLogger(__name__)
 
+# Threads per multi-hop request. Each request gets its own pool, so a step that
+# overruns and is abandoned can only hold threads of the request that started it.
+DEFAULT_MAX_STEP_WORKERS = 6
+# Per-step time budget (seconds), counted from when the step starts running;
+# a step that overruns is abandoned and its result dropped.
+DEFAULT_STEP_TIMEOUT = 15.0
+
 
 class QueryComplexity(Enum):
     """Query complexity levels."""
@@ -31,6 +42,9 @@ class QueryStep:
     retrieval_type: str  # "metrics", "sec_narratives", "uploaded_docs", "macro", "portfolio"
     tickers: List[str]
     results: Optional[RetrievalResult] = None
+    depends_on: List[int] = field(default_factory=list)  # step_numbers whose results this step needs
+    timeout_seconds: Optional[float] = None  # Overrides the executor's per-step budget
+    status: str = "pending"  # pending | completed | failed | timed_out | skipped
 
 
 @dataclass
@@ -46,7 +60,7 @@ class RAGController:
     """
     Controller for multi-hop RAG retrieval.
     
-    Decomposes complex questions into sub-queries and performs sequential retrieval.
+    Decomposes complex questions into sub-queries and runs independent steps in parallel.
     """
     
     def __init__(self, retriever: RAGRetriever):
@@ -64,55 +78,44 @@ class RAGController:
         # Detect query complexity
         complexity = self._detect_complexity(query)
         
-        steps = []
-        
-        # Step 1: Always retrieve metrics and facts
-        steps.append(QueryStep(
-            step_number=1,
-            sub_query=query,
-            retrieval_type="metrics",
-            tickers=tickers,
-        ))
+        steps: List[QueryStep] = []
         
-        # Step 2: If query mentions narratives/explanations, retrieve SEC narratives
-        narrative_keywords = ["why", "how", "explain", "reason", "cause", "impact", "effect"]
-        if any(keyword in query_lower for keyword in narrative_keywords):
+        def add_step(retrieval_type: str, step_tickers: List[str], depends_on: Optional[List[int]] = None) -> int:
+            step_number = len(steps) + 1
             steps.append(QueryStep(
-                step_number=2,
+                step_number=step_number,
                 sub_query=query,
-                retrieval_type="sec_narratives",
-                tickers=tickers,
+                retrieval_type=retrieval_type,
+                tickers=step_tickers,
+                depends_on=list(depends_on or []),
             ))
+            return step_number
+        
+        # Always retrieve metrics and facts; one independent lookup per ticker in comparisons
+        if len(tickers) > 1:
+            metric_steps = [add_step("metrics", [ticker]) for ticker in tickers]
+        else:
+            metric_steps = [add_step("metrics", tickers)]
         
-        # Step 3: If query mentions macro/economic context
+        # If query mentions narratives/explanations, retrieve SEC narratives
+        narrative_keywords = ["why", "how", "explain", "reason", "cause", "impact", "effect"]
+        if any(keyword in query_lower for keyword in narrative_keywords):
+            add_step("sec_narratives", tickers)
+        
+        # If query mentions macro/economic context
         macro_keywords = ["economy", "economic", "inflation", "rates", "fed", "gdp", "market"]
         if any(keyword in query_lower for keyword in macro_keywords):
-            steps.append(QueryStep(
-                step_number=3,
-                sub_query=query,
-                retrieval_type="macro",
-                tickers=tickers,
-            ))
+            add_step("macro", tickers)
         
-        # Step 4: If query mentions portfolio
+        # If query mentions portfolio
         portfolio_keywords = ["portfolio", "holdings", "exposure", "allocation"]
         if any(keyword in query_lower for keyword in portfolio_keywords):
-            steps.append(QueryStep(
-                step_number=4,
-                sub_query=query,
-                retrieval_type="portfolio",
-                tickers=tickers,
-            ))
+            add_step("portfolio", tickers)
         
-        # Step 5: If query mentions forecast/prediction
+        # If query mentions forecast/prediction; forecasts build on the retrieved metrics
         forecast_keywords = ["forecast", "predict", "future", "outlook", "projection"]
         if any(keyword in query_lower for keyword in forecast_keywords):
-            steps.append(QueryStep(
-                step_number=5,
-                sub_query=query,
-                retrieval_type="ml_forecasts",
-                tickers=tickers,
-            ))
+            add_step("ml_forecasts", tickers, depends_on=metric_steps)
         
         return DecomposedQuery(
             original_query=query,
@@ -151,27 +154,41 @@ class RAGController:
         *,
         max_steps: int = 5,
         use_reranking: bool = True,
+        step_timeout: float = DEFAULT_STEP_TIMEOUT,
+        time_budget: Optional[float] = None,
     ) -> RetrievalResult:
         """
         Execute multi-hop retrieval for a complex query.
         
+        Steps whose dependencies are satisfied run concurrently on a pool of
+        up to ``DEFAULT_MAX_STEP_WORKERS`` threads. Each step gets
+        ``step_timeout`` seconds (or its own ``timeout_seconds``) from when it
+        starts running; steps that fail or overrun are dropped, along with
+        anything depending on them, and the remaining results are merged.
+        
         Args:
             query: User query
             tickers: List of ticker symbols
-            max_steps: Maximum retrieval steps
+            max_steps: Maximum logical retrieval steps (retrieval types); the
+                per-ticker fan-out of a step counts once
             use_reranking: Enable reranking
+            step_timeout: Default per-step time budget in seconds
+            time_budget: Optional budget for the whole execution in seconds
         
         Returns:
             Combined RetrievalResult from all steps
         """
         # Decompose query
         decomposed = self.decompose_query(query, tickers)
+        steps = self._limit_logical_steps(decomposed.steps, max_steps)
         
         LOGGER.info(
-            f"Multi-hop retrieval: {decomposed.complexity.value} query, {len(decomposed.steps)} steps"
+            f"Multi-hop retrieval: {decomposed.complexity.value} query, {len(steps)} steps"
         )
         
-        # Execute steps sequentially
+        self._run_step_graph(steps, use_reranking=use_reranking, step_timeout=step_timeout, time_budget=time_budget)
+        
+        # Combine results in step order so output does not depend on completion order
         all_metrics = []
         all_facts = []
         all_sec_narratives = []
@@ -180,59 +197,18 @@ class RAGController:
         portfolio_data = None
         ml_forecasts = None
         
-        for step in decomposed.steps[:max_steps]:
-            try:
-                if step.retrieval_type == "metrics":
-                    # Retrieve metrics and facts
-                    result = self.retriever.retrieve(
-                        query=step.sub_query,
-                        tickers=step.tickers,
-                        use_semantic_search=False,  # Metrics are SQL-only
-                        use_reranking=False,
-                    )
-                    all_metrics.extend(result.metrics)
-                    all_facts.extend(result.facts)
-                
-                elif step.retrieval_type == "sec_narratives":
-                    # Retrieve SEC narratives
-                    result = self.retriever.retrieve(
-                        query=step.sub_query,
-                        tickers=step.tickers,
-                        max_sec_results=5,
-                        use_reranking=use_reranking,
-                    )
-                    all_sec_narratives.extend(result.sec_narratives)
-                
-                elif step.retrieval_type == "uploaded_docs":
-                    # Retrieve uploaded documents
-                    result = self.retriever.retrieve(
-                        query=step.sub_query,
-                        tickers=step.tickers,
-                        max_uploaded_results=3,
-                        use_reranking=use_reranking,
-                    )
-                    all_uploaded_docs.extend(result.uploaded_docs)
-                
-                elif step.retrieval_type == "macro":
-                    # Retrieve macro data (from context_builder or macro_data module)
-                    # This would need integration with macro_data provider
-                    LOGGER.debug("Macro data retrieval (placeholder)")
-                
-                elif step.retrieval_type == "portfolio":
-                    # Portfolio data (from portfolio module)
-                    LOGGER.debug("Portfolio data retrieval (placeholder)")
-                
-                elif step.retrieval_type == "ml_forecasts":
-                    # ML forecasts (from ml_forecasting module)
-                    LOGGER.debug("ML forecast retrieval (placeholder)")
-                
-                step.results = result if 'result' in locals() else None
-                
-            except Exception as e:
-                LOGGER.warning(f"Step {step.step_number} ({step.retrieval_type}) failed: {e}")
+        for step in steps:
+            result = step.results
+            if result is None:
                 continue
+            if step.retrieval_type == "metrics":
+                all_metrics.extend(result.metrics)
+                all_facts.extend(result.facts)
+            elif step.retrieval_type == "sec_narratives":
+                all_sec_narratives.extend(result.sec_narratives)
+            elif step.retrieval_type == "uploaded_docs":
+                all_uploaded_docs.extend(result.uploaded_docs)
         
-        # Combine all results
         final_result = RetrievalResult(
             metrics=all_metrics,
             facts=all_facts,
@@ -251,4 +227,137 @@ class RAGController:
         )
         
         return final_result
-
+    
+    @staticmethod
+    def _limit_logical_steps(steps: List[QueryStep], max_steps: int) -> List[QueryStep]:
+        """Keep the steps of the first ``max_steps`` retrieval types, in order."""
+        kept_types: List[str] = []
+        for step in steps:
+            if step.retrieval_type not in kept_types:
+                kept_types.append(step.retrieval_type)
+        allowed = set(kept_types[:max_steps])
+        return [step for step in steps if step.retrieval_type in allowed]
+    
+    def _run_step_graph(
+        self,
+        steps: List[QueryStep],
+        *,
+        use_reranking: bool,
+        step_timeout: float,
+        time_budget: Optional[float],
+    ) -> None:
+        """Run ``steps`` respecting ``depends_on``; results land on each step."""
+        if not steps:
+            return
+        by_number = {step.step_number: step for step in steps}
+        pending = {step.step_number: step for step in steps}
+        # future -> (step, budget, [monotonic time the worker started the step, or None while queued])
+        running: Dict[Future, Tuple[QueryStep, float, List[Optional[float]]]] = {}
+        pool = ThreadPoolExecutor(
+            max_workers=min(len(steps), DEFAULT_MAX_STEP_WORKERS),
+            thread_name_prefix="rag-multihop",
+        )
+        started = time.monotonic()
+        overall_deadline = started + time_budget if time_budget is not None else None
+        
+        def deadline(budget: float, started_at: Optional[float], now: float) -> float:
+            # A queued step's budget has not begun, so ``now + budget`` is a lower bound for it
+            limit = (started_at if started_at is not None else now) + budget
+            return min(limit, overall_deadline) if overall_deadline is not None else limit
+        
+        def run(step: QueryStep, started_at: List[Optional[float]]) -> Optional[RetrievalResult]:
+            started_at[0] = time.monotonic()
+            return self._execute_step(step, use_reranking)
+        
+        try:
+            while pending or running:
+                # Resolve steps whose dependencies are settled: skip if any dependency did not complete
+                for number, step in list(pending.items()):
+                    deps = [by_number[dep] for dep in step.depends_on if dep in by_number]
+                    if any(dep.status in ("failed", "timed_out", "skipped") for dep in deps):
+                        step.status = "skipped"
+                        del pending[number]
+                        LOGGER.debug(f"Step {number} ({step.retrieval_type}) skipped: dependency unavailable")
+                    elif all(dep.status == "completed" for dep in deps):
+                        budget = step.timeout_seconds if step.timeout_seconds is not None else step_timeout
+                        started_at: List[Optional[float]] = [None]
+                        running[pool.submit(run, step, started_at)] = (step, budget, started_at)
+                        del pending[number]
+                
+                if not running:
+                    # Only reachable with cyclic dependencies: nothing left can ever become ready
+                    for step in pending.values():
+                        step.status = "skipped"
+                    break
+                
+                now = time.monotonic()
+                timeout = max(0.0, min(deadline(budget, at[0], now) for _, budget, at in running.values()) - now)
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    step, _, _ = running.pop(future)
+                    try:
+                        step.results = future.result()
+                        step.status = "completed"
+                    except Exception as e:
+                        step.status = "failed"
+                        LOGGER.warning(f"Step {step.step_number} ({step.retrieval_type}) failed: {e}")
+                
+                now = time.monotonic()
+                for future, (step, budget, at) in list(running.items()):
+                    step_expired = at[0] is not None and now >= at[0] + budget
+                    if step_expired or (overall_deadline is not None and now >= overall_deadline):
+                        # Abandon the step: cancel if not started, otherwise ignore its eventual result
+                        future.cancel()
+                        running.pop(future)
+                        step.status = "timed_out"
+                        LOGGER.warning(
+                            f"Step {step.step_number} ({step.retrieval_type}) exceeded its time budget; "
+                            f"continuing with partial results"
+                        )
+        finally:
+            # Queued work is dropped; abandoned running steps end on their own without blocking the caller
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        LOGGER.debug(f"Multi-hop step graph finished in {time.monotonic() - started:.3f}s")
+    
+    def _execute_step(self, step: QueryStep, use_reranking: bool) -> Optional[RetrievalResult]:
+        """Run a single retrieval step."""
+        if step.retrieval_type == "metrics":
+            # Retrieve metrics and facts
+            return self.retriever.retrieve(
+                query=step.sub_query,
+                tickers=step.tickers,
+                use_semantic_search=False,  # Metrics are SQL-only
+                use_reranking=False,
+            )
+        
+        if step.retrieval_type == "sec_narratives":
+            # Retrieve SEC narratives
+            return self.retriever.retrieve(
+                query=step.sub_query,
+                tickers=step.tickers,
+                max_sec_results=5,
+                use_reranking=use_reranking,
+            )
+        
+        if step.retrieval_type == "uploaded_docs":
+            # Retrieve uploaded documents
+            return self.retriever.retrieve(
+                query=step.sub_query,
+                tickers=step.tickers,
+                max_uploaded_results=3,
+                use_reranking=use_reranking,
+            )
+        
+        if step.retrieval_type == "macro":
+            # Retrieve macro data (from context_builder or macro_data module)
+            # This would need integration with macro_data provider
+            LOGGER.debug("Macro data retrieval (placeholder)")
+        elif step.retrieval_type == "portfolio":
+            # Portfolio data (from portfolio module)
+            LOGGER.debug("Portfolio data retrieval (placeholder)")
+        elif step.retrieval_type == "ml_forecasts":
+            # ML forecasts (from ml_forecasting module)
+            LOGGER.debug("ML forecast retrieval (placeholder)")
+        return None
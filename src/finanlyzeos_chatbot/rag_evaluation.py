@@ -85,16 +85,35 @@ class RAGEvaluator:
             retrieved_ids.append(f"uploaded:{doc_id}")
             retrieved_scores.append(doc.score or 0.0)
         
-        # Calculate metrics
+        return self.evaluate_ranking(query, retrieved_ids, relevant_doc_ids, retrieved_scores)
+    
+    def evaluate_ranking(
+        self,
+        query: str,
+        retrieved_ids: List[str],
+        relevant_doc_ids: Set[str],
+        retrieved_scores: Optional[List[float]] = None,
+    ) -> RetrievalEvaluation:
+        """
+        Evaluate a ranked list of document IDs against ground truth.
+        
+        Args:
+            query: User query
+            retrieved_ids: Retrieved document IDs, best first
+            relevant_doc_ids: Set of relevant document IDs (ground truth)
+            retrieved_scores: Optional scores aligned with ``retrieved_ids``
+        
+        Returns:
+            RetrievalEvaluation with metrics
+        """
         eval_result = RetrievalEvaluation(
             query=query,
             relevant_doc_ids=relevant_doc_ids,
             retrieved_doc_ids=retrieved_ids,
-            retrieved_scores=retrieved_scores,
+            retrieved_scores=retrieved_scores if retrieved_scores is not None else [0.0] * len(retrieved_ids),
         )
         
         # Recall@K
-        relevant_retrieved = set(retrieved_ids) & relevant_doc_ids
         num_relevant = len(relevant_doc_ids)
         
         if num_relevant > 0:
@@ -11,8 +11,10 @@ from __future__ import annotations
 
 import logging
 import json
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from enum import Enum
@@ -49,19 +51,73 @@ class FeedbackRecord:
 class FeedbackCollector:
     """
     Collects and stores user feedback for RAG queries.
+    
+    Feedback is appended to a SQLite table (one INSERT per record) and the
+    calibration statistics are kept as running counts per source type and
+    score bucket, so recording feedback costs the same regardless of how much
+    history has accumulated.
     """
     
-    def __init__(self, feedback_file: Optional[Path] = None):
+    # Number of equal-width score buckets over [0, 1] used for calibration counts
+    SCORE_BUCKETS = 10
+    # Pseudo source type holding query-level totals
+    ALL_SOURCES = "__all__"
+    
+    def __init__(self, feedback_file: Optional[Path] = None, *, database_path: Optional[Path] = None):
         """
         Initialize feedback collector.
         
         Args:
-            feedback_file: Path to JSON file for storing feedback (optional)
+            feedback_file: Legacy JSON feedback file; imported once into the log if present
+            database_path: SQLite database holding the feedback log (default: data/rag_feedback.sqlite3)
         """
         self.feedback_file = feedback_file or Path("data/rag_feedback.json")
-        self.feedback_file.parent.mkdir(parents=True, exist_ok=True)
-        self.feedback_records: List[FeedbackRecord] = []
-        self._load_feedback()
+        self.database_path = Path(database_path) if database_path else self.feedback_file.with_suffix(".sqlite3")
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # (source_type, bucket) -> [good, bad, partial]; bucket -1 holds query-level totals
+        self._counts: Dict[Tuple[str, int], List[int]] = {}
+        self._ensure_table()
+        self._import_legacy_file()
+        self._load_counts()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.database_path, timeout=30)
+    
+    def _ensure_table(self) -> None:
+        """Create the feedback log and running-count tables if needed."""
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS rag_feedback (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    query TEXT NOT NULL,
+                    doc_ids TEXT NOT NULL,
+                    doc_scores TEXT NOT NULL,
+                    source_types TEXT,
+                    answer TEXT,
+                    label TEXT NOT NULL,
+                    user_id TEXT,
+                    conversation_id TEXT,
+                    reason TEXT,
+                    created_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS rag_feedback_counts (
+                    source_type TEXT NOT NULL,
+                    score_bucket INTEGER NOT NULL,
+                    good INTEGER NOT NULL DEFAULT 0,
+                    bad INTEGER NOT NULL DEFAULT 0,
+                    partial INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source_type, score_bucket)
+                );
+                """
+            )
+    
+    @classmethod
+    def score_bucket(cls, score: float) -> int:
+        """Map a retrieval score in [0, 1] to its calibration bucket."""
+        clamped = min(max(float(score or 0.0), 0.0), 1.0)
+        return min(int(clamped * cls.SCORE_BUCKETS), cls.SCORE_BUCKETS - 1)
     
     def record_feedback(
         self,
@@ -73,6 +129,7 @@ class FeedbackCollector:
         user_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
         reason: Optional[str] = None,
+        source_types: Optional[List[str]] = None,
     ):
         """
         Record user feedback.
@@ -86,6 +143,7 @@ class FeedbackCollector:
             user_id: Optional user ID
             conversation_id: Optional conversation ID
             reason: Optional reason for feedback
+            source_types: Optional source type per document (e.g. "sec_narratives")
         """
         record = FeedbackRecord(
             query=query,
@@ -97,11 +155,88 @@ class FeedbackCollector:
             conversation_id=conversation_id,
             reason=reason,
         )
+        if self._append(record, source_types):
+            LOGGER.info(f"Feedback recorded: {label.value} for query '{query[:50]}...'")
+    
+    def _append(self, record: FeedbackRecord, source_types: Optional[List[str]] = None) -> bool:
+        """Append ``record`` to the log and bump its running counts in one transaction."""
+        # Increments for the running counts touched by this record
+        increments: Dict[Tuple[str, int], int] = {(self.ALL_SOURCES, -1): 1}
+        types = list(source_types or [])
+        for position, score in enumerate(record.doc_scores):
+            source_type = types[position] if position < len(types) else "unknown"
+            key = (source_type, self.score_bucket(score))
+            increments[key] = increments.get(key, 0) + 1
+        column = record.label.value
         
-        self.feedback_records.append(record)
-        self._save_feedback()
-        
-        LOGGER.info(f"Feedback recorded: {label.value} for query '{query[:50]}...'")
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO rag_feedback (
+                        query, doc_ids, doc_scores, source_types, answer, label,
+                        user_id, conversation_id, reason, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        record.query,
+                        json.dumps(record.doc_ids),
+                        json.dumps(record.doc_scores),
+                        json.dumps(types) if types else None,
+                        record.answer,
+                        column,
+                        record.user_id,
+                        record.conversation_id,
+                        record.reason,
+                        record.timestamp,
+                    ),
+                )
+                conn.executemany(
+                    f"""
+                    INSERT INTO rag_feedback_counts (source_type, score_bucket, {column})
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(source_type, score_bucket) DO UPDATE SET {column} = {column} + excluded.{column}
+                    """,
+                    [(source_type, bucket, count) for (source_type, bucket), count in increments.items()],
+                )
+                index = _LABEL_COLUMNS.index(column)
+                for key, count in increments.items():
+                    self._counts.setdefault(key, [0, 0, 0])[index] += count
+        except sqlite3.Error as e:
+            LOGGER.warning(f"Failed to save feedback: {e}")
+            return False
+        return True
+    
+    @property
+    def feedback_records(self) -> List[FeedbackRecord]:
+        """All recorded feedback, oldest first (reads the log; not for hot paths)."""
+        return self.load_records()
+    
+    def load_records(self, limit: Optional[int] = None) -> List[FeedbackRecord]:
+        """Read feedback records from the log, oldest first (``limit`` keeps the newest)."""
+        columns = "query, doc_ids, doc_scores, answer, label, user_id, conversation_id, created_at, reason"
+        if limit is None:
+            sql = f"SELECT {columns} FROM rag_feedback ORDER BY id"
+            params: Tuple[Any, ...] = ()
+        else:
+            sql = f"SELECT {columns} FROM (SELECT * FROM rag_feedback ORDER BY id DESC LIMIT ?) ORDER BY id"
+            params = (limit,)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            FeedbackRecord(
+                query=query,
+                doc_ids=json.loads(doc_ids),
+                doc_scores=json.loads(doc_scores),
+                answer=answer,
+                label=FeedbackLabel(label),
+                user_id=user_id,
+                conversation_id=conversation_id,
+                timestamp=created_at,
+                reason=reason,
+            )
+            for query, doc_ids, doc_scores, answer, label, user_id, conversation_id, created_at, reason in rows
+        ]
     
     def get_feedback_stats(self) -> Dict[str, Any]:
         """
@@ -110,7 +245,10 @@ class FeedbackCollector:
         Returns:
             Dictionary with feedback statistics
         """
-        if not self.feedback_records:
+        with self._lock:
+            good, bad, partial = self._counts.get((self.ALL_SOURCES, -1), [0, 0, 0])
+        total = good + bad + partial
+        if not total:
             return {
                 "total": 0,
                 "good": 0,
@@ -118,11 +256,6 @@ class FeedbackCollector:
                 "partial": 0,
             }
         
-        total = len(self.feedback_records)
-        good = sum(1 for r in self.feedback_records if r.label == FeedbackLabel.GOOD)
-        bad = sum(1 for r in self.feedback_records if r.label == FeedbackLabel.BAD)
-        partial = sum(1 for r in self.feedback_records if r.label == FeedbackLabel.PARTIAL)
-        
         return {
             "total": total,
             "good": good,
@@ -131,51 +264,65 @@ class FeedbackCollector:
             "good_ratio": good / total if total > 0 else 0.0,
         }
     
-    def _load_feedback(self):
-        """Load feedback records from file."""
-        if not self.feedback_file.exists():
+    def get_bucket_counts(self, source_type: str, score: float) -> Tuple[int, int, int]:
+        """Return running (good, bad, partial) counts for ``source_type`` near ``score``."""
+        with self._lock:
+            counts = self._counts.get((source_type, self.score_bucket(score)), [0, 0, 0])
+        return counts[0], counts[1], counts[2]
+    
+    def _load_counts(self) -> None:
+        """Load the running counts (a few rows per source type) into memory."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT source_type, score_bucket, good, bad, partial FROM rag_feedback_counts"
+            ).fetchall()
+        with self._lock:
+            self._counts = {
+                (source_type, bucket): [good, bad, partial]
+                for source_type, bucket, good, bad, partial in rows
+            }
+        total = sum(self._counts.get((self.ALL_SOURCES, -1), [0, 0, 0]))
+        if total:
+            LOGGER.info(f"Loaded feedback statistics for {total} records")
+    
+    def _import_legacy_file(self) -> None:
+        """Import the legacy JSON feedback file once, then rename it out of the way."""
+        if self.feedback_file.suffix != ".json" or not self.feedback_file.exists():
             return
-        
         try:
             with open(self.feedback_file, 'r') as f:
                 data = json.load(f)
-                for record_data in data:
-                    record_data['label'] = FeedbackLabel(record_data['label'])
-                    self.feedback_records.append(FeedbackRecord(**record_data))
-            LOGGER.info(f"Loaded {len(self.feedback_records)} feedback records")
-        except Exception as e:
-            LOGGER.warning(f"Failed to load feedback: {e}")
-    
-    def _save_feedback(self):
-        """Save feedback records to file."""
-        try:
-            data = [asdict(record) for record in self.feedback_records]
-            # Convert enum to string
             for record_data in data:
-                record_data['label'] = record_data['label'].value
-            
-            with open(self.feedback_file, 'w') as f:
-                json.dump(data, f, indent=2)
+                record_data['label'] = FeedbackLabel(record_data['label'])
+                self._append(FeedbackRecord(**record_data))
+            self.feedback_file.rename(self.feedback_file.with_suffix(".json.imported"))
+            LOGGER.info(f"Imported {len(data)} legacy feedback records from {self.feedback_file}")
         except Exception as e:
-            LOGGER.warning(f"Failed to save feedback: {e}")
+            LOGGER.warning(f"Failed to import legacy feedback: {e}")
+
+
+_LABEL_COLUMNS = [FeedbackLabel.GOOD.value, FeedbackLabel.BAD.value, FeedbackLabel.PARTIAL.value]
 
 
 class ScoreCalibrator:
     """
     Calibrates retrieval scores based on user feedback.
     
-    Simple logistic regression or threshold adjustment based on feedback.
+    Uses the collector's running counts per source type and score bucket;
+    buckets with too little feedback fall back to the overall good ratio.
     """
     
-    def __init__(self, feedback_collector: Optional[FeedbackCollector] = None):
+    def __init__(self, feedback_collector: Optional[FeedbackCollector] = None, *, min_bucket_samples: int = 5):
         """
         Initialize score calibrator.
         
         Args:
             feedback_collector: FeedbackCollector instance
+            min_bucket_samples: Feedback count needed before a bucket's own ratio is used
         """
         self.feedback_collector = feedback_collector
         self.calibration_threshold = 0.5  # Default threshold
+        self.min_bucket_samples = min_bucket_samples
     
     def calibrate_score(
         self,
@@ -194,16 +341,19 @@ class ScoreCalibrator:
         Returns:
             Calibrated score
         """
-        # Simple calibration: adjust threshold based on feedback
-        # More sophisticated: train a small ML model
-        
         if not self.feedback_collector:
             return score
         
-        # Get feedback stats for this source type
-        stats = self.feedback_collector.get_feedback_stats()
+        good, bad, partial = self.feedback_collector.get_bucket_counts(source_type, score)
+        samples = good + bad + partial
+        if samples >= self.min_bucket_samples:
+            # Smoothed helpfulness of documents from this source at this score level,
+            # mapped to a 0.9x-1.1x adjustment
+            ratio = (good + 0.5 * partial + 1) / (samples + 2)
+            return min(1.0, max(0.0, score * (0.9 + 0.2 * ratio)))
         
-        # Adjust score based on overall feedback quality
+        # Not enough bucket-level feedback: adjust on overall feedback quality
+        stats = self.feedback_collector.get_feedback_stats()
         if stats.get("good_ratio", 0.5) > 0.7:
             # High quality feedback - slightly boost scores
             calibrated = min(1.0, score * 1.1)
@@ -216,7 +366,7 @@ class ScoreCalibrator:
         return calibrated
     
     def update_from_feedback(self):
-        """Update calibration parameters from feedback."""
+        """Update calibration parameters from the running feedback counts (O(1))."""
         if not self.feedback_collector:
             return
         
@@ -231,4 +381,3 @@ class ScoreCalibrator:
             self.calibration_threshold = min(0.7, self.calibration_threshold + 0.05)
         
         LOGGER.debug(f"Calibration threshold updated to {self.calibration_threshold:.2f}")
-
@@ -250,6 +250,63 @@ class SourceFusion:
         
         return fused_docs
     
+    def fuse_reciprocal_rank(
+        self,
+        dense_hits: List[RetrievedDocument],
+        sparse_hits: List[RetrievedDocument],
+        k: int = 60,
+        dense_weight: float = 1.0,
+        sparse_weight: float = 1.0,
+    ) -> List[RetrievedDocument]:
+        """
+        Fuse sparse and dense results with Reciprocal Rank Fusion.
+        
+        Each list contributes ``weight / (k + rank)`` per document, so only the
+        rank positions matter and no score normalisation is needed (BM25 scores
+        and Chroma distances are not on comparable scales).
+        
+        Args:
+            dense_hits: Documents from dense (embedding) retrieval, best first
+            sparse_hits: Documents from sparse (BM25) retrieval, best first
+            k: RRF smoothing constant (default 60)
+            dense_weight: Multiplier for the dense contribution
+            sparse_weight: Multiplier for the sparse contribution
+        
+        Returns:
+            Fused list of documents sorted by RRF score
+        """
+        doc_map: Dict[str, RetrievedDocument] = {}
+        rrf_scores: Dict[str, float] = {}
+        
+        for hits, weight, rank_key in (
+            (dense_hits, dense_weight, "_dense_rank"),
+            (sparse_hits, sparse_weight, "_sparse_rank"),
+        ):
+            for rank, doc in enumerate(hits, start=1):
+                doc_id = self._get_doc_id(doc)
+                if doc_id in doc_map:
+                    if rank_key in doc_map[doc_id].metadata:
+                        continue  # Duplicate within one list keeps its best rank
+                else:
+                    doc_map[doc_id] = doc
+                doc_map[doc_id].metadata[rank_key] = rank
+                rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + weight / (k + rank)
+        
+        fused_docs = []
+        for doc_id, doc in doc_map.items():
+            doc.score = rrf_scores[doc_id]
+            doc.metadata["_fused_score"] = doc.score
+            fused_docs.append(doc)
+        
+        fused_docs.sort(key=lambda x: x.score or 0.0, reverse=True)
+        
+        LOGGER.debug(
+            f"Reciprocal rank fusion: {len(dense_hits)} dense + {len(sparse_hits)} sparse "
+            f"→ {len(fused_docs)} unique"
+        )
+        
+        return fused_docs
+    
     def _get_doc_id(self, doc: RetrievedDocument) -> str:
         """Generate unique document ID from text and metadata."""
         # Use text hash + source type + key metadata as ID
@@ -34,6 +34,8 @@ class HybridRetrievalConfig:
     dense_weight: float = 0.6  # Weight for dense scores
     sparse_weight: float = 0.4  # Weight for sparse scores
     use_hybrid: bool = True  # Enable hybrid retrieval
+    fusion_method: str = "weighted"  # "weighted" (score fusion) or "rrf" (reciprocal rank fusion)
+    rrf_k: int = 60  # RRF smoothing constant
 
 
 class HybridRetriever:
@@ -120,12 +122,7 @@ class HybridRetriever:
         
         # Fuse results
         if dense_hits or sparse_hits:
-            fused = self.fusion.fuse_sparse_dense(
-                dense_hits=dense_hits,
-                sparse_hits=sparse_hits,
-                dense_weight=self.config.dense_weight,
-                sparse_weight=self.config.sparse_weight,
-            )
+            fused = self._fuse(dense_hits, sparse_hits)
             
             # Return top k_final
             return fused[:self.config.k_final]
@@ -191,18 +188,32 @@ class HybridRetriever:
         
         # Fuse results
         if dense_hits or sparse_hits:
-            fused = self.fusion.fuse_sparse_dense(
-                dense_hits=dense_hits,
-                sparse_hits=sparse_hits,
-                dense_weight=self.config.dense_weight,
-                sparse_weight=self.config.sparse_weight,
-            )
+            fused = self._fuse(dense_hits, sparse_hits)
             
             # Return top k_final
             return fused[:self.config.k_final]
         
         return []
     
+    def _fuse(
+        self,
+        dense_hits: List[RetrievedDocument],
+        sparse_hits: List[RetrievedDocument],
+    ) -> List[RetrievedDocument]:
+        """Fuse dense and sparse hits with the configured fusion method."""
+        if self.config.fusion_method == "rrf":
+            return self.fusion.fuse_reciprocal_rank(
+                dense_hits=dense_hits,
+                sparse_hits=sparse_hits,
+                k=self.config.rrf_k,
+            )
+        return self.fusion.fuse_sparse_dense(
+            dense_hits=dense_hits,
+            sparse_hits=sparse_hits,
+            dense_weight=self.config.dense_weight,
+            sparse_weight=self.config.sparse_weight,
+        )
+    
     def get_retrieval_stats(self) -> Dict[str, Any]:
         """
         Get statistics about retrieval method usage.
@@ -214,6 +225,7 @@ class HybridRetriever:
             "use_hybrid": self.config.use_hybrid,
             "dense_weight": self.config.dense_weight,
             "sparse_weight": self.config.sparse_weight,
+            "fusion_method": self.config.fusion_method,
             "dense_available": self.vector_store is not None and self.vector_store._available,
             "sparse_available": self.sparse_retriever is not None,
         }
@@ -0,0 +1,144 @@
+"""
+RAG Index Manifest - Record of Indexed Chunks per Source
+
+Tracks which content-hash chunk IDs have been written to each vector store
+collection for each source (e.g. ``sec:<accession>``, ``uploaded:<document_id>``)
+so indexing runs can skip unchanged chunks, embed only new text and delete
+chunks a source no longer produces. One-off collection migrations are
+recorded alongside so they run only once.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IndexManifest:
+    """SQLite-backed manifest of (collection, source, chunk id) entries and completed migrations."""
+
+    def __init__(self, database_path: Optional[Path] = None):
+        """
+        Initialize the manifest.
+
+        Args:
+            database_path: SQLite database holding the manifest table (in-memory when None)
+        """
+        self._conn = sqlite3.connect(
+            str(database_path) if database_path else ":memory:",
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._ensure_table()
+
+    def _ensure_table(self) -> None:
+        """Create the manifest table if it does not exist."""
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS rag_index_manifest (
+                    collection TEXT NOT NULL,
+                    source_key TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    indexed_at TEXT NOT NULL,
+                    PRIMARY KEY (collection, source_key, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_rag_index_manifest_chunk
+                    ON rag_index_manifest(collection, chunk_id);
+                CREATE TABLE IF NOT EXISTS rag_index_migrations (
+                    collection TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    completed_at TEXT NOT NULL,
+                    PRIMARY KEY (collection, name)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def has_source(self, collection: str, source_key: str) -> bool:
+        """Return True if any chunk has been recorded for ``source_key``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM rag_index_manifest WHERE collection = ? AND source_key = ? LIMIT 1",
+                (collection, source_key),
+            ).fetchone()
+        return row is not None
+
+    def chunk_ids(self, collection: str, source_key: str) -> Set[str]:
+        """Chunk IDs currently recorded for ``source_key``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM rag_index_manifest WHERE collection = ? AND source_key = ?",
+                (collection, source_key),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def indexed(self, collection: str, chunk_ids: Iterable[str], *, exclude_source: Optional[str] = None) -> Set[str]:
+        """Subset of ``chunk_ids`` recorded under any source (optionally ignoring one)."""
+        chunk_ids = list(chunk_ids)
+        found: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ", ".join("?" for _ in batch)
+                query = (
+                    f"SELECT DISTINCT chunk_id FROM rag_index_manifest "
+                    f"WHERE collection = ? AND chunk_id IN ({placeholders})"
+                )
+                params: List[str] = [collection, *batch]
+                if exclude_source is not None:
+                    query += " AND source_key <> ?"
+                    params.append(exclude_source)
+                found.update(row[0] for row in self._conn.execute(query, params))
+        return found
+
+    def replace_source(self, collection: str, source_key: str, chunk_ids: Iterable[str]) -> None:
+        """Make ``chunk_ids`` the complete set recorded for ``source_key``."""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM rag_index_manifest WHERE collection = ? AND source_key = ?",
+                (collection, source_key),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO rag_index_manifest (collection, source_key, chunk_id, indexed_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(collection, source_key, chunk_id, now) for chunk_id in chunk_ids],
+            )
+
+    def sources(self, collection: str, prefix: str = "") -> Dict[str, int]:
+        """Recorded sources in ``collection`` (optionally by key prefix) with chunk counts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_key, COUNT(*) FROM rag_index_manifest "
+                "WHERE collection = ? AND source_key LIKE ? GROUP BY source_key",
+                (collection, f"{prefix}%"),
+            ).fetchall()
+        return {source_key: count for source_key, count in rows}
+
+    def migration_done(self, collection: str, name: str) -> bool:
+        """Return True if the one-off migration ``name`` has completed for ``collection``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM rag_index_migrations WHERE collection = ? AND name = ?",
+                (collection, name),
+            ).fetchone()
+        return row is not None
+
+    def mark_migration(self, collection: str, name: str) -> None:
+        """Record that the one-off migration ``name`` has completed for ``collection``."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rag_index_migrations (collection, name, completed_at) VALUES (?, ?, ?)",
+                (collection, name, datetime.now(timezone.utc).isoformat()),
+            )
+
+    def close(self) -> None:
+        """Close the manifest's database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,250 @@
+"""
+Bulk Indexing Pipeline - Parallel Parse, Batched Embed, Async Write
+
+Producer/consumer pipeline for indexing many SEC filings:
+- Parse: ``extract_sections_from_filing`` runs in a process pool
+- Embed: a single stage accumulates chunks across filings and encodes them in
+  large batches (one ``encode`` call per batch, which the SentenceTransformer
+  sorts by length internally)
+- Write: a background thread upserts embedded batches into Chroma while the
+  next batch is being encoded
+
+Incremental semantics match ``VectorStore.sync_documents``: only chunks not
+yet in the index manifest are embedded, and a filing's manifest entry is
+replaced (dropping orphans) by the writer as soon as the batch holding its
+last new chunk is written, so an interrupted run keeps every finished filing.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .sec_filing_parser import extract_sections_from_filing
+
+LOGGER = logging.getLogger(__name__)
+
+_SENTINEL = object()
+
+
+@dataclass
+class FilingTask:
+    """One filing to parse and index."""
+    source_key: str  # e.g. "sec:<accession>"
+    filing_text: str
+    ticker: str
+    filing_type: str
+    fiscal_year: int
+    source_url: str
+    filing_date: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Extra metadata for every chunk
+
+
+@dataclass
+class PipelineStats:
+    """Throughput of one pipeline run."""
+    filings: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    parse_wait_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.filings / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def parse_filing(task: FilingTask) -> Tuple[str, List[Dict[str, Any]]]:
+    """Parse and chunk one filing (runs in a worker process)."""
+    sections = extract_sections_from_filing(
+        filing_text=task.filing_text,
+        ticker=task.ticker,
+        filing_type=task.filing_type,
+        fiscal_year=task.fiscal_year,
+        source_url=task.source_url,
+        filing_date=task.filing_date,
+    )
+    for section in sections:
+        section["metadata"].update(task.metadata)
+    return task.source_key, sections
+
+
+class IndexingPipeline:
+    """
+    Parallel bulk indexer for a VectorStore collection.
+
+    Filings are consumed lazily from any iterable (a generator that downloads
+    them works), so parsing overlaps with fetching, embedding and writing.
+    """
+
+    def __init__(
+        self,
+        vector_store: Any,
+        *,
+        parse_workers: Optional[int] = None,
+        embed_batch_size: int = 512,
+        model_batch_size: int = 64,
+        max_pending_writes: int = 2,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            vector_store: VectorStore to write into
+            parse_workers: Parser processes (defaults to CPU count - 1, minimum 1)
+            embed_batch_size: Chunks accumulated before each encode call
+            model_batch_size: Batch size passed to the embedding model
+            max_pending_writes: Embedded batches allowed to queue for the writer
+            executor: Executor for parsing (defaults to a spawn-based ProcessPoolExecutor)
+        """
+        self.vector_store = vector_store
+        self.parse_workers = parse_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.embed_batch_size = embed_batch_size
+        self.model_batch_size = model_batch_size
+        self.max_pending_writes = max_pending_writes
+        self._executor = executor
+
+    def run(self, filings: Iterable[FilingTask], collection) -> PipelineStats:
+        """Parse, embed and write ``filings`` into ``collection``."""
+        stats = PipelineStats()
+        start = time.perf_counter()
+        # Workers start lazily from the feeder thread while the writer thread and the embedding
+        # model are live; forking such a multithreaded process can deadlock, so spawn them
+        executor = self._executor or ProcessPoolExecutor(
+            max_workers=self.parse_workers, mp_context=mp.get_context("spawn")
+        )
+        futures: "queue.Queue[Any]" = queue.Queue(maxsize=self.parse_workers * 4)
+        writes: "queue.Queue[Any]" = queue.Queue(maxsize=self.max_pending_writes)
+        write_errors: List[BaseException] = []
+
+        def feed() -> None:
+            # Submitting from a thread lets a slow (e.g. downloading) iterable overlap with parsing
+            try:
+                for task in filings:
+                    futures.put(executor.submit(parse_filing, task))
+            except Exception as e:
+                LOGGER.warning(f"Indexing pipeline input failed: {e}")
+            finally:
+                futures.put(_SENTINEL)
+
+        def write() -> None:
+            while True:
+                item = writes.get()
+                if item is _SENTINEL:
+                    return
+                if write_errors:
+                    continue
+                chunks, finished = item
+                write_start = time.perf_counter()
+                try:
+                    if chunks is not None:
+                        self.vector_store.write_chunks(collection, *chunks)
+                    # Writes are FIFO, so every chunk these filings reference is now stored
+                    for source_key, chunk_ids in finished:
+                        stats.deleted += self.vector_store.finish_sync(source_key, chunk_ids, collection)
+                except Exception as e:
+                    write_errors.append(e)
+                stats.write_seconds += time.perf_counter() - write_start
+
+        feeder = threading.Thread(target=feed, name="index-feed", daemon=True)
+        writer = threading.Thread(target=write, name="index-write", daemon=True)
+        feeder.start()
+        writer.start()
+
+        pending: List[Tuple[str, Dict[str, Any]]] = []  # (chunk id, document) awaiting embedding
+        finished: List[Tuple[str, List[str]]] = []  # (source key, chunk ids) finalised with the next write
+        try:
+            while True:
+                future = futures.get()
+                if future is _SENTINEL:
+                    break
+                parse_start = time.perf_counter()
+                try:
+                    source_key, sections = future.result()
+                except Exception as e:
+                    LOGGER.warning(f"Parsing filing failed: {e}")
+                    stats.failed += 1
+                    continue
+                finally:
+                    stats.parse_wait_seconds += time.perf_counter() - parse_start
+
+                if not sections:
+                    # Keep whatever was indexed before rather than treating the filing as emptied
+                    LOGGER.warning(f"No sections extracted for {source_key}")
+                    stats.failed += 1
+                    continue
+
+                by_id, new_ids = self.vector_store.plan_sync(source_key, sections, collection)
+                stats.filings += 1
+                stats.chunks += len(by_id)
+                stats.unchanged += len(by_id) - len(new_ids)
+                # Another filing in this run may already have queued the same chunk
+                queued = {chunk_id for chunk_id, _ in pending}
+                pending.extend((chunk_id, by_id[chunk_id]) for chunk_id in new_ids if chunk_id not in queued)
+                finished.append((source_key, list(by_id)))
+
+                if len(pending) >= self.embed_batch_size:
+                    stats.embedded += self._embed(pending, finished, writes, stats)
+                    pending, finished = [], []
+                elif not pending:
+                    # Nothing new to embed: finalise once earlier queued writes land
+                    writes.put((None, finished))
+                    finished = []
+
+            if pending or finished:
+                stats.embedded += self._embed(pending, finished, writes, stats)
+        finally:
+            writes.put(_SENTINEL)
+            writer.join()
+            if self._executor is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        feeder.join()
+
+        if write_errors:
+            raise write_errors[0]
+
+        stats.elapsed_seconds = time.perf_counter() - start
+        LOGGER.info(
+            f"Indexed {stats.filings} filings / {stats.chunks} chunks in {stats.elapsed_seconds:.1f}s "
+            f"({stats.embedded} embedded, {stats.unchanged} unchanged, {stats.deleted} deleted)"
+        )
+        return stats
+
+    def _embed(
+        self,
+        pending: List[Tuple[str, Dict[str, Any]]],
+        finished: List[Tuple[str, List[str]]],
+        writes: "queue.Queue[Any]",
+        stats: PipelineStats,
+    ) -> int:
+        """Encode ``pending`` and queue it for writing along with the filings it completes."""
+        if not pending:
+            writes.put((None, finished))
+            return 0
+        embed_start = time.perf_counter()
+        texts = [doc["text"] for _, doc in pending]
+        embeddings = self.vector_store.encode_texts(texts, batch_size=self.model_batch_size)
+        stats.embed_seconds += time.perf_counter() - embed_start
+        chunks = (
+            [chunk_id for chunk_id, _ in pending],
+            texts,
+            [doc.get("metadata", {}) for _, doc in pending],
+            embeddings,
+        )
+        writes.put((chunks, finished))
+        return len(pending)
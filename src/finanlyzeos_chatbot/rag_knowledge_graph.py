@@ -11,11 +11,14 @@ then uses RAG on docs only for explaining those relations.
 
 from __future__ import annotations
 
+import json
 import logging
 import re
+import sqlite3
+import threading
+from pathlib import Path
 from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
 
 LOGGER = logging.getLogger(__name__)
 
@@ -53,40 +56,142 @@ class KnowledgeGraph:
     Stores:
     - Companies and their segments, products, risks, metrics
     - Relations between entities
+    
+    Entities and relations live in SQLite (``kg_entities`` / ``kg_relations``)
+    with adjacency indexes by source, target and relation type, so neighbour
+    lookups and bounded-depth traversals are index probes and the graph
+    persists across processes. Without a database path an in-memory database
+    is used.
     """
     
-    def __init__(self):
-        """Initialize knowledge graph."""
-        self.entities: Dict[str, Entity] = {}
-        self.relations: List[Relation] = []
-        self.graph = None
+    def __init__(self, database_path: Optional[Path] = None):
+        """
+        Initialize knowledge graph.
         
-        if NETWORKX_AVAILABLE:
-            self.graph = nx.DiGraph()
-        else:
-            LOGGER.warning("networkx not available. Install: pip install networkx")
+        Args:
+            database_path: Optional SQLite database for the persistent graph
+        """
+        self.database_path = Path(database_path) if database_path else None
+        self._conn = sqlite3.connect(
+            str(self.database_path) if self.database_path else ":memory:",
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._ensure_table()
     
+    def _ensure_table(self) -> None:
+        """Create entity/relation tables and adjacency indexes if needed."""
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS kg_entities (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    entity_type TEXT NOT NULL,
+                    metadata TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_kg_entities_type ON kg_entities(entity_type);
+                CREATE TABLE IF NOT EXISTS kg_relations (
+                    source_id TEXT NOT NULL,
+                    target_id TEXT NOT NULL,
+                    relation_type TEXT NOT NULL,
+                    document_id TEXT NOT NULL DEFAULT '',
+                    metadata TEXT,
+                    PRIMARY KEY (source_id, relation_type, target_id, document_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_kg_relations_target
+                    ON kg_relations(target_id, relation_type);
+                CREATE INDEX IF NOT EXISTS idx_kg_relations_type
+                    ON kg_relations(relation_type, source_id);
+                CREATE INDEX IF NOT EXISTS idx_kg_relations_document
+                    ON kg_relations(document_id);
+                """
+            )
+    
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
     def add_entity(self, entity: Entity):
-        """Add entity to graph."""
-        self.entities[entity.id] = entity
-        if self.graph:
-            self.graph.add_node(entity.id, **entity.metadata)
+        """Add (or update) an entity."""
+        self.add_entities([entity])
+    
+    def add_entities(self, entities: List[Entity]) -> None:
+        """Add or update several entities in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kg_entities (id, name, entity_type, metadata) VALUES (?, ?, ?, ?)",
+                [(e.id, e.name, e.entity_type, json.dumps(e.metadata)) for e in entities],
+            )
     
     def add_relation(self, relation: Relation):
-        """Add relation to graph."""
-        self.relations.append(relation)
-        if self.graph:
-            self.graph.add_edge(
-                relation.source_id,
-                relation.target_id,
-                relation_type=relation.relation_type,
-                **relation.metadata,
+        """Add relation to graph (duplicates from the same document are ignored)."""
+        self.add_relations([relation])
+    
+    def add_relations(self, relations: List[Relation]) -> None:
+        """Add several relations in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO kg_relations (source_id, target_id, relation_type, document_id, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        r.source_id,
+                        r.target_id,
+                        r.relation_type,
+                        str(r.metadata.get("document_id") or ""),
+                        json.dumps(r.metadata),
+                    )
+                    for r in relations
+                ],
             )
     
+    def remove_document(self, document_id: str) -> int:
+        """Drop relations extracted from ``document_id``; returns the number removed."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM kg_relations WHERE document_id = ?", (document_id,))
+        return cursor.rowcount
+    
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    @property
+    def entities(self) -> Dict[str, Entity]:
+        """All entities keyed by id (reads the store; not for hot paths)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, name, entity_type, metadata FROM kg_entities").fetchall()
+        return {
+            entity_id: Entity(id=entity_id, name=name, entity_type=entity_type, metadata=json.loads(metadata or "{}"))
+            for entity_id, name, entity_type, metadata in rows
+        }
+    
+    @property
+    def relations(self) -> List[Relation]:
+        """All relations (reads the store; not for hot paths)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_id, target_id, relation_type, metadata FROM kg_relations"
+            ).fetchall()
+        return [
+            Relation(source_id=source, target_id=target, relation_type=rel_type, metadata=json.loads(metadata or "{}"))
+            for source, target, rel_type, metadata in rows
+        ]
+    
+    def get_entity(self, entity_id: str) -> Optional[Entity]:
+        """Return a single entity or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, entity_type, metadata FROM kg_entities WHERE id = ?", (entity_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Entity(id=entity_id, name=row[0], entity_type=row[1], metadata=json.loads(row[2] or "{}"))
+    
     def get_related_entities(
         self,
         entity_id: str,
         relation_type: Optional[str] = None,
+        *,
+        direction: str = "out",
     ) -> List[str]:
         """
         Get entities related to given entity.
@@ -94,33 +199,57 @@ class KnowledgeGraph:
         Args:
             entity_id: Entity ID
             relation_type: Optional relation type filter
+            direction: "out" for targets of the entity, "in" for its sources
         
         Returns:
             List of related entity IDs
         """
-        if not self.graph:
-            # Fallback: use relations list
-            related = []
-            for rel in self.relations:
-                if rel.source_id == entity_id:
-                    if relation_type is None or rel.relation_type == relation_type:
-                        related.append(rel.target_id)
-            return related
-        
-        # Use networkx
-        if entity_id not in self.graph:
-            return []
+        return sorted(self._neighbours([entity_id], relation_type, direction))
+    
+    def _neighbours(self, entity_ids: List[str], relation_type: Optional[str], direction: str) -> Set[str]:
+        if not entity_ids:
+            return set()
+        near, far = ("source_id", "target_id") if direction == "out" else ("target_id", "source_id")
+        placeholders = ", ".join("?" for _ in entity_ids)
+        sql = f"SELECT DISTINCT {far} FROM kg_relations WHERE {near} IN ({placeholders})"
+        params: List[Any] = list(entity_ids)
+        if relation_type is not None:
+            sql += " AND relation_type = ?"
+            params.append(relation_type)
+        with self._lock:
+            return {row[0] for row in self._conn.execute(sql, params)}
+    
+    def traverse(
+        self,
+        start_ids: List[str],
+        *,
+        max_depth: int = 2,
+        relation_type: Optional[str] = None,
+        direction: str = "out",
+        limit: int = 500,
+    ) -> Dict[str, int]:
+        """
+        Breadth-first traversal from ``start_ids`` up to ``max_depth`` hops.
         
-        related = []
-        for target_id in self.graph.successors(entity_id):
-            if relation_type is None:
-                related.append(target_id)
-            else:
-                edge_data = self.graph[entity_id][target_id]
-                if edge_data.get("relation_type") == relation_type:
-                    related.append(target_id)
+        Each level is a single indexed query over the current frontier.
         
-        return related
+        Returns:
+            Mapping of reached entity ID to its hop distance (start nodes excluded)
+        """
+        seen: Set[str] = set(start_ids)
+        reached: Dict[str, int] = {}
+        frontier = list(start_ids)
+        for depth in range(1, max_depth + 1):
+            next_ids = self._neighbours(frontier, relation_type, direction) - seen
+            if not next_ids:
+                break
+            for entity_id in sorted(next_ids):
+                if len(reached) >= limit:
+                    return reached
+                reached[entity_id] = depth
+            seen |= next_ids
+            frontier = list(next_ids)
+        return reached
     
     def find_common_entities(
         self,
@@ -137,18 +266,41 @@ class KnowledgeGraph:
         Returns:
             List of common related entity IDs
         """
-        if not entity_ids:
+        unique_ids = list(dict.fromkeys(entity_ids))
+        if not unique_ids:
             return []
         
-        # Get related entities for each
-        all_related = []
-        for entity_id in entity_ids:
-            related = self.get_related_entities(entity_id, relation_type)
-            all_related.append(set(related))
-        
-        # Find intersection
-        common = set.intersection(*all_related) if all_related else set()
-        return list(common)
+        placeholders = ", ".join("?" for _ in unique_ids)
+        sql = f"SELECT target_id FROM kg_relations WHERE source_id IN ({placeholders})"
+        params: List[Any] = list(unique_ids)
+        if relation_type is not None:
+            sql += " AND relation_type = ?"
+            params.append(relation_type)
+        sql += " GROUP BY target_id HAVING COUNT(DISTINCT source_id) = ? ORDER BY target_id"
+        params.append(len(unique_ids))
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+    
+    def to_networkx(self):
+        """Export the graph as a ``networkx.DiGraph`` (requires networkx)."""
+        if not NETWORKX_AVAILABLE:
+            raise ImportError("networkx not available. Install: pip install networkx")
+        graph = nx.DiGraph()
+        for entity in self.entities.values():
+            graph.add_node(entity.id, **entity.metadata)
+        for relation in self.relations:
+            graph.add_edge(
+                relation.source_id,
+                relation.target_id,
+                relation_type=relation.relation_type,
+                **relation.metadata,
+            )
+        return graph
+    
+    def close(self) -> None:
+        """Close the graph's database connection."""
+        with self._lock:
+            self._conn.close()
     
     def extract_from_document(
         self,
@@ -159,6 +311,10 @@ class KnowledgeGraph:
         """
         Extract entities and relations from document text.
         
+        When ``metadata`` carries a ``document_id`` (or ``filing_id``), relations
+        previously extracted from that document are replaced, so re-indexing a
+        filing updates the graph incrementally.
+        
         Args:
             text: Document text
             ticker: Ticker symbol
@@ -166,16 +322,17 @@ class KnowledgeGraph:
         """
         # Simple extraction (can be enhanced with NER)
         ticker_upper = ticker.upper()
+        document_id = metadata.get("document_id") or metadata.get("filing_id")
         
         # Add company entity
         company_id = f"company_{ticker_upper}"
-        if company_id not in self.entities:
-            self.add_entity(Entity(
-                id=company_id,
-                name=ticker_upper,
-                entity_type="company",
-                metadata={"ticker": ticker_upper},
-            ))
+        entities = [Entity(
+            id=company_id,
+            name=ticker_upper,
+            entity_type="company",
+            metadata={"ticker": ticker_upper},
+        )]
+        relations = []
         
         # Extract segments (simple pattern matching)
         segment_patterns = [
@@ -189,23 +346,32 @@ class KnowledgeGraph:
                 segment_name = match.group(1).strip()
                 segment_id = f"segment_{ticker_upper}_{segment_name.lower().replace(' ', '_')}"
                 
-                if segment_id not in self.entities:
-                    self.add_entity(Entity(
-                        id=segment_id,
-                        name=segment_name,
-                        entity_type="segment",
-                        metadata={"ticker": ticker_upper},
-                    ))
+                entities.append(Entity(
+                    id=segment_id,
+                    name=segment_name,
+                    entity_type="segment",
+                    metadata={"ticker": ticker_upper},
+                ))
                 
                 # Add relation
-                self.add_relation(Relation(
+                relation_metadata: Dict[str, Any] = {"source": "document"}
+                if document_id:
+                    relation_metadata["document_id"] = document_id
+                relations.append(Relation(
                     source_id=company_id,
                     target_id=segment_id,
                     relation_type="has_segment",
-                    metadata={"source": "document"},
+                    metadata=relation_metadata,
                 ))
         
-        LOGGER.debug(f"Extracted entities and relations from document for {ticker_upper}")
+        if document_id:
+            self.remove_document(str(document_id))
+        self.add_entities(entities)
+        self.add_relations(relations)
+        
+        LOGGER.debug(
+            f"Extracted {len(entities)} entities and {len(relations)} relations from document for {ticker_upper}"
+        )
 
 
 class KGRAGHybrid:
@@ -221,6 +387,7 @@ class KGRAGHybrid:
         self,
         knowledge_graph: KnowledgeGraph,
         rag_retriever: Any,  # RAGRetriever
+        max_depth: int = 1,
     ):
         """
         Initialize KG+RAG hybrid.
@@ -228,9 +395,11 @@ class KGRAGHybrid:
         Args:
             knowledge_graph: KnowledgeGraph instance
             rag_retriever: RAGRetriever instance
+            max_depth: Hops followed from each company when collecting candidates
         """
         self.kg = knowledge_graph
         self.rag_retriever = rag_retriever
+        self.max_depth = max_depth
     
     def is_relationship_query(self, query: str) -> bool:
         """Check if query is asking about relationships."""
@@ -260,11 +429,11 @@ class KGRAGHybrid:
             # Not a relationship query - use RAG only
             return [], []
         
-        # Query KG for candidate entities
+        # Query KG for candidate entities (bounded-depth traversal over the adjacency index)
         kg_entities = []
         for ticker in tickers:
             company_id = f"company_{ticker.upper()}"
-            related = self.kg.get_related_entities(company_id)
+            related = self.kg.traverse([company_id], max_depth=self.max_depth)
             kg_entities.extend(related)
         
         # If multiple tickers, find common entities
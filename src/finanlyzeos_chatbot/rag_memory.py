@@ -10,8 +10,13 @@ Implements per-conversation, per-user document tracking and clustering:
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
-from typing import List, Dict, Any, Optional, Set
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -50,19 +55,117 @@ class MemoryAugmentedRAG:
     Memory-augmented RAG for uploaded documents.
     
     Tracks documents per conversation/user and provides topic clustering.
+    
+    State lives in SQLite (``rag_memory_*`` tables) indexed by conversation,
+    user, upload time and last access, so lookups are per-conversation index
+    probes and every process sees the same memory. Topic clusters are updated
+    incrementally as documents are retrieved, and an optional background sweep
+    drops stale documents from the clusters. Without a database path an
+    in-memory database is used.
     """
     
-    def __init__(self, document_lifetime_days: int = 90):
+    # Simple keyword-based clustering (can be enhanced with LDA, BERTopic, etc.)
+    TOPIC_KEYWORDS = {
+        "financial_metrics": ["revenue", "earnings", "profit", "margin", "ebitda"],
+        "risk_analysis": ["risk", "uncertainty", "volatility", "exposure"],
+        "forecasting": ["forecast", "projection", "outlook", "future"],
+        "governance": ["board", "executive", "compensation", "governance"],
+        "operations": ["operations", "business", "segment", "product"],
+    }
+    
+    def __init__(
+        self,
+        document_lifetime_days: int = 90,
+        *,
+        database_path: Optional[Path] = None,
+        sweep_interval_seconds: Optional[float] = None,
+    ):
         """
         Initialize memory-augmented RAG.
         
         Args:
             document_lifetime_days: Days before documents are considered stale (default 90)
+            database_path: Optional SQLite database shared across processes
+            sweep_interval_seconds: Run :meth:`sweep_stale` on a background thread at this interval
         """
         self.document_lifetime = timedelta(days=document_lifetime_days)
-        self.conversation_memories: Dict[str, ConversationMemory] = {}
-        self.user_memories: Dict[str, Set[str]] = defaultdict(set)  # user_id -> conversation_ids
-        self.document_registry: Dict[str, DocumentMemory] = {}
+        self.database_path = Path(database_path) if database_path else None
+        self._conn = sqlite3.connect(
+            str(self.database_path) if self.database_path else ":memory:",
+            check_same_thread=False,
+            timeout=30,
+        )
+        self._lock = threading.Lock()
+        self._ensure_table()
+        
+        self._sweep_stop = threading.Event()
+        self._sweep_thread: Optional[threading.Thread] = None
+        if sweep_interval_seconds:
+            self.start_sweeper(sweep_interval_seconds)
+    
+    def _ensure_table(self) -> None:
+        """Create memory tables and indexes if they do not exist."""
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS rag_memory_documents (
+                    document_id TEXT PRIMARY KEY,
+                    conversation_id TEXT,
+                    user_id TEXT,
+                    filename TEXT NOT NULL,
+                    uploaded_at TEXT NOT NULL,
+                    last_accessed TEXT NOT NULL,
+                    access_count INTEGER NOT NULL DEFAULT 0,
+                    chunk_ids TEXT NOT NULL DEFAULT '[]'
+                );
+                CREATE INDEX IF NOT EXISTS idx_rag_memory_documents_conversation
+                    ON rag_memory_documents(conversation_id, uploaded_at);
+                CREATE INDEX IF NOT EXISTS idx_rag_memory_documents_user
+                    ON rag_memory_documents(user_id, uploaded_at);
+                CREATE INDEX IF NOT EXISTS idx_rag_memory_documents_uploaded
+                    ON rag_memory_documents(uploaded_at);
+                CREATE INDEX IF NOT EXISTS idx_rag_memory_documents_accessed
+                    ON rag_memory_documents(last_accessed);
+                CREATE TABLE IF NOT EXISTS rag_memory_conversations (
+                    conversation_id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    created_at TEXT NOT NULL,
+                    last_accessed TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_rag_memory_conversations_user
+                    ON rag_memory_conversations(user_id);
+                CREATE TABLE IF NOT EXISTS rag_memory_topics (
+                    conversation_id TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    document_id TEXT NOT NULL,
+                    PRIMARY KEY (conversation_id, topic, document_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_rag_memory_topics_document
+                    ON rag_memory_topics(document_id);
+                """
+            )
+    
+    def _stale_cutoff(self) -> str:
+        return (datetime.now() - self.document_lifetime).isoformat()
+    
+    @staticmethod
+    def _row_to_memory(row: Tuple[Any, ...], topics: Optional[List[str]] = None) -> DocumentMemory:
+        document_id, conversation_id, user_id, filename, uploaded_at, last_accessed, access_count, chunk_ids = row
+        return DocumentMemory(
+            document_id=document_id,
+            conversation_id=conversation_id,
+            user_id=user_id,
+            filename=filename,
+            uploaded_at=datetime.fromisoformat(uploaded_at),
+            last_accessed=datetime.fromisoformat(last_accessed),
+            access_count=access_count,
+            topics=topics or [],
+            chunk_ids=json.loads(chunk_ids or "[]"),
+        )
+    
+    _DOCUMENT_COLUMNS = (
+        "document_id, conversation_id, user_id, filename, uploaded_at, last_accessed, access_count, chunk_ids"
+    )
     
     def register_document(
         self,
@@ -84,35 +187,32 @@ class MemoryAugmentedRAG:
             chunk_ids: List of chunk IDs in vector store
             uploaded_at: Upload timestamp (defaults to now)
         """
-        now = uploaded_at or datetime.now()
-        
-        memory = DocumentMemory(
-            document_id=document_id,
-            conversation_id=conversation_id,
-            user_id=user_id,
-            filename=filename,
-            uploaded_at=now,
-            last_accessed=now,
-            chunk_ids=chunk_ids,
-        )
+        uploaded_at = uploaded_at or datetime.now()
+        if uploaded_at.tzinfo is not None:
+            # Stored as naive local time so staleness comparisons are plain string ranges
+            uploaded_at = uploaded_at.astimezone().replace(tzinfo=None)
+        now = uploaded_at.isoformat()
         
-        self.document_registry[document_id] = memory
-        
-        # Add to conversation memory
-        if conversation_id:
-            if conversation_id not in self.conversation_memories:
-                self.conversation_memories[conversation_id] = ConversationMemory(
-                    conversation_id=conversation_id,
-                    documents=[],
-                    created_at=now,
-                    last_accessed=now,
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""
+                INSERT OR REPLACE INTO rag_memory_documents ({self._DOCUMENT_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+                """,
+                (document_id, conversation_id, user_id, filename, now, now, json.dumps(chunk_ids)),
+            )
+            # Add to conversation memory and track user conversations
+            if conversation_id:
+                self._conn.execute(
+                    """
+                    INSERT INTO rag_memory_conversations (conversation_id, user_id, created_at, last_accessed)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(conversation_id) DO UPDATE SET
+                        last_accessed = excluded.last_accessed,
+                        user_id = COALESCE(rag_memory_conversations.user_id, excluded.user_id)
+                    """,
+                    (conversation_id, user_id, now, now),
                 )
-            self.conversation_memories[conversation_id].documents.append(memory)
-            self.conversation_memories[conversation_id].last_accessed = now
-        
-        # Track user conversations
-        if user_id and conversation_id:
-            self.user_memories[user_id].add(conversation_id)
         
         LOGGER.debug(f"Registered document {document_id} in conversation {conversation_id}")
     
@@ -122,13 +222,37 @@ class MemoryAugmentedRAG:
         conversation_id: Optional[str] = None,
     ) -> None:
         """Update document access timestamp and count."""
-        if document_id in self.document_registry:
-            memory = self.document_registry[document_id]
-            memory.last_accessed = datetime.now()
-            memory.access_count += 1
-            
-            if conversation_id and conversation_id in self.conversation_memories:
-                self.conversation_memories[conversation_id].last_accessed = datetime.now()
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE rag_memory_documents SET last_accessed = ?, access_count = access_count + 1 "
+                "WHERE document_id = ?",
+                (now, document_id),
+            )
+            if conversation_id:
+                self._conn.execute(
+                    "UPDATE rag_memory_conversations SET last_accessed = ? WHERE conversation_id = ?",
+                    (now, conversation_id),
+                )
+    
+    def _fetch_documents(self, where: str, params: Tuple[Any, ...], include_stale: bool) -> List[DocumentMemory]:
+        sql = f"SELECT {self._DOCUMENT_COLUMNS} FROM rag_memory_documents WHERE {where}"
+        if not include_stale:
+            sql += " AND uploaded_at > ?"
+            params = params + (self._stale_cutoff(),)
+        sql += " ORDER BY uploaded_at"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            topics: Dict[str, List[str]] = defaultdict(list)
+            if rows:
+                placeholders = ", ".join("?" for _ in rows)
+                for document_id, topic in self._conn.execute(
+                    f"SELECT DISTINCT document_id, topic FROM rag_memory_topics "
+                    f"WHERE document_id IN ({placeholders}) ORDER BY topic",
+                    [row[0] for row in rows],
+                ):
+                    topics[document_id].append(topic)
+        return [self._row_to_memory(row, topics.get(row[0])) for row in rows]
     
     def get_conversation_documents(
         self,
@@ -145,19 +269,7 @@ class MemoryAugmentedRAG:
         Returns:
             List of DocumentMemory entries
         """
-        if conversation_id not in self.conversation_memories:
-            return []
-        
-        memory = self.conversation_memories[conversation_id]
-        now = datetime.now()
-        
-        documents = []
-        for doc in memory.documents:
-            age = now - doc.uploaded_at
-            if include_stale or age < self.document_lifetime:
-                documents.append(doc)
-        
-        return documents
+        return self._fetch_documents("conversation_id = ?", (conversation_id,), include_stale)
     
     def get_user_documents(
         self,
@@ -174,14 +286,12 @@ class MemoryAugmentedRAG:
         Returns:
             List of DocumentMemory entries
         """
-        conversation_ids = self.user_memories.get(user_id, set())
-        all_docs = []
-        
-        for conv_id in conversation_ids:
-            docs = self.get_conversation_documents(conv_id, include_stale)
-            all_docs.extend(docs)
-        
-        return all_docs
+        return self._fetch_documents(
+            "(user_id = ? OR conversation_id IN "
+            "(SELECT conversation_id FROM rag_memory_conversations WHERE user_id = ?))",
+            (user_id, user_id),
+            include_stale,
+        )
     
     def cluster_documents_by_topic(
         self,
@@ -191,43 +301,47 @@ class MemoryAugmentedRAG:
         """
         Cluster documents by topic (simplified - can be enhanced with topic modeling).
         
+        Assignments for ``documents`` are added to the conversation's stored
+        clusters rather than recomputing them from scratch.
+        
         Args:
             conversation_id: Conversation ID
             documents: Retrieved documents
         
         Returns:
-            Dictionary mapping topic -> list of document IDs
+            Dictionary mapping topic -> list of document IDs for the conversation
         """
-        # Simple keyword-based clustering (can be enhanced with LDA, BERTopic, etc.)
-        topic_keywords = {
-            "financial_metrics": ["revenue", "earnings", "profit", "margin", "ebitda"],
-            "risk_analysis": ["risk", "uncertainty", "volatility", "exposure"],
-            "forecasting": ["forecast", "projection", "outlook", "future"],
-            "governance": ["board", "executive", "compensation", "governance"],
-            "operations": ["operations", "business", "segment", "product"],
-        }
-        
-        clusters: Dict[str, List[str]] = defaultdict(list)
-        
+        assignments = []
         for doc in documents:
             text_lower = doc.text.lower()
             doc_id = doc.metadata.get("document_id") or doc.metadata.get("filename", "unknown")
             
             # Assign to topic based on keywords
-            assigned = False
-            for topic, keywords in topic_keywords.items():
-                if any(keyword in text_lower for keyword in keywords):
-                    clusters[topic].append(doc_id)
-                    assigned = True
-                    break
-            
-            if not assigned:
-                clusters["general"].append(doc_id)
+            topic = next(
+                (name for name, keywords in self.TOPIC_KEYWORDS.items() if any(k in text_lower for k in keywords)),
+                "general",
+            )
+            assignments.append((conversation_id, topic, doc_id))
         
-        # Update conversation memory
-        if conversation_id in self.conversation_memories:
-            self.conversation_memories[conversation_id].topic_clusters = dict(clusters)
+        if assignments:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO rag_memory_topics (conversation_id, topic, document_id) VALUES (?, ?, ?)",
+                    assignments,
+                )
         
+        return self.get_topic_clusters(conversation_id)
+    
+    def get_topic_clusters(self, conversation_id: str) -> Dict[str, List[str]]:
+        """Return the stored topic -> document IDs clusters for a conversation."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic, document_id FROM rag_memory_topics WHERE conversation_id = ? ORDER BY topic, document_id",
+                (conversation_id,),
+            ).fetchall()
+        clusters: Dict[str, List[str]] = defaultdict(list)
+        for topic, document_id in rows:
+            clusters[topic].append(document_id)
         return dict(clusters)
     
     def get_stale_documents(self, conversation_id: Optional[str] = None) -> List[str]:
@@ -240,20 +354,65 @@ class MemoryAugmentedRAG:
         Returns:
             List of stale document IDs
         """
-        now = datetime.now()
-        stale = []
-        
+        sql = "SELECT document_id FROM rag_memory_documents WHERE uploaded_at <= ?"
+        params: Tuple[Any, ...] = (self._stale_cutoff(),)
         if conversation_id:
-            docs = self.get_conversation_documents(conversation_id, include_stale=True)
-            for doc in docs:
-                if now - doc.uploaded_at > self.document_lifetime:
-                    stale.append(doc.document_id)
-        else:
-            for doc_id, doc in self.document_registry.items():
-                if now - doc.uploaded_at > self.document_lifetime:
-                    stale.append(doc_id)
+            sql += " AND conversation_id = ?"
+            params += (conversation_id,)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+    
+    def sweep_stale(self, *, purge_after_days: Optional[int] = None) -> int:
+        """
+        Drop stale documents from topic clusters (and optionally purge old rows).
         
-        return stale
+        Args:
+            purge_after_days: Also delete documents older than lifetime + this many days
+        
+        Returns:
+            Number of topic assignments removed
+        """
+        cutoff = self._stale_cutoff()
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM rag_memory_topics WHERE document_id IN "
+                "(SELECT document_id FROM rag_memory_documents WHERE uploaded_at <= ?)",
+                (cutoff,),
+            ).rowcount
+            if purge_after_days is not None:
+                purge_cutoff = (datetime.now() - self.document_lifetime - timedelta(days=purge_after_days)).isoformat()
+                self._conn.execute("DELETE FROM rag_memory_documents WHERE uploaded_at <= ?", (purge_cutoff,))
+        if removed:
+            LOGGER.debug(f"Memory sweep removed {removed} stale topic assignments")
+        return removed
+    
+    def start_sweeper(self, interval_seconds: float) -> None:
+        """Run :meth:`sweep_stale` every ``interval_seconds`` on a daemon thread."""
+        if self._sweep_thread and self._sweep_thread.is_alive():
+            return
+        self._sweep_stop.clear()
+        
+        def _loop() -> None:
+            while not self._sweep_stop.wait(interval_seconds):
+                try:
+                    self.sweep_stale()
+                except sqlite3.Error as e:
+                    LOGGER.warning(f"Memory sweep failed: {e}")
+        
+        self._sweep_thread = threading.Thread(target=_loop, name="rag-memory-sweep", daemon=True)
+        self._sweep_thread.start()
+    
+    def stop_sweeper(self) -> None:
+        """Stop the background sweep thread, if running."""
+        self._sweep_stop.set()
+    
+    def close(self) -> None:
+        """Stop the sweeper and close the database connection."""
+        self.stop_sweeper()
+        if self._sweep_thread is not None:
+            self._sweep_thread.join(timeout=5)
+        with self._lock:
+            self._conn.close()
     
     def get_memory_stats(self, conversation_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -265,19 +424,56 @@ class MemoryAugmentedRAG:
         Returns:
             Dictionary with memory stats
         """
+        cutoff = self._stale_cutoff()
         if conversation_id:
-            docs = self.get_conversation_documents(conversation_id, include_stale=True)
+            with self._lock:
+                total, stale = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(uploaded_at <= ?), 0) FROM rag_memory_documents "
+                    "WHERE conversation_id = ?",
+                    (cutoff, conversation_id),
+                ).fetchone()
             return {
                 "conversation_id": conversation_id,
-                "total_documents": len(docs),
-                "active_documents": len([d for d in docs if (datetime.now() - d.uploaded_at) < self.document_lifetime]),
-                "stale_documents": len([d for d in docs if (datetime.now() - d.uploaded_at) >= self.document_lifetime]),
-                "topic_clusters": self.conversation_memories.get(conversation_id, ConversationMemory("", [], datetime.now(), datetime.now())).topic_clusters,
-            }
-        else:
-            return {
-                "total_documents": len(self.document_registry),
-                "total_conversations": len(self.conversation_memories),
-                "total_users": len(self.user_memories),
+                "total_documents": total,
+                "active_documents": total - stale,
+                "stale_documents": stale,
+                "topic_clusters": self.get_topic_clusters(conversation_id),
             }
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM rag_memory_documents").fetchone()[0]
+            conversations = self._conn.execute("SELECT COUNT(*) FROM rag_memory_conversations").fetchone()[0]
+            users = self._conn.execute(
+                "SELECT COUNT(DISTINCT user_id) FROM rag_memory_conversations WHERE user_id IS NOT NULL"
+            ).fetchone()[0]
+        return {
+            "total_documents": documents,
+            "total_conversations": conversations,
+            "total_users": users,
+        }
+
+
+_MEMORY_STORES: Dict[str, MemoryAugmentedRAG] = {}
+_MEMORY_STORES_LOCK = threading.Lock()
+
+
+def get_memory_store(database_path: Path, *, sweep_interval_seconds: float = 3600.0) -> MemoryAugmentedRAG:
+    """Return the process-wide memory store for ``database_path`` (with its stale sweep running)."""
+    key = str(Path(database_path).resolve())
+    with _MEMORY_STORES_LOCK:
+        store = _MEMORY_STORES.get(key)
+        if store is None:
+            store = MemoryAugmentedRAG(database_path=database_path, sweep_interval_seconds=sweep_interval_seconds)
+            _MEMORY_STORES[key] = store
+        return store
+
+
+def close_memory_stores() -> None:
+    """Close every process-wide memory store (run at interpreter exit)."""
+    with _MEMORY_STORES_LOCK:
+        stores = list(_MEMORY_STORES.values())
+        _MEMORY_STORES.clear()
+    for store in stores:
+        store.close()
+
 
+atexit.register(close_memory_stores)
@@ -18,12 +18,12 @@ from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
 from .rag_retriever import RAGRetriever, RetrievalResult
-from .rag_reranker import Reranker
+from .rag_reranker import get_shared_reranker
 from .rag_observability import RAGObserver, RAGGuardrails
 from .rag_controller import RAGController, QueryComplexity
 from .rag_fusion import SourceFusion
 from .rag_grounded_decision import GroundedDecisionLayer
-from .rag_memory import MemoryAugmentedRAG
+from .rag_memory import get_memory_store
 from .rag_prompt_template import build_rag_prompt
 from .parsing.parse import parse_to_structured
 from .rag_intent_policies import IntentPolicyManager, RetrievalIntent
@@ -97,22 +97,22 @@ class RAGOrchestrator:
             analytics_engine,
             use_hybrid_retrieval=use_hybrid_retrieval,
         )
-        self.reranker = Reranker(use_reranking=use_reranking) if use_reranking else None
+        self.reranker = get_shared_reranker() if use_reranking else None
         self.observer = RAGObserver(RAGGuardrails(min_relevance_score=0.25))
         self.controller = RAGController(self.retriever) if use_multi_hop else None
         self.fusion = SourceFusion() if use_fusion else None
         self.grounded_decision = GroundedDecisionLayer() if use_grounded_decision else None
-        self.memory = MemoryAugmentedRAG() if use_memory else None
+        self.memory = get_memory_store(database_path) if use_memory else None
         
         # Initialize advanced features
         self.intent_manager = IntentPolicyManager() if use_intent_policies else None
         self.temporal_parser = TemporalQueryParser() if use_temporal else None
         self.claim_verifier = ClaimVerifier(llm_client) if use_claim_verification else None
         self.structure_parser = StructureAwareParser() if use_structure_aware else None
-        self.table_retriever = TableAwareRetriever(self.structure_parser) if use_structure_aware else None
-        self.feedback_collector = FeedbackCollector() if use_feedback else None
+        self.table_retriever = TableAwareRetriever(self.structure_parser, database_path) if use_structure_aware else None
+        self.feedback_collector = FeedbackCollector(database_path=database_path) if use_feedback else None
         self.score_calibrator = ScoreCalibrator(self.feedback_collector) if use_feedback else None
-        self.knowledge_graph = KnowledgeGraph() if use_knowledge_graph else None
+        self.knowledge_graph = KnowledgeGraph(database_path) if use_knowledge_graph else None
         self.kg_rag_hybrid = KGRAGHybrid(self.knowledge_graph, self.retriever) if (use_knowledge_graph and self.knowledge_graph) else None
         
         # Feature flags
@@ -206,7 +206,11 @@ class RAGOrchestrator:
                 table_data = self.table_retriever.retrieve_tables(
                     query,
                     ticker=tickers[0] if tickers else None,
-                    period=None,  # Could extract from time_filter
+                    period=(
+                        f"FY{time_filter.fiscal_years[0]}"
+                        if time_filter and time_filter.fiscal_years and len(time_filter.fiscal_years) == 1
+                        else None
+                    ),
                 )
                 LOGGER.info(f"Table query detected: retrieved {len(table_data)} tables")
         
@@ -421,11 +425,17 @@ class RAGOrchestrator:
         # Extract document IDs and scores
         doc_ids = []
         doc_scores = []
-        
-        for doc in retrieval_result.sec_narratives + retrieval_result.uploaded_docs:
-            doc_id = doc.metadata.get("document_id") or doc.metadata.get("filing_id") or "unknown"
-            doc_ids.append(doc_id)
-            doc_scores.append(doc.score or 0.0)
+        source_types = []
+        
+        for source_type, docs in (
+            ("sec_narratives", retrieval_result.sec_narratives),
+            ("uploaded_docs", retrieval_result.uploaded_docs),
+        ):
+            for doc in docs:
+                doc_id = doc.metadata.get("document_id") or doc.metadata.get("filing_id") or "unknown"
+                doc_ids.append(doc_id)
+                doc_scores.append(doc.score or 0.0)
+                source_types.append(source_type)
         
         # Record feedback
         from .rag_feedback import FeedbackLabel
@@ -440,9 +450,17 @@ class RAGOrchestrator:
             user_id=user_id,
             conversation_id=conversation_id,
             reason=reason,
+            source_types=source_types,
         )
         
         # Update score calibrator
         if self.score_calibrator:
             self.score_calibrator.update_from_feedback()
-
+    
+    def close(self) -> None:
+        """Release the SQLite connections held by this orchestrator's components."""
+        self.retriever.close()
+        if self.table_retriever:
+            self.table_retriever.close()
+        if self.knowledge_graph:
+            self.knowledge_graph.close()
@@ -9,7 +9,12 @@ Implements reranking stage for production-grade RAG:
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import re
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
@@ -17,6 +22,8 @@ from .rag_retriever import RetrievedDocument
 
 LOGGER = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"\w+")
+
 # Optional imports for reranking
 try:
     from sentence_transformers import CrossEncoder
@@ -39,13 +46,24 @@ class Reranker:
     Reranker for retrieved documents.
     
     Uses cross-encoder to score (query, document) pairs for true relevance.
-    More accurate than bi-encoder cosine similarity but slower.
+    More accurate than bi-encoder cosine similarity but slower, so candidates
+    are deduplicated and capped per source before scoring, all pairs of a
+    request are scored in one length-bucketed batch, and pair scores are
+    cached by (query hash, source, document id, chunk id). The instance is
+    shared across requests, so per-call statistics go to the ``stats`` dict
+    a caller passes in rather than onto the reranker.
     """
     
     def __init__(
         self,
         model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         use_reranking: bool = True,
+        *,
+        max_candidates_per_source: Optional[int] = 20,
+        dedup_threshold: float = 0.9,
+        batch_size: int = 32,
+        score_cache_size: int = 4096,
+        model: Optional[Any] = None,
     ):
         """
         Initialize reranker.
@@ -53,7 +71,24 @@ class Reranker:
         Args:
             model_name: Cross-encoder model for reranking
             use_reranking: Whether to enable reranking (can be disabled for speed)
+            max_candidates_per_source: Candidates kept per source before scoring (None = all)
+            dedup_threshold: Token Jaccard similarity above which chunks count as duplicates
+            batch_size: Cross-encoder batch size
+            score_cache_size: Max cached (query, chunk) scores
+            model: Preloaded cross-encoder (anything with ``predict(pairs, batch_size=...)``)
         """
+        self.max_candidates_per_source = max_candidates_per_source
+        self.dedup_threshold = dedup_threshold
+        self.batch_size = batch_size
+        self.score_cache_size = score_cache_size
+        self._score_cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        if model is not None:
+            self.use_reranking = use_reranking
+            self.model = model
+            return
+        
         self.use_reranking = use_reranking and CROSS_ENCODER_AVAILABLE
         
         if self.use_reranking:
@@ -70,57 +105,146 @@ class Reranker:
             if not CROSS_ENCODER_AVAILABLE:
                 LOGGER.debug("Cross-encoder not available. Install: pip install sentence-transformers")
     
-    def rerank(
+    # ------------------------------------------------------------------
+    # Candidate pruning
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _chunk_key(doc: RetrievedDocument) -> str:
+        # Chunk IDs are only unique within a source and document, so both are part of the key
+        metadata = doc.metadata or {}
+        chunk_id = metadata.get("chunk_id") or hashlib.sha1(doc.text.encode("utf-8")).hexdigest()
+        return f"{doc.source_type}|{metadata.get('document_id') or ''}|{chunk_id}"
+    
+    def deduplicate(self, documents: List[RetrievedDocument]) -> List[RetrievedDocument]:
+        """
+        Drop near-identical chunks, keeping the first (best first-stage) occurrence.
+        
+        Exact duplicates (after whitespace/case normalisation) are removed by
+        hash; the rest are compared by token-set Jaccard similarity.
+        """
+        kept: List[RetrievedDocument] = []
+        kept_tokens: List[frozenset] = []
+        seen: set = set()
+        for doc in documents:
+            normalized = " ".join(_TOKEN_RE.findall(doc.text.lower()))
+            if normalized in seen:
+                continue
+            tokens = frozenset(normalized.split())
+            if self.dedup_threshold < 1.0 and tokens and any(
+                len(tokens & other) / len(tokens | other) >= self.dedup_threshold
+                for other in kept_tokens
+            ):
+                continue
+            seen.add(normalized)
+            kept.append(doc)
+            kept_tokens.append(tokens)
+        return kept
+    
+    def prune_candidates(
         self,
-        query: str,
         documents: List[RetrievedDocument],
-        top_k: Optional[int] = None,
-        score_threshold: float = 0.0,
-    ) -> List[RerankedDocument]:
+        cap: Optional[int] = None,
+    ) -> List[RetrievedDocument]:
         """
-        Rerank documents by relevance to query.
+        Deduplicate and keep at most ``cap`` candidates for cross-encoder scoring.
         
-        Args:
-            query: User query
-            documents: Initial retrieved documents
-            top_k: Return top K documents (None = return all)
-            score_threshold: Minimum rerank score to include
-        
-        Returns:
-            Reranked documents sorted by relevance (highest first)
+        Retrieval returns each ticker's hits best-first and concatenates them,
+        so candidates are interleaved by their first-stage rank within their
+        ticker before truncating; no single ticker crowds out the others.
         """
-        if not documents:
-            return []
+        cap = self.max_candidates_per_source if cap is None else cap
+        documents = self.deduplicate(documents)
+        if cap is None or len(documents) <= cap:
+            return documents
+        rank_in_group: Dict[Any, int] = {}
+        ranked = []
+        for position, doc in enumerate(documents):
+            group = doc.metadata.get("ticker") if doc.metadata else None
+            rank = rank_in_group.get(group, 0)
+            rank_in_group[group] = rank + 1
+            ranked.append((rank, position, doc))
+        ranked.sort(key=lambda item: (item[0], item[1]))
+        return [doc for _, _, doc in ranked[:cap]]
+    
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def score_pairs(
+        self,
+        query: str,
+        documents: List[RetrievedDocument],
+        *,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> List[float]:
+        """
+        Cross-encoder scores for ``documents`` against ``query``.
         
-        if not self.use_reranking or not self.model:
-            # No reranking: return documents as-is with original scores
-            return [
-                RerankedDocument(
-                    text=doc.text,
-                    source_type=doc.source_type,
-                    metadata=doc.metadata,
-                    score=doc.score,
-                    initial_score=doc.score,
-                    rerank_score=None,
-                    final_score=doc.score,
-                )
-                for doc in documents
-            ]
+        Cached pairs are reused; the remaining pairs are sorted by text length
+        and scored in a single ``predict`` call so each padded batch holds
+        similarly sized inputs. ``cache_hits`` and ``scored_pairs`` are
+        recorded in ``stats`` when given.
+        """
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        keys = [(query_hash, self._chunk_key(doc)) for doc in documents]
+        scores: List[Optional[float]] = [None] * len(documents)
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._score_cache.get(key)
+                if cached is not None:
+                    self._score_cache.move_to_end(key)
+                    scores[i] = cached
         
-        # Prepare (query, document) pairs for cross-encoder
-        pairs = [(query, doc.text) for doc in documents]
+        pending: Dict[Tuple[str, str], int] = {}
+        for i, key in enumerate(keys):
+            if scores[i] is None and key not in pending:
+                pending[key] = i
+        cache_hits = sum(1 for score in scores if score is not None)
         
-        try:
-            # Score all pairs (cross-encoder is slower but more accurate)
-            rerank_scores = self.model.predict(pairs)
-            
-            # Convert to list if single value
-            if not isinstance(rerank_scores, list):
-                rerank_scores = rerank_scores.tolist() if hasattr(rerank_scores, 'tolist') else [rerank_scores]
-        except Exception as e:
-            LOGGER.warning(f"Reranking failed: {e}, using original scores")
-            rerank_scores = [doc.score or 0.0 for doc in documents]
+        if pending:
+            order = sorted(pending.values(), key=lambda i: len(documents[i].text))
+            predicted = self.model.predict(
+                [(query, documents[i].text) for i in order],
+                batch_size=self.batch_size,
+            )
+            predicted = predicted.tolist() if hasattr(predicted, "tolist") else list(predicted)
+            by_key = {keys[i]: float(score) for i, score in zip(order, predicted)}
+            with self._cache_lock:
+                for key, score in by_key.items():
+                    self._score_cache[key] = score
+                    self._score_cache.move_to_end(key)
+                while len(self._score_cache) > self.score_cache_size:
+                    self._score_cache.popitem(last=False)
+            for i, key in enumerate(keys):
+                if scores[i] is None:
+                    scores[i] = by_key[key]
         
+        if stats is not None:
+            stats.update({"cache_hits": cache_hits, "scored_pairs": len(pending)})
+        return scores  # type: ignore[return-value]
+    
+    @staticmethod
+    def _passthrough(documents: List[RetrievedDocument]) -> List[RerankedDocument]:
+        # No reranking: return documents as-is with original scores
+        return [
+            RerankedDocument(
+                text=doc.text,
+                source_type=doc.source_type,
+                metadata=doc.metadata,
+                score=doc.score,
+                initial_score=doc.score,
+                rerank_score=None,
+                final_score=doc.score,
+            )
+            for doc in documents
+        ]
+    
+    @staticmethod
+    def _combine(
+        documents: List[RetrievedDocument],
+        rerank_scores: List[float],
+        top_k: Optional[int],
+        score_threshold: float,
+    ) -> List[RerankedDocument]:
         # Create reranked documents with combined scores
         reranked = []
         for doc, rerank_score in zip(documents, rerank_scores):
@@ -148,8 +272,56 @@ class Reranker:
         # Return top K
         if top_k is not None:
             reranked = reranked[:top_k]
+        return reranked
+    
+    def rerank(
+        self,
+        query: str,
+        documents: List[RetrievedDocument],
+        top_k: Optional[int] = None,
+        score_threshold: float = 0.0,
+        *,
+        max_candidates: Optional[int] = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> List[RerankedDocument]:
+        """
+        Rerank documents by relevance to query.
         
-        LOGGER.debug(f"Reranked {len(documents)} documents -> {len(reranked)} above threshold")
+        Args:
+            query: User query
+            documents: Initial retrieved documents
+            top_k: Return top K documents (None = return all)
+            score_threshold: Minimum rerank score to include
+            max_candidates: Override ``max_candidates_per_source`` for this call
+            stats: Optional dict that receives this call's candidate counts,
+                cache hits and latency
+        
+        Returns:
+            Reranked documents sorted by relevance (highest first)
+        """
+        if not documents:
+            return []
+        
+        if not self.use_reranking or not self.model:
+            return self._passthrough(documents)
+        
+        start = time.perf_counter()
+        candidates = self.prune_candidates(documents, max_candidates)
+        try:
+            rerank_scores = self.score_pairs(query, candidates, stats=stats)
+        except Exception as e:
+            LOGGER.warning(f"Reranking failed: {e}, using original scores")
+            rerank_scores = [doc.score or 0.0 for doc in candidates]
+        
+        reranked = self._combine(candidates, rerank_scores, top_k, score_threshold)
+        if stats is not None:
+            stats.update({
+                "candidates": len(documents),
+                "pruned_candidates": len(candidates),
+                "latency_ms": (time.perf_counter() - start) * 1000,
+            })
+        
+        LOGGER.debug(f"Reranked {len(candidates)}/{len(documents)} documents -> {len(reranked)} above threshold")
         
         return reranked
     
@@ -162,10 +334,15 @@ class Reranker:
         max_sec: int = 5,
         max_uploaded: int = 3,
         score_threshold: float = 0.0,
+        max_candidates: Optional[int] = None,
+        stats: Optional[Dict[str, Any]] = None,
     ) -> Tuple[List[RerankedDocument], List[RerankedDocument]]:
         """
         Rerank documents from multiple sources with score normalization.
         
+        Each source is pruned to its own candidate cap, then candidates from
+        both sources are scored together in one cross-encoder batch.
+        
         Args:
             query: User query
             sec_docs: SEC filing documents
@@ -173,13 +350,52 @@ class Reranker:
             max_sec: Max SEC documents to return
             max_uploaded: Max uploaded documents to return
             score_threshold: Minimum score threshold
+            max_candidates: Override ``max_candidates_per_source`` for this call
+            stats: Optional dict that receives this call's candidate counts,
+                cache hits and latency
         
         Returns:
             Tuple of (reranked_sec_docs, reranked_uploaded_docs)
         """
-        # Rerank each source separately
-        reranked_sec = self.rerank(query, sec_docs, top_k=max_sec, score_threshold=score_threshold)
-        reranked_uploaded = self.rerank(query, uploaded_docs, top_k=max_uploaded, score_threshold=score_threshold)
+        if not self.use_reranking or not self.model:
+            return self._passthrough(sec_docs)[:max_sec], self._passthrough(uploaded_docs)[:max_uploaded]
+        
+        start = time.perf_counter()
+        sec_candidates = self.prune_candidates(sec_docs, max_candidates)
+        uploaded_candidates = self.prune_candidates(uploaded_docs, max_candidates)
+        combined = sec_candidates + uploaded_candidates
+        try:
+            scores = self.score_pairs(query, combined, stats=stats) if combined else []
+        except Exception as e:
+            LOGGER.warning(f"Reranking failed: {e}, using original scores")
+            scores = [doc.score or 0.0 for doc in combined]
+        
+        split = len(sec_candidates)
+        reranked_sec = self._combine(sec_candidates, scores[:split], max_sec, score_threshold)
+        reranked_uploaded = self._combine(uploaded_candidates, scores[split:], max_uploaded, score_threshold)
+        if stats is not None:
+            stats.update({
+                "candidates": len(sec_docs) + len(uploaded_docs),
+                "pruned_candidates": len(combined),
+                "latency_ms": (time.perf_counter() - start) * 1000,
+            })
         
         return reranked_sec, reranked_uploaded
+    
+    def clear_cache(self) -> None:
+        """Drop all cached pair scores."""
+        with self._cache_lock:
+            self._score_cache.clear()
+
+
+_SHARED_RERANKER: Optional[Reranker] = None
+_SHARED_RERANKER_LOCK = threading.Lock()
+
 
+def get_shared_reranker() -> Reranker:
+    """Return a process-wide reranker so the cross-encoder is loaded once."""
+    global _SHARED_RERANKER
+    with _SHARED_RERANKER_LOCK:
+        if _SHARED_RERANKER is None:
+            _SHARED_RERANKER = Reranker(use_reranking=True)
+        return _SHARED_RERANKER
@@ -12,14 +12,18 @@ Architecture aligns with Lecture 2:
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 
+from .rag_index_manifest import IndexManifest
+
 # Import smart caching for performance optimization
 try:
-    from .smart_cache import cache_embeddings, cache_retrieval
+    from .smart_cache import cache_embeddings, cache_retrieval, get_embedding_cache
     CACHING_AVAILABLE = True
 except ImportError:
     CACHING_AVAILABLE = False
@@ -29,6 +33,11 @@ except ImportError:
 
 LOGGER = logging.getLogger(__name__)
 
+# IDs written before content-hash IDs ended in a positional ``_<n>`` suffix
+_POSITIONAL_ID = re.compile(r"_\d{1,12}$")
+# Manifest name of the one-off migration that removes those chunks
+_PURGE_POSITIONAL_MIGRATION = "purge_positional_ids"
+
 # Optional imports for semantic search
 try:
     import chromadb
@@ -82,6 +91,40 @@ class RetrievalResult:
     overall_confidence: Optional[float] = None  # Overall retrieval confidence (0-1)
 
 
+def _chunk_id_prefix(meta: Dict[str, Any]) -> str:
+    """Readable, source-specific prefix for a chunk ID."""
+    source_type = meta.get('source_type', 'doc')
+    ticker = meta.get('ticker', 'unknown')
+    
+    # Scoped to the document so identical text in two uploads never shares an ID
+    if source_type == 'uploaded_doc':
+        return f"upload_{meta.get('document_id', 'unknown')}"
+    if source_type == 'sec_filing':
+        return f"{ticker}_{meta.get('filing_type', 'doc')}_{meta.get('fiscal_year', 'unknown')}_{meta.get('section', 'unknown')}"
+    if source_type == 'earnings_transcript':
+        return f"{ticker}_earnings_{meta.get('date', 'unknown')}_{meta.get('quarter', 'unknown')}"
+    if source_type == 'news':
+        return f"{ticker}_news_{meta.get('date', 'unknown')}_{meta.get('publisher', 'unknown')}"
+    if source_type == 'analyst_report':
+        return f"{ticker}_analyst_{meta.get('date', 'unknown')}_{meta.get('analyst', 'unknown')}"
+    if source_type == 'press_release':
+        return f"{ticker}_press_{meta.get('date', 'unknown')}"
+    if source_type == 'industry_research':
+        return f"industry_{meta.get('sector', 'unknown')}_{meta.get('date', 'unknown')}"
+    return f"{source_type}_{ticker}_{meta.get('date', 'unknown')}"
+
+
+def content_chunk_id(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Stable chunk ID: readable source prefix plus a hash of the chunk text.
+    
+    The same text under the same prefix always maps to the same ID, so
+    re-indexing upserts in place instead of duplicating or shifting chunks.
+    """
+    digest = hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:20]
+    return f"{_chunk_id_prefix(metadata or {})}_{digest}"
+
+
 class VectorStore:
     """
     Document / Vector Store for RAG Pipeline
@@ -122,6 +165,16 @@ class VectorStore:
             LOGGER.info("Falling back to individual model download")
             self.embedding_model = SentenceTransformer(embedding_model)
         
+        # Query embeddings are cached per model (memory LRU + on-disk tier next to ChromaDB)
+        self.embedding_model_id = embedding_model
+        try:
+            self.embedding_model_id = f"{embedding_model}:{self.embedding_model.get_sentence_embedding_dimension()}"
+        except Exception:
+            pass
+        self.query_cache = get_embedding_cache(database_path.parent / "embedding_cache") if CACHING_AVAILABLE else None
+        if self.query_cache is not None:
+            self.query_cache.start_warm_up(database_path, self.embedding_model_id, self._encode_queries)
+        
         # Initialize ChromaDB
         chroma_db_path = database_path.parent / "chroma_db"
         chroma_db_path.mkdir(exist_ok=True)
@@ -205,11 +258,22 @@ class VectorStore:
             return 0
         return self._add_documents(documents, self.sec_collection, batch_size)
     
-    def add_uploaded_documents(self, documents: List[Dict[str, Any]], batch_size: int = 100) -> int:
-        """Add uploaded documents to vector store."""
+    def add_uploaded_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        batch_size: int = 100,
+        ids: Optional[List[str]] = None,
+    ) -> int:
+        """Add uploaded documents to vector store (optionally with explicit chunk IDs)."""
         if not self._available:
             return 0
-        return self._add_documents(documents, self.uploaded_collection, batch_size)
+        return self._add_documents(documents, self.uploaded_collection, batch_size, ids=ids)
+    
+    def delete_uploaded_document(self, document_id: str) -> None:
+        """Remove every indexed chunk of an uploaded document."""
+        if not self._available:
+            return
+        self.uploaded_collection.delete(where={"document_id": document_id})
     
     def add_earnings_transcripts(self, documents: List[Dict[str, Any]], batch_size: int = 100) -> int:
         """Add earnings call transcripts to vector store."""
@@ -246,63 +310,205 @@ class VectorStore:
         documents: List[Dict[str, Any]],
         collection,
         batch_size: int = 100,
+        ids: Optional[List[str]] = None,
     ) -> int:
         """Internal method to add documents to a collection."""
         if not documents:
             return 0
+        if ids is not None and len(ids) != len(documents):
+            raise ValueError("ids must match documents one-to-one")
+        if ids is None:
+            ids = [content_chunk_id(doc["text"], doc.get("metadata", {})) for doc in documents]
+        
+        # Upserting content-hash IDs is idempotent; drop repeats within the call
+        unique: Dict[str, Dict[str, Any]] = {}
+        for chunk_id, doc in zip(ids, documents):
+            unique.setdefault(chunk_id, doc)
+        ids, documents = list(unique.keys()), list(unique.values())
         
         total_added = 0
         for i in range(0, len(documents), batch_size):
             batch = documents[i:i + batch_size]
             texts = [doc["text"] for doc in batch]
-            metadatas_raw = [doc.get("metadata", {}) for doc in batch]
-            
-            # Clean metadata: Remove None values (ChromaDB doesn't accept None)
-            metadatas = []
-            for meta in metadatas_raw:
-                cleaned_meta = {k: v for k, v in meta.items() if v is not None}
-                metadatas.append(cleaned_meta)
             
             # Generate embeddings: "Text → Tokens → Embeddings"
-            embeddings = self.embedding_model.encode(
+            embeddings = self.encode_texts(texts)
+            total_added += self.write_chunks(
+                collection,
+                ids[i:i + batch_size],
                 texts,
-                show_progress_bar=False,
-                convert_to_numpy=True,
-            ).tolist()
-            
-            # Generate IDs based on source type
-            ids = []
-            for j, meta in enumerate(metadatas_raw):  # Use raw metadata for ID generation
-                source_type = meta.get('source_type', 'doc')
-                ticker = meta.get('ticker', 'unknown')
-                
-                if source_type == 'sec_filing':
-                    doc_id = f"{ticker}_{meta.get('filing_type', 'doc')}_{meta.get('fiscal_year', 'unknown')}_{meta.get('section', 'unknown')}_{i+j}"
-                elif source_type == 'earnings_transcript':
-                    doc_id = f"{ticker}_earnings_{meta.get('date', 'unknown')}_{meta.get('quarter', 'unknown')}_{i+j}"
-                elif source_type == 'news':
-                    doc_id = f"{ticker}_news_{meta.get('date', 'unknown')}_{meta.get('publisher', 'unknown')}_{i+j}"
-                elif source_type == 'analyst_report':
-                    doc_id = f"{ticker}_analyst_{meta.get('date', 'unknown')}_{meta.get('analyst', 'unknown')}_{i+j}"
-                elif source_type == 'press_release':
-                    doc_id = f"{ticker}_press_{meta.get('date', 'unknown')}_{i+j}"
-                elif source_type == 'industry_research':
-                    doc_id = f"industry_{meta.get('sector', 'unknown')}_{meta.get('date', 'unknown')}_{i+j}"
-                else:
-                    doc_id = f"{source_type}_{ticker}_{meta.get('date', 'unknown')}_{i+j}"
-                
-                ids.append(doc_id)
-            
-            collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,  # Use cleaned metadata without None values
-                ids=ids,
+                [doc.get("metadata", {}) for doc in batch],
+                embeddings,
             )
-            total_added += len(texts)
         
         return total_added
     
+    def encode_texts(self, texts: List[str], batch_size: int = 32):
+        """Embed document texts as a float32 array (model batches are length-sorted)."""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+    
+    def write_chunks(
+        self,
+        collection,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings,
+    ) -> int:
+        """Upsert already-embedded chunks into ``collection``."""
+        # Clean metadata: Remove None values (ChromaDB doesn't accept None)
+        cleaned = [{k: v for k, v in meta.items() if v is not None} for meta in metadatas]
+        collection.upsert(
+            embeddings=embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings,
+            documents=texts,
+            metadatas=cleaned,
+            ids=ids,
+        )
+        return len(ids)
+    
+    @property
+    def manifest(self) -> IndexManifest:
+        """Manifest of chunk IDs indexed per source (stored in the main database)."""
+        if getattr(self, "_manifest", None) is None:
+            self._manifest = IndexManifest(self.database_path)
+        return self._manifest
+    
+    def is_source_indexed(self, source_key: str, collection) -> bool:
+        """Return True if ``source_key`` already has chunks recorded for ``collection``."""
+        if not self._available:
+            return False
+        return self.manifest.has_source(collection.name, source_key)
+    
+    def sync_documents(
+        self,
+        source_key: str,
+        documents: List[Dict[str, Any]],
+        collection,
+        batch_size: int = 100,
+    ) -> Dict[str, int]:
+        """
+        Incrementally index one source's chunks (e.g. ``sec:<accession>``).
+        
+        Only chunks whose content-hash ID is not yet indexed are embedded;
+        chunks the source previously produced but no longer does are deleted
+        unless another source still references them.
+        
+        Returns:
+            Counts of ``added``, ``unchanged`` and ``deleted`` chunks
+        """
+        if not self._available:
+            return {"added": 0, "unchanged": 0, "deleted": 0}
+        
+        by_id, new_ids = self.plan_sync(source_key, documents, collection)
+        added = self._add_documents([by_id[chunk_id] for chunk_id in new_ids], collection, batch_size, ids=new_ids)
+        deleted = self.finish_sync(source_key, by_id, collection)
+        return {"added": added, "unchanged": len(by_id) - len(new_ids), "deleted": deleted}
+    
+    def plan_sync(
+        self,
+        source_key: str,
+        documents: List[Dict[str, Any]],
+        collection,
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        First half of :meth:`sync_documents`: assign chunk IDs and pick the new ones.
+        
+        Returns:
+            Tuple of (chunk id -> document for the whole source, IDs that need embedding)
+        """
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for doc in documents:
+            by_id.setdefault(content_chunk_id(doc["text"], doc.get("metadata", {})), doc)
+        
+        previous = self.manifest.chunk_ids(collection.name, source_key)
+        recorded = previous | self.manifest.indexed(collection.name, by_id, exclude_source=source_key)
+        # The manifest can outlive the collection (wiped or partially written); trust only stored IDs
+        already_indexed = self._existing_ids(collection, [chunk_id for chunk_id in by_id if chunk_id in recorded])
+        return by_id, [chunk_id for chunk_id in by_id if chunk_id not in already_indexed]
+    
+    @staticmethod
+    def _existing_ids(collection, ids: List[str], batch_size: int = 500) -> Set[str]:
+        """Subset of ``ids`` actually present in ``collection``."""
+        found: Set[str] = set()
+        for start in range(0, len(ids), batch_size):
+            result = collection.get(ids=ids[start:start + batch_size], include=[])
+            found.update(result.get("ids") or [])
+        return found
+    
+    def finish_sync(self, source_key: str, chunk_ids, collection) -> int:
+        """
+        Second half of :meth:`sync_documents`, run once the new chunks are written.
+        
+        Deletes orphaned chunks and records ``chunk_ids`` as the source's
+        complete set. Returns the number of chunks deleted.
+        """
+        chunk_ids = set(chunk_ids)
+        orphans = self.manifest.chunk_ids(collection.name, source_key) - chunk_ids
+        if orphans:
+            orphans -= self.manifest.indexed(collection.name, orphans, exclude_source=source_key)
+        if orphans:
+            collection.delete(ids=sorted(orphans))
+        
+        self.manifest.replace_source(collection.name, source_key, chunk_ids)
+        return len(orphans)
+    
+    def purge_positional_chunks(self, collection, page_size: int = 1000) -> int:
+        """
+        Delete chunks left over from positional ``<prefix>_<n>`` IDs.
+        
+        Runs as a one-off migration: the full collection scan happens once per
+        collection and is recorded in the manifest, later calls return 0.
+        Chunks recorded in the manifest, and chunks written with an explicit
+        ``chunk_id`` in their metadata, are kept. Returns the number deleted.
+        """
+        if not self._available:
+            return 0
+        if self.manifest.migration_done(collection.name, _PURGE_POSITIONAL_MIGRATION):
+            return 0
+        stale: List[str] = []
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            for chunk_id, meta in zip(ids, metadatas):
+                if _POSITIONAL_ID.search(chunk_id) and not (meta or {}).get("chunk_id"):
+                    stale.append(chunk_id)
+            offset += len(ids)
+        if stale:
+            stale = sorted(set(stale) - self.manifest.indexed(collection.name, stale))
+        for start in range(0, len(stale), page_size):
+            collection.delete(ids=stale[start:start + page_size])
+        if stale:
+            LOGGER.info(f"Removed {len(stale)} positional-ID chunks from {collection.name}")
+        self.manifest.mark_migration(collection.name, _PURGE_POSITIONAL_MIGRATION)
+        return len(stale)
+    
+    def prune_sources(self, collection, prefix: str, keep: Set[str]) -> int:
+        """Remove every source under ``prefix`` not in ``keep``; returns the number removed."""
+        if not self._available:
+            return 0
+        removed = 0
+        for source_key in self.manifest.sources(collection.name, prefix):
+            if source_key not in keep:
+                self.sync_documents(source_key, [], collection)
+                removed += 1
+        return removed
+    
+    def close(self) -> None:
+        """Release the manifest's database connection (reopened on next use)."""
+        manifest = getattr(self, "_manifest", None)
+        if manifest is not None:
+            manifest.close()
+            self._manifest = None
+    
     def search_sec_narratives(
         self,
         query: str,
@@ -402,6 +608,15 @@ class VectorStore:
         
         return results
     
+    def _encode_queries(self, queries: List[str]):
+        return self.embedding_model.encode(queries, convert_to_numpy=True)
+    
+    def embed_query(self, query: str):
+        """Embed a search query, reusing cached vectors when available."""
+        if self.query_cache is None:
+            return self.embedding_model.encode(query, convert_to_numpy=True)
+        return self.query_cache.get_or_compute(self.embedding_model_id, [query], self._encode_queries)[0]
+    
     @cache_retrieval
     def _search(
         self,
@@ -412,11 +627,8 @@ class VectorStore:
         source_type: str,
     ) -> List[RetrievedDocument]:
         """Internal semantic search method."""
-        # Embed query and do nearest-neighbor search
-        query_embedding = self.embedding_model.encode(
-            query,
-            convert_to_numpy=True,
-        ).tolist()
+        # Embed query (through the query-embedding cache) and do nearest-neighbor search
+        query_embedding = self.embed_query(query).tolist()
         
         results = collection.query(
             query_embeddings=[query_embedding],
@@ -497,6 +709,11 @@ class RAGRetriever:
                 LOGGER.warning(f"Hybrid retriever not available: {e}. Using dense-only retrieval.")
                 self.use_hybrid_retrieval = False
     
+    def close(self) -> None:
+        """Release resources held by the vector store."""
+        if self.vector_store is not None:
+            self.vector_store.close()
+    
     def retrieve(
         self,
         query: str,
@@ -766,8 +983,8 @@ class RAGRetriever:
             
             if reranker is None:
                 try:
-                    from .rag_reranker import Reranker
-                    reranker = Reranker(use_reranking=True)
+                    from .rag_reranker import get_shared_reranker
+                    reranker = get_shared_reranker()
                 except ImportError:
                     LOGGER.debug("Reranker not available, skipping reranking")
                     reranker = None
@@ -6,14 +6,20 @@ Handles structured content in financial documents:
 - Identifies document sections (MD&A, Risk Factors, etc.)
 - Returns specific table rows/columns instead of dumping whole text
 - Routes table queries to table-specific retrieval
+- Persists extracted tables with an inverted term index in SQLite
 """
 
 from __future__ import annotations
 
+import json
 import logging
 import re
-from typing import List, Dict, Any, Optional, Tuple
+import sqlite3
+import threading
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 
 LOGGER = logging.getLogger(__name__)
 
@@ -190,17 +196,85 @@ class StructureAwareParser:
 class TableAwareRetriever:
     """
     Table-aware retriever that routes table queries to table-specific retrieval.
+    
+    Extracted tables are stored in SQLite (``document_tables``) together with an
+    inverted index of header and row-label terms (``document_table_terms``), so
+    lookups are index probes filtered by ticker and period before scoring and
+    survive restarts. Without a database path an in-memory database is used.
     """
     
-    def __init__(self, structure_parser: Optional[StructureAwareParser] = None):
+    # Terms too common in queries and table headers to discriminate between tables
+    STOPWORDS = frozenset({
+        "a", "an", "and", "as", "at", "by", "for", "from", "in", "is", "of", "on",
+        "or", "show", "the", "to", "what", "with", "me", "give", "table",
+    })
+    _TERM_PATTERN = re.compile(r'\b\w+\b')
+    # Header matches weigh more than row-label matches when ranking tables
+    _FIELD_WEIGHTS = {"header": 2.0, "title": 2.0, "row_label": 1.0}
+    
+    def __init__(
+        self,
+        structure_parser: Optional[StructureAwareParser] = None,
+        database_path: Optional[Path] = None,
+    ):
         """
         Initialize table-aware retriever.
         
         Args:
             structure_parser: StructureAwareParser instance
+            database_path: Optional SQLite database for the persistent table store
         """
         self.structure_parser = structure_parser or StructureAwareParser()
-        self.table_index: Dict[str, List[DocumentTable]] = {}  # doc_id -> tables
+        self.database_path = Path(database_path) if database_path else None
+        self._conn = sqlite3.connect(
+            str(self.database_path) if self.database_path else ":memory:",
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._ensure_table()
+    
+    def _ensure_table(self) -> None:
+        """Create the table store and its inverted index if they do not exist."""
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS document_tables (
+                    table_id TEXT PRIMARY KEY,
+                    doc_id TEXT NOT NULL,
+                    ticker TEXT,
+                    period TEXT,
+                    source_document TEXT,
+                    title TEXT,
+                    headers TEXT NOT NULL,
+                    rows TEXT NOT NULL,
+                    metadata TEXT,
+                    indexed_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_document_tables_doc ON document_tables(doc_id);
+                CREATE INDEX IF NOT EXISTS idx_document_tables_ticker_period
+                    ON document_tables(ticker, period);
+                CREATE TABLE IF NOT EXISTS document_table_terms (
+                    term TEXT NOT NULL,
+                    table_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    PRIMARY KEY (term, table_id, field)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_document_table_terms_table
+                    ON document_table_terms(table_id);
+                CREATE TABLE IF NOT EXISTS document_table_sources (
+                    doc_id TEXT PRIMARY KEY,
+                    table_count INTEGER NOT NULL,
+                    indexed_at TEXT NOT NULL
+                );
+                """
+            )
+    
+    @classmethod
+    def _terms(cls, text: str) -> set:
+        return {
+            term for term in cls._TERM_PATTERN.findall(text.lower())
+            if term not in cls.STOPWORDS
+        }
     
     def is_table_query(self, query: str) -> bool:
         """
@@ -220,25 +294,94 @@ class TableAwareRetriever:
         ]
         return any(keyword in query_lower for keyword in table_keywords)
     
-    def index_tables(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+    def is_indexed(self, doc_id: str) -> bool:
+        """Return True if ``doc_id`` has been processed (even if it contained no tables)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM document_table_sources WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return row is not None
+    
+    def index_tables(self, doc_id: str, text: str, metadata: Dict[str, Any]) -> int:
         """
-        Index tables from a document.
+        Index tables from a document, replacing any tables stored for it.
         
         Args:
             doc_id: Document ID
             text: Document text
-            metadata: Document metadata
+            metadata: Document metadata (``ticker``, ``period``/``fiscal_year``, ``source``)
+        
+        Returns:
+            Number of tables stored
         """
         tables = self.structure_parser.parse_tables(text)
+        return self.store_tables(doc_id, tables, metadata)
+    
+    def store_tables(self, doc_id: str, tables: List[DocumentTable], metadata: Dict[str, Any]) -> int:
+        """Persist already-parsed ``tables`` for ``doc_id`` and index their terms."""
+        ticker = metadata.get("ticker")
+        period = metadata.get("period") or (
+            f"FY{metadata['fiscal_year']}" if metadata.get("fiscal_year") else None
+        )
+        source_document = metadata.get("source") or metadata.get("filing_url") or doc_id
+        indexed_at = datetime.now(timezone.utc).isoformat()
+        
+        table_rows = []
+        term_rows = []
+        for position, table in enumerate(tables):
+            table_id = f"{doc_id}:{position}"
+            table_rows.append((
+                table_id,
+                doc_id,
+                ticker.upper() if ticker else None,
+                period,
+                source_document,
+                table.title,
+                json.dumps(table.headers),
+                json.dumps([row.values for row in table.rows]),
+                json.dumps(table.metadata),
+                indexed_at,
+            ))
+            fields = {
+                "header": self._terms(" ".join(table.headers)),
+                "title": self._terms(table.title or ""),
+                "row_label": self._terms(" ".join(row.values[0] for row in table.rows if row.values)),
+            }
+            for field_name, terms in fields.items():
+                term_rows.extend((term, table_id, field_name) for term in terms)
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM document_table_terms WHERE table_id IN "
+                "(SELECT table_id FROM document_tables WHERE doc_id = ?)",
+                (doc_id,),
+            )
+            self._conn.execute("DELETE FROM document_tables WHERE doc_id = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT INTO document_tables (table_id, doc_id, ticker, period, source_document, "
+                "title, headers, rows, metadata, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                table_rows,
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO document_table_terms (term, table_id, field) VALUES (?, ?, ?)",
+                term_rows,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO document_table_sources (doc_id, table_count, indexed_at) "
+                "VALUES (?, ?, ?)",
+                (doc_id, len(tables), indexed_at),
+            )
         if tables:
-            self.table_index[doc_id] = tables
             LOGGER.debug(f"Indexed {len(tables)} tables for document {doc_id}")
+        return len(tables)
     
     def retrieve_tables(
         self,
         query: str,
         ticker: Optional[str] = None,
         period: Optional[str] = None,
+        *,
+        limit: int = 10,
     ) -> List[str]:
         """
         Retrieve relevant table data for query.
@@ -247,29 +390,59 @@ class TableAwareRetriever:
             query: User query
             ticker: Optional ticker filter
             period: Optional period filter
+            limit: Maximum number of tables to return
         
         Returns:
-            List of serialized table texts
+            List of serialized table texts, best match first
         """
         if not self.is_table_query(query):
             return []
         
+        query_terms = sorted(self._terms(query))
+        if not query_terms:
+            return []
+        
+        placeholders = ", ".join("?" for _ in query_terms)
+        weight_case = " ".join(
+            f"WHEN '{field_name}' THEN {weight}" for field_name, weight in self._FIELD_WEIGHTS.items()
+        )
+        sql = f"""
+            SELECT t.table_id, t.ticker, t.period, t.title, t.headers, t.rows, t.metadata,
+                   SUM(CASE i.field {weight_case} ELSE 1.0 END) AS score
+            FROM document_table_terms AS i
+            JOIN document_tables AS t ON t.table_id = i.table_id
+            WHERE i.term IN ({placeholders})
+        """
+        params: List[Any] = list(query_terms)
+        if ticker:
+            sql += " AND t.ticker = ?"
+            params.append(ticker.upper())
+        if period:
+            sql += " AND t.period = ?"
+            params.append(period)
+        sql += " GROUP BY t.table_id ORDER BY score DESC, t.table_id LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        
         results = []
-        for doc_id, tables in self.table_index.items():
-            for table in tables:
-                # Simple relevance check: keyword matching
-                table_text = " ".join(table.headers)
-                query_keywords = set(re.findall(r'\b\w+\b', query.lower()))
-                table_keywords = set(re.findall(r'\b\w+\b', table_text.lower()))
-                
-                overlap = query_keywords & table_keywords
-                if len(overlap) > 0:
-                    # Serialize table
-                    serialized = self.structure_parser.serialize_table(
-                        table, ticker or "UNKNOWN", period or "UNKNOWN"
-                    )
-                    results.append(serialized)
+        for _table_id, table_ticker, table_period, title, headers_json, rows_json, metadata_json, _score in rows:
+            headers = json.loads(headers_json)
+            table = DocumentTable(
+                title=title,
+                headers=headers,
+                rows=[TableRow(headers=headers, values=values, metadata={}) for values in json.loads(rows_json)],
+                metadata=json.loads(metadata_json or "{}"),
+            )
+            results.append(self.structure_parser.serialize_table(
+                table, table_ticker or ticker or "UNKNOWN", table_period or period or "UNKNOWN"
+            ))
         
         LOGGER.debug(f"Retrieved {len(results)} tables for query '{query[:50]}...'")
         return results
-
+    
+    def close(self) -> None:
+        """Close the table store's database connection."""
+        with self._lock:
+            self._conn.close()
@@ -302,8 +302,12 @@ def _chunk_text(text: str, chunk_size: int = 1500, chunk_overlap: int = 200) ->
         if chunk_text:  # Only add non-empty chunks
             chunks.append(chunk_text)
         
+        # The final chunk reaches the end of the text; stepping back by the
+        # overlap would only re-emit its tail
+        if end >= text_length:
+            break
         start = end - chunk_overlap
-        if start >= text_length or start < 0:
+        if start < 0:
             break
     
     if not chunks and text.strip():
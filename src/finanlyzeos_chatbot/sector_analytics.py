@@ -8,13 +8,16 @@ for S&P 500 companies. Enables powerful comparative analytics across industries.
 from __future__ import annotations
 
 import logging
-import statistics
+import threading
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import sqlite3
 
+from .smart_cache import get_metric_version_watcher
+
 LOGGER = logging.getLogger(__name__)
 
 # S&P 500 Sector Classifications (GICS Sectors)
@@ -199,7 +202,7 @@ class SectorAnalytics:
     """Advanced sector-level analytics and benchmarking."""
     
     def __init__(self, db_path: str):
-        self.db_path = db_path
+        self.db_path = str(db_path)
         self.sector_map = SECTOR_MAP
     
     def get_company_sector(self, ticker: str) -> Optional[str]:
@@ -214,6 +217,69 @@ class SectorAnalytics:
         """Get list of all sectors."""
         return sorted(set(self.sector_map.values()))
     
+    def sector_distribution(self, sector: str, fiscal_year: int = 2024) -> Optional["SectorDistribution"]:
+        """Return the cached metric distribution for ``sector`` in ``fiscal_year``."""
+        return self._load_distributions(sector, [fiscal_year]).get(fiscal_year)
+    
+    def _load_distributions(self, sector: str, fiscal_years: Sequence[int]) -> Dict[int, "SectorDistribution"]:
+        """
+        Fetch distributions for several years, querying only the uncached ones.
+        
+        All missing years are loaded with a single query and stored in the
+        process-wide cache. Entries are stamped with the sector's stored metric
+        write counters, so writes from any process make them stale;
+        ``invalidate_sector_distributions`` drops them outright.
+        """
+        companies = self.get_sector_companies(sector)
+        if not companies:
+            return {}
+        
+        versions = get_metric_version_watcher(self.db_path).versions()
+        stamp = sum(versions.get(ticker, 0) for ticker in companies)
+        found: Dict[int, SectorDistribution] = {}
+        missing: List[int] = []
+        with _CACHE_LOCK:
+            generation = _CACHE_GENERATION[0]
+            for year in fiscal_years:
+                cached = _DISTRIBUTION_CACHE.get((self.db_path, sector, year))
+                if cached is not None and cached[0] == stamp:
+                    found[year] = cached[1]
+                else:
+                    missing.append(year)
+        if not missing:
+            return found
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # Later rows win for duplicate (ticker, metric) pairs, as with dict(fetchall())
+            rows = conn.execute(
+                """
+                SELECT end_year, ticker, metric, value
+                FROM metric_snapshots
+                WHERE ticker IN ({}) AND end_year IN ({})
+                ORDER BY id
+                """.format(','.join('?' * len(companies)), ','.join('?' * len(missing))),
+                companies + missing,
+            ).fetchall()
+        finally:
+            conn.close()
+        
+        by_year: Dict[int, List[Tuple[str, str, Optional[float]]]] = defaultdict(list)
+        for year, ticker, metric, value in rows:
+            by_year[year].append((ticker, metric, value))
+        
+        loaded = {
+            year: SectorDistribution.from_rows(sector, year, by_year.get(year, []))
+            for year in missing
+        }
+        with _CACHE_LOCK:
+            # Skip caching if a refresh invalidated the cache while we were reading
+            if _CACHE_GENERATION[0] == generation:
+                for year, distribution in loaded.items():
+                    _DISTRIBUTION_CACHE[(self.db_path, sector, year)] = (stamp, distribution)
+        found.update(loaded)
+        return found
+    
     def calculate_sector_benchmarks(self, sector: str, fiscal_year: int = 2024) -> Optional[SectorBenchmark]:
         """
         Calculate aggregated metrics for an entire sector.
@@ -225,87 +291,38 @@ class SectorAnalytics:
         Returns:
             SectorBenchmark with aggregated sector metrics
         """
-        companies = self.get_sector_companies(sector)
-        if not companies:
+        distribution = self.sector_distribution(sector, fiscal_year)
+        if distribution is None:
             return None
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Gather metrics for all companies in sector
-        revenues = []
-        net_margins = []
-        operating_margins = []
-        roes = []
-        roas = []
-        debt_to_equities = []
-        current_ratios = []
-        
-        for ticker in companies:
-            # Get metrics from metric_snapshots
-            query = """
-                SELECT metric, value
-                FROM metric_snapshots
-                WHERE ticker = ? AND end_year = ?
-                AND metric IN ('revenue', 'net_income', 'operating_income', 
-                             'total_assets', 'shareholders_equity', 'total_liabilities',
-                             'current_assets', 'current_liabilities')
-            """
-            cursor.execute(query, (ticker, fiscal_year))
-            metrics = dict(cursor.fetchall())
-            
-            if not metrics:
-                continue
-            
-            # Calculate derived metrics
-            revenue = metrics.get('revenue', 0)
-            net_income = metrics.get('net_income', 0)
-            operating_income = metrics.get('operating_income', 0)
-            total_assets = metrics.get('total_assets', 0)
-            equity = metrics.get('shareholders_equity', 0)
-            total_liabilities = metrics.get('total_liabilities', 0)
-            current_assets = metrics.get('current_assets', 0)
-            current_liabilities = metrics.get('current_liabilities', 0)
-            
-            if revenue > 0:
-                revenues.append(revenue)
-                net_margins.append((net_income / revenue) * 100)
-                operating_margins.append((operating_income / revenue) * 100)
-            
-            if equity > 0:
-                roes.append((net_income / equity) * 100)
-                if total_liabilities > 0:
-                    debt_to_equities.append(total_liabilities / equity)
-            
-            if total_assets > 0:
-                roas.append((net_income / total_assets) * 100)
-            
-            if current_liabilities > 0:
-                current_ratios.append(current_assets / current_liabilities)
-        
-        conn.close()
-        
-        if not revenues:
+        # Only companies with positive revenue contribute revenue figures
+        revenues = distribution.values("revenue")
+        revenues = revenues[revenues > 0]
+        if not revenues.size:
             return None
         
+        def stat(metric: str, fn) -> float:
+            values = revenues if metric == "revenue" else distribution.values(metric)
+            return float(fn(values)) if values.size else 0
+        
         # Calculate sector aggregates
         return SectorBenchmark(
             sector=sector,
-            companies_count=len(revenues),
-            avg_revenue=statistics.mean(revenues) if revenues else 0,
-            median_revenue=statistics.median(revenues) if revenues else 0,
-            avg_net_margin=statistics.mean(net_margins) if net_margins else 0,
-            median_net_margin=statistics.median(net_margins) if net_margins else 0,
-            avg_operating_margin=statistics.mean(operating_margins) if operating_margins else 0,
-            median_operating_margin=statistics.median(operating_margins) if operating_margins else 0,
-            avg_roe=statistics.mean(roes) if roes else 0,
-            median_roe=statistics.median(roes) if roes else 0,
-            avg_roa=statistics.mean(roas) if roas else 0,
-            median_roa=statistics.median(roas) if roas else 0,
-            avg_debt_to_equity=statistics.mean(debt_to_equities) if debt_to_equities else 0,
-            median_debt_to_equity=statistics.median(debt_to_equities) if debt_to_equities else 0,
-            avg_current_ratio=statistics.mean(current_ratios) if current_ratios else 0,
-            median_current_ratio=statistics.median(current_ratios) if current_ratios else 0,
+            companies_count=int(revenues.size),
+            avg_revenue=stat("revenue", np.mean),
+            median_revenue=stat("revenue", np.median),
+            avg_net_margin=stat("net_margin", np.mean),
+            median_net_margin=stat("net_margin", np.median),
+            avg_operating_margin=stat("operating_margin", np.mean),
+            median_operating_margin=stat("operating_margin", np.median),
+            avg_roe=stat("roe", np.mean),
+            median_roe=stat("roe", np.median),
+            avg_roa=stat("roa", np.mean),
+            median_roa=stat("roa", np.median),
+            avg_debt_to_equity=stat("debt_to_equity", np.mean),
+            median_debt_to_equity=stat("debt_to_equity", np.median),
+            avg_current_ratio=stat("current_ratio", np.mean),
+            median_current_ratio=stat("current_ratio", np.median),
         )
     
     def compare_company_to_sector(self, ticker: str, fiscal_year: int = 2024) -> Optional[CompanyVsSector]:
@@ -329,28 +346,20 @@ class SectorAnalytics:
         if not benchmarks:
             return None
         
-        # Get company metrics
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT company_name FROM ticker_aliases WHERE ticker = ?
-        """, (ticker,))
-        result = cursor.fetchone()
-        company_name = result[0] if result else ticker
-        
-        query = """
-            SELECT metric, value
-            FROM metric_snapshots
-            WHERE ticker = ? AND end_year = ?
-        """
-        cursor.execute(query, (ticker, fiscal_year))
-        metrics = dict(cursor.fetchall())
-        conn.close()
-        
+        distribution = self.sector_distribution(sector, fiscal_year)
+        metrics = distribution.company_metrics(ticker) if distribution else {}
         if not metrics:
             return None
         
+        conn = sqlite3.connect(self.db_path)
+        try:
+            result = conn.execute(
+                "SELECT company_name FROM ticker_aliases WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        finally:
+            conn.close()
+        company_name = result[0] if result else ticker
+        
         # Calculate percentile ranks within sector
         percentile_ranks = self._calculate_percentile_ranks(
             ticker, sector, fiscal_year, metrics
@@ -368,30 +377,11 @@ class SectorAnalytics:
     def _calculate_percentile_ranks(
         self, ticker: str, sector: str, fiscal_year: int, company_metrics: Dict
     ) -> Dict[str, float]:
-        """Calculate where company ranks in sector (0-100 percentile)."""
-        companies = self.get_sector_companies(sector)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        percentiles = {}
-        
-        # Revenue percentile
-        query = """
-            SELECT ticker, value
-            FROM metric_snapshots
-            WHERE ticker IN ({}) AND end_year = ? AND metric = 'revenue'
-        """.format(','.join('?' * len(companies)))
-        cursor.execute(query, companies + [fiscal_year])
-        revenues = {t: v for t, v in cursor.fetchall()}
-        
-        if ticker in revenues and revenues:
-            company_revenue = revenues[ticker]
-            sorted_revenues = sorted(revenues.values())
-            rank = sorted_revenues.index(company_revenue) + 1
-            percentiles['revenue'] = (rank / len(sorted_revenues)) * 100
-        
-        conn.close()
-        return percentiles
+        """Calculate where company ranks in sector (0-100 percentile) for every available metric."""
+        distribution = self.sector_distribution(sector, fiscal_year)
+        if distribution is None:
+            return {}
+        return distribution.percentile_ranks(ticker.upper())
     
     def get_top_performers_by_sector(
         self, sector: str, metric: str = 'revenue', limit: int = 10, fiscal_year: int = 2024
@@ -408,23 +398,13 @@ class SectorAnalytics:
         Returns:
             List of (ticker, value) tuples sorted by metric descending
         """
-        companies = self.get_sector_companies(sector)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT ticker, value
-            FROM metric_snapshots
-            WHERE ticker IN ({}) AND end_year = ? AND metric = ?
-            ORDER BY value DESC
-            LIMIT ?
-        """.format(','.join('?' * len(companies)))
-        
-        cursor.execute(query, companies + [fiscal_year, metric, limit])
-        results = cursor.fetchall()
-        conn.close()
-        
-        return results
+        distribution = self.sector_distribution(sector, fiscal_year)
+        if distribution is None or metric not in distribution.columns:
+            return []
+        column = distribution.matrix[:, distribution.columns[metric]]
+        present = np.flatnonzero(~np.isnan(column))
+        order = present[np.argsort(-column[present], kind="stable")][:limit]
+        return [(distribution.tickers[i], float(column[i])) for i in order]
     
     def get_sector_growth_trends(self, sector: str, years: int = 5) -> Dict[int, Dict[str, float]]:
         """
@@ -437,31 +417,137 @@ class SectorAnalytics:
         Returns:
             Dict mapping year to aggregated sector metrics
         """
-        companies = self.get_sector_companies(sector)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         current_year = 2024
+        year_range = list(range(current_year - years + 1, current_year + 1))
+        distributions = self._load_distributions(sector, year_range)
+        
         trends = {}
+        for year in year_range:
+            distribution = distributions.get(year)
+            trends[year] = {}
+            if distribution is None:
+                continue
+            for metric in ('revenue', 'net_income', 'operating_income'):
+                values = distribution.values(metric)
+                if values.size:
+                    trends[year][metric] = float(values.mean())
+        return trends
+
+
+# Ratios derived per company; each maps to (numerator, denominator, scale, extra guard metric)
+DERIVED_RATIOS: Dict[str, Tuple[str, str, float, Optional[str]]] = {
+    "net_margin": ("net_income", "revenue", 100.0, None),
+    "operating_margin": ("operating_income", "revenue", 100.0, None),
+    "roe": ("net_income", "shareholders_equity", 100.0, None),
+    "roa": ("net_income", "total_assets", 100.0, None),
+    "debt_to_equity": ("total_liabilities", "shareholders_equity", 1.0, "total_liabilities"),
+    "current_ratio": ("current_assets", "current_liabilities", 1.0, None),
+}
+
+
+@dataclass
+class SectorDistribution:
+    """
+    Company x metric matrix for one sector and fiscal year.
+    
+    Missing values are NaN. Benchmark ratios are derived once per company with
+    a positive denominator (missing numerators count as 0, as in the original
+    per-company loop) and kept apart from the reported metrics.
+    """
+    sector: str
+    fiscal_year: int
+    tickers: List[str]
+    columns: Dict[str, int]
+    matrix: np.ndarray
+    ratios: Dict[str, np.ndarray]
+    
+    @classmethod
+    def from_rows(
+        cls, sector: str, fiscal_year: int, rows: Sequence[Tuple[str, str, Optional[float]]]
+    ) -> "SectorDistribution":
+        tickers = sorted({ticker for ticker, _, _ in rows})
+        columns = {metric: i for i, metric in enumerate(sorted({metric for _, metric, _ in rows}))}
+        ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+        matrix = np.full((len(tickers), len(columns)), np.nan)
+        for ticker, metric, value in rows:
+            matrix[ticker_index[ticker], columns[metric]] = np.nan if value is None else value
         
-        for year in range(current_year - years + 1, current_year + 1):
-            query = """
-                SELECT metric, AVG(value) as avg_value
-                FROM metric_snapshots
-                WHERE ticker IN ({}) AND end_year = ?
-                AND metric IN ('revenue', 'net_income', 'operating_income')
-                GROUP BY metric
-            """.format(','.join('?' * len(companies)))
-            
-            cursor.execute(query, companies + [year])
-            year_metrics = dict(cursor.fetchall())
-            trends[year] = year_metrics
+        def filled(metric: str) -> np.ndarray:
+            if metric not in columns:
+                return np.zeros(len(tickers))
+            return np.nan_to_num(matrix[:, columns[metric]], nan=0.0)
         
-        conn.close()
-        return trends
+        ratios: Dict[str, np.ndarray] = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name, (numerator, denominator, scale, guard) in DERIVED_RATIOS.items():
+                denom = filled(denominator)
+                mask = denom > 0
+                if guard is not None:
+                    mask &= filled(guard) > 0
+                ratios[name] = np.where(mask, filled(numerator) / denom * scale, np.nan)
+        
+        return cls(sector, fiscal_year, tickers, columns, matrix, ratios)
+    
+    def values(self, metric: str) -> np.ndarray:
+        """Non-missing values of a reported metric or benchmark ratio across the sector."""
+        if metric in self.ratios:
+            column = self.ratios[metric]
+        elif metric in self.columns:
+            column = self.matrix[:, self.columns[metric]]
+        else:
+            return np.empty(0)
+        return column[~np.isnan(column)]
+    
+    def quantiles(self, metric: str, q: Sequence[float] = (0.25, 0.5, 0.75)) -> Dict[float, float]:
+        """Quantiles of ``metric`` across the sector (empty when no company reports it)."""
+        values = self.values(metric)
+        if not values.size:
+            return {}
+        return dict(zip(q, (float(v) for v in np.quantile(values, q))))
+    
+    def company_metrics(self, ticker: str) -> Dict[str, float]:
+        """Reported metrics for ``ticker``."""
+        try:
+            row = self.matrix[self.tickers.index(ticker.upper())]
+        except ValueError:
+            return {}
+        return {metric: float(row[i]) for metric, i in self.columns.items() if not np.isnan(row[i])}
+    
+    def percentile_ranks(self, ticker: str) -> Dict[str, float]:
+        """Rank of ``ticker`` within the sector for every metric it reports (0-100)."""
+        try:
+            row = self.tickers.index(ticker)
+        except ValueError:
+            return {}
+        sorted_matrix = np.sort(self.matrix, axis=0)  # NaNs sort last
+        counts = np.sum(~np.isnan(self.matrix), axis=0)
+        ranks: Dict[str, float] = {}
+        for metric, i in self.columns.items():
+            value = self.matrix[row, i]
+            if np.isnan(value):
+                continue
+            rank = int(np.searchsorted(sorted_matrix[:counts[i], i], value, side="left")) + 1
+            ranks[metric] = (rank / counts[i]) * 100
+        return ranks
+
+
+# (db path, sector, fiscal year) -> (summed metric write counters of the sector, distribution)
+_DISTRIBUTION_CACHE: Dict[Tuple[str, str, int], Tuple[int, SectorDistribution]] = {}
+_CACHE_LOCK = threading.Lock()
+_CACHE_GENERATION = [0]
+
+
+def invalidate_sector_distributions(db_path: Optional[str] = None) -> None:
+    """Drop cached sector distributions (for one database, or all) after a metric refresh."""
+    with _CACHE_LOCK:
+        _CACHE_GENERATION[0] += 1
+        if db_path is None:
+            _DISTRIBUTION_CACHE.clear()
+            return
+        for key in [key for key in _DISTRIBUTION_CACHE if key[0] == str(db_path)]:
+            del _DISTRIBUTION_CACHE[key]
 
 
 def get_sector_analytics(db_path: str) -> SectorAnalytics:
     """Factory function to create SectorAnalytics instance."""
     return SectorAnalytics(db_path)
-
@@ -2,25 +2,41 @@
 
 from __future__ import annotations
 
+import atexit
 import hashlib
 import json
 import logging
+import re
+import sqlite3
+import threading
 import time
-from typing import Any, Dict, Optional, Tuple, Callable
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from functools import wraps
 from pathlib import Path
 
+import numpy as np
+
 LOGGER = logging.getLogger(__name__)
 
 
 class SmartCache:
-    """Intelligent caching system for expensive operations."""
+    """Intelligent caching system for expensive operations.
+    
+    Entries are kept in an ``OrderedDict`` in access order, so lookups, inserts
+    and LRU eviction are all O(1); expired entries are dropped lazily.
+    """
     
     def __init__(self, max_size: int = 1000, ttl_seconds: int = 3600):
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Tuple[Any, float]] = {}  # key -> (value, timestamp)
-        self._access_times: Dict[str, float] = {}  # key -> last_access_time
+        self._cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()  # key -> (value, timestamp)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
     
     def _generate_key(self, *args, **kwargs) -> str:
         """Generate cache key from function arguments."""
@@ -35,51 +51,30 @@ class SmartCache:
         """Check if cache entry is expired."""
         return time.time() - timestamp > self.ttl_seconds
     
-    def _evict_expired(self) -> None:
-        """Remove expired entries."""
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, timestamp) in self._cache.items()
-            if current_time - timestamp > self.ttl_seconds
-        ]
-        for key in expired_keys:
-            self._cache.pop(key, None)
-            self._access_times.pop(key, None)
-    
-    def _evict_lru(self) -> None:
-        """Evict least recently used entries if cache is full."""
-        if len(self._cache) >= self.max_size:
-            # Remove oldest accessed entries
-            sorted_keys = sorted(
-                self._access_times.items(), 
-                key=lambda x: x[1]
-            )
-            keys_to_remove = [key for key, _ in sorted_keys[:len(sorted_keys)//4]]  # Remove 25%
-            for key in keys_to_remove:
-                self._cache.pop(key, None)
-                self._access_times.pop(key, None)
-    
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
-        if key in self._cache:
-            value, timestamp = self._cache[key]
-            if not self._is_expired(timestamp):
-                self._access_times[key] = time.time()
-                return value
-            else:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                value, timestamp = entry
+                if not self._is_expired(timestamp):
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    return value
                 # Remove expired entry
-                self._cache.pop(key, None)
-                self._access_times.pop(key, None)
+                del self._cache[key]
+                self._expirations += 1
+            self._misses += 1
         return None
     
     def set(self, key: str, value: Any) -> None:
         """Set value in cache."""
-        self._evict_expired()
-        self._evict_lru()
-        
-        current_time = time.time()
-        self._cache[key] = (value, current_time)
-        self._access_times[key] = current_time
+        with self._lock:
+            self._cache[key] = (value, time.time())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self._evictions += 1
     
     def cache_function(self, func: Callable) -> Callable:
         """Decorator to cache function results."""
@@ -103,24 +98,501 @@ class SmartCache:
         return wrapper
     
     def clear(self) -> None:
-        """Clear all cache entries."""
-        self._cache.clear()
-        self._access_times.clear()
+        """Clear all cache entries (statistics are kept)."""
+        with self._lock:
+            self._cache.clear()
     
     def stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        current_time = time.time()
-        expired_count = sum(
-            1 for _, timestamp in self._cache.values()
-            if current_time - timestamp > self.ttl_seconds
-        )
+        with self._lock:
+            current_time = time.time()
+            expired_count = sum(
+                1 for _, timestamp in self._cache.values()
+                if current_time - timestamp > self.ttl_seconds
+            )
+            requests = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "expired_entries": expired_count,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_rate": self._hits / requests if requests else 0.0,
+            }
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Normalise text before hashing so trivially different queries share an embedding."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for text embeddings.
+    
+    Tier 1 is an in-process LRU of float32 vectors. Tier 2 is an on-disk store
+    per model: vectors are appended to a raw float32 file read through
+    ``numpy.memmap`` and located via a small SQLite index keyed by
+    ``(model_id, sha1(normalised text))``. The disk tier is shared by every
+    process using the same directory and survives restarts.
+    
+    ``_lock`` only guards the in-memory LRU and counters; disk reads and
+    writes run outside it so memory hits never wait on I/O.
+    """
+    
+    def __init__(self, cache_dir: Optional[Path] = None, *, max_memory_items: int = 2048):
+        """
+        Args:
+            cache_dir: Directory for the on-disk tier; memory-only when None
+            max_memory_items: Capacity of the in-memory LRU
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._maps_lock = threading.Lock()
+        self._maps: Dict[str, Tuple[np.memmap, int]] = {}  # model_id -> (memmap, rows mapped)
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_writes": 0}
+        self._warmed_models: Set[str] = set()
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._ensure_table()
+    
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.cache_dir / "index.sqlite3", timeout=30, isolation_level=None)
+    
+    def _ensure_table(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_index (
+                    model_id TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    row INTEGER NOT NULL,
+                    dim INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model_id, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+    
+    def _vectors_path(self, model_id: str) -> Path:
+        slug = hashlib.sha1(model_id.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"vectors-{slug}.f32"
+    
+    def _read_row(self, model_id: str, row: int, dim: int) -> Optional[np.ndarray]:
+        path = self._vectors_path(model_id)
+        with self._maps_lock:
+            mapped = self._maps.get(model_id)
+        if mapped is None or row >= mapped[1]:
+            # Remap to cover rows appended since the last mapping (possibly by another process)
+            rows = path.stat().st_size // (dim * 4) if path.exists() else 0
+            if row >= rows:
+                return None
+            mapped = (np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim)), rows)
+            with self._maps_lock:
+                current = self._maps.get(model_id)
+                if current is None or current[1] < rows:
+                    self._maps[model_id] = mapped
+        return np.array(mapped[0][row])
+    
+    def _disk_get(self, model_id: str, text_hash: str) -> Optional[np.ndarray]:
+        if self.cache_dir is None:
+            return None
+        with self._connect() as conn:
+            found = conn.execute(
+                "SELECT row, dim FROM embedding_index WHERE model_id = ? AND text_hash = ?",
+                (model_id, text_hash),
+            ).fetchone()
+        if found is None:
+            return None
+        return self._read_row(model_id, found[0], found[1])
+    
+    def _disk_put_many(self, model_id: str, items: Sequence[Tuple[str, np.ndarray]]) -> None:
+        if self.cache_dir is None or not items:
+            return
+        dim = int(items[0][1].shape[0])
+        path = self._vectors_path(model_id)
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE serialises writers across processes, keeping rows and index aligned
+            conn.execute("BEGIN IMMEDIATE")
+            known = {
+                text_hash for (text_hash,) in conn.execute(
+                    f"SELECT text_hash FROM embedding_index WHERE model_id = ? AND text_hash IN "
+                    f"({', '.join('?' for _ in items)})",
+                    [model_id, *(text_hash for text_hash, _ in items)],
+                )
+            }
+            pending = [(h, v) for h, v in dict(items).items() if h not in known and v.shape[0] == dim]
+            if pending:
+                with open(path, "ab") as handle:
+                    start = handle.tell() // (dim * 4)
+                    handle.write(np.stack([v for _, v in pending]).astype(np.float32, copy=False).tobytes())
+                now = time.time()
+                conn.executemany(
+                    "INSERT INTO embedding_index (model_id, text_hash, row, dim, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(model_id, h, start + offset, dim, now) for offset, (h, _) in enumerate(pending)],
+                )
+            conn.execute("COMMIT")
+            with self._lock:
+                self._stats["disk_writes"] += len(pending)
+        except (sqlite3.Error, OSError) as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            LOGGER.warning(f"Embedding cache disk write failed: {e}")
+        finally:
+            conn.close()
+    
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha1(normalize_embedding_text(text).encode("utf-8")).hexdigest()
+    
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for ``text`` or None."""
+        key = (model_id, self.text_hash(text))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vector
+        vector = self._disk_get(*key)
+        with self._lock:
+            if vector is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, vector)
+        return vector
+    
+    def put(self, model_id: str, text: str, vector: Any) -> None:
+        """Store an embedding in both tiers."""
+        self.put_many(model_id, [text], [vector])
+    
+    def put_many(self, model_id: str, texts: Sequence[str], vectors: Iterable[Any]) -> None:
+        """Store several embeddings, appending to the disk tier in one write."""
+        items = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                array = np.asarray(vector, dtype=np.float32).reshape(-1)
+                text_hash = self.text_hash(text)
+                self._remember((model_id, text_hash), array)
+                items.append((text_hash, array))
+        self._disk_put_many(model_id, items)
+    
+    def get_or_compute(
+        self,
+        model_id: str,
+        texts: Sequence[str],
+        encode: Callable[[List[str]], Any],
+    ) -> List[np.ndarray]:
+        """Return embeddings for ``texts``, encoding only the misses in one batch."""
+        results: List[Optional[np.ndarray]] = [self.get(model_id, text) for text in texts]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            # Texts that normalise to the same key are encoded once
+            unique: Dict[str, str] = {}
+            for i in missing:
+                unique.setdefault(self.text_hash(texts[i]), texts[i])
+            encoded = [np.asarray(v, dtype=np.float32).reshape(-1) for v in encode(list(unique.values()))]
+            self.put_many(model_id, list(unique.values()), encoded)
+            by_hash = dict(zip(unique.keys(), encoded))
+            for i in missing:
+                results[i] = by_hash[self.text_hash(texts[i])]
+        return results  # type: ignore[return-value]
+    
+    def warm_up(
+        self,
+        model_id: str,
+        texts: Iterable[str],
+        encode: Optional[Callable[[List[str]], Any]] = None,
+    ) -> int:
+        """
+        Load ``texts`` into the memory tier, from disk or by encoding misses.
         
-        return {
-            "size": len(self._cache),
-            "max_size": self.max_size,
-            "expired_entries": expired_count,
-            "hit_rate": getattr(self, '_hit_count', 0) / max(getattr(self, '_total_requests', 1), 1)
-        }
+        Returns the number of texts now resident in memory.
+        """
+        texts = [text for text in dict.fromkeys(texts) if text and text.strip()]
+        if not texts:
+            return 0
+        if encode is not None:
+            return len(self.get_or_compute(model_id, texts, encode))
+        return sum(1 for text in texts if self.get(model_id, text) is not None)
+    
+    def warm_up_from_conversations(
+        self,
+        database_path: Path,
+        model_id: str,
+        encode: Optional[Callable[[List[str]], Any]] = None,
+        *,
+        limit: int = 200,
+    ) -> int:
+        """Warm the cache with the most recent user questions from the conversation log."""
+        from . import database
+        
+        try:
+            queries = database.fetch_recent_user_messages(database_path, limit=limit)
+        except sqlite3.Error as e:
+            LOGGER.debug(f"Embedding cache warm-up skipped: {e}")
+            return 0
+        warmed = self.warm_up(model_id, queries, encode)
+        LOGGER.info(f"Embedding cache warmed with {warmed} recent queries")
+        return warmed
+    
+    def start_warm_up(
+        self,
+        database_path: Path,
+        model_id: str,
+        encode: Optional[Callable[[List[str]], Any]] = None,
+    ) -> Optional[threading.Thread]:
+        """
+        Warm up from the conversation log in a background thread, once per model.
+        
+        Returns the started thread, or None when ``model_id`` was already warmed.
+        """
+        with self._lock:
+            if model_id in self._warmed_models:
+                return None
+            self._warmed_models.add(model_id)
+        thread = threading.Thread(
+            target=self.warm_up_from_conversations,
+            args=(database_path, model_id, encode),
+            name="query-embedding-warmup",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+    
+    def clear_memory(self) -> None:
+        """Drop the in-memory tier (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction statistics for both tiers."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats.update({
+                "memory_size": len(self._memory),
+                "max_memory_items": self.max_memory_items,
+                "hit_rate": (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0,
+                "disk_enabled": self.cache_dir is not None,
+            })
+        return stats
+
+
+_EMBEDDING_CACHES: Dict[str, EmbeddingCache] = {}
+_EMBEDDING_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(cache_dir: Optional[Path] = None) -> EmbeddingCache:
+    """Return the process-wide embedding cache for ``cache_dir`` (memory-only when None)."""
+    key = str(Path(cache_dir).resolve()) if cache_dir else ""
+    with _EMBEDDING_CACHES_LOCK:
+        cache = _EMBEDDING_CACHES.get(key)
+        if cache is None:
+            cache = EmbeddingCache(cache_dir)
+            _EMBEDDING_CACHES[key] = cache
+        return cache
+
+
+class MetricVersionWatcher:
+    """
+    Per-ticker metric write counters of one database, as seen by this process.
+    
+    Every metric writer bumps ``metric_data_versions`` once per ticker it
+    touches (``database.bump_metric_data_versions``), whichever connection or
+    process makes the write. The table is only re-read when ``PRAGMA data_version``
+    on a persistent connection shows another connection committed.
+    """
+    
+    def __init__(self, database_path: Path):
+        self.database_path = Path(database_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._data_version = -1
+        self._versions: Dict[str, int] = {}
+    
+    def versions(self) -> Dict[str, int]:
+        """Current ``{ticker: version}`` map (do not mutate)."""
+        with self._lock:
+            try:
+                if self._conn is None:
+                    if not self.database_path.exists():
+                        return self._versions
+                    self._conn = sqlite3.connect(str(self.database_path), check_same_thread=False, isolation_level=None)
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    rows = self._conn.execute("SELECT ticker, version FROM metric_data_versions").fetchall()
+                    self._versions = dict(rows)
+                    self._data_version = data_version
+            except sqlite3.Error as e:
+                # Databases created before the version table existed keep in-process invalidation only
+                LOGGER.debug(f"Metric version check failed for {self.database_path}: {e}")
+            return self._versions
+    
+    def close(self) -> None:
+        """Close the persistent connection; the next :meth:`versions` call reopens it."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._data_version = -1
+
+
+_METRIC_WATCHERS: Dict[str, MetricVersionWatcher] = {}
+_METRIC_WATCHERS_LOCK = threading.Lock()
+
+
+def get_metric_version_watcher(database_path: Any) -> MetricVersionWatcher:
+    """Return the process-wide metric version watcher for ``database_path``."""
+    key = str(Path(database_path).resolve())
+    with _METRIC_WATCHERS_LOCK:
+        watcher = _METRIC_WATCHERS.get(key)
+        if watcher is None:
+            watcher = MetricVersionWatcher(Path(key))
+            _METRIC_WATCHERS[key] = watcher
+        return watcher
+
+
+def close_metric_version_watchers() -> None:
+    """Close every watcher's connection (they reopen on next use)."""
+    with _METRIC_WATCHERS_LOCK:
+        watchers = list(_METRIC_WATCHERS.values())
+    for watcher in watchers:
+        watcher.close()
+
+
+atexit.register(close_metric_version_watchers)
+
+
+class MetricsCache:
+    """
+    Process-wide LRU of metric snapshot lists shared by ``AnalyticsEngine`` consumers.
+
+    Entries are keyed by ``(database, ticker, period filters)`` and stamped with
+    the ticker's in-process version and its stored write counter (see
+    :class:`MetricVersionWatcher`). In-process writers bump the former through
+    :meth:`invalidate` (``database.replace_metric_snapshots`` and the KPI
+    backfill writes do so); those writers and the utility scripts also bump the
+    latter, which is how other processes notice. Either makes every cached entry
+    for the ticker stale without touching other tickers.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str, Tuple[Tuple[int, int], ...]], Tuple[Tuple[int, int], Any]]" = OrderedDict()
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _db_key(database_path: Any) -> str:
+        return str(Path(database_path).resolve())
+
+    @staticmethod
+    def _filter_key(period_filters: Optional[Sequence[Tuple[int, int]]]) -> Tuple[Tuple[int, int], ...]:
+        if not period_filters:
+            return ()
+        return tuple(sorted({(int(start), int(end)) for start, end in period_filters}))
+
+    def version(self, database_path: Any, ticker: str) -> int:
+        """Current data version of ``ticker`` in ``database_path``."""
+        with self._lock:
+            return self._versions.get((self._db_key(database_path), ticker.upper()), 0)
+
+    def get_or_load(
+        self,
+        database_path: Any,
+        ticker: str,
+        period_filters: Optional[Sequence[Tuple[int, int]]],
+        loader: Callable[[], Sequence[Any]],
+    ) -> List[Any]:
+        """Return the cached list for the key, calling ``loader`` on a miss.
+
+        The result is a fresh list each call, so callers may sort or extend it.
+        """
+        db_key = self._db_key(database_path)
+        ticker = ticker.upper()
+        key = (db_key, ticker, self._filter_key(period_filters))
+        stored_version = get_metric_version_watcher(db_key).versions().get(ticker, 0)
+        with self._lock:
+            version = (self._versions.get((db_key, ticker), 0), stored_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return list(entry[1])
+                del self._entries[key]
+                self._stats["stale"] += 1
+            self._stats["misses"] += 1
+
+        # Load outside the lock; a write racing with the load bumps the version,
+        # so the entry stored below is already stale and is reloaded next time
+        values = tuple(loader())
+        with self._lock:
+            self._entries[key] = (version, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return list(values)
+
+    def invalidate(self, database_path: Any, tickers: Iterable[str]) -> None:
+        """Mark cached metrics for ``tickers`` in ``database_path`` as stale."""
+        db_key = self._db_key(database_path)
+        affected = {ticker.upper() for ticker in tickers if ticker}
+        if not affected:
+            return
+        with self._lock:
+            for ticker in affected:
+                self._versions[(db_key, ticker)] = self._versions.get((db_key, ticker), 0) + 1
+            for key in [key for key in self._entries if key[0] == db_key and key[1] in affected]:
+                del self._entries[key]
+            self._stats["invalidations"] += len(affected)
+
+    def clear(self) -> None:
+        """Drop every cached entry (versions are kept so in-flight loads stay stale)."""
+        with self._lock:
+            self._entries.clear()
+            for key in self._versions:
+                self._versions[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/invalidation statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            })
+        return stats
+
+
+metrics_cache = MetricsCache()
 
 
 # Global cache instances for different types of operations
@@ -149,6 +621,7 @@ def clear_all_caches() -> None:
     embedding_cache.clear()
     retrieval_cache.clear()
     context_cache.clear()
+    metrics_cache.clear()
     LOGGER.info("All smart caches cleared")
 
 
@@ -157,5 +630,9 @@ def get_cache_stats() -> Dict[str, Any]:
     return {
         "embedding_cache": embedding_cache.stats(),
         "retrieval_cache": retrieval_cache.stats(),
-        "context_cache": context_cache.stats()
+        "context_cache": context_cache.stats(),
+        "metrics": metrics_cache.stats(),
+        "query_embeddings": {
+            (path or "memory"): cache.stats() for path, cache in list(_EMBEDDING_CACHES.items())
+        },
     }
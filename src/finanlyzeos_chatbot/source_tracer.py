@@ -7,12 +7,14 @@ enabling drill-downs and audit trails.
 
 from __future__ import annotations
 
+import json
 import logging
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from . import database
 
@@ -75,9 +77,35 @@ class FactDetail:
         }
 
 
+# (ticker, metric, period) or (ticker, metric, period, fiscal_year)
+LineageKey = Tuple[Any, ...]
+
+
+@lru_cache(maxsize=8192)
+def build_sec_url(accession: str, cik: str) -> Optional[str]:
+    """Build SEC EDGAR URL from accession number and CIK (memoized)."""
+    if not accession or not cik:
+        return None
+    
+    clean_cik = cik.lstrip("0") or cik
+    return f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={clean_cik}&accession_number={accession}&xbrl_type=v"
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class SourceTracer:
     """Traces data lineage from metrics to their sources."""
     
+    # Facts attached to each traced metric (most recently ingested first)
+    MAX_FACTS_PER_METRIC = 10
+    
     def __init__(self, db_path: Path):
         self.db_path = db_path
     
@@ -89,33 +117,40 @@ class SourceTracer:
         fiscal_year: Optional[int] = None
     ) -> SourceTrace:
         """Trace a metric back to its sources."""
-        trace_path = []
-        sources = []
+        return self.trace_metrics([(ticker, metric, period, fiscal_year)])[0]
+    
+    def trace_metrics(self, requests: Sequence[LineageKey]) -> List[SourceTrace]:
+        """
+        Trace many metrics at once.
+        
+        Args:
+            requests: ``(ticker, metric, period)`` triples, optionally with a
+                fourth ``fiscal_year`` element (which takes precedence over period)
+        
+        Returns:
+            One SourceTrace per request, in request order. Snapshots, facts and
+            filings for all requests are resolved with a handful of set-based
+            queries rather than several queries per metric.
+        """
+        keys = [self._normalize_key(request) for request in requests]
+        if not keys:
+            return []
         
-        # Step 1: Check metric_snapshots
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            
-            # Get metric snapshot
-            query = """
-                SELECT value, period, start_year, end_year, source, updated_at
-                FROM metric_snapshots
-                WHERE ticker = ? AND metric = ?
-            """
-            params = [ticker.upper(), metric.lower()]
-            
-            if fiscal_year:
-                query += " AND (end_year = ? OR start_year = ?)"
-                params.extend([fiscal_year, fiscal_year])
-            elif period:
-                query += " AND period = ?"
-                params.append(period)
-            
-            query += " ORDER BY updated_at DESC LIMIT 1"
-            
-            snapshot = conn.execute(query, params).fetchone()
+            self._load_requests(conn, keys)
+            snapshots = self._fetch_snapshots(conn)
+            facts = self._fetch_facts(conn, [idx for idx, row in snapshots.items() if row["source"] == "edgar"])
+            filings = self._fetch_filings(conn)
+            conn.execute("DROP TABLE temp.lineage_requests")
+        
+        traces = []
+        for idx, (ticker, metric, period, _fiscal_year) in enumerate(keys):
+            trace_path: List[Dict[str, Any]] = []
+            sources: List[Dict[str, Any]] = []
             value = None
             
+            snapshot = snapshots.get(idx)
             if snapshot:
                 value = snapshot["value"]
                 trace_path.append({
@@ -126,28 +161,18 @@ class SourceTracer:
                     "updated_at": snapshot["updated_at"],
                 })
             
-            # Step 2: Trace to financial_facts
-            if snapshot and snapshot["source"] == "edgar":
-                facts = self._get_facts_for_metric(
-                    conn, ticker, metric, period, fiscal_year
-                )
-                
-                for fact in facts:
-                    fact_detail = self._get_fact_detail(conn, fact["id"])
-                    if fact_detail:
-                        sources.append(fact_detail.to_dict())
-                        trace_path.append({
-                            "step": "financial_fact",
-                            "description": f"Financial fact from {fact_detail.source_filing}",
-                            "fact_id": fact_detail.fact_id,
-                            "value": fact_detail.value,
-                            "source_filing": fact_detail.source_filing,
-                            "source_url": fact_detail.source_url,
-                        })
+            for fact_detail in facts.get(idx, []):
+                sources.append(fact_detail.to_dict())
+                trace_path.append({
+                    "step": "financial_fact",
+                    "description": f"Financial fact from {fact_detail.source_filing}",
+                    "fact_id": fact_detail.fact_id,
+                    "value": fact_detail.value,
+                    "source_filing": fact_detail.source_filing,
+                    "source_url": fact_detail.source_url,
+                })
             
-            # Step 3: Trace to filings
-            filing_sources = self._get_filing_sources(conn, ticker, metric, period, fiscal_year)
-            for filing in filing_sources:
+            for filing in filings.get(idx, []):
                 sources.append(filing)
                 trace_path.append({
                     "step": "filing",
@@ -157,86 +182,158 @@ class SourceTracer:
                     "filed_at": filing.get("filed_at"),
                     "sec_url": filing.get("sec_url"),
                 })
-        
-        return SourceTrace(
-            ticker=ticker,
-            metric=metric,
-            period=period or "latest",
-            value=value,
-            trace_path=trace_path,
-            sources=sources,
-        )
+            
+            traces.append(SourceTrace(
+                ticker=ticker,
+                metric=metric,
+                period=period or "latest",
+                value=value,
+                trace_path=trace_path,
+                sources=sources,
+            ))
+        return traces
     
-    def _get_facts_for_metric(
-        self,
-        conn: sqlite3.Connection,
-        ticker: str,
-        metric: str,
-        period: Optional[str],
-        fiscal_year: Optional[int]
-    ) -> List[sqlite3.Row]:
-        """Get financial facts for a metric."""
-        query = """
-            SELECT id, value, fiscal_year, fiscal_period, source_filing
-            FROM financial_facts
-            WHERE ticker = ? AND metric = ?
-        """
-        params = [ticker.upper(), metric.lower()]
-        
-        if fiscal_year:
-            query += " AND fiscal_year = ?"
-            params.append(fiscal_year)
-        elif period:
-            query += " AND period = ?"
-            params.append(period)
-        
-        query += " ORDER BY ingested_at DESC LIMIT 10"
-        
-        return conn.execute(query, params).fetchall()
+    @staticmethod
+    def _normalize_key(request: LineageKey) -> Tuple[str, str, Optional[str], Optional[int]]:
+        ticker, metric, period = request[0], request[1], request[2] if len(request) > 2 else None
+        fiscal_year = request[3] if len(request) > 3 else None
+        return ticker, metric, period or None, fiscal_year or None
     
-    def _get_fact_detail(self, conn: sqlite3.Connection, fact_id: int) -> Optional[FactDetail]:
-        """Get detailed information about a financial fact."""
-        conn.row_factory = sqlite3.Row
-        row = conn.execute(
+    @staticmethod
+    def _load_requests(conn: sqlite3.Connection, keys: Sequence[Tuple[str, str, Optional[str], Optional[int]]]) -> None:
+        """Stage the requested (ticker, metric, period, fiscal year) keys in a temp table."""
+        conn.execute(
             """
-            SELECT 
-                id, ticker, metric, fiscal_year, fiscal_period, value, unit,
-                source_filing, period_start, period_end, raw, cik
-            FROM financial_facts
-            WHERE id = ?
+            CREATE TEMP TABLE IF NOT EXISTS lineage_requests (
+                idx INTEGER PRIMARY KEY,
+                ticker TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                period TEXT,
+                fiscal_year INTEGER
+            )
+            """
+        )
+        conn.execute("DELETE FROM temp.lineage_requests")
+        conn.executemany(
+            "INSERT INTO temp.lineage_requests (idx, ticker, metric, period, fiscal_year) VALUES (?, ?, ?, ?, ?)",
+            [
+                (idx, ticker.upper(), metric.lower(), period, fiscal_year)
+                for idx, (ticker, metric, period, fiscal_year) in enumerate(keys)
+            ],
+        )
+    
+    @staticmethod
+    def _fetch_snapshots(conn: sqlite3.Connection) -> Dict[int, sqlite3.Row]:
+        """Latest matching metric snapshot per request."""
+        rows = conn.execute(
+            """
+            SELECT idx, value, period, source, updated_at FROM (
+                SELECT r.idx, s.value, s.period, s.source, s.updated_at,
+                       ROW_NUMBER() OVER (PARTITION BY r.idx ORDER BY s.updated_at DESC) AS rn
+                FROM temp.lineage_requests r
+                JOIN metric_snapshots s ON s.ticker = r.ticker AND s.metric = r.metric
+                WHERE CASE
+                    WHEN r.fiscal_year IS NOT NULL THEN (s.end_year = r.fiscal_year OR s.start_year = r.fiscal_year)
+                    WHEN r.period IS NOT NULL THEN s.period = r.period
+                    ELSE 1
+                END
+            ) WHERE rn = 1
+            """
+        ).fetchall()
+        return {row["idx"]: row for row in rows}
+    
+    def _fetch_facts(self, conn: sqlite3.Connection, request_ids: Sequence[int]) -> Dict[int, List[FactDetail]]:
+        """Most recently ingested financial facts for each of ``request_ids``."""
+        if not request_ids:
+            return {}
+        placeholders = ",".join("?" * len(request_ids))
+        rows = conn.execute(
+            f"""
+            SELECT * FROM (
+                SELECT r.idx, f.id, f.ticker, f.metric, f.fiscal_year, f.fiscal_period, f.value, f.unit,
+                       f.source_filing, f.period_start, f.period_end, f.raw, f.cik,
+                       ROW_NUMBER() OVER (PARTITION BY r.idx ORDER BY f.ingested_at DESC) AS rn
+                FROM temp.lineage_requests r
+                JOIN financial_facts f ON f.ticker = r.ticker AND f.metric = r.metric
+                WHERE r.idx IN ({placeholders}) AND CASE
+                    WHEN r.fiscal_year IS NOT NULL THEN f.fiscal_year = r.fiscal_year
+                    WHEN r.period IS NOT NULL THEN f.period = r.period
+                    ELSE 1
+                END
+            ) WHERE rn <= ?
+            ORDER BY idx, rn
             """,
-            (fact_id,),
-        ).fetchone()
+            [*request_ids, self.MAX_FACTS_PER_METRIC],
+        ).fetchall()
+        facts: Dict[int, List[FactDetail]] = {}
+        for row in rows:
+            facts.setdefault(row["idx"], []).append(self._fact_from_row(row))
+        return facts
+    
+    @staticmethod
+    def _fetch_filings(conn: sqlite3.Connection) -> Dict[int, List[Dict[str, Any]]]:
+        """SEC filings behind the facts of every request (matched by fiscal year only)."""
+        fact_rows = conn.execute(
+            """
+            SELECT DISTINCT r.idx, f.source_filing, f.cik
+            FROM temp.lineage_requests r
+            JOIN financial_facts f ON f.ticker = r.ticker AND f.metric = r.metric
+            WHERE f.source_filing <> ''
+              AND (r.fiscal_year IS NULL OR f.fiscal_year = r.fiscal_year)
+            """
+        ).fetchall()
         
-        if not row:
-            return None
+        # Parse source_filing format (e.g., "10-K/0001234567-23-000123")
+        wanted: List[Tuple[int, str, Optional[str]]] = []
+        for row in fact_rows:
+            parts = row["source_filing"].split("/")
+            if len(parts) > 1 and parts[1]:
+                wanted.append((row["idx"], parts[1], row["cik"]))
         
+        accessions = sorted({accession for _, accession, _ in wanted})
+        filing_rows: Dict[str, sqlite3.Row] = {}
+        for start in range(0, len(accessions), 500):
+            batch = accessions[start:start + 500]
+            for filing_row in conn.execute(
+                f"""
+                SELECT id, form_type, filed_at, accession_number, period_of_report
+                FROM company_filings
+                WHERE accession_number IN ({",".join("?" * len(batch))})
+                ORDER BY id
+                """,
+                batch,
+            ):
+                filing_rows.setdefault(filing_row["accession_number"], filing_row)
+        
+        filings: Dict[int, List[Dict[str, Any]]] = {}
+        for idx, accession, cik in wanted:
+            filing_row = filing_rows.get(accession)
+            if filing_row is None:
+                continue
+            filings.setdefault(idx, []).append({
+                "id": filing_row["id"],
+                "form_type": filing_row["form_type"],
+                "filed_at": filing_row["filed_at"],
+                "accession_number": filing_row["accession_number"],
+                "period_of_report": filing_row["period_of_report"],
+                "sec_url": build_sec_url(accession, cik) if cik else None,
+            })
+        return filings
+    
+    @staticmethod
+    def _fact_from_row(row: sqlite3.Row) -> FactDetail:
+        """Build a FactDetail from a financial_facts row."""
         # Build SEC URL
         source_url = None
         if row["source_filing"] and row["cik"]:
-            source_url = self._build_sec_url(row["source_filing"], row["cik"])
+            source_url = build_sec_url(row["source_filing"], row["cik"])
         
         # Parse raw data
-        import json
         raw_data = {}
         if row["raw"]:
             try:
                 raw_data = json.loads(row["raw"]) if isinstance(row["raw"], str) else row["raw"]
-            except:
-                pass
-        
-        # Parse dates
-        period_start = None
-        period_end = None
-        if row["period_start"]:
-            try:
-                period_start = datetime.fromisoformat(row["period_start"])
-            except:
-                pass
-        if row["period_end"]:
-            try:
-                period_end = datetime.fromisoformat(row["period_end"])
-            except:
+            except (TypeError, ValueError):
                 pass
         
         return FactDetail(
@@ -249,80 +346,32 @@ class SourceTracer:
             unit=row["unit"],
             source_filing=row["source_filing"],
             source_url=source_url,
-            period_start=period_start,
-            period_end=period_end,
+            period_start=_parse_datetime(row["period_start"]),
+            period_end=_parse_datetime(row["period_end"]),
             raw_data=raw_data,
         )
     
-    def _get_filing_sources(
-        self,
-        conn: sqlite3.Connection,
-        ticker: str,
-        metric: str,
-        period: Optional[str],
-        fiscal_year: Optional[int]
-    ) -> List[Dict[str, Any]]:
-        """Get SEC filing sources for a metric."""
-        # Get unique filings from financial_facts
-        query = """
-            SELECT DISTINCT source_filing, cik
+    def _get_fact_detail(self, conn: sqlite3.Connection, fact_id: int) -> Optional[FactDetail]:
+        """Get detailed information about a financial fact."""
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            """
+            SELECT 
+                id, ticker, metric, fiscal_year, fiscal_period, value, unit,
+                source_filing, period_start, period_end, raw, cik
             FROM financial_facts
-            WHERE ticker = ? AND metric = ?
-        """
-        params = [ticker.upper(), metric.lower()]
-        
-        if fiscal_year:
-            query += " AND fiscal_year = ?"
-            params.append(fiscal_year)
-        
-        fact_rows = conn.execute(query, params).fetchall()
-        
-        filings = []
-        for row in fact_rows:
-            if not row[0]:  # source_filing
-                continue
-            
-            # Parse source_filing format (e.g., "10-K/0001234567-23-000123")
-            parts = row[0].split("/")
-            form_type = parts[0] if parts else "Unknown"
-            accession = parts[1] if len(parts) > 1 else None
-            
-            # Get filing details from company_filings
-            if accession:
-                conn.row_factory = sqlite3.Row
-                filing_row = conn.execute(
-                    """
-                    SELECT id, form_type, filed_at, accession_number, period_of_report
-                    FROM company_filings
-                    WHERE accession_number = ?
-                    """,
-                    (accession,),
-                ).fetchone()
-                
-                if filing_row:
-                    cik = row[1] if len(row) > 1 else None
-                    sec_url = self._build_sec_url(accession, cik) if cik else None
-                    
-                    filings.append({
-                        "id": filing_row["id"],
-                        "form_type": filing_row["form_type"],
-                        "filed_at": filing_row["filed_at"],
-                        "accession_number": filing_row["accession_number"],
-                        "period_of_report": filing_row["period_of_report"],
-                        "sec_url": sec_url,
-                    })
+            WHERE id = ?
+            """,
+            (fact_id,),
+        ).fetchone()
         
-        return filings
+        if not row:
+            return None
+        return self._fact_from_row(row)
     
     def _build_sec_url(self, accession: str, cik: str) -> Optional[str]:
         """Build SEC EDGAR URL from accession number and CIK."""
-        if not accession or not cik:
-            return None
-        
-        clean_cik = cik.lstrip("0") or cik
-        acc_no_dash = accession.replace("-", "")
-        
-        return f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={clean_cik}&accession_number={accession}&xbrl_type=v"
+        return build_sec_url(accession, cik)
     
     def get_fact_drilldown(self, fact_id: int) -> Optional[FactDetail]:
         """Get detailed drill-down information for a specific fact."""
@@ -351,6 +400,35 @@ class SourceTracer:
         }
         
         return lineage
-
-
-
+    
+    def get_lineage_graph(self, requests: Sequence[LineageKey]) -> Dict[str, Any]:
+        """
+        Build one lineage graph for many metrics.
+        
+        Returns ``{"nodes": [...], "edges": [...]}``. Metric nodes link to the
+        financial facts behind them and to their SEC filings; facts and filings
+        shared by several metrics appear once.
+        """
+        nodes: Dict[str, Dict[str, Any]] = {}
+        edges: List[Dict[str, str]] = []
+        for trace in self.trace_metrics(requests):
+            metric_id = f"metric:{trace.ticker.upper()}:{trace.metric.lower()}:{trace.period}"
+            nodes[metric_id] = {
+                "id": metric_id,
+                "type": "metric",
+                "ticker": trace.ticker,
+                "name": trace.metric,
+                "period": trace.period,
+                "value": trace.value,
+            }
+            for step in trace.trace_path:
+                if step["step"] == "financial_fact":
+                    node_id = f"fact:{step['fact_id']}"
+                    nodes.setdefault(node_id, {"id": node_id, "type": "financial_fact", **step})
+                elif step["step"] == "filing":
+                    node_id = f"filing:{step['accession_number']}"
+                    nodes.setdefault(node_id, {"id": node_id, "type": "filing", **step})
+                else:
+                    continue
+                edges.append({"source": metric_id, "target": node_id})
+        return {"nodes": list(nodes.values()), "edges": edges}
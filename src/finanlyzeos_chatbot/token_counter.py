@@ -0,0 +1,220 @@
+"""Process-wide token counting for prompt assembly.
+
+``tiktoken.encoding_for_model`` is comparatively expensive and the chatbot used
+to call it for every count while trimming context into budget. This module
+keeps one encoding per model for the lifetime of the process, exposes batched
+and approximate counting for tight loops, and falls back to a deterministic
+offline tokenizer when tiktoken (or its BPE files) are unavailable.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o"
+# Encoding used when tiktoken does not recognise the model name.
+_FALLBACK_ENCODING = "o200k_base"
+# Characters per token used by the approximate mode before any calibration.
+_DEFAULT_CHARS_PER_TOKEN = 4.0
+
+_OFFLINE_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]", re.UNICODE)
+
+
+def _offline_token_count(text: str) -> int:
+    """Deterministic BPE-like estimate used when tiktoken cannot be loaded.
+
+    Words are split into ~4 character pieces, digits into groups of three and
+    every punctuation mark counts as its own token, which tracks cl100k/o200k
+    counts closely enough for budgeting while never depending on the network.
+    """
+    total = 0
+    for piece in _OFFLINE_TOKEN_PATTERN.findall(text):
+        if piece.isalpha():
+            total += max(1, (len(piece) + 3) // 4)
+        else:
+            total += 1
+    return total
+
+
+class TokenCounter:
+    """Count tokens with cached encodings and an offline fallback."""
+
+    def __init__(self, default_model: str = DEFAULT_MODEL) -> None:
+        self.default_model = default_model
+        self._encoders: Dict[str, Optional[Callable[[str], List[int]]]] = {}
+        self._chars_per_token: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Encoding management
+    # ------------------------------------------------------------------
+    def _load_encoder(self, model: str) -> Optional[Callable[[str], List[int]]]:
+        try:
+            import tiktoken
+        except ImportError:
+            LOGGER.info("tiktoken not installed; using offline token estimates")
+            return None
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(_FALLBACK_ENCODING)
+        except Exception as exc:  # BPE download failures surface as many types
+            LOGGER.warning("tiktoken encoding for %s unavailable (%s); using offline token estimates", model, exc)
+            return None
+        return encoding.encode_ordinary
+
+    def _encoder(self, model: Optional[str]) -> Optional[Callable[[str], List[int]]]:
+        name = model or self.default_model
+        try:
+            return self._encoders[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._encoders:
+                self._encoders[name] = self._load_encoder(name)
+            return self._encoders[name]
+
+    def is_exact(self, model: Optional[str] = None) -> bool:
+        """Return True when counts for ``model`` come from tiktoken."""
+        return self._encoder(model) is not None
+
+    # ------------------------------------------------------------------
+    # Counting
+    # ------------------------------------------------------------------
+    def count(self, text: str, model: Optional[str] = None, *, exact: bool = True) -> int:
+        """Return the token count for ``text``.
+
+        With ``exact=False`` the count is a character-ratio estimate calibrated
+        from earlier exact counts for the same model; use it inside trimming
+        loops and confirm the final candidate with an exact count.
+        """
+        if not text:
+            return 0
+        if not exact:
+            return self.approximate(text, model)
+        encode = self._encoder(model)
+        if encode is None:
+            tokens = _offline_token_count(text)
+        else:
+            tokens = len(encode(text))
+        if tokens:
+            self._chars_per_token[model or self.default_model] = len(text) / tokens
+        return tokens
+
+    def count_many(self, texts: Iterable[str], model: Optional[str] = None) -> List[int]:
+        """Return exact token counts for each text, resolving the encoding once."""
+        encode = self._encoder(model)
+        counts: List[int] = []
+        for text in texts:
+            if not text:
+                counts.append(0)
+            elif encode is None:
+                counts.append(_offline_token_count(text))
+            else:
+                counts.append(len(encode(text)))
+        return counts
+
+    def approximate(self, text: str, model: Optional[str] = None) -> int:
+        """Return a fast character-ratio estimate of the token count."""
+        if not text:
+            return 0
+        ratio = self._chars_per_token.get(model or self.default_model, _DEFAULT_CHARS_PER_TOKEN)
+        return int(len(text) / ratio) + 1
+
+    def truncate(self, text: str, max_tokens: int, model: Optional[str] = None) -> str:
+        """Return the longest prefix of ``text`` that fits in ``max_tokens``.
+
+        Approximate counts pick a starting length; exact counts then step in
+        5% increments until one length fits and the next does not, and a
+        binary search between those two lengths finds the final cut.
+        """
+        if max_tokens <= 0 or not text:
+            return ""
+        total = self.count(text, model)
+        if total <= max_tokens:
+            return text
+
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.approximate(text[:mid], model) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+
+        # Bracket the cut with exact counts: ``fits`` is within budget, ``too_long`` is not
+        fits, too_long = 0, len(text)
+        size = low
+        if size and self.count(text[:size], model) <= max_tokens:
+            fits = size
+            while True:
+                size = max(size + 1, int(size * 1.05))
+                if size >= too_long:
+                    break
+                if self.count(text[:size], model) > max_tokens:
+                    too_long = size
+                    break
+                fits = size
+        elif size:
+            too_long = size
+            while True:
+                size = int(size * 0.95)
+                if not size:
+                    break
+                if self.count(text[:size], model) <= max_tokens:
+                    fits = size
+                    break
+                too_long = size
+
+        while too_long - fits > 1:
+            mid = (fits + too_long) // 2
+            if self.count(text[:mid], model) <= max_tokens:
+                fits = mid
+            else:
+                too_long = mid
+        return text[:fits]
+
+    def clear(self) -> None:
+        """Forget cached encodings and calibration (mainly for tests)."""
+        with self._lock:
+            self._encoders.clear()
+            self._chars_per_token.clear()
+
+
+_COUNTER: Optional[TokenCounter] = None
+_COUNTER_LOCK = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Return the shared process-wide :class:`TokenCounter`."""
+    global _COUNTER
+    if _COUNTER is None:
+        with _COUNTER_LOCK:
+            if _COUNTER is None:
+                _COUNTER = TokenCounter()
+    return _COUNTER
+
+
+def count_tokens(text: str, model: Optional[str] = None, *, exact: bool = True) -> int:
+    """Convenience wrapper around :meth:`TokenCounter.count` on the shared counter."""
+    return get_token_counter().count(text, model, exact=exact)
+
+
+def count_tokens_many(texts: Iterable[str], model: Optional[str] = None) -> List[int]:
+    """Convenience wrapper around :meth:`TokenCounter.count_many` on the shared counter."""
+    return get_token_counter().count_many(texts, model)
+
+
+__all__ = [
+    "DEFAULT_MODEL",
+    "TokenCounter",
+    "count_tokens",
+    "count_tokens_many",
+    "get_token_counter",
+]
@@ -588,6 +588,19 @@ class FilingFact(BaseModel):
     search_url: Optional[str]
 
 
+class LineageItem(BaseModel):
+    """One metric whose lineage is requested."""
+    ticker: str
+    metric: str
+    period: Optional[str] = None
+    fiscal_year: Optional[int] = None
+
+
+class LineageBatchRequest(BaseModel):
+    """Request body for batched lineage lookups."""
+    items: List[LineageItem]
+
+
 class FilingFactsSummary(BaseModel):
     """Aggregate stats describing the filing facts payload."""
     count: int
@@ -2419,46 +2432,28 @@ async def document_upload(
         LOGGER.info(f"   - Conversation ID: {conversation_id}")
         LOGGER.info("="*80)
         
-        # Automatically index the document for semantic search (non-blocking)
+        # Chunk and embed the document once so each chat turn retrieves only relevant chunks
         try:
-            from .rag_retriever import VectorStore
-            vector_store = VectorStore(db_path)
-            if vector_store._available and extracted_text.strip():
-                # Chunk and index the document
-                chunk_size = 1500
-                chunk_overlap = 200
-                chunks = []
-                start = 0
-                text = extracted_text
-                while start < len(text):
-                    end = min(start + chunk_size, len(text))
-                    chunk = text[start:end].strip()
-                    if chunk:
-                        chunks.append({
-                            "text": chunk,
-                            "metadata": {
-                                "filename": file.filename,
-                                "file_type": file_type,
-                                "uploaded_at": created_at,
-                                "conversation_id": conversation_id,
-                                "document_id": document_id,
-                            }
-                        })
-                    if end >= len(text):
-                        break
-                    start = max(start - chunk_overlap, 0) + chunk_size
+            from .document_index import UploadedDocumentIndex, get_shared_vector_store
+            if extracted_text.strip():
+                document_index = UploadedDocumentIndex(db_path, vector_store=get_shared_vector_store(db_path))
+                indexed_chunks = document_index.index_document(
+                    document_id=document_id,
+                    conversation_id=conversation_id,
+                    filename=file.filename,
+                    text=extracted_text,
+                    file_type=file_type,
+                    uploaded_at=created_at,
+                )
                 
-                if chunks:
-                    vector_store.add_uploaded_documents(chunks)
-                    LOGGER.info(f"Auto-indexed {len(chunks)} chunks for document {document_id}")
+                if indexed_chunks:
+                    LOGGER.info(f"Auto-indexed {len(indexed_chunks)} chunks for document {document_id}")
                     
                     # Register in memory-augmented RAG
                     try:
-                        from .rag_memory import MemoryAugmentedRAG
-                        # Get or create memory instance (could be singleton)
-                        # For now, create new instance (in production, use singleton)
-                        memory_rag = MemoryAugmentedRAG()
-                        chunk_ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+                        from .rag_memory import get_memory_store
+                        memory_rag = get_memory_store(db_path)
+                        chunk_ids = [chunk.chunk_id for chunk in indexed_chunks]
                         memory_rag.register_document(
                             document_id=document_id,
                             conversation_id=conversation_id,
@@ -5215,6 +5210,47 @@ def get_metric_lineage(
         raise HTTPException(status_code=500, detail={"message": f"Lineage retrieval failed: {str(e)}"})
 
 
+@app.post("/api/sources/lineage/batch")
+def get_metric_lineage_batch(payload: LineageBatchRequest) -> Dict[str, Any]:
+    """Get one lineage graph for many metrics."""
+    try:
+        settings = get_settings()
+        tracer = SourceTracer(settings.database_path)
+        graph = tracer.get_lineage_graph(
+            [(item.ticker, item.metric, item.period, item.fiscal_year) for item in payload.items]
+        )
+        return {
+            "success": True,
+            "lineage": graph
+        }
+    except Exception as e:
+        LOGGER.error(f"Batch lineage retrieval failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail={"message": f"Batch lineage retrieval failed: {str(e)}"})
+
+
+@app.get("/api/anomalies")
+def get_flagged_anomalies(
+    ticker: Optional[str] = Query(None, description="Ticker to filter by"),
+    fiscal_year: Optional[int] = Query(None, description="Fiscal year"),
+    min_severity: Optional[str] = Query(None, description="Lowest severity: low, medium, high, critical"),
+    limit: int = Query(50, ge=1, le=500),
+) -> Dict[str, Any]:
+    """Get anomalies persisted by the universe-wide anomaly sweep."""
+    try:
+        from .anomaly_detection import get_anomaly_detector
+
+        settings = get_settings()
+        detector = get_anomaly_detector(str(settings.database_path))
+        anomalies = detector.get_flagged_anomalies(ticker, fiscal_year, min_severity, limit)
+        return {
+            "success": True,
+            "anomalies": [anomaly.to_dict() for anomaly in anomalies]
+        }
+    except Exception as e:
+        LOGGER.error(f"Anomaly retrieval failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail={"message": f"Anomaly retrieval failed: {str(e)}"})
+
+
 # ============================================================================
 # Custom Modeling API Endpoints
 # ============================================================================
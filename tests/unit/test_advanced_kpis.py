@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.advanced_kpis import AdvancedKPICalculator
+
+FINANCIALS = {
+    ("AAPL", 2023): {
+        "revenue": 383.0, "net_income": 97.0, "operating_income": 114.0, "income_tax_expense": 17.0,
+        "total_assets": 352.0, "current_assets": 143.0, "current_liabilities": 145.0,
+        "total_liabilities": 290.0, "shareholders_equity": 62.0, "cash_from_operations": 110.0,
+        "free_cash_flow": 99.0, "interest_expense": 3.9, "long_term_debt": 95.0,
+    },
+    ("AAPL", 2024): {"revenue": 391.0, "net_income": 94.0, "total_assets": 365.0, "ebit": 120.0},
+    ("MSFT", 2024): {
+        "revenue": 245.0, "net_income": 88.0, "operating_income": 109.0, "total_assets": 512.0,
+        "current_liabilities": 125.0, "shareholders_equity": 268.0, "inventory": 1.2,
+        "current_assets": 159.0, "shares_outstanding": 7.4,
+    },
+    ("NVDA", 2024): {"employees": 29600.0},
+}
+
+
+def _seed(db_path, financials):
+    now = datetime.now(timezone.utc)
+    database.replace_metric_snapshots(db_path, [
+        database.MetricRecord(ticker, metric, f"FY{year}", value, "edgar", now, year, year)
+        for (ticker, year), metrics in financials.items()
+        for metric, value in metrics.items()
+    ])
+
+
+@pytest.fixture()
+def calculator(tmp_path):
+    db_path = tmp_path / "kpis.sqlite3"
+    database.initialise(db_path)
+    _seed(db_path, FINANCIALS)
+    return AdvancedKPICalculator(str(db_path))
+
+
+def test_materialized_kpis_match_on_the_fly_calculation(calculator):
+    assert calculator.materialize() == {"tickers": 3, "rows": 4, "removed": 0}
+    for ticker, year in FINANCIALS:
+        stored = calculator.get_materialized(ticker, year)
+        live = calculator.calculate_all_kpis(ticker, year, use_materialized=False)
+        assert stored is not None
+        for key, value in live.to_dict().items():
+            if isinstance(value, dict):
+                assert stored.to_dict()[key] == pytest.approx(value), (ticker, year, key)
+
+
+def test_materialize_only_recomputes_changed_tickers(calculator):
+    calculator.materialize()
+    assert calculator.materialize()["tickers"] == 0
+
+    _seed(calculator.db_path, {("MSFT", 2024): {"net_income": 44.0}})
+    assert calculator.materialize() == {"tickers": 1, "rows": 1, "removed": 0}
+    assert calculator.calculate_all_kpis("MSFT", 2024).roe == pytest.approx(44.0 / 268.0 * 100)
+
+
+def test_rank_and_screen_use_materialized_universe(calculator):
+    calculator.materialize()
+    assert [ticker for ticker, _ in calculator.rank_by_kpi("roa", 2024)] == ["AAPL", "MSFT"]
+    screened = calculator.screen({"roe": (20, None)}, fiscal_year=2024)
+    assert [kpis.ticker for kpis in screened] == ["MSFT"]
+    with pytest.raises(ValueError):
+        calculator.rank_by_kpi("roe; DROP TABLE advanced_kpi_values", 2024)
+
+
+def test_stale_materialized_rows_are_recomputed(calculator):
+    calculator.materialize()
+    assert calculator.get_materialized("MSFT", 2024) is not None
+
+    _seed(calculator.db_path, {("MSFT", 2024): {"net_income": 44.0}})
+
+    assert calculator.get_materialized("MSFT", 2024) is None
+    assert calculator.calculate_all_kpis("MSFT", 2024).roe == pytest.approx(44.0 / 268.0 * 100)
+    assert calculator.get_materialized("AAPL", 2024) is not None
@@ -1,6 +1,8 @@
 
 from __future__ import annotations
 
+import sqlite3
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 
 import pytest
@@ -155,6 +157,9 @@ def test_refresh_metrics_computes_growth_and_valuation(tmp_path):
     assert pytest.approx(latest["free_cash_flow"], rel=1e-6) == 105.0
     assert pytest.approx(latest["tsr"], rel=1e-6) == pytest.approx(((50.0 - 45.0) + 1.2) / 45.0, rel=1e-6)
     assert "roic" in latest and latest["roic"] is not None
+    # The refresh also runs the universe anomaly sweep, which persists its flags
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'anomaly_flags'").fetchone()
 
 def test_refresh_metrics_handles_alias_metrics_without_quotes(tmp_path, monkeypatch):
     db_path = tmp_path / "db.sqlite3"
@@ -260,3 +265,95 @@ def test_refresh_metrics_handles_alias_metrics_without_quotes(tmp_path, monkeypa
     assert pytest.approx(latest_derived["cash_conversion"], rel=1e-6) == expected_cash_conversion
     assert pytest.approx(latest_derived["free_cash_flow_margin"], rel=1e-6) == expected_free_cash_flow_margin
     assert pytest.approx(latest_derived["debt_to_equity"], rel=1e-6) == expected_debt_to_equity
+
+
+def test_benchmark_percentiles_are_materialized_and_match_live_query(tmp_path):
+    db_path = tmp_path / "db.sqlite3"
+    database.initialise(db_path)
+    now = datetime.now(timezone.utc)
+    snapshots = [
+        ("AAPL", 2023, 80.0), ("AAPL", 2024, 100.0),
+        ("MSFT", 2024, 60.0), ("NVDA", 2024, 40.0), ("JPM", 2024, 20.0),
+        ("NOTINDEX", 2024, 1_000.0),
+    ]
+    database.replace_metric_snapshots(db_path, [
+        database.MetricRecord(ticker, "net_income", f"FY{year}", value, "edgar", now, year, year)
+        for ticker, year, value in snapshots
+    ])
+    engine = AnalyticsEngine(_settings(db_path, tmp_path / "cache"))
+    live = engine.compute_benchmark_metrics(["Net_Income"], use_materialized=False)
+
+    assert engine.materialize_benchmark_percentiles() == 3  # universe, Technology, Financials
+    fast = engine.compute_benchmark_metrics(["Net_Income"])
+    assert fast["net_income"].value == live["net_income"].value == 55.0
+    assert fast["net_income"].period == live["net_income"].period == "FY2024"
+
+    tech = engine.get_benchmark_percentiles(["net_income"], sector="Technology")["net_income"]
+    assert tech.ticker_count == 3
+    assert (tech.p50, tech.mean) == (60.0, pytest.approx(200.0 / 3))
+    universe = engine.get_benchmark_percentiles(["net_income"])["net_income"]
+    assert universe.p25 == 35.0 and universe.p75 == 70.0
+
+
+def test_benchmark_metrics_mix_materialized_and_live_values(tmp_path):
+    db_path = tmp_path / "db.sqlite3"
+    database.initialise(db_path)
+    now = datetime.now(timezone.utc)
+
+    def seed(metric, values):
+        database.replace_metric_snapshots(db_path, [
+            database.MetricRecord(ticker, metric, "FY2024", value, "edgar", now, 2024, 2024)
+            for ticker, value in values.items()
+        ])
+
+    seed("net_income", {"AAPL": 100.0, "MSFT": 60.0})
+    engine = AnalyticsEngine(_settings(db_path, tmp_path / "cache"))
+    engine.materialize_benchmark_percentiles()
+    # Snapshots written after materialization are not in benchmark_percentiles yet
+    seed("revenue", {"AAPL": 400.0, "MSFT": 200.0})
+
+    mixed = engine.compute_benchmark_metrics(["net_income", "revenue"])
+    assert mixed["net_income"].value == 80.0
+    assert mixed["revenue"].value == 300.0
+    assert database.fetch_benchmark_percentiles(db_path, "sp500", ["revenue"]) == {}
+
+
+class _FixtureQuotes:
+    def __init__(self, prices):
+        self.prices = prices
+        self.requests = []
+
+    def fetch_quotes(self, tickers):
+        self.requests.append(list(tickers))
+        now = datetime.now(timezone.utc)
+        return [
+            MarketQuote(ticker, self.prices[ticker], "USD", None, now, "fixture", {})
+            for ticker in tickers
+            if ticker in self.prices
+        ]
+
+
+def test_ensure_quotes_refreshes_only_missing_or_stale_tickers(tmp_path):
+    db_path = tmp_path / "db.sqlite3"
+    database.initialise(db_path)
+    now = datetime.now(timezone.utc)
+    database.bulk_insert_market_quotes(db_path, [
+        MarketQuote("AAPL", 150.0, "USD", None, now - timedelta(days=400), "yahoo", {}),
+        MarketQuote("AAPL", 190.0, "USD", None, now - timedelta(hours=1), "yahoo", {}),
+        MarketQuote("MSFT", 300.0, "USD", None, now - timedelta(days=3), "yahoo", {}),
+    ])
+    settings = replace(_settings(db_path, tmp_path / "cache"), quote_max_age_hours=24)
+    provider = _FixtureQuotes({"MSFT": 410.0, "NVDA": 120.0})
+    engine = AnalyticsEngine(settings, quote_provider=provider)
+
+    engine._ensure_quotes(["aapl", "MSFT", "NVDA", "GONE"])
+
+    assert provider.requests == [["MSFT", "NVDA", "GONE"]]
+    latest = database.fetch_latest_quotes(db_path, ["AAPL", "MSFT", "NVDA", "GONE"])
+    assert {ticker: quote["price"] for ticker, quote in latest.items()} == {
+        "AAPL": 190.0, "MSFT": 410.0, "NVDA": 120.0,
+    }
+    year_ago = database.fetch_quotes_on_or_before(
+        db_path, {"AAPL": now - timedelta(days=365), "MSFT": now - timedelta(days=365)}
+    )
+    assert list(year_ago) == ["AAPL"] and year_ago["AAPL"]["price"] == 150.0
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.anomaly_detection import AnomalyDetector
+
+TICKERS = ("AAPL", "MSFT", "NVDA", "ORCL", "CSCO")
+
+
+def _seed(db_path):
+    database.initialise(db_path)
+    now = datetime.now(timezone.utc)
+    records = []
+    for offset, ticker in enumerate(TICKERS):
+        for year in range(2019, 2025):
+            revenue = 100.0 * (1.05 + 0.01 * offset + 0.002 * (year % 2)) ** (year - 2019)
+            if ticker == "AAPL" and year == 2024:
+                revenue *= 1.6  # growth spike
+            equity = 50.0
+            liabilities = 50.0 + offset + (year % 2)
+            if ticker == "NVDA" and year == 2024:
+                liabilities = 400.0  # leverage far from sector peers and history
+            for metric, value in (
+                ("revenue", revenue),
+                ("net_income", revenue * (0.2 + 0.005 * offset + 0.001 * (year % 3))),
+                ("shareholders_equity", equity),
+                ("total_liabilities", liabilities),
+            ):
+                records.append(database.MetricRecord(ticker, metric, f"FY{year}", value, "edgar", now, year, year))
+    database.replace_metric_snapshots(db_path, records)
+
+
+def test_sweep_flags_rolling_and_peer_outliers(tmp_path):
+    db_path = tmp_path / "anomalies.sqlite3"
+    _seed(db_path)
+    detector = AnomalyDetector(str(db_path))
+
+    anomalies = detector.sweep_universe(years=4)
+    flagged = {(a.ticker, a.metric) for a in anomalies}
+    assert ("AAPL", "revenue_growth") in flagged
+    assert ("NVDA", "debt_to_equity") in flagged
+    assert all(a.fiscal_year == 2024 for a in anomalies)
+    assert [a.confidence for a in anomalies] == sorted((a.confidence for a in anomalies), reverse=True)
+    nvda = next(a for a in anomalies if (a.ticker, a.metric) == ("NVDA", "debt_to_equity"))
+    assert nvda.value == 8.0 and nvda.severity in ("high", "critical")
+
+    # Nothing unusual in a quiet year
+    assert not any(a.ticker == "AAPL" for a in detector.sweep_universe(2022, years=4, persist=False))
+
+
+def test_flags_are_persisted_and_replaced(tmp_path):
+    db_path = tmp_path / "anomalies.sqlite3"
+    _seed(db_path)
+    detector = AnomalyDetector(str(db_path))
+    swept = detector.sweep_universe(years=4)
+
+    stored = detector.get_flagged_anomalies(fiscal_year=2024, limit=100)
+    assert [a.to_dict() for a in stored] == [a.to_dict() for a in swept]
+    assert all(a.ticker == "NVDA" for a in detector.get_flagged_anomalies(ticker="nvda"))
+
+    # Re-sweeping a subset only replaces that subset's rows
+    detector.sweep_universe(years=4, tickers=["AAPL", "MSFT"], std_threshold=1e9, robust_threshold=1e9)
+    remaining = {a.ticker for a in detector.get_flagged_anomalies(fiscal_year=2024, limit=100)}
+    assert "AAPL" not in remaining and "NVDA" in remaining
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from finanlyzeos_chatbot import database, finance_consolidation
+from finanlyzeos_chatbot.finance_consolidation import (
+    ConsolidationCube,
+    ConsolidationFilters,
+    consolidate_from_database,
+)
+
+
+def _seed(db_path):
+    database.initialise(db_path)
+    with database.temporary_connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO kpi_values (ticker, fiscal_year, fiscal_quarter, metric_id, value) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("AAPL", 2025, 1, "revenue", 100.0),
+                ("AAPL", 2025, 1, "cost_of_revenue", 60.0),
+                ("MSFT", 2025, 1, "revenue", 50.0),
+                ("MSFT", 2025, 2, "revenue", 70.0),
+            ],
+        )
+    now = datetime.now(timezone.utc)
+    database.replace_metric_snapshots(db_path, [
+        database.MetricRecord("AAPL", "ebitda", "FY2025", 40.0, "edgar", now, 2025, 2025),
+    ])
+
+
+def test_cube_maps_metrics_to_longest_alias_and_parses_periods(tmp_path):
+    db_path = tmp_path / "cube.sqlite3"
+    _seed(db_path)
+    cube = ConsolidationCube(db_path)
+    assert cube.refresh() == 5
+
+    q1 = cube.lookup(2025, 1)
+    assert q1["Revenue"] == {"kpi_values": 150.0}
+    assert q1["COGS"] == {"kpi_values": 60.0}
+    assert cube.lookup(2025, 1, ["msft"])["Revenue"] == {"kpi_values": 50.0}
+    assert cube.lookup(2025)["EBITDA"] == {"metric_snapshots": 40.0}
+    assert cube.entities() == ["AAPL", "MSFT"]
+
+
+def test_refresh_for_tickers_only_rebuilds_their_rows(tmp_path):
+    db_path = tmp_path / "cube.sqlite3"
+    _seed(db_path)
+    cube = ConsolidationCube(db_path)
+    cube.refresh()
+    with database.temporary_connection(db_path) as conn:
+        conn.execute("UPDATE kpi_values SET value = 80.0 WHERE ticker = 'MSFT' AND fiscal_quarter = 1")
+        conn.execute("DELETE FROM kpi_values WHERE ticker = 'AAPL'")
+
+    cube.refresh(["msft"])
+    # AAPL keeps its materialized rows until it is refreshed itself
+    assert cube.lookup(2025, 1)["Revenue"] == {"kpi_values": 180.0}
+    cube.refresh(["AAPL"])
+    assert cube.lookup(2025, 1)["Revenue"] == {"kpi_values": 80.0}
+
+
+def test_consolidation_reads_the_cube(tmp_path, monkeypatch):
+    db_path = tmp_path / "cube.sqlite3"
+    _seed(db_path)
+    monkeypatch.setattr(finance_consolidation, "load_settings", lambda: SimpleNamespace(database_path=db_path))
+
+    table = consolidate_from_database([], ConsolidationFilters(periods=["2025-Q1"], entities=["AAPL", "Global"]))
+    actuals = {(row.line_item, row.entity): row.actual for row in table.rows}
+    assert actuals[("Revenue", "AAPL")] == 100.0
+    assert actuals[("Revenue", "Global")] == 150.0
+    assert actuals[("COGS", "Global")] == 60.0
+
+
+def test_annual_lookup_prefers_annual_rows_over_quarters(tmp_path):
+    db_path = tmp_path / "cube.sqlite3"
+    _seed(db_path)
+    with database.temporary_connection(db_path) as conn:
+        conn.execute(
+            "INSERT INTO kpi_values (ticker, fiscal_year, fiscal_quarter, metric_id, value) "
+            "VALUES ('AAPL', 2025, 0, 'revenue', 400.0)"
+        )
+    cube = ConsolidationCube(db_path)
+    cube.refresh()
+
+    # AAPL reports a full year, MSFT only quarters (summed as the fallback)
+    assert cube.lookup(2025)["Revenue"] == {"kpi_values": 400.0 + 120.0}
+    assert cube.lookup(2025, 0, ["aapl"])["Revenue"] == {"kpi_values": 400.0}
+    assert cube.lookup(2025, 1, ["aapl"])["Revenue"] == {"kpi_values": 100.0}
+
+
+def test_ticker_refresh_keeps_other_metric_mappings(tmp_path):
+    db_path = tmp_path / "cube.sqlite3"
+    _seed(db_path)
+    cube = ConsolidationCube(db_path)
+    cube.refresh()
+    cube.refresh(["MSFT"])
+
+    with database.temporary_connection(db_path) as conn:
+        mapped = {row[0] for row in conn.execute("SELECT metric FROM consolidation_metric_map")}
+    assert {"cost_of_revenue", "ebitda"} <= mapped
+    assert cube.lookup(2025, 1)["COGS"] == {"kpi_values": 60.0}
+
+
+def test_empty_cube_is_only_built_once(tmp_path, monkeypatch):
+    db_path = tmp_path / "cube.sqlite3"
+    database.initialise(db_path)
+    cube = ConsolidationCube(db_path)
+    refreshes = []
+    monkeypatch.setattr(cube, "refresh", lambda tickers=None: refreshes.append(tickers) or 0)
+
+    cube.ensure_built()
+    cube.ensure_built()
+    assert refreshes == [None]
@@ -3,10 +3,18 @@ from __future__ import annotations
 import sqlite3
 from pathlib import Path
 
-from finanlyzeos_chatbot.analytics_workspace import DataDictionary
+import pytest
+
+from finanlyzeos_chatbot.analytics_workspace import DataDictionary, close_data_dictionaries
 from finanlyzeos_chatbot.database import initialise
 
 
+@pytest.fixture(autouse=True)
+def _close_dictionaries():
+    yield
+    close_data_dictionaries()
+
+
 def test_data_dictionary_autocreates_alias(tmp_path):
     db_path = tmp_path / "workspace.db"
     initialise(Path(db_path))
@@ -40,3 +48,41 @@ def test_data_dictionary_returns_existing_binding(tmp_path):
     assert first["NetIncome"].canonical_metric == "net_income"
     assert second["netincome"].canonical_metric == "net_income"
 
+
+
+def test_data_dictionary_writes_batch_through_and_shares_memory(tmp_path):
+    db_path = tmp_path / "workspace.db"
+    initialise(Path(db_path))
+
+    dictionary = DataDictionary(Path(db_path))
+    start = dictionary.version
+    bindings = dictionary.resolve(["Revenue", "Net Income", "Gross Profit"])
+    assert len(bindings) == 3
+    assert dictionary.version == start + 3
+
+    # A second instance reuses the loaded map and sees the same bindings
+    other = DataDictionary(Path(db_path))
+    assert other.resolve(["revenue"], create_missing=False)["revenue"] is bindings["Revenue"]
+
+
+def test_data_dictionary_detects_external_changes(tmp_path):
+    db_path = tmp_path / "workspace.db"
+    initialise(Path(db_path))
+
+    dictionary = DataDictionary(Path(db_path))
+    dictionary.resolve(["Revenue"])
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE metric_dictionary SET canonical_metric = 'total_revenue' WHERE alias = 'revenue'")
+
+    assert dictionary.resolve(["Revenue"])["Revenue"].canonical_metric == "total_revenue"
+
+
+def test_closed_dictionaries_reopen_on_next_use(tmp_path):
+    db_path = tmp_path / "workspace.db"
+    initialise(Path(db_path))
+    DataDictionary(Path(db_path)).resolve(["Revenue"])
+
+    close_data_dictionaries()
+
+    reopened = DataDictionary(Path(db_path))
+    assert reopened.resolve(["revenue"], create_missing=False)["revenue"].canonical_metric == "revenue"
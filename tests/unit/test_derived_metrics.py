@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from graphlib import CycleError
+
+import numpy as np
+import pytest
+
+from finanlyzeos_chatbot.analytics_engine import DEFAULT_TAX_RATE, _compute_derived_metric_rows
+from finanlyzeos_chatbot.derived_metrics import (
+    DerivedMetricGraph,
+    DerivedNode,
+    MetricFrame,
+    default_derived_nodes,
+    safe_div,
+)
+
+
+def _period(**values):
+    return {name: (value, None) for name, value in values.items()}
+
+
+def test_graph_rows_match_per_period_rules():
+    rows = _compute_derived_metric_rows({
+        ("AAPL", 2024): _period(
+            revenue=400.0, net_income=100.0, adjusted_net_income=None,
+            operating_income=120.0, depreciation_and_amortization=10.0,
+            total_assets=800.0, cash=50.0, current_liabilities=150.0,
+            cash_from_operations=130.0, capital_expenditures=-30.0,
+        ),
+        ("MSFT", 2024): _period(revenue=0.0, net_income=50.0, free_cash_flow=None),
+    })
+
+    aapl = rows[("AAPL", 2024)]
+    assert aapl["net_margin"] == aapl["profit_margin"] == 0.25
+    assert aapl["ebitda"] == 130.0
+    assert aapl["free_cash_flow"] == 100.0
+    assert aapl["roic"] == pytest.approx(120.0 * (1 - DEFAULT_TAX_RATE) / 600.0)
+    # Zero revenue leaves margins undefined; a reported (even empty) FCF is never re-derived
+    assert rows[("MSFT", 2024)] == {}
+
+
+def test_memoized_evaluation_recomputes_only_downstream_nodes():
+    graph = DerivedMetricGraph(default_derived_nodes(tax_rate=DEFAULT_TAX_RATE))
+    keys = [("AAPL", 2024), ("MSFT", 2024)]
+    base = {"revenue": np.array([400.0, 200.0]), "net_income": np.array([100.0, 20.0]),
+            "total_assets": np.array([800.0, 400.0])}
+
+    first = graph.evaluate(MetricFrame(keys, dict(base)))
+    computed = graph.stats()["computed"]
+    assert graph.evaluate(MetricFrame(keys, dict(base)))["roa"].tolist() == first["roa"].tolist()
+    assert graph.stats()["computed"] == computed
+
+    changed = dict(base, total_assets=np.array([800.0, 100.0]))
+    result = graph.evaluate(MetricFrame(keys, changed))
+    assert result["roa"].tolist() == [0.125, 0.2]
+    assert graph.stats()["computed"] - computed == len(graph.downstream(["total_assets"]))
+    assert graph.downstream(["total_assets"]) == {
+        "return_on_assets", "asset_turnover", "invested_capital", "return_on_invested_capital",
+    }
+
+
+def test_cyclic_graph_is_rejected():
+    with pytest.raises(CycleError):
+        DerivedMetricGraph([
+            DerivedNode("a", ("b", "revenue"), safe_div),
+            DerivedNode("b", ("a", "revenue"), safe_div),
+        ])
@@ -0,0 +1,84 @@
+"""Tests for chunked retrieval over uploaded documents."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.document_index import (
+    PAGE_BREAK,
+    UploadedDocumentIndex,
+    best_matching_window,
+    chunk_document_text,
+)
+
+
+def _index(tmp_path: Path) -> UploadedDocumentIndex:
+    db_path = tmp_path / "docs.sqlite3"
+    database.initialise(db_path)
+    return UploadedDocumentIndex(db_path)
+
+
+def test_chunking_keeps_page_provenance():
+    text = PAGE_BREAK.join(
+        [
+            "Revenue overview.\n\nRevenue grew 12% year over year.",
+            "Liquidity.\n\nCash and equivalents were $48.3 billion.",
+        ]
+    )
+
+    chunks = chunk_document_text(text, chunk_tokens=50)
+
+    assert [page for page, _ in chunks] == [1, 2]
+    assert "Cash and equivalents" in chunks[1][1]
+
+
+def test_chunking_respects_token_limit():
+    paragraph = "Operating expenses rose on higher research spending. " * 20
+    text = "\n\n".join([paragraph] * 6)
+
+    chunks = chunk_document_text(text, chunk_tokens=120, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    assert all(page is None for page, _ in chunks)
+
+
+def test_search_returns_relevant_chunks_within_budget(tmp_path):
+    index = _index(tmp_path)
+    filler = "\n\n".join(
+        f"Section {i}: the company discussed product roadmaps and hiring plans." for i in range(40)
+    )
+    text = PAGE_BREAK.join([filler, "Goodwill impairment of $2.1 billion was recorded in Q3.", filler])
+    chunks = index.index_document(
+        document_id="doc-1",
+        conversation_id="conv-1",
+        filename="10q.pdf",
+        text=text,
+    )
+
+    hits = index.search("goodwill impairment", conversation_id="conv-1", top_k=3, token_budget=400)
+
+    assert len(chunks) > 3
+    assert hits[0].chunk.page_number == 2
+    assert "Goodwill impairment" in hits[0].chunk.text
+    assert hits[0].chunk.citation == "10q.pdf, p. 2"
+    assert sum(hit.chunk.token_count for hit in hits) <= 400
+
+
+def test_reindexing_replaces_previous_chunks(tmp_path):
+    index = _index(tmp_path)
+    index.index_document(document_id="doc-2", conversation_id="conv-2", filename="a.txt", text="alpha " * 800)
+    index.index_document(document_id="doc-2", conversation_id="conv-2", filename="a.txt", text="beta")
+
+    chunks = index.load_chunks(conversation_id="conv-2")
+
+    assert [chunk.text for chunk in chunks] == ["beta"]
+
+
+def test_best_matching_window_keeps_source_order():
+    text = "Capex guidance unchanged.\n\nServices margin expanded.\n\nHeadcount flat.\n\nServices mix rose.\n\nOutlook."
+
+    assert best_matching_window(text, "services").split("\n\n") == [
+        "Services margin expanded.", "Headcount flat.", "Services mix rose.",
+    ]
+    assert best_matching_window(text, "dividends") == text
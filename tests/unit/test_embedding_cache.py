@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.smart_cache import EmbeddingCache, SmartCache
+
+
+class _Encoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), 1.0, 2.0] for text in texts], dtype=np.float32)
+
+
+def test_smart_cache_lru_evicts_least_recently_used_and_counts():
+    cache = SmartCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 1, 2)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_embeddings_persist_to_disk_tier_across_instances(tmp_path):
+    encoder = _Encoder()
+    cache = EmbeddingCache(tmp_path, max_memory_items=1)
+    first = cache.get_or_compute("model:3", ["Apple revenue", " Apple   revenue", "MSFT margin"], encoder)
+    assert encoder.calls == [["Apple revenue", "MSFT margin"]]
+    assert np.allclose(first[0], [13.0, 1.0, 2.0])
+    assert cache.stats()["evictions"] >= 1
+
+    reopened = EmbeddingCache(tmp_path)
+    vector = reopened.get("model:3", "MSFT margin")
+    assert vector is not None and np.allclose(vector, [11.0, 1.0, 2.0])
+    assert reopened.get("other-model:3", "MSFT margin") is None
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+
+def test_warm_up_from_recent_user_messages(tmp_path):
+    db_path = tmp_path / "chat.sqlite3"
+    database.initialise(db_path)
+    database.log_message(db_path, "c1", "user", "What is Apple's revenue?")
+    database.log_message(db_path, "c1", "assistant", "About $391B.")
+    database.log_message(db_path, "c2", "user", "What is Apple's revenue?")
+    database.log_message(db_path, "c2", "user", "Compare MSFT margins")
+
+    encoder = _Encoder()
+    cache = EmbeddingCache(tmp_path / "embeddings")
+    assert cache.warm_up_from_conversations(db_path, "model:3", encoder) == 2
+    assert sorted(encoder.calls[0]) == ["Compare MSFT margins", "What is Apple's revenue?"]
+
+    cache.get_or_compute("model:3", ["Compare MSFT margins"], encoder)
+    assert len(encoder.calls) == 1
+    assert cache.stats()["memory_hits"] >= 1
+
+
+def test_background_warm_up_runs_once_per_model(tmp_path):
+    db_path = tmp_path / "chat.sqlite3"
+    database.initialise(db_path)
+    database.log_message(db_path, "c1", "user", "What is Apple's revenue?")
+
+    encoder = _Encoder()
+    cache = EmbeddingCache(tmp_path / "embeddings")
+    thread = cache.start_warm_up(db_path, "model:3", encoder)
+    thread.join(timeout=5)
+    assert cache.start_warm_up(db_path, "model:3", encoder) is None
+    assert len(encoder.calls) == 1
+    other = cache.start_warm_up(db_path, "other:3", encoder)
+    assert other is not None
+    other.join(timeout=5)
+
+
+def test_memory_hits_do_not_wait_for_disk_lookups(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings")
+    cache.put("model:3", "cached", [1.0, 2.0, 3.0])
+    entered, release = threading.Event(), threading.Event()
+    disk_get = cache._disk_get
+
+    def slow_disk_get(model_id, text_hash):
+        entered.set()
+        release.wait(5)
+        return disk_get(model_id, text_hash)
+
+    cache._disk_get = slow_disk_get
+    lookup = threading.Thread(target=cache.get, args=("model:3", "not cached"))
+    lookup.start()
+    try:
+        assert entered.wait(5)
+        assert cache.get("model:3", "cached").tolist() == [1.0, 2.0, 3.0]
+    finally:
+        release.set()
+        lookup.join(5)
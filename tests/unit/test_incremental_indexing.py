@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import numpy as np
+
+from finanlyzeos_chatbot.rag_index_manifest import IndexManifest
+from finanlyzeos_chatbot.rag_retriever import VectorStore, content_chunk_id
+
+
+class _Model:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return np.zeros((len(texts), 3), dtype=np.float32)
+
+
+class _Collection:
+    name = "rag_docs_sec"
+
+    def __init__(self):
+        self.rows = {}
+
+        self.metadatas = {}
+
+    def upsert(self, embeddings, documents, metadatas, ids):
+        self.rows.update(zip(ids, documents))
+        self.metadatas.update(zip(ids, metadatas))
+
+    def get(self, ids=None, include=(), limit=None, offset=0):
+        selected = [chunk_id for chunk_id in (ids if ids is not None else self.rows) if chunk_id in self.rows]
+        selected = selected[offset:offset + limit] if limit else selected
+        return {"ids": selected, "metadatas": [self.metadatas.get(chunk_id, {}) for chunk_id in selected]}
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.rows.pop(chunk_id, None)
+
+
+def _store(tmp_path):
+    store = VectorStore.__new__(VectorStore)
+    store._available = True
+    store.database_path = tmp_path / "rag.sqlite3"
+    store.embedding_model = _Model()
+    return store
+
+
+def _chunks(*texts):
+    return [{"text": text, "metadata": {"ticker": "AAPL", "section": "MD&A"}} for text in texts]
+
+
+def test_chunk_ids_depend_on_content_not_position():
+    meta = {"source_type": "sec_filing", "ticker": "AAPL", "filing_type": "10-K", "fiscal_year": 2024, "section": "MD&A"}
+    first = content_chunk_id("Services revenue grew.", meta)
+    assert first.startswith("AAPL_10-K_2024_MD&A_")
+    assert content_chunk_id("Services  revenue grew. ", meta) == first
+    assert content_chunk_id("iPhone revenue fell.", meta) != first
+
+
+def test_sync_embeds_only_new_chunks_and_deletes_orphans(tmp_path):
+    store, collection = _store(tmp_path), _Collection()
+
+    assert store.sync_documents("sec:0001", _chunks("a", "b", "b"), collection) == {
+        "added": 2, "unchanged": 0, "deleted": 0,
+    }
+    store.embedding_model.encoded.clear()
+
+    counts = store.sync_documents("sec:0001", _chunks("a", "c"), collection)
+    assert counts == {"added": 1, "unchanged": 1, "deleted": 1}
+    assert store.embedding_model.encoded == ["c"]
+    assert sorted(collection.rows.values()) == ["a", "c"]
+    assert store.is_source_indexed("sec:0001", collection)
+
+
+def test_shared_chunks_survive_until_no_source_references_them(tmp_path):
+    store, collection = _store(tmp_path), _Collection()
+    store.sync_documents("sec:0001", _chunks("boilerplate", "x"), collection)
+    assert store.sync_documents("sec:0002", _chunks("boilerplate"), collection)["added"] == 0
+
+    assert store.prune_sources(collection, "sec:", keep={"sec:0002"}) == 1
+    assert sorted(collection.rows.values()) == ["boilerplate"]
+    assert IndexManifest(tmp_path / "rag.sqlite3").sources(collection.name) == {"sec:0002": 1}
+
+
+def test_uploaded_chunk_ids_are_scoped_to_the_document():
+    first = content_chunk_id("Revenue grew.", {"source_type": "uploaded_doc", "document_id": "d1"})
+    second = content_chunk_id("Revenue grew.", {"source_type": "uploaded_doc", "document_id": "d2"})
+    assert first.startswith("upload_d1_") and second.startswith("upload_d2_")
+
+
+def test_sync_re_embeds_chunks_missing_from_the_collection(tmp_path):
+    store, collection = _store(tmp_path), _Collection()
+    store.sync_documents("sec:0001", _chunks("a", "b"), collection)
+    collection.rows.clear()
+    store.embedding_model.encoded.clear()
+
+    assert store.sync_documents("sec:0001", _chunks("a", "b"), collection)["added"] == 2
+    assert sorted(collection.rows.values()) == ["a", "b"]
+
+
+def test_purge_removes_only_unrecorded_positional_ids(tmp_path):
+    store, collection = _store(tmp_path), _Collection()
+    store.sync_documents("sec:0001", _chunks("a"), collection)
+    collection.upsert(None, ["old", "upload"], [{}, {"chunk_id": "d1_chunk_0"}], ["AAPL_10-K_2023_MD&A_7", "d1_chunk_0"])
+
+    assert store.purge_positional_chunks(collection) == 1
+    assert sorted(collection.rows.values()) == ["a", "upload"]
+
+
+def test_purge_runs_once_per_collection(tmp_path):
+    store, collection = _store(tmp_path), _Collection()
+    collection.upsert(None, ["old"], [{}], ["AAPL_10-K_2023_MD&A_7"])
+    assert store.purge_positional_chunks(collection) == 1
+
+    collection.upsert(None, ["older"], [{}], ["AAPL_10-K_2022_MD&A_3"])
+    store.close()
+    assert store.purge_positional_chunks(collection) == 0
+    assert sorted(collection.rows.values()) == ["older"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from finanlyzeos_chatbot.rag_indexing_pipeline import FilingTask, IndexingPipeline
+from finanlyzeos_chatbot.rag_retriever import VectorStore
+from finanlyzeos_chatbot.sec_filing_parser import _chunk_text
+
+
+class _Model:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(len(texts))
+        return np.zeros((len(texts), 3), dtype=np.float32)
+
+
+class _Collection:
+    name = "rag_docs_sec"
+
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, embeddings, documents, metadatas, ids):
+        self.rows.update(zip(ids, metadatas))
+
+    def get(self, ids, include=()):
+        return {"ids": [chunk_id for chunk_id in ids if chunk_id in self.rows]}
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.rows.pop(chunk_id, None)
+
+
+def _filing(n, extra=""):
+    paragraph = f"Revenue for segment {n} increased because of pricing and volume. " * 12
+    text = f"ITEM 1. BUSINESS {paragraph * 3} ITEM 7. MANAGEMENT'S DISCUSSION AND ANALYSIS {paragraph * 4}{extra} SIGNATURES"
+    return FilingTask(
+        source_key=f"sec:{n}", filing_text=text, ticker="AAPL", filing_type="10-K",
+        fiscal_year=2024, source_url="https://www.sec.gov/", metadata={"document_id": str(n)},
+    )
+
+
+def test_chunking_stops_at_end_of_text():
+    text = " ".join(f"Sentence number {i} is here." for i in range(250))
+    chunks = _chunk_text(text, chunk_size=1500, chunk_overlap=200)
+    assert len(chunks) == 6
+    assert chunks[-1].endswith("Sentence number 249 is here.")
+    assert len(set(chunks)) == len(chunks)
+
+
+def test_pipeline_batches_embeddings_across_filings_and_is_incremental(tmp_path):
+    store = VectorStore.__new__(VectorStore)
+    store._available = True
+    store.database_path = tmp_path / "rag.sqlite3"
+    store.embedding_model = _Model()
+    collection = _Collection()
+    pipeline = IndexingPipeline(store, embed_batch_size=10_000, executor=ThreadPoolExecutor(2))
+
+    stats = pipeline.run([_filing(n) for n in range(3)], collection)
+    assert stats.filings == 3 and stats.failed == 0
+    assert store.embedding_model.calls == [stats.embedded] and stats.embedded == len(collection.rows)
+    assert {meta["document_id"] for meta in collection.rows.values()} == {"0", "1", "2"}
+
+    store.embedding_model.calls.clear()
+    again = pipeline.run([_filing(0), _filing(1, extra=" New disclosure about tariffs. " * 40)], collection)
+    assert again.unchanged > 0 and 0 < again.embedded < again.chunks
+    assert store.embedding_model.calls == [again.embedded]
+
+
+def test_filings_are_recorded_as_their_writes_land(tmp_path):
+    class _FailingCollection(_Collection):
+        def upsert(self, embeddings, documents, metadatas, ids):
+            if self.rows:
+                raise RuntimeError("disk full")
+            super().upsert(embeddings, documents, metadatas, ids)
+
+    store = VectorStore.__new__(VectorStore)
+    store._available = True
+    store.database_path = tmp_path / "rag.sqlite3"
+    store.embedding_model = _Model()
+    collection = _FailingCollection()
+    pipeline = IndexingPipeline(store, embed_batch_size=1, executor=ThreadPoolExecutor(1))
+
+    with pytest.raises(RuntimeError):
+        pipeline.run([_filing(0), _filing(1)], collection)
+    assert store.is_source_indexed("sec:0", collection)
+    assert not store.is_source_indexed("sec:1", collection)
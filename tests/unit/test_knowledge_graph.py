@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from finanlyzeos_chatbot.rag_knowledge_graph import Entity, KGRAGHybrid, KnowledgeGraph, Relation
+
+
+def test_graph_persists_and_reextraction_replaces_document_relations(tmp_path):
+    db_path = tmp_path / "kg.sqlite3"
+    graph = KnowledgeGraph(db_path)
+    graph.extract_from_document("Revenue grew in the Services segment.", "aapl", {"document_id": "10k-2023"})
+    graph.extract_from_document("Revenue grew in the Wearables segment.", "AAPL", {"document_id": "10k-2023"})
+    graph.close()
+
+    reopened = KnowledgeGraph(db_path)
+    try:
+        related = reopened.get_related_entities("company_AAPL", "has_segment")
+        assert any("wearables" in entity_id for entity_id in related)
+        assert not any("services" in entity_id for entity_id in related)
+        assert reopened.get_related_entities(related[0], direction="in") == ["company_AAPL"]
+    finally:
+        reopened.close()
+
+
+def test_bounded_traversal_and_common_entities():
+    graph = KnowledgeGraph()
+    graph.add_entities([Entity(id, id, "node") for id in ("company_A", "company_B", "risk_fx", "region_eu")])
+    graph.add_relations([
+        Relation("company_A", "risk_fx", "faces_risk"),
+        Relation("company_B", "risk_fx", "faces_risk"),
+        Relation("risk_fx", "region_eu", "located_in"),
+    ])
+
+    assert graph.traverse(["company_A"], max_depth=1) == {"risk_fx": 1}
+    assert graph.traverse(["company_A"], max_depth=2) == {"risk_fx": 1, "region_eu": 2}
+    assert graph.find_common_entities(["company_A", "company_B"]) == ["risk_fx"]
+
+    hybrid = KGRAGHybrid(graph, rag_retriever=None)
+    entities, _ = hybrid.retrieve_hybrid("What risks do A and B have in common?", ["A", "B"])
+    assert entities.count("risk_fx") == 3
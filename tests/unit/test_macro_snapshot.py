@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from finanlyzeos_chatbot.macro_data import LocalMacroFixtureSource, MacroDataProvider
+
+FIXTURE = {"vix": 18.2, "treasury_10y": 4.1, "fed_funds_rate": {"value": 4.0}}
+
+
+def test_snapshot_is_persisted_and_reused_across_providers(tmp_path):
+    db_path = tmp_path / "macro.sqlite3"
+    source = LocalMacroFixtureSource(FIXTURE)
+    provider = MacroDataProvider(database_path=db_path, source=source)
+
+    snapshot = provider.get_macro_snapshot()
+    assert snapshot["vix"].value == 18.2
+    assert snapshot["vix"].source == "Fixture (live)"
+    assert snapshot["gdp_growth"].source == "Fixture (default)"
+    first_calls = source.calls
+    assert first_calls == len(MacroDataProvider.INDICATORS)
+
+    provider.get_macro_snapshot()
+    assert source.calls == first_calls
+
+    cold_source = LocalMacroFixtureSource(FIXTURE)
+    cold = MacroDataProvider(database_path=db_path, source=cold_source)
+    assert cold.get_macro_snapshot()["treasury_10y"].value == 4.1
+    assert cold_source.calls == 0
+
+
+def test_stale_snapshot_served_while_refreshing_in_background():
+    source = LocalMacroFixtureSource(FIXTURE)
+    provider = MacroDataProvider(source=source)
+    provider.get_macro_snapshot()
+
+    provider.cache_ttl_map["vix"] = timedelta(0)
+    provider.refresh_snapshot(["vix"])
+    source._observations["VIXCLS"] = {"value": 30.5}
+
+    stale = provider.get_macro_snapshot()
+    assert stale["vix"].value == 18.2
+
+    provider._refresh_thread.join(timeout=5)
+    assert provider.get_macro_snapshot()["vix"].value == 30.5
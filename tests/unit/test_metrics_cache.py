@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.smart_cache import (
+    MetricsCache,
+    close_metric_version_watchers,
+    get_cache_stats,
+    metrics_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _close_watchers():
+    yield
+    close_metric_version_watchers()
+
+
+def _record(ticker: str, metric: str, value: float) -> database.MetricRecord:
+    return database.MetricRecord(
+        ticker=ticker,
+        metric=metric,
+        period="FY2024",
+        value=value,
+        source="test",
+        updated_at=datetime.now(timezone.utc),
+        start_year=2024,
+        end_year=2024,
+    )
+
+
+def test_cache_is_keyed_by_filters_and_bounded(tmp_path):
+    cache = MetricsCache(max_size=2)
+    calls = []
+
+    def load(tag):
+        return lambda: calls.append(tag) or [tag]
+
+    assert cache.get_or_load(tmp_path, "aapl", None, load("all")) == ["all"]
+    assert cache.get_or_load(tmp_path, "AAPL", None, load("again")) == ["all"]
+    assert cache.get_or_load(tmp_path, "AAPL", [(2024, 2024)], load("fy24")) == ["fy24"]
+    cache.get_or_load(tmp_path, "MSFT", None, load("msft"))
+
+    assert calls == ["all", "fy24", "msft"]
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["hit_rate"] == 0.25
+
+
+def test_snapshot_writes_invalidate_only_the_written_ticker(tmp_path):
+    db_path = tmp_path / "metrics.sqlite3"
+    database.initialise(db_path)
+    database.replace_metric_snapshots(db_path, [_record("AAPL", "revenue", 1.0), _record("MSFT", "revenue", 2.0)])
+
+    def cached(ticker):
+        return metrics_cache.get_or_load(
+            db_path, ticker, None, lambda: database.fetch_metric_snapshots(db_path, ticker)
+        )
+
+    assert cached("AAPL")[0].value == 1.0
+    assert cached("MSFT")[0].value == 2.0
+    msft_version = metrics_cache.version(db_path, "MSFT")
+
+    database.replace_metric_snapshots(db_path, [_record("AAPL", "revenue", 5.0)])
+    assert cached("AAPL")[0].value == 5.0
+    assert metrics_cache.version(db_path, "MSFT") == msft_version
+
+    aapl_version = metrics_cache.version(db_path, "AAPL")
+    database.upsert_kpi_value(db_path, "aapl", 2024, None, "revenue", 5.0, "USD", "direct", "test", None)
+    assert metrics_cache.version(db_path, "AAPL") == aapl_version + 1
+    assert "metrics" in get_cache_stats()
+
+
+def test_writes_from_other_connections_are_detected(tmp_path):
+    db_path = tmp_path / "metrics.sqlite3"
+    database.initialise(db_path)
+    database.replace_metric_snapshots(db_path, [_record("AAPL", "revenue", 1.0)])
+    loads = []
+
+    def cached():
+        return metrics_cache.get_or_load(
+            db_path, "AAPL", None, lambda: loads.append(1) or database.fetch_metric_snapshots(db_path, "AAPL")
+        )
+
+    assert cached()[0].value == 1.0
+    assert cached()[0].value == 1.0 and len(loads) == 1
+
+    # Mirrors scripts that write with raw SQL (and so never call invalidate)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE metric_snapshots SET value = 7.0 WHERE ticker = 'AAPL'")
+        database.bump_metric_data_versions(conn, ["aapl"])
+    assert cached()[0].value == 7.0 and len(loads) == 2
+
+    # A closed watcher reopens its connection and still sees later writes
+    close_metric_version_watchers()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE metric_snapshots SET value = 9.0 WHERE ticker = 'AAPL'")
+        database.bump_metric_data_versions(conn, ["AAPL"])
+    assert cached()[0].value == 9.0 and len(loads) == 3
+
+
+def test_bulk_writes_bump_each_ticker_once(tmp_path):
+    db_path = tmp_path / "metrics.sqlite3"
+    database.initialise(db_path)
+    database.replace_metric_snapshots(
+        db_path, [_record(ticker, metric, 1.0) for ticker in ("AAPL", "MSFT") for metric in ("revenue", "net_income")]
+    )
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT ticker, version FROM metric_data_versions ORDER BY ticker").fetchall() == [
+            ("AAPL", 1), ("MSFT", 1),
+        ]
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0] == 0
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from finanlyzeos_chatbot.parsing import alias_builder, parse
+
+
+def _count_parses(monkeypatch):
+    calls = []
+    original = parse._parse_uncached
+
+    def _tracking(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(parse, "_parse_uncached", _tracking)
+    parse.invalidate_parse_cache()
+    return calls
+
+
+def test_parse_to_structured_parses_identical_text_once(monkeypatch):
+    calls = _count_parses(monkeypatch)
+
+    first = parse.parse_to_structured("Show revenue for Microsoft in 2023")
+    second = parse.parse_to_structured("Show revenue for Microsoft in 2023")
+
+    assert calls == ["Show revenue for Microsoft in 2023"]
+    assert first == second
+    assert first["tickers"][0]["ticker"] == "MSFT"
+
+
+def test_parse_cache_hands_out_independent_copies(monkeypatch):
+    _count_parses(monkeypatch)
+
+    first = parse.parse_to_structured("Compare Apple and Microsoft margins")
+    first["tickers"].clear()
+    first["warnings"].append("mutated")
+
+    second = parse.parse_to_structured("Compare Apple and Microsoft margins")
+    assert second["tickers"]
+    assert "mutated" not in second["warnings"]
+
+
+def test_parse_cache_invalidated_when_aliases_reload(monkeypatch):
+    calls = _count_parses(monkeypatch)
+
+    parse.parse_to_structured("Tesla revenue 2022")
+    alias_builder.reset_alias_cache()
+    parse.parse_to_structured("Tesla revenue 2022")
+    parse.invalidate_parse_cache(metrics_changed=True)
+    parse.parse_to_structured("Tesla revenue 2022")
+
+    assert len(calls) == 3
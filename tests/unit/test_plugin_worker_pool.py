@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+
+from finanlyzeos_chatbot.ml_forecasting.user_plugins import PluginExecutionError, PluginWorkerPool
+
+PLUGIN_SOURCE = '''
+import os
+import time
+
+
+class PidPlugin:
+    def fit(self, df, sleep=0, **kwargs):
+        time.sleep(sleep)
+
+    def describe(self):
+        return {"pid": os.getpid()}
+'''
+
+
+@pytest.fixture
+def plugin_path(tmp_path):
+    path = tmp_path / "pid_plugin.py"
+    path.write_text(PLUGIN_SOURCE, encoding="utf-8")
+    return path
+
+
+def _train_pid(pool, path, owner=None, **parameters):
+    response = pool.execute(
+        path, "PidPlugin", "train", {"data": [], "parameters": parameters}, timeout=30, owner=owner
+    )
+    assert response["success"], response
+    return response["description"]["pid"]
+
+
+def test_worker_pool_reuses_and_recycles_workers(plugin_path):
+    pool = PluginWorkerPool(size=1, max_calls_per_worker=2, max_memory_growth_mb=None)
+    try:
+        first = _train_pid(pool, plugin_path)
+        second = _train_pid(pool, plugin_path)
+        third = _train_pid(pool, plugin_path)
+    finally:
+        pool.shutdown()
+
+    assert first == second
+    assert third != first
+
+
+def test_worker_pool_timeout_kills_worker_and_pool_recovers(plugin_path):
+    pool = PluginWorkerPool(size=1, max_memory_growth_mb=None)
+    try:
+        before = _train_pid(pool, plugin_path)
+        with pytest.raises(PluginExecutionError, match="timed out"):
+            pool.execute(
+                plugin_path,
+                "PidPlugin",
+                "train",
+                {"data": [], "parameters": {"sleep": 5}},
+                timeout=0.5,
+            )
+        after = _train_pid(pool, plugin_path)
+    finally:
+        pool.shutdown()
+
+    assert after != before
+
+
+def test_worker_pool_does_not_share_workers_between_users(plugin_path):
+    pool = PluginWorkerPool(size=1, max_memory_growth_mb=None)
+    try:
+        alice = _train_pid(pool, plugin_path, owner="alice")
+        alice_again = _train_pid(pool, plugin_path, owner="alice")
+        bob = _train_pid(pool, plugin_path, owner="bob")
+    finally:
+        pool.shutdown()
+
+    assert alice == alice_again
+    assert bob != alice
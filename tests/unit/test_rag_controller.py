@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from finanlyzeos_chatbot import rag_controller
+from finanlyzeos_chatbot.rag_controller import RAGController
+from finanlyzeos_chatbot.rag_retriever import RetrievalResult
+
+
+class _FakeRetriever:
+    """Each call sleeps ``delay``; metrics steps wait on ``barrier`` (if any); ``slow_tickers`` block until ``release`` is set."""
+
+    def __init__(self, barrier=None, slow_tickers=(), delay=0.0):
+        self.barrier = barrier
+        self.slow_tickers = set(slow_tickers)
+        self.delay = delay
+        self.release = threading.Event()
+
+    def retrieve(self, query, tickers, **kwargs):
+        time.sleep(self.delay)
+        if self.slow_tickers.intersection(tickers):
+            self.release.wait(timeout=5)
+        elif self.barrier is not None and kwargs.get("use_semantic_search") is False:
+            self.barrier.wait(timeout=5)
+        narratives = [{"tickers": list(tickers)}] if "max_sec_results" in kwargs else []
+        return RetrievalResult(
+            metrics=[{"ticker": ticker} for ticker in tickers],
+            facts=[],
+            sec_narratives=narratives,
+            uploaded_docs=[],
+        )
+
+
+def test_independent_steps_run_concurrently():
+    # The barrier only opens when all three metric lookups are in flight at once
+    controller = RAGController(_FakeRetriever(barrier=threading.Barrier(3)))
+    query = "Compare AAPL, MSFT and GOOGL margins and explain why they differ"
+
+    decomposed = controller.decompose_query(query, ["AAPL", "MSFT", "GOOGL"])
+    assert [step.retrieval_type for step in decomposed.steps] == [
+        "metrics", "metrics", "metrics", "sec_narratives",
+    ]
+
+    result = controller.execute_multi_hop(query, ["AAPL", "MSFT", "GOOGL"])
+
+    assert [row["ticker"] for row in result.metrics] == ["AAPL", "MSFT", "GOOGL"]
+
+
+def test_max_steps_counts_per_ticker_fan_out_once():
+    tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA"]
+    controller = RAGController(_FakeRetriever())
+    query = "Compare AAPL, MSFT, GOOGL, AMZN, META and NVDA margins and explain why they differ"
+
+    result = controller.execute_multi_hop(query, tickers)
+
+    assert [row["ticker"] for row in result.metrics] == tickers
+    assert result.sec_narratives == [{"tickers": tickers}]
+    assert controller.execute_multi_hop(query, tickers, max_steps=1).sec_narratives == []
+
+
+def test_step_timeout_keeps_partial_results_and_skips_dependents():
+    retriever = _FakeRetriever(slow_tickers={"MSFT"})
+    controller = RAGController(retriever)
+    query = "Compare AAPL and MSFT revenue forecast"
+
+    decomposed = controller.decompose_query(query, ["AAPL", "MSFT"])
+    assert decomposed.steps[-1].retrieval_type == "ml_forecasts"
+    assert decomposed.steps[-1].depends_on == [1, 2]
+
+    try:
+        result = controller.execute_multi_hop(query, ["AAPL", "MSFT"], step_timeout=0.2)
+    finally:
+        retriever.release.set()  # let the abandoned step finish instead of holding a pool thread
+
+    assert [row["ticker"] for row in result.metrics] == ["AAPL"]
+
+
+def test_step_budget_starts_when_the_step_runs(monkeypatch):
+    # One worker: the second and third lookups queue longer than the budget but each runs well within it
+    monkeypatch.setattr(rag_controller, "DEFAULT_MAX_STEP_WORKERS", 1)
+    controller = RAGController(_FakeRetriever(delay=0.15))
+    query = "Compare AAPL, MSFT and GOOGL margins and explain why they differ"
+
+    result = controller.execute_multi_hop(query, ["AAPL", "MSFT", "GOOGL"], step_timeout=0.4)
+
+    assert [row["ticker"] for row in result.metrics] == ["AAPL", "MSFT", "GOOGL"]
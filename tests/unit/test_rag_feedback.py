@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+
+from finanlyzeos_chatbot.rag_feedback import FeedbackCollector, FeedbackLabel, ScoreCalibrator
+
+
+def _record(collector, label, score=0.85, source_type="sec_narratives"):
+    collector.record_feedback(
+        query="Why did Apple's margin expand?",
+        doc_ids=["doc-1"],
+        doc_scores=[score],
+        answer="Services mix.",
+        label=label,
+        source_types=[source_type],
+    )
+
+
+def test_feedback_counts_are_incremental_and_persisted(tmp_path):
+    db_path = tmp_path / "feedback.sqlite3"
+    collector = FeedbackCollector(tmp_path / "missing.json", database_path=db_path)
+    for label in (FeedbackLabel.GOOD, FeedbackLabel.GOOD, FeedbackLabel.BAD):
+        _record(collector, label)
+
+    reopened = FeedbackCollector(tmp_path / "missing.json", database_path=db_path)
+    assert reopened.get_feedback_stats() == {
+        "total": 3, "good": 2, "bad": 1, "partial": 0, "good_ratio": 2 / 3,
+    }
+    assert reopened.get_bucket_counts("sec_narratives", 0.81) == (2, 1, 0)
+    assert [record.label for record in reopened.load_records(limit=1)] == [FeedbackLabel.BAD]
+
+
+def test_calibrator_uses_bucket_counts_once_enough_feedback(tmp_path):
+    collector = FeedbackCollector(tmp_path / "missing.json", database_path=tmp_path / "fb.sqlite3")
+    calibrator = ScoreCalibrator(collector, min_bucket_samples=3)
+    for _ in range(3):
+        _record(collector, FeedbackLabel.BAD, score=0.9, source_type="uploaded_docs")
+        _record(collector, FeedbackLabel.GOOD, score=0.9, source_type="sec_narratives")
+
+    assert calibrator.calibrate_score(0.9, "uploaded_docs") < 0.9
+    assert calibrator.calibrate_score(0.9, "sec_narratives") > 0.9
+    # Sparse bucket falls back to the overall ratio (50% good -> unchanged)
+    assert calibrator.calibrate_score(0.2, "sec_narratives") == 0.2
+
+
+def test_legacy_json_feedback_is_imported_once(tmp_path):
+    legacy = tmp_path / "rag_feedback.json"
+    legacy.write_text(json.dumps([{
+        "query": "q", "doc_ids": ["a"], "doc_scores": [0.5], "answer": "x",
+        "label": "partial", "timestamp": "2024-01-01T00:00:00",
+    }]))
+
+    collector = FeedbackCollector(legacy)
+    assert collector.get_feedback_stats()["partial"] == 1
+    assert collector.feedback_records[0].timestamp == "2024-01-01T00:00:00"
+    assert not legacy.exists()
+    assert FeedbackCollector(legacy).get_feedback_stats()["total"] == 1
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from finanlyzeos_chatbot.rag_evaluation import RAGEvaluator
+from finanlyzeos_chatbot.rag_fusion import SourceFusion
+from finanlyzeos_chatbot.rag_retriever import RetrievedDocument
+
+
+def _doc(doc_id, score):
+    return RetrievedDocument(
+        text=f"text for {doc_id}", source_type="sec_filing", metadata={"document_id": doc_id}, score=score,
+    )
+
+
+def test_reciprocal_rank_fusion_rewards_agreement_and_ignores_score_scales():
+    dense = [_doc("a", 0.2), _doc("b", 0.3), _doc("c", 0.9)]  # Chroma distances
+    sparse = [_doc("b", 42.0), _doc("d", 17.5), _doc("c", 3.0)]  # BM25 scores
+
+    fused = SourceFusion().fuse_reciprocal_rank(dense, sparse, k=60)
+
+    assert [doc.metadata["document_id"] for doc in fused] == ["b", "c", "a", "d"]
+    assert (fused[0].metadata["_dense_rank"], fused[0].metadata["_sparse_rank"]) == (2, 1)
+    assert fused[1].score == 2 / 63
+
+
+def test_evaluate_ranking_computes_recall_mrr_and_ndcg():
+    evaluation = RAGEvaluator().evaluate_ranking("q", ["x", "a", "y", "b"], {"a", "b"})
+
+    assert evaluation.recall_at_1 == 0.0
+    assert evaluation.recall_at_5 == 1.0
+    assert evaluation.mrr == 0.5
+    assert 0.0 < evaluation.ndcg_at_5 < 1.0
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from finanlyzeos_chatbot.rag_memory import MemoryAugmentedRAG, close_memory_stores, get_memory_store
+from finanlyzeos_chatbot.rag_retriever import RetrievedDocument
+
+
+def _doc(document_id, text):
+    return RetrievedDocument(text=text, source_type="uploaded", metadata={"document_id": document_id})
+
+
+def test_memory_is_shared_across_instances_on_same_database(tmp_path):
+    db_path = tmp_path / "memory.sqlite3"
+    writer = MemoryAugmentedRAG(database_path=db_path)
+    writer.register_document("doc-1", "conv-1", "user-1", "10k.pdf", ["c1", "c2"])
+    writer.register_document("old", "conv-1", "user-1", "old.pdf", [], uploaded_at=datetime.now() - timedelta(days=120))
+
+    reader = MemoryAugmentedRAG(database_path=db_path)
+    try:
+        reader.update_access("doc-1", "conv-1")
+
+        docs = writer.get_conversation_documents("conv-1")
+        assert [doc.document_id for doc in docs] == ["doc-1"]
+        assert docs[0].access_count == 1 and docs[0].chunk_ids == ["c1", "c2"]
+        assert [doc.document_id for doc in reader.get_user_documents("user-1", include_stale=True)] == ["old", "doc-1"]
+        assert reader.get_stale_documents("conv-1") == ["old"]
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_topic_clusters_accumulate_and_sweep_drops_stale_documents():
+    memory = MemoryAugmentedRAG()
+    memory.register_document("fresh", "conv", None, "a.pdf", [])
+    memory.register_document("old", "conv", None, "b.pdf", [], uploaded_at=datetime.now() - timedelta(days=200))
+
+    memory.cluster_documents_by_topic("conv", [_doc("fresh", "Revenue and margin grew")])
+    clusters = memory.cluster_documents_by_topic("conv", [_doc("old", "Key risk factors")])
+    assert clusters == {"financial_metrics": ["fresh"], "risk_analysis": ["old"]}
+
+    assert memory.sweep_stale() == 1
+    stats = memory.get_memory_stats("conv")
+    assert stats["topic_clusters"] == {"financial_metrics": ["fresh"]}
+    assert (stats["active_documents"], stats["stale_documents"]) == (1, 1)
+
+
+def test_close_memory_stores_stops_sweepers_and_resets_the_registry(tmp_path):
+    store = get_memory_store(tmp_path / "memory.sqlite3", sweep_interval_seconds=60)
+    assert get_memory_store(tmp_path / "memory.sqlite3") is store
+
+    close_memory_stores()
+
+    assert not store._sweep_thread.is_alive()
+    assert get_memory_store(tmp_path / "memory.sqlite3") is not store
+    close_memory_stores()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from finanlyzeos_chatbot.rag_reranker import Reranker
+from finanlyzeos_chatbot.rag_retriever import RetrievedDocument
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(list(pairs))
+        return [float(len(text)) for _, text in pairs]
+
+
+def _doc(text, ticker="AAPL", score=0.5):
+    return RetrievedDocument(text=text, source_type="sec_filing", metadata={"ticker": ticker}, score=score)
+
+
+def test_prune_deduplicates_and_interleaves_tickers():
+    reranker = Reranker(model=_CountingModel(), max_candidates_per_source=3)
+    docs = [
+        _doc("Apple services revenue grew strongly"),
+        _doc("apple  SERVICES revenue grew strongly!"),
+        _doc("Apple iPhone sales declined in China"),
+        _doc("Apple buyback program expanded"),
+        _doc("Microsoft Azure grew 30 percent", ticker="MSFT"),
+    ]
+
+    pruned = reranker.prune_candidates(docs)
+
+    assert [doc.text for doc in pruned] == [
+        "Apple services revenue grew strongly",
+        "Microsoft Azure grew 30 percent",
+        "Apple iPhone sales declined in China",
+    ]
+
+
+def test_multi_source_scores_in_one_length_sorted_batch_and_caches():
+    model = _CountingModel()
+    reranker = Reranker(model=model)
+    sec = [_doc("a much longer SEC narrative chunk"), _doc("short sec")]
+    uploaded = [_doc("mid-length upload", ticker=None)]
+
+    reranked_sec, reranked_uploaded = reranker.rerank_multi_source("q", sec, uploaded)
+
+    assert len(model.calls) == 1
+    assert [text for _, text in model.calls[0]] == [
+        "short sec", "mid-length upload", "a much longer SEC narrative chunk",
+    ]
+    assert reranked_sec[0].text == "a much longer SEC narrative chunk"
+    assert reranked_uploaded[0].rerank_score == float(len("mid-length upload"))
+
+    stats = {}
+    reranker.rerank_multi_source("q", sec, uploaded, stats=stats)
+    assert len(model.calls) == 1
+    assert stats["cache_hits"] == 3
+
+
+def test_score_cache_key_includes_source_and_document():
+    model = _CountingModel()
+    reranker = Reranker(model=model)
+    sec = RetrievedDocument(
+        text="sec text", source_type="sec_filing", metadata={"chunk_id": "chunk_0", "document_id": "0001"}
+    )
+    upload = RetrievedDocument(
+        text="uploaded text", source_type="uploaded_doc", metadata={"chunk_id": "chunk_0", "document_id": "d1"}
+    )
+    other_upload = RetrievedDocument(
+        text="another upload", source_type="uploaded_doc", metadata={"chunk_id": "chunk_0", "document_id": "d2"}
+    )
+
+    scores = reranker.score_pairs("q", [sec, upload, other_upload])
+
+    assert scores == [float(len("sec text")), float(len("uploaded text")), float(len("another upload"))]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.sector_analytics import SectorAnalytics, invalidate_sector_distributions
+from finanlyzeos_chatbot.smart_cache import close_metric_version_watchers
+
+COMPANIES = {
+    "AAPL": {"revenue": 400.0, "net_income": 100.0, "shareholders_equity": 50.0, "total_liabilities": 250.0},
+    "MSFT": {"revenue": 200.0, "net_income": 80.0, "shareholders_equity": 200.0},
+    "NVDA": {"revenue": 100.0, "net_income": 30.0, "total_assets": 300.0},
+}
+
+
+def _seed(db_path, companies, year=2024):
+    now = datetime.now(timezone.utc)
+    database.replace_metric_snapshots(db_path, [
+        database.MetricRecord(ticker, metric, f"FY{year}", value, "edgar", now, year, year)
+        for ticker, metrics in companies.items()
+        for metric, value in metrics.items()
+    ])
+
+
+@pytest.fixture()
+def analytics(tmp_path):
+    db_path = tmp_path / "sector.sqlite3"
+    database.initialise(db_path)
+    _seed(db_path, COMPANIES)
+    invalidate_sector_distributions()
+    yield SectorAnalytics(str(db_path))
+    close_metric_version_watchers()
+
+
+def test_benchmarks_and_ranks_come_from_one_distribution(analytics):
+    benchmark = analytics.calculate_sector_benchmarks("Technology", 2024)
+    assert benchmark.companies_count == 3
+    assert benchmark.avg_revenue == pytest.approx(700 / 3)
+    assert benchmark.median_revenue == 200.0
+    assert benchmark.median_net_margin == pytest.approx(30.0)
+    assert benchmark.avg_roe == pytest.approx((200.0 + 40.0) / 2)
+    assert benchmark.avg_debt_to_equity == 5.0
+    assert benchmark.avg_roa == 10.0
+
+    comparison = analytics.compare_company_to_sector("MSFT", 2024)
+    assert comparison.metrics["net_income"] == 80.0
+    assert comparison.percentile_ranks["revenue"] == pytest.approx(200 / 3)
+    assert comparison.percentile_ranks["net_income"] == pytest.approx(200 / 3)
+    assert analytics.get_top_performers_by_sector("Technology", "net_income", 2) == [("AAPL", 100.0), ("MSFT", 80.0)]
+    assert analytics.sector_distribution("Technology", 2024).quantiles("revenue")[0.25] == 150.0
+
+
+def test_distributions_are_cached_until_sector_metrics_change(analytics):
+    first = analytics.sector_distribution("Technology", 2024)
+    assert analytics.sector_distribution("Technology", 2024) is first
+    _seed(analytics.db_path, {"JPM": {"revenue": 50.0}})
+    assert analytics.sector_distribution("Technology", 2024) is first
+
+    # A write from another connection (e.g. a utility script) is picked up without invalidation
+    with sqlite3.connect(analytics.db_path) as conn:
+        conn.execute("UPDATE metric_snapshots SET value = 1000.0 WHERE ticker = 'AAPL' AND metric = 'revenue'")
+        database.bump_metric_data_versions(conn, ["AAPL"])
+    assert analytics.calculate_sector_benchmarks("Technology", 2024).avg_revenue == pytest.approx(1300 / 3)
+
+    cached = analytics.sector_distribution("Technology", 2024)
+    invalidate_sector_distributions(analytics.db_path)
+    assert analytics.sector_distribution("Technology", 2024) is not cached
+
+
+def test_growth_trends_load_all_years_together(analytics):
+    _seed(analytics.db_path, {"AAPL": {"revenue": 300.0}, "MSFT": {"revenue": 100.0}}, year=2023)
+    trends = analytics.get_sector_growth_trends("Technology", years=2)
+    assert trends[2023] == {"revenue": 200.0}
+    assert trends[2024]["net_income"] == pytest.approx(70.0)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+
+from finanlyzeos_chatbot import database
+from finanlyzeos_chatbot.source_tracer import SourceTracer
+
+
+def _seed(db_path):
+    database.initialise(db_path)
+    with database.temporary_connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO metric_snapshots (ticker, metric, period, start_year, end_year, value, source, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("AAPL", "revenue", "FY2023", 2023, 2023, 383.0, "edgar", "2024-01-01"),
+                ("AAPL", "revenue", "FY2024", 2024, 2024, 391.0, "edgar", "2025-01-01"),
+                ("MSFT", "revenue", "FY2024", 2024, 2024, 245.0, "derived", "2025-01-01"),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO financial_facts (cik, ticker, metric, fiscal_year, period, value, source_filing, raw, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("0000320193", "AAPL", "revenue", 2024, "FY2024", 391.0, "10-K/0000320193-24-000123", json.dumps({"k": 1}), "2025-01-02"),
+                ("0000320193", "AAPL", "revenue", 2023, "FY2023", 383.0, "10-K/0000320193-23-000106", "{}", "2024-01-02"),
+                ("0000789019", "MSFT", "revenue", 2024, "FY2024", 245.0, "10-K/0000789019-24-000001", "{}", "2025-01-02"),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO company_filings (cik, ticker, accession_number, form_type, filed_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("0000320193", "AAPL", "0000320193-24-000123", "10-K", "2024-11-01"),
+                ("0000789019", "MSFT", "0000789019-24-000001", "10-K", "2024-07-30"),
+            ],
+        )
+
+
+def test_batched_traces_match_per_metric_semantics(tmp_path):
+    db_path = tmp_path / "lineage.sqlite3"
+    _seed(db_path)
+    tracer = SourceTracer(db_path)
+
+    aapl, msft, missing = tracer.trace_metrics([
+        ("aapl", "Revenue", None, 2024),
+        ("MSFT", "revenue", "FY2024"),
+        ("NVDA", "revenue", None),
+    ])
+    assert aapl.value == 391.0
+    assert [step["step"] for step in aapl.trace_path] == ["metric_snapshot", "financial_fact", "filing"]
+    assert aapl.sources[0]["raw_data"] == {"k": 1}
+    assert aapl.sources[1]["sec_url"].endswith("cik=320193&accession_number=0000320193-24-000123&xbrl_type=v")
+    # Non-EDGAR snapshots skip fact details but still list filings
+    assert [step["step"] for step in msft.trace_path] == ["metric_snapshot", "filing"]
+    assert missing.value is None and missing.trace_path == []
+
+    single = tracer.trace_metric("aapl", "Revenue", fiscal_year=2024)
+    assert single.to_dict() == aapl.to_dict()
+
+
+def test_lineage_graph_shares_nodes_across_metrics(tmp_path):
+    db_path = tmp_path / "lineage.sqlite3"
+    _seed(db_path)
+    graph = SourceTracer(db_path).get_lineage_graph([
+        ("AAPL", "revenue", "FY2024", 2024),
+        ("AAPL", "revenue", "FY2024-restated", 2024),
+    ])
+    types = [node["type"] for node in graph["nodes"]]
+    assert types.count("metric") == 2
+    assert types.count("filing") == 1 and types.count("financial_fact") == 1
+    assert len(graph["edges"]) == 4
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from finanlyzeos_chatbot.rag_structure_aware import TableAwareRetriever
+
+SEGMENT_TABLE = """
+| Segment | Revenue | Operating Income |
+|---|---|---|
+| Services | 96,169 | 68,000 |
+| iPhone | 201,183 | 80,000 |
+"""
+
+GEOGRAPHY_TABLE = """
+| Region | Net Sales |
+|---|---|
+| Americas | 167,045 |
+| Europe | 101,328 |
+"""
+
+
+def test_tables_persist_and_filter_by_ticker_and_period(tmp_path):
+    db_path = tmp_path / "tables.sqlite3"
+    retriever = TableAwareRetriever(database_path=db_path)
+    assert retriever.index_tables("aapl-10k-2024", SEGMENT_TABLE + GEOGRAPHY_TABLE, {"ticker": "aapl", "fiscal_year": 2024}) == 2
+    retriever.index_tables("msft-10k-2024", SEGMENT_TABLE, {"ticker": "MSFT", "period": "FY2024"})
+    retriever.close()
+
+    reopened = TableAwareRetriever(database_path=db_path)
+    try:
+        assert reopened.is_indexed("aapl-10k-2024")
+
+        results = reopened.retrieve_tables("Revenue by segment", ticker="AAPL", period="FY2024")
+        assert len(results) == 1
+        assert "Ticker=AAPL | Period=FY2024" in results[0]
+        assert "Segment=Services" in results[0]
+
+        by_region = reopened.retrieve_tables("Net sales by region breakdown", ticker="AAPL")
+        assert by_region and "Region=Americas" in by_region[0]
+        assert reopened.retrieve_tables("Revenue by segment", ticker="GOOGL") == []
+    finally:
+        reopened.close()
+
+
+def test_reindexing_a_document_replaces_its_tables():
+    retriever = TableAwareRetriever()
+    retriever.index_tables("doc", SEGMENT_TABLE, {"ticker": "AAPL"})
+    retriever.index_tables("doc", GEOGRAPHY_TABLE, {"ticker": "AAPL"})
+
+    assert retriever.retrieve_tables("segment revenue table") == []
+    assert len(retriever.retrieve_tables("revenue by region")) == 1
+
+
+def test_documents_without_tables_are_marked_indexed(tmp_path):
+    retriever = TableAwareRetriever(database_path=tmp_path / "tables.sqlite3")
+    try:
+        assert not retriever.is_indexed("no-tables")
+        assert retriever.index_tables("no-tables", "Narrative text only.", {"ticker": "AAPL"}) == 0
+        assert retriever.is_indexed("no-tables")
+    finally:
+        retriever.close()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from finanlyzeos_chatbot import token_counter
+from finanlyzeos_chatbot.token_counter import TokenCounter
+
+
+def _offline_counter(monkeypatch) -> TokenCounter:
+    counter = TokenCounter()
+    monkeypatch.setattr(counter, "_load_encoder", lambda model: None)
+    return counter
+
+
+def test_offline_fallback_is_deterministic(monkeypatch):
+    counter = _offline_counter(monkeypatch)
+    text = "Revenue grew 12% to $394.3 billion."
+
+    assert not counter.is_exact()
+    assert counter.count(text) == counter.count(text) > 0
+    assert counter.count_many([text, "", text]) == [counter.count(text), 0, counter.count(text)]
+
+
+def test_encoder_loaded_once_per_model(monkeypatch):
+    loads = []
+    counter = TokenCounter()
+
+    def _fake_loader(model):
+        loads.append(model)
+        return lambda text: text.split()
+
+    monkeypatch.setattr(counter, "_load_encoder", _fake_loader)
+    for _ in range(5):
+        counter.count("one two three")
+    counter.count_many(["a b", "c"], model="gpt-4o-mini")
+
+    assert loads == ["gpt-4o", "gpt-4o-mini"]
+    assert counter.count("one two three") == 3
+
+
+def test_truncate_result_fits_exact_budget(monkeypatch):
+    counter = _offline_counter(monkeypatch)
+    text = "Operating margin expanded to 31.5% on services mix. " * 400
+
+    truncated = counter.truncate(text, 250)
+
+    assert text.startswith(truncated)
+    assert 0 < counter.count(truncated) <= 250
+    assert counter.truncate("short", 250) == "short"
+
+
+def test_shared_counter_is_singleton():
+    assert token_counter.get_token_counter() is token_counter.get_token_counter()
+
+
+def test_truncate_returns_longest_fitting_prefix(monkeypatch):
+    counter = _offline_counter(monkeypatch)
+    text = "Free cash flow rose 8% while capex normalised. " * 120
+
+    for budget in (1, 37, 250):
+        truncated = counter.truncate(text, budget)
+        assert counter.count(truncated) <= budget
+        assert counter.count(text[: len(truncated) + 1]) > budget